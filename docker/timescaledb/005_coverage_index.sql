@@ -0,0 +1,18 @@
+-- =============================================================================
+-- TradeCat 覆盖索引（缺口检测）
+-- 每个 (表, exchange, symbol, UTC 日) 一行，slots 为当日槽位位图，由 data-service upsert 同事务维护
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS market_data.coverage_daily (
+    table_name  TEXT         NOT NULL,
+    exchange    TEXT         NOT NULL,
+    symbol      TEXT         NOT NULL,
+    day         DATE         NOT NULL,
+    slots       BIT VARYING  NOT NULL,
+    filled      INTEGER      GENERATED ALWAYS AS (bit_count(slots)::int) STORED,
+    updated_at  TIMESTAMPTZ  NOT NULL DEFAULT now(),
+    PRIMARY KEY (table_name, exchange, symbol, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_coverage_daily_day
+    ON market_data.coverage_daily (table_name, day, symbol);
@@ -0,0 +1,50 @@
+-- =============================================================================
+-- TradeCat 采集端聚合表（5m/15m/1h/4h/1d/1w）
+-- data-service 由 1m 流滚动聚合后写入；candles_5m 等为连续聚合，不能直接 upsert
+-- candles_{周期}_live 视图：_rollup 中已有的桶优先，其余取连续聚合（trading-service 读取）
+-- =============================================================================
+
+SET search_path TO market_data, public;
+
+DO $$
+DECLARE
+    cfg RECORD;
+BEGIN
+    FOR cfg IN
+        SELECT * FROM (VALUES
+            ('candles_5m_rollup',  INTERVAL '7 days'),
+            ('candles_15m_rollup', INTERVAL '7 days'),
+            ('candles_1h_rollup',  INTERVAL '30 days'),
+            ('candles_4h_rollup',  INTERVAL '30 days'),
+            ('candles_1d_rollup',  INTERVAL '365 days'),
+            ('candles_1w_rollup',  INTERVAL '365 days')
+        ) AS t(table_name, chunk_interval)
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS market_data.%I (LIKE market_data.candles_1m INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING INDEXES)',
+            cfg.table_name
+        );
+        EXECUTE format('ALTER TABLE market_data.%I ALTER COLUMN source SET DEFAULT %L', cfg.table_name, 'ws_rollup');
+        PERFORM create_hypertable(
+            format('market_data.%I', cfg.table_name)::regclass, 'bucket_ts',
+            chunk_time_interval => cfg.chunk_interval, if_not_exists => TRUE
+        );
+        -- 读取视图 candles_{周期}_live：采集端聚合的桶优先，没有的桶取连续聚合
+        IF to_regclass(format('market_data.%I', replace(cfg.table_name, '_rollup', ''))) IS NOT NULL THEN
+            EXECUTE format($fmt$
+                CREATE OR REPLACE VIEW market_data.%1$I AS
+                SELECT exchange, symbol, bucket_ts, open, high, low, close, volume, quote_volume, trade_count,
+                       is_closed, source, taker_buy_volume, taker_buy_quote_volume
+                FROM market_data.%2$I
+                UNION ALL
+                SELECT c.exchange, c.symbol, c.bucket_ts, c.open, c.high, c.low, c.close, c.volume, c.quote_volume,
+                       c.trade_count, c.is_closed, c.source, c.taker_buy_volume, c.taker_buy_quote_volume
+                FROM market_data.%3$I c
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM market_data.%2$I r
+                    WHERE r.exchange = c.exchange AND r.symbol = c.symbol AND r.bucket_ts = c.bucket_ts
+                )
+            $fmt$, replace(cfg.table_name, '_rollup', '_live'), cfg.table_name, replace(cfg.table_name, '_rollup', ''));
+        END IF;
+    END LOOP;
+END$$;
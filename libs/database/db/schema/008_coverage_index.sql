@@ -0,0 +1,49 @@
+-- 008_coverage_index.sql
+--
+-- 目的：
+-- 1. 建立 coverage_daily 覆盖索引：每个 (表, exchange, symbol, UTC 日) 一行，slots 为当日槽位位图
+--    （candles_1m 为 1440 位，binance_futures_metrics_5m 为 288 位，第 i 位 = 当日第 i 根）。
+-- 2. data-service 的 upsert 路径在同一事务内对位图做 OR 合并（幂等，与插入/更新无关），
+--    缺口检测只查不完整的格子，代价与 symbol × 天数成正比，不再随历史行数增长。
+--
+-- 使用说明：
+-- - 在执行本脚本前需已运行 001_timescaledb.sql / 005_metrics_5m.sql。
+-- - 脚本支持幂等执行；末尾的回填从现有数据一次性生成位图，数据量大时可按时间范围分批执行。
+-- - 保留策略删除旧 chunk 后，旧日期的位图不会清除；缺口检测只扫描近期窗口，不受影响。
+
+SET search_path TO market_data, public;
+
+CREATE TABLE IF NOT EXISTS market_data.coverage_daily (
+    table_name  TEXT         NOT NULL,
+    exchange    TEXT         NOT NULL,
+    symbol      TEXT         NOT NULL,
+    day         DATE         NOT NULL,
+    slots       BIT VARYING  NOT NULL,
+    filled      INTEGER      GENERATED ALWAYS AS (bit_count(slots)::int) STORED,
+    updated_at  TIMESTAMPTZ  NOT NULL DEFAULT now(),
+    PRIMARY KEY (table_name, exchange, symbol, day)
+);
+
+-- 按日期范围扫描不完整格子
+CREATE INDEX IF NOT EXISTS idx_coverage_daily_day
+    ON market_data.coverage_daily (table_name, day, symbol);
+
+-- 回填：candles_1m -----------------------------------------------------------
+INSERT INTO market_data.coverage_daily (table_name, exchange, symbol, day, slots)
+SELECT 'candles_1m', exchange, symbol, (bucket_ts AT TIME ZONE 'UTC')::date,
+       bit_or(B'1'::bit(1440) >> ((EXTRACT(EPOCH FROM bucket_ts)::bigint % 86400) / 60)::int)::varbit
+FROM market_data.candles_1m
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (table_name, exchange, symbol, day) DO UPDATE SET
+    slots = coverage_daily.slots | EXCLUDED.slots,
+    updated_at = now();
+
+-- 回填：binance_futures_metrics_5m（create_time 为 UTC 无时区时间） -------------
+INSERT INTO market_data.coverage_daily (table_name, exchange, symbol, day, slots)
+SELECT 'binance_futures_metrics_5m', exchange, symbol, create_time::date,
+       bit_or(B'1'::bit(288) >> ((EXTRACT(EPOCH FROM create_time)::bigint % 86400) / 300)::int)::varbit
+FROM market_data.binance_futures_metrics_5m
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (table_name, exchange, symbol, day) DO UPDATE SET
+    slots = coverage_daily.slots | EXCLUDED.slots,
+    updated_at = now();
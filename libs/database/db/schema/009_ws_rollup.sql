@@ -0,0 +1,60 @@
+-- 009_ws_rollup.sql
+--
+-- 目的：
+-- 1. 为 data-service 采集端聚合（collectors/rollup.py）建立物理表 candles_{5m,15m,1h,4h,1d,1w}_rollup。
+--    candles_5m 等同名对象是连续聚合（物化视图），不能直接 upsert，因此采集端聚合结果写入独立的 _rollup 表，
+--    K 线闭合后即可读取，不必等待连续聚合刷新策略。
+-- 2. 列结构与 candles_1m 一致（LIKE），聚合语义与 004_continuous_aggregates.sql 相同：
+--    first(open) / max(high) / min(low) / last(close) / sum(...) / bool_and(is_closed)，
+--    桶边界与 time_bucket 默认 origin 对齐（周线从周一 00:00 UTC 开始）。
+-- 3. 视图 candles_{周期}_live：_rollup 中已有的桶优先，其余取连续聚合；trading-service 检测到视图存在时改读该视图，
+--    未启用采集端聚合（_rollup 为空）时与连续聚合结果相同。
+--
+-- 使用说明：
+-- - 在执行本脚本前需已运行 001_timescaledb.sql 与 004_continuous_aggregates.sql（视图依赖连续聚合）。
+-- - 脚本支持幂等执行；可用 services/data-service/scripts/verify_rollup.py 与连续聚合逐桶核对。
+
+SET search_path TO market_data, public;
+
+DO $$
+DECLARE
+    cfg RECORD;
+BEGIN
+    FOR cfg IN
+        SELECT * FROM (VALUES
+            ('candles_5m_rollup',  INTERVAL '7 days'),
+            ('candles_15m_rollup', INTERVAL '7 days'),
+            ('candles_1h_rollup',  INTERVAL '30 days'),
+            ('candles_4h_rollup',  INTERVAL '30 days'),
+            ('candles_1d_rollup',  INTERVAL '365 days'),
+            ('candles_1w_rollup',  INTERVAL '365 days')
+        ) AS t(table_name, chunk_interval)
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS market_data.%I (LIKE market_data.candles_1m INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING INDEXES)',
+            cfg.table_name
+        );
+        EXECUTE format('ALTER TABLE market_data.%I ALTER COLUMN source SET DEFAULT %L', cfg.table_name, 'ws_rollup');
+        PERFORM create_hypertable(
+            format('market_data.%I', cfg.table_name)::regclass, 'bucket_ts',
+            chunk_time_interval => cfg.chunk_interval, if_not_exists => TRUE
+        );
+        -- 读取视图 candles_{周期}_live：采集端聚合的桶优先，没有的桶取连续聚合
+        IF to_regclass(format('market_data.%I', replace(cfg.table_name, '_rollup', ''))) IS NOT NULL THEN
+            EXECUTE format($fmt$
+                CREATE OR REPLACE VIEW market_data.%1$I AS
+                SELECT exchange, symbol, bucket_ts, open, high, low, close, volume, quote_volume, trade_count,
+                       is_closed, source, taker_buy_volume, taker_buy_quote_volume
+                FROM market_data.%2$I
+                UNION ALL
+                SELECT c.exchange, c.symbol, c.bucket_ts, c.open, c.high, c.low, c.close, c.volume, c.quote_volume,
+                       c.trade_count, c.is_closed, c.source, c.taker_buy_volume, c.taker_buy_quote_volume
+                FROM market_data.%3$I c
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM market_data.%2$I r
+                    WHERE r.exchange = c.exchange AND r.symbol = c.symbol AND r.bucket_ts = c.bucket_ts
+                )
+            $fmt$, replace(cfg.table_name, '_rollup', '_live'), cfg.table_name, replace(cfg.table_name, '_rollup', ''));
+        END IF;
+    END LOOP;
+END$$;
@@ -0,0 +1,159 @@
+"""
+chunk 维护基准（需本地 TimescaleDB）
+
+用法: python scripts/bench_chunk_maintenance.py --symbols 100 --days 10 --replays 5
+
+在独立 schema（默认 bench_maint）中按 market_data.candles_1m 建 hypertable（1 天一个 chunk），
+写入最近 --days 天数据并压缩 2 天前的 chunk，测试结束后删除：
+- late:    向已压缩区间写入迟到分钟，只解压受影响的 chunk；维护任务重新压缩的耗时
+- replay:  对热区 chunk 重复写入相同批次（spool 回放），对比有/无 IS DISTINCT FROM 条件时
+           产生的更新元组数与 chunk 大小（写放大）
+- read:    热区维护（VACUUM）前后最近 1 小时窗口查询延迟
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from psycopg import sql
+
+import adapters.timescale as timescale
+from adapters.timescale import TimescaleAdapter
+from config import settings
+from maintenance.chunks import ChunkMaintainer, ChunkPolicy
+
+
+def make_batch(symbols: int, start: datetime, bars: int) -> dict:
+    cols = {k: [] for k in ("symbol", "bucket_ts", "open", "high", "low", "close", "volume")}
+    for s in range(symbols):
+        for i in range(bars):
+            p = 100.0 + s + i * 0.01
+            cols["symbol"].append(f"BENCH{s:04d}USDT")
+            cols["bucket_ts"].append(start + timedelta(minutes=i))
+            cols["open"].append(p)
+            cols["high"].append(p + 0.5)
+            cols["low"].append(p - 0.5)
+            cols["close"].append(p + 0.1)
+            cols["volume"].append(10.0 + i)
+    return cols
+
+
+def timed(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def table_stats(ts: TimescaleAdapter, table: str) -> tuple:
+    """(更新元组数, 死元组数, 表大小字节, 已压缩 chunk 数)"""
+    with ts.connection() as conn:
+        try:
+            conn.execute("SELECT pg_stat_force_next_flush()")
+        except Exception:
+            conn.rollback()
+            time.sleep(1)
+        conn.execute("SELECT pg_stat_clear_snapshot()")
+        upd, dead = conn.execute("""
+            SELECT COALESCE(sum(s.n_tup_upd), 0), COALESCE(sum(s.n_dead_tup), 0)
+            FROM timescaledb_information.chunks c
+            JOIN pg_stat_user_tables s ON s.schemaname = c.chunk_schema AND s.relname = c.chunk_name
+            WHERE c.hypertable_schema = %s AND c.hypertable_name = %s
+        """, (ts.schema, table)).fetchone()
+        size = conn.execute("SELECT hypertable_size(%s::regclass)", (f"{ts.schema}.{table}",)).fetchone()[0]
+        compressed = conn.execute(
+            "SELECT count(*) FROM timescaledb_information.chunks "
+            "WHERE hypertable_schema = %s AND hypertable_name = %s AND is_compressed",
+            (ts.schema, table)).fetchone()[0]
+        conn.commit()
+    return int(upd), int(dead), int(size), int(compressed)
+
+
+def read_latency(ts: TimescaleAdapter, table: str, end: datetime, n: int = 50) -> float:
+    """最近 1 小时窗口逐 symbol 查询的平均延迟（毫秒）"""
+    query = sql.SQL("SELECT * FROM {t} WHERE exchange = %s AND symbol = %s AND bucket_ts >= %s").format(
+        t=sql.Identifier(ts.schema, table))
+    with ts.connection() as conn:
+        t0 = time.perf_counter()
+        for i in range(n):
+            conn.execute(query, (settings.db_exchange, f"BENCH{i % 10:04d}USDT", end - timedelta(hours=1))).fetchall()
+        conn.commit()
+    return (time.perf_counter() - t0) / n * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="chunk 维护基准")
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--replays", type=int, default=5)
+    parser.add_argument("--schema", default="bench_maint")
+    args = parser.parse_args()
+
+    table = "candles_1m"
+    ts = TimescaleAdapter(schema=args.schema)
+    with ts.connection() as conn:
+        conn.execute(sql.SQL("DROP SCHEMA IF EXISTS {s} CASCADE").format(s=sql.Identifier(args.schema)))
+        conn.execute(sql.SQL("CREATE SCHEMA {s}").format(s=sql.Identifier(args.schema)))
+        conn.execute(sql.SQL("CREATE TABLE {t} (LIKE {src} INCLUDING ALL)").format(
+            t=sql.Identifier(args.schema, table), src=sql.Identifier(settings.db_schema, table)))
+        conn.execute("SELECT create_hypertable(%s, 'bucket_ts', chunk_time_interval => INTERVAL '1 day')",
+                     (f"{args.schema}.{table}",))
+        conn.commit()
+
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    start = (now - timedelta(days=args.days)).replace(hour=0, minute=0)
+    maint = ChunkMaintainer(ts, [ChunkPolicy(table, compress_after=timedelta(days=2), hot_window=timedelta(days=2),
+                                             segmentby="exchange,symbol", orderby="bucket_ts")])
+    try:
+        t = start
+        while t < now:
+            bars = min(1440, int((now - t).total_seconds() // 60))
+            ts.upsert_candles_columnar("1m", make_batch(args.symbols, t, bars), source="bench")
+            t += timedelta(days=1)
+        t_compress = timed(maint.run_once)
+        print(f"setup     {args.symbols} symbols x {args.days} days, 初始压缩 {table_stats(ts, table)[3]} chunk "
+              f"({t_compress:.2f}s)")
+
+        # 迟到数据：5 天前的 10 分钟
+        before = table_stats(ts, table)[3]
+        ts._compressed.clear()  # 已压缩边界缓存 COMPRESSED_BOUNDARY_TTL 秒，基准中立即刷新
+        late = make_batch(3, now - timedelta(days=5), 10)
+        t_late = timed(lambda: ts.upsert_candles_columnar("1m", late, source="bench_late"))
+        after = table_stats(ts, table)[3]
+        t_re = timed(maint.run_once)
+        print(f"late      写入 {t_late * 1000:7.1f}ms  解压 {before - after} chunk  "
+              f"重新压缩 {t_re:.2f}s -> {table_stats(ts, table)[3]} chunk")
+
+        # spool 回放：同一热区批次重复写入
+        batch = make_batch(args.symbols, now - timedelta(hours=3), 120)
+        guard = timescale._changed_sql
+        for name, changed in (("guarded", guard), ("unguarded", lambda cols: sql.SQL("TRUE"))):
+            timescale._changed_sql = changed
+            upd0, dead0, size0, _ = table_stats(ts, table)
+            for _ in range(args.replays):
+                ts.upsert_candles_columnar("1m", batch, source="bench")
+            upd1, dead1, size1, _ = table_stats(ts, table)
+            print(f"replay    {name:<9} 更新元组 {upd1 - upd0:8d}  死元组 +{dead1 - dead0:8d}  "
+                  f"大小 +{(size1 - size0) / 1024:8.0f} KiB")
+        timescale._changed_sql = guard
+
+        r0 = read_latency(ts, table, now)
+        with maint._connect() as conn:
+            for c in maint.chunks(conn, table):
+                if not c.compressed:
+                    conn.execute(sql.SQL("VACUUM (ANALYZE) {}").format(sql.Identifier(c.schema, c.name)))
+        r1 = read_latency(ts, table, now)
+        print(f"read      最近 1h 窗口 {r0:6.2f}ms -> VACUUM 后 {r1:6.2f}ms  死元组 {table_stats(ts, table)[1]}")
+    finally:
+        with ts.connection() as conn:
+            conn.execute(sql.SQL("DROP SCHEMA IF EXISTS {s} CASCADE").format(s=sql.Identifier(args.schema)))
+            conn.commit()
+        ts.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+限流器争用基准: 旧版文件锁 + JSON 状态 vs 共享内存令牌桶
+
+用法: python scripts/bench_rate_limiter.py --procs 8 --threads 4 --calls 2000
+
+令牌速率设为极大值，只测量取令牌本身的开销与跨进程争用吞吐。
+"""
+from __future__ import annotations
+
+import argparse
+import fcntl
+import json
+import multiprocessing as mp
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from adapters.rate_limiter import SharedTokenBucket
+
+CAPACITY = RATE = 1e12
+
+
+class FileBucket:
+    """旧实现：每次取令牌 flock + 读 JSON + 写临时文件 + rename"""
+
+    def __init__(self, state_file: Path, lock_file: Path):
+        self.state_file = state_file
+        self.lock_file = lock_file
+
+    def take(self, weight: float) -> float:
+        with open(self.lock_file, "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                try:
+                    d = json.loads(self.state_file.read_text())
+                    tokens, last = d["tokens"], d["last"]
+                except Exception:
+                    tokens, last = CAPACITY, time.time()
+                now = time.time()
+                tokens = min(CAPACITY, tokens + (now - last) * RATE)
+                if tokens >= weight:
+                    tmp = self.state_file.with_suffix(".tmp")
+                    tmp.write_text(json.dumps({"tokens": tokens - weight, "last": now}))
+                    tmp.rename(self.state_file)
+                    return 0.0
+                return (weight - tokens) / RATE
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def make_bucket(kind: str, workdir: Path, name: str):
+    if kind == "file":
+        return FileBucket(workdir / "state.json", workdir / "file.lock")
+    return SharedTokenBucket(name, CAPACITY, RATE, workdir / "shm.lock")
+
+
+def worker(kind: str, workdir: str, name: str, threads: int, calls: int, start, done) -> None:
+    bucket = make_bucket(kind, Path(workdir), name)
+
+    def run():
+        for _ in range(calls):
+            bucket.take(1)
+
+    ts = [threading.Thread(target=run) for _ in range(threads)]
+    start.wait()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    done.put(1)
+
+
+def bench(kind: str, procs: int, threads: int, calls: int, workdir: Path) -> float:
+    name = f"tradecat_rl_bench_{int(time.time() * 1000) % 10**8}"
+    owner = make_bucket(kind, workdir, name)
+    ctx = mp.get_context("spawn")
+    start, done = ctx.Event(), ctx.Queue()
+    ps = [ctx.Process(target=worker, args=(kind, str(workdir), name, threads, calls, start, done))
+          for _ in range(procs)]
+    for p in ps:
+        p.start()
+    time.sleep(1.0)  # 等待子进程就绪
+    t0 = time.perf_counter()
+    start.set()
+    for _ in ps:
+        done.get()
+    elapsed = time.perf_counter() - t0
+    for p in ps:
+        p.join()
+    if kind == "shm":
+        owner.unlink()
+        owner.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="限流器争用基准")
+    parser.add_argument("--procs", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    total = args.procs * args.threads * args.calls
+    print(f"acquires={total} ({args.procs} procs x {args.threads} threads x {args.calls})")
+    with tempfile.TemporaryDirectory() as d:
+        for kind in ("file", "shm"):
+            elapsed = bench(kind, args.procs, args.threads, args.calls, Path(d))
+            print(f"{kind:<5} {elapsed:7.2f}s  {total / elapsed:10.0f} acquires/s  "
+                  f"{elapsed / total * 1e6:7.1f} us/acquire")
+
+
+if __name__ == "__main__":
+    main()
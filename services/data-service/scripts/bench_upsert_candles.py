@@ -0,0 +1,105 @@
+"""
+K线写入基准: upsert_candles（逐行 dict + 文本 COPY + 合并）vs upsert_candles_columnar
+
+用法: python scripts/bench_upsert_candles.py --symbols 200 --bars 1440
+
+在独立 schema（默认 bench_upsert）中按 market_data.candles_1m 建表，测试结束后删除：
+- append:  全新时间段（走直接 COPY 路径）
+- overlap: 重写同一时间段（走 BINARY COPY 临时表 + ON CONFLICT 路径）
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from psycopg import sql
+
+from adapters.timescale import TimescaleAdapter
+from config import settings
+
+
+def make_batch(symbols: int, bars: int, start: datetime) -> dict:
+    """生成列式 K 线批次"""
+    cols = {k: [] for k in ("symbol", "bucket_ts", "open", "high", "low", "close", "volume",
+                            "quote_volume", "trade_count", "taker_buy_volume", "taker_buy_quote_volume")}
+    for s in range(symbols):
+        sym = f"BENCH{s:04d}USDT"
+        for i in range(bars):
+            p = 100.0 + (s % 50) + i * 0.01
+            cols["symbol"].append(sym)
+            cols["bucket_ts"].append(start + timedelta(minutes=i))
+            cols["open"].append(p)
+            cols["high"].append(p + 0.5)
+            cols["low"].append(p - 0.5)
+            cols["close"].append(p + 0.1)
+            cols["volume"].append(10.0 + i)
+            cols["quote_volume"].append((10.0 + i) * p)
+            cols["trade_count"].append(100 + i)
+            cols["taker_buy_volume"].append(5.0 + i)
+            cols["taker_buy_quote_volume"].append((5.0 + i) * p)
+    return cols
+
+
+def to_rows(cols: dict) -> list:
+    """列式 -> 原 upsert_candles 的 dict 行"""
+    names = list(cols)
+    rows = [dict(zip(names, vals)) for vals in zip(*cols.values())]
+    for r in rows:
+        r.update(exchange=settings.db_exchange, is_closed=True, source="bench")
+    return rows
+
+
+def timed(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="K线写入基准")
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--bars", type=int, default=1440)
+    parser.add_argument("--schema", default="bench_upsert")
+    args = parser.parse_args()
+
+    ts = TimescaleAdapter(schema=args.schema)
+    with ts.connection() as conn:
+        conn.execute(sql.SQL("DROP SCHEMA IF EXISTS {s} CASCADE").format(s=sql.Identifier(args.schema)))
+        conn.execute(sql.SQL("CREATE SCHEMA {s}").format(s=sql.Identifier(args.schema)))
+        conn.execute(sql.SQL("CREATE TABLE {t} (LIKE {src} INCLUDING ALL)").format(
+            t=sql.Identifier(args.schema, "candles_1m"),
+            src=sql.Identifier(settings.db_schema, "candles_1m"),
+        ))
+        conn.commit()
+
+    n = args.symbols * args.bars
+    day = timedelta(days=1)
+    base = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    print(f"rows={n} ({args.symbols} symbols x {args.bars} bars)")
+    try:
+        # 每个场景使用独立时间段，互不干扰
+        for name, start in (("legacy", base), ("columnar", base + 10 * day)):
+            cols = make_batch(args.symbols, args.bars, start)
+            if name == "legacy":
+                rows = to_rows(cols)
+                t_append = timed(lambda rows=rows: ts.upsert_candles("1m", rows))
+                t_overlap = timed(lambda rows=rows: ts.upsert_candles("1m", rows))
+            else:
+                t_append = timed(lambda cols=cols: ts.upsert_candles_columnar("1m", cols, source="bench"))
+                t_overlap = timed(lambda cols=cols: ts.upsert_candles_columnar("1m", cols, source="bench"))
+            print(f"{name:<9} append {t_append:7.2f}s ({n / t_append:9.0f} rows/s)  "
+                  f"overlap {t_overlap:7.2f}s ({n / t_overlap:9.0f} rows/s)")
+    finally:
+        with ts.connection() as conn:
+            conn.execute(sql.SQL("DROP SCHEMA IF EXISTS {s} CASCADE").format(s=sql.Identifier(args.schema)))
+            conn.commit()
+        ts.close()
+
+
+if __name__ == "__main__":
+    main()
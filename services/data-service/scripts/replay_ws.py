@@ -0,0 +1,111 @@
+"""
+WS K线回放: 按录制的到达节奏（默认 10 倍速）把 CandleEvent 流喂给 CandleIngestor，输出背压指标
+
+录制: BINANCE_WS_RECORD_FILE=/tmp/ws.jsonl python src/collectors/ws.py
+回放: python scripts/replay_ws.py /tmp/ws.jsonl --speed 10
+合成: python scripts/replay_ws.py --synthetic 600 --minutes 30 --write-latency 0.2
+写库: python scripts/replay_ws.py /tmp/ws.jsonl --db   （写入 KLINE_DB_SCHEMA 指定的 schema）
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from adapters.cryptofeed import CandleEvent
+from adapters.metrics import metrics
+from collectors.ingest import CandleIngestor
+from collectors.ws import WSCollector, candle_row
+
+
+def load_recording(path: Path) -> Iterator[Tuple[float, CandleEvent]]:
+    """录制文件 -> (到达时间, CandleEvent)"""
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                d = json.loads(line)
+                recv = d.pop("recv")
+                yield recv, CandleEvent.from_dict(d)
+
+
+def synthetic(symbols: int, minutes: int, start: float) -> Iterator[Tuple[float, CandleEvent]]:
+    """合成流：每分钟整点后 0.2-2 秒内所有币种推送上一分钟 K 线"""
+    rnd = random.Random(42)
+    start = start // 60 * 60
+    for m in range(minutes):
+        bucket = start + m * 60
+        arrivals = sorted((bucket + 60 + 0.2 + rnd.random() * 1.8, s) for s in range(symbols))
+        for recv, s in arrivals:
+            p = 100.0 + s
+            yield recv, CandleEvent(
+                symbol=f"S{s:04d}-USDT-PERP", timestamp=bucket, open=p, high=p + 1, low=p - 1,
+                close=p + 0.5, volume=10.0, trade_count=100,
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="WS K线回放")
+    parser.add_argument("recording", nargs="?", type=Path)
+    parser.add_argument("--speed", type=float, default=10.0)
+    parser.add_argument("--synthetic", type=int, default=0, help="合成币种数")
+    parser.add_argument("--minutes", type=int, default=10)
+    parser.add_argument("--queue", type=int, default=20000)
+    parser.add_argument("--write-latency", type=float, default=0.05, help="模拟写库耗时（秒/批，不写库时）")
+    parser.add_argument("--db", action="store_true", help="写入数据库（默认只模拟写入）")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        events = list(synthetic(args.synthetic, args.minutes, time.time() - args.minutes * 60))
+    elif args.recording:
+        events = list(load_recording(args.recording))
+    else:
+        parser.error("需要录制文件或 --synthetic")
+    if not events:
+        return
+
+    if args.db:
+        from adapters.timescale import TimescaleAdapter
+        ts = TimescaleAdapter()
+        writer = lambda rows: ts.upsert_candles("1m", rows)  # noqa: E731
+    else:
+        written: List[int] = []
+
+        def writer(rows):
+            time.sleep(args.write_latency)
+            written.append(len(rows))
+            return len(rows)
+
+    rec_t0, real_t0 = events[0][0], time.monotonic()
+    speed = args.speed
+    ingest = CandleIngestor(
+        writer, max_queue=args.queue, max_batch=WSCollector.MAX_BUFFER,
+        flush_window=WSCollector.FLUSH_WINDOW / speed, max_wait=10.0 / speed,
+        # 迟到判定使用回放时钟（录制时间轴）
+        clock=lambda: rec_t0 + (time.monotonic() - real_t0) * speed,
+    )
+    ingest.start()
+
+    for recv, e in events:
+        delay = (recv - rec_t0) / speed - (time.monotonic() - real_t0)
+        if delay > 0:
+            time.sleep(delay)
+        sym = e.symbol.replace("-USDT-PERP", "USDT")
+        ingest.put_nowait(candle_row(e, sym))
+
+    ingest.stop()
+    elapsed = time.monotonic() - real_t0
+    print(f"events={len(events)} speed={speed}x elapsed={elapsed:.1f}s "
+          f"(recorded {events[-1][0] - rec_t0:.0f}s)")
+    for k, v in metrics.to_dict().items():
+        if k.startswith("ws_") or k == "rows_written":
+            print(f"  {k}={v:.4f}" if isinstance(v, float) else f"  {k}={v}")
+
+
+if __name__ == "__main__":
+    main()
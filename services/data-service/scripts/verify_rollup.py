@@ -0,0 +1,85 @@
+"""
+采集端聚合核对: candles_{周期}_rollup 与连续聚合 candles_{周期} 逐桶比较
+
+用法: python scripts/verify_rollup.py --hours 24 [--intervals 5m,1h] [--rtol 1e-9]
+
+只比较两边都存在且已闭合的桶（连续聚合需已刷新到对应时间），输出每个周期的
+桶数、缺失数与字段不一致数；存在不一致时以非零状态退出。
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from psycopg import sql
+
+from adapters.timescale import TimescaleAdapter
+from collectors.rollup import ROLLUP_INTERVALS, rollup_table
+from config import settings
+
+FIELDS = ("open", "high", "low", "close", "volume", "quote_volume", "trade_count",
+          "taker_buy_volume", "taker_buy_quote_volume", "is_closed")
+
+
+def _same(a, b, rtol: float) -> bool:
+    if a is None or b is None:
+        return a is b
+    if isinstance(a, bool):
+        return a == b
+    return math.isclose(float(a), float(b), rel_tol=rtol, abs_tol=1e-12)
+
+
+def verify(ts: TimescaleAdapter, interval: str, start: datetime, end: datetime, rtol: float) -> tuple:
+    cols = sql.SQL(", ").join(sql.Identifier(c) for c in FIELDS)
+    query = sql.SQL("""
+        SELECT symbol, bucket_ts, {cols} FROM {table}
+        WHERE exchange = %s AND bucket_ts >= %s AND bucket_ts < %s
+    """)
+    out = {}
+    with ts.connection() as conn:
+        for name in (rollup_table(interval), f"candles_{interval}"):
+            rows = conn.execute(query.format(cols=cols, table=sql.Identifier(ts.schema, name)),
+                                (settings.db_exchange, start, end)).fetchall()
+            out[name] = {(r[0], r[1]): r[2:] for r in rows}
+    mine, cagg = out[rollup_table(interval)], out[f"candles_{interval}"]
+
+    missing = len(set(cagg) - set(mine))
+    mismatched = 0
+    for key in set(mine) & set(cagg):
+        bad = [f for f, a, b in zip(FIELDS, mine[key], cagg[key]) if not _same(a, b, rtol)]
+        if bad:
+            mismatched += 1
+            if mismatched <= 5:
+                print(f"  {interval} {key[0]} {key[1].isoformat()} 不一致: {', '.join(bad)}")
+    return len(mine), missing, mismatched
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="采集端聚合核对")
+    parser.add_argument("--hours", type=int, default=24)
+    parser.add_argument("--intervals", default=",".join(ROLLUP_INTERVALS))
+    parser.add_argument("--rtol", type=float, default=1e-9, help="数值相对误差（float8 聚合 vs numeric）")
+    args = parser.parse_args()
+
+    ts = TimescaleAdapter()
+    # 最近 2 个周期内连续聚合可能尚未刷新，不参与比较
+    now = datetime.now(timezone.utc)
+    failed = False
+    try:
+        for iv in (i.strip() for i in args.intervals.split(",") if i.strip()):
+            end = now - timedelta(seconds=2 * ROLLUP_INTERVALS[iv])
+            n, missing, mismatched = verify(ts, iv, now - timedelta(hours=args.hours), end, args.rtol)
+            print(f"{iv:>4}  rollup={n:<7} missing={missing:<6} mismatched={mismatched}")
+            failed |= mismatched > 0
+    finally:
+        ts.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
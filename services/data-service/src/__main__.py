@@ -64,6 +64,7 @@ def main() -> None:
     parser.add_argument("--ws", action="store_true", help="WebSocket 采集")
     parser.add_argument("--metrics", action="store_true", help="指标采集")
     parser.add_argument("--backfill", action="store_true", help="历史补齐")
+    parser.add_argument("--maintenance", action="store_true", help="chunk 保留/压缩/重排维护")
     parser.add_argument("--all", action="store_true", help="全部启动")
     args = parser.parse_args()
 
@@ -78,9 +79,11 @@ def main() -> None:
         sched.add("metrics", [py, "collectors/metrics.py"])
     if args.backfill:
         sched.add("backfill", [py, "collectors/backfill.py"])
+    if args.all or args.maintenance:
+        sched.add("maintenance", [py, "maintenance/chunks.py"])
 
     if not sched._procs:
-        print("用法: python src/__main__.py --ws|--metrics|--backfill|--all")
+        print("用法: python src/__main__.py --ws|--metrics|--backfill|--maintenance|--all")
         sys.exit(1)
 
     sched.run()
@@ -78,8 +78,21 @@ def load_symbols(exchange: str = "binance") -> List[str]:
     return _symbols[key]
 
 
+# /fapi/v1/klines 请求权重按 limit 分档: [1,100) -> 1, [100,500) -> 2, [500,1000] -> 5, > 1000 -> 10
+KLINE_WEIGHT_TIERS = ((99, 1), (499, 2), (1000, 5), (1500, 10))
+KLINE_MAX_LIMIT = 1500
+
+
+def kline_weight(limit: int) -> int:
+    for max_limit, weight in KLINE_WEIGHT_TIERS:
+        if limit <= max_limit:
+            return weight
+    return KLINE_WEIGHT_TIERS[-1][1]
+
+
 def fetch_ohlcv(exchange: str, symbol: str, interval: str = "1m",
-               since_ms: Optional[int] = None, limit: int = 1000) -> List[List]:
+               since_ms: Optional[int] = None, limit: int = 1000, raise_errors: bool = False) -> List[List]:
+    """拉取 K 线；raise_errors=True 时重试耗尽后抛出异常（区分"请求失败"与"交易所无数据"）"""
     symbol = symbol.upper()
     if not symbol.endswith("USDT"):
         return []
@@ -87,7 +100,7 @@ def fetch_ohlcv(exchange: str, symbol: str, interval: str = "1m",
     ccxt_sym = f"{symbol[:-4]}/USDT:USDT"
 
     for attempt in range(3):
-        acquire(2)
+        acquire(kline_weight(limit))
         try:
             return get_client(exchange).fetch_ohlcv(ccxt_sym, interval, since=since_ms, limit=limit)
         except ccxt.RateLimitExceeded as e:
@@ -102,10 +115,14 @@ def fetch_ohlcv(exchange: str, symbol: str, interval: str = "1m",
                 set_ban(time.time() + 60)
             if attempt == 2:
                 logger.warning("fetch_ohlcv 限流: %s", e)
+                if raise_errors:
+                    raise
                 return []
         except (ccxt.NetworkError, ccxt.ExchangeNotAvailable, ccxt.RequestTimeout) as e:
             if attempt == 2:
                 logger.warning("fetch_ohlcv 网络错误: %s", e)
+                if raise_errors:
+                    raise
                 return []
             time.sleep(1 * (2 ** attempt))
         finally:
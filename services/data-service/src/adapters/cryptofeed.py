@@ -26,6 +26,26 @@ class CandleEvent:
     taker_buy_quote_volume: Optional[Decimal] = None
     trade_count: Optional[int] = None
 
+    _DECIMALS = ("quote_volume", "taker_buy_volume", "taker_buy_quote_volume")
+
+    def to_dict(self) -> dict:
+        """录制用（Decimal 以字符串保存，回放时无损还原）"""
+        d = {k: getattr(self, k) for k in self.__dataclass_fields__}
+        for k in self._DECIMALS:
+            if d[k] is not None:
+                d[k] = str(d[k])
+        for k in ("open", "high", "low", "close", "volume"):
+            d[k] = float(d[k])
+        return d
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "CandleEvent":
+        d = dict(d)
+        for k in cls._DECIMALS:
+            if d.get(k) is not None:
+                d[k] = Decimal(d[k])
+        return cls(**d)
+
 
 class BinanceWSAdapter:
     """Binance WebSocket 适配器"""
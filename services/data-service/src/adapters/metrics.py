@@ -17,14 +17,44 @@ class Metrics:
     gaps_found: int = 0
     gaps_filled: int = 0
     zip_downloads: int = 0
+    backfill_requests: int = 0
+    backfill_weight: int = 0
+    backfill_deferred: int = 0
+
+    # WS 写入队列（背压）
+    ws_queue_depth: int = 0
+    ws_queue_peak: int = 0
+    ws_dropped: int = 0
+    ws_late: int = 0
+    ws_batches: int = 0
+    ws_write_failed: int = 0
+    ws_flush_latency: float = 0
+    ws_flush_latency_max: float = 0
+    ws_spool_pending: int = 0
+    ws_spool_replayed: int = 0
+    ws_rollup_bars: int = 0
+    ws_rollup_late: int = 0
+    ws_rollup_failed: int = 0
+    ws_rollup_rerolled: int = 0
+
+    # chunk 维护
+    maint_dropped: int = 0
+    maint_compressed: int = 0
+    maint_reordered: int = 0
+    maint_vacuumed: int = 0
+    maint_decompressed: int = 0
+    maint_failed: int = 0
+    maint_dead_tuples: int = 0
 
     # 耗时 (秒)
     last_collect_duration: float = 0
     last_backfill_duration: float = 0
+    last_maint_duration: float = 0
 
     # 时间戳
     last_collect_time: float = 0
     last_backfill_time: float = 0
+    last_maint_time: float = 0
 
     _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
 
@@ -45,10 +75,36 @@ class Metrics:
                 "gaps_found": self.gaps_found,
                 "gaps_filled": self.gaps_filled,
                 "zip_downloads": self.zip_downloads,
+                "backfill_requests": self.backfill_requests,
+                "backfill_weight": self.backfill_weight,
+                "backfill_deferred": self.backfill_deferred,
+                "ws_queue_depth": self.ws_queue_depth,
+                "ws_queue_peak": self.ws_queue_peak,
+                "ws_dropped": self.ws_dropped,
+                "ws_late": self.ws_late,
+                "ws_batches": self.ws_batches,
+                "ws_write_failed": self.ws_write_failed,
+                "ws_flush_latency": self.ws_flush_latency,
+                "ws_flush_latency_max": self.ws_flush_latency_max,
+                "ws_spool_pending": self.ws_spool_pending,
+                "ws_spool_replayed": self.ws_spool_replayed,
+                "ws_rollup_bars": self.ws_rollup_bars,
+                "ws_rollup_late": self.ws_rollup_late,
+                "ws_rollup_failed": self.ws_rollup_failed,
+                "ws_rollup_rerolled": self.ws_rollup_rerolled,
+                "maint_dropped": self.maint_dropped,
+                "maint_compressed": self.maint_compressed,
+                "maint_reordered": self.maint_reordered,
+                "maint_vacuumed": self.maint_vacuumed,
+                "maint_decompressed": self.maint_decompressed,
+                "maint_failed": self.maint_failed,
+                "maint_dead_tuples": self.maint_dead_tuples,
                 "last_collect_duration": self.last_collect_duration,
                 "last_backfill_duration": self.last_backfill_duration,
+                "last_maint_duration": self.last_maint_duration,
                 "last_collect_time": self.last_collect_time,
                 "last_backfill_time": self.last_backfill_time,
+                "last_maint_time": self.last_maint_time,
             }
 
     def __str__(self) -> str:
@@ -1,19 +1,22 @@
-"""全局限流器 - 信号量控制并发 + 跨进程令牌桶 + ban 共享"""
+"""全局限流器 - 信号量控制并发 + 跨进程令牌桶（共享内存）+ ban 共享"""
 from __future__ import annotations
 
+import asyncio
 import fcntl
-import json
+import hashlib
 import logging
 import os
 import re
+import struct
 import threading
 import time
+from multiprocessing import resource_tracker, shared_memory
 from pathlib import Path
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
 _BASE_DIR = Path(__file__).parent.parent.parent / "logs"
-_STATE_FILE = _BASE_DIR / ".rate_limit_state"
 _LOCK_FILE = _BASE_DIR / ".rate_limit.lock"
 _BAN_FILE = _BASE_DIR / ".ban_until"
 
@@ -22,6 +25,124 @@ RATE_PER_MINUTE = min(int(os.getenv("RATE_LIMIT_PER_MINUTE", "1800")), 2400)
 # 最大并发数，上限 20
 MAX_CONCURRENT = min(int(os.getenv("MAX_CONCURRENT", "5")), 20)
 
+# 共享内存布局: magic(u64) | tokens(f64) | last(f64) | ban_until(f64)
+_LAYOUT = struct.Struct("<Qddd")
+_MAGIC = 0x7472616465636174  # "tradecat"
+# 非阻塞取令牌时锁被占用的重试间隔（秒）；临界区只有几微秒
+LOCK_RETRY_SECONDS = 0.001
+_BUSY = object()
+
+
+def _segment_name(base_dir: Path) -> str:
+    """按 logs 目录派生共享内存名，同一部署的所有进程共享，不同部署互不干扰"""
+    return "tradecat_rl_" + hashlib.md5(str(base_dir.resolve()).encode()).hexdigest()[:12]
+
+
+class SharedTokenBucket:
+    """
+    跨进程令牌桶：状态放在 POSIX 共享内存，临界区用常驻文件锁（flock）+ 进程内线程锁保护
+
+    每次取令牌只有 flock 加/解锁两次系统调用，不再打开/读写/重命名状态文件
+    """
+
+    def __init__(self, name: str, capacity: float, rate: float, lock_path: Path):
+        self.name = name
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self._lock_path = lock_path
+        self._tlock = threading.Lock()
+        self._fd = -1
+        self._pid = -1
+        self._shm = self._attach(name)
+
+    @staticmethod
+    def _attach(name: str) -> shared_memory.SharedMemory:
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=_LAYOUT.size)
+        except FileExistsError:
+            shm = shared_memory.SharedMemory(name=name)
+        # 段由所有进程共享，不随某个进程退出而被 resource_tracker 删除
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+    def _lock_fd(self) -> int:
+        # fork 后子进程必须重新打开，否则与父进程共享同一把 flock
+        if self._pid != os.getpid():
+            self._lock_path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def _locked(self, fn, blocking: bool = True):
+        """在跨进程临界区内执行 fn(state) -> (新 state 或 None, 返回值)；非阻塞时锁被占用返回 _BUSY"""
+        if not self._tlock.acquire(blocking):
+            return _BUSY
+        try:
+            fd = self._lock_fd()
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return _BUSY
+            try:
+                magic, tokens, last, ban = _LAYOUT.unpack_from(self._shm.buf, 0)
+                if magic != _MAGIC:
+                    tokens, last, ban = self.capacity, time.time(), 0.0
+                state, result = fn(tokens, last, ban)
+                if state is not None or magic != _MAGIC:
+                    tokens, last, ban = state or (tokens, last, ban)
+                    _LAYOUT.pack_into(self._shm.buf, 0, _MAGIC, tokens, last, ban)
+                return result
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            self._tlock.release()
+
+    def take(self, weight: float, blocking: bool = True) -> Optional[float]:
+        """尝试扣减令牌：成功返回 0，否则返回还需等待的秒数；blocking=False 且锁被占用时返回 None"""
+        def _take(tokens, last, ban):
+            now = time.time()
+            tokens = min(self.capacity, tokens + (now - last) * self.rate)
+            if tokens >= weight:
+                return (tokens - weight, now, ban), 0.0
+            return None, (weight - tokens) / self.rate
+        result = self._locked(_take, blocking)
+        return None if result is _BUSY else result
+
+    def available(self) -> float:
+        """当前可用令牌（无锁读取，仅供规划参考）"""
+        magic, tokens, last, _ = _LAYOUT.unpack_from(self._shm.buf, 0)
+        if magic != _MAGIC:
+            return self.capacity
+        return min(self.capacity, tokens + (time.time() - last) * self.rate)
+
+    @property
+    def ban_until(self) -> float:
+        """无锁读取（单个 8 字节字段，写入方持锁整体更新）"""
+        magic, _, _, ban = _LAYOUT.unpack_from(self._shm.buf, 0)
+        return ban if magic == _MAGIC else 0.0
+
+    def extend_ban(self, until: float) -> bool:
+        """ban 只延长不缩短，返回是否更新"""
+        def _extend(tokens, last, ban):
+            if until > ban:
+                return (tokens, last, until), True
+            return None, False
+        return self._locked(_extend)
+
+    def unlink(self) -> None:
+        """删除共享内存段（测试/基准清理用）"""
+        resource_tracker.register(self._shm._name, "shared_memory")
+        self._shm.unlink()
+
+    def close(self) -> None:
+        self._shm.close()
+        if self._pid == os.getpid() and self._fd >= 0:
+            os.close(self._fd)
+            self._fd, self._pid = -1, -1
+
 
 class GlobalLimiter:
     _instance = None
@@ -35,78 +156,83 @@ class GlobalLimiter:
                     cls._instance._init()
         return cls._instance
 
-    def _init(self):
+    @classmethod
+    def isolated(cls, base_dir: Path) -> "GlobalLimiter":
+        """不经单例、状态放在 base_dir 下的独立限流器（测试/基准用，用完调用 close(unlink=True)）"""
+        limiter = super().__new__(cls)
+        limiter._init(base_dir)
+        return limiter
+
+    def _init(self, base_dir: Path = _BASE_DIR):
         self.capacity = float(RATE_PER_MINUTE)
         self.rate = RATE_PER_MINUTE / 60.0
         self._sem = threading.Semaphore(MAX_CONCURRENT)
-        self._ban_until = 0.0
-        self._ban_lock = threading.Lock()
-        _BASE_DIR.mkdir(parents=True, exist_ok=True)
-        self._load_ban()
+        base_dir.mkdir(parents=True, exist_ok=True)
+        self._ban_file = base_dir / _BAN_FILE.name
+        self._bucket = SharedTokenBucket(_segment_name(base_dir), self.capacity, self.rate, base_dir / _LOCK_FILE.name)
+        # 重启后从文件恢复 ban（共享内存不跨重启）
+        self._bucket.extend_ban(self._load_ban())
 
-    def _load_ban(self):
+    def _load_ban(self) -> float:
         try:
-            if _BAN_FILE.exists():
-                self._ban_until = float(_BAN_FILE.read_text().strip())
+            if self._ban_file.exists():
+                return float(self._ban_file.read_text().strip())
         except Exception:
             pass
+        return 0.0
 
-    def _save_ban(self):
+    def _save_ban(self, until: float):
         try:
-            tmp = _BAN_FILE.with_suffix('.tmp')
-            tmp.write_text(str(self._ban_until))
-            tmp.rename(_BAN_FILE)
+            tmp = self._ban_file.with_suffix('.tmp')
+            tmp.write_text(str(until))
+            tmp.rename(self._ban_file)
         except Exception:
             pass
 
+    def close(self, unlink: bool = False) -> None:
+        if unlink:
+            self._bucket.unlink()
+        self._bucket.close()
+
+    @property
+    def _ban_until(self) -> float:
+        return self._bucket.ban_until
+
     def set_ban(self, until: float):
-        with self._ban_lock:
-            if until > self._ban_until:
-                self._ban_until = until
-                self._save_ban()
-                logger.warning("IP ban 至 %s", time.strftime('%H:%M:%S', time.localtime(until)))
+        if self._bucket.extend_ban(until):
+            self._save_ban(until)
+            logger.warning("IP ban 至 %s", time.strftime('%H:%M:%S', time.localtime(until)))
+
+    def ban_remaining(self) -> float:
+        """ban 剩余秒数（跨进程共享）"""
+        return max(0.0, self._bucket.ban_until - time.time())
+
+    def available(self) -> float:
+        """当前可用权重（ban 期间为 0）"""
+        return 0.0 if self.ban_remaining() > 0 else self._bucket.available()
 
     def _wait_ban(self):
-        self._load_ban()
-        with self._ban_lock:
-            if self._ban_until > time.time():
-                wait = self._ban_until - time.time() + 5
-                logger.warning("等待 ban 解除 %.0fs", wait)
-                time.sleep(wait)
+        wait = self.ban_remaining()
+        if wait > 0:
+            logger.warning("等待 ban 解除 %.0fs", wait + 5)
+            time.sleep(wait + 5)
+
+    def _take_tokens(self, weight: int, blocking: bool = True) -> Optional[float]:
+        """尝试扣减令牌：成功返回 0，否则返回还需等待的秒数；非阻塞且锁被占用返回 None"""
+        return self._bucket.take(weight, blocking)
 
     def _acquire_tokens(self, weight: int):
-        while True:
-            with open(_LOCK_FILE, "w") as f:
-                fcntl.flock(f, fcntl.LOCK_EX)
-                try:
-                    tokens, last = self._read_state()
-                    now = time.time()
-                    tokens = min(self.capacity, tokens + (now - last) * self.rate)
-                    if tokens >= weight:
-                        tokens -= weight
-                        self._write_state(tokens, now)
-                        return
-                    wait = (weight - tokens) / self.rate
-                finally:
-                    fcntl.flock(f, fcntl.LOCK_UN)
+        while (wait := self._take_tokens(weight)) > 0:
             time.sleep(max(0.05, wait))
 
-    def _read_state(self):
-        try:
-            if _STATE_FILE.exists():
-                d = json.loads(_STATE_FILE.read_text())
-                return d.get("tokens", self.capacity), d.get("last", time.time())
-        except Exception:
-            pass
-        return self.capacity, time.time()
-
-    def _write_state(self, tokens, last):
-        try:
-            tmp = _STATE_FILE.with_suffix('.tmp')
-            tmp.write_text(json.dumps({"tokens": tokens, "last": last}))
-            tmp.rename(_STATE_FILE)
-        except Exception:
-            pass
+    async def acquire_async(self, weight: int = 1):
+        """异步获取令牌：等ban -> 获取令牌（不占线程信号量，并发由调用方的 asyncio.Semaphore 控制）"""
+        while (wait := self.ban_remaining()) > 0:
+            logger.warning("等待 ban 解除 %.0fs", wait + 5)
+            await asyncio.sleep(wait + 5)
+        # 非阻塞取锁：锁被其他线程/进程占用时让出事件循环稍后重试，不在循环线程上阻塞 flock
+        while (wait := self._take_tokens(weight, blocking=False)) != 0:
+            await asyncio.sleep(LOCK_RETRY_SECONDS if wait is None else max(0.05, wait))
 
     def acquire(self, weight: int = 1):
         """获取许可：等ban -> 获取信号量 -> 获取令牌"""
@@ -130,7 +256,9 @@ class GlobalLimiter:
 _g = GlobalLimiter()
 
 def acquire(weight: int = 1): _g.acquire(weight)
+async def acquire_async(weight: int = 1): await _g.acquire_async(weight)
 def release(): _g.release()
+def available() -> float: return _g.available()
 def set_ban(until: float): _g.set_ban(until)
 def parse_ban(msg: str) -> float: return _g.parse_ban(msg)
 
@@ -2,18 +2,135 @@
 from __future__ import annotations
 
 import logging
+import re
+import time
 from contextlib import contextmanager
-from datetime import datetime
-from typing import Dict, Iterator, List, Optional, Sequence
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
 
-from psycopg import sql
+from psycopg import errors, sql
 from psycopg.rows import dict_row
 from psycopg_pool import ConnectionPool
 
-from config import normalize_interval, settings
+from adapters.metrics import metrics
+from config import INTERVAL_TO_MS, normalize_interval, settings
 
 logger = logging.getLogger(__name__)
 
+# K线列 -> COPY BINARY 声明类型（数值列以 float8 传输，写入目标表时由服务端赋值转换为 numeric）
+CANDLE_COPY_TYPES: Dict[str, str] = {
+    "exchange": "text", "symbol": "text", "bucket_ts": "timestamptz",
+    "open": "float8", "high": "float8", "low": "float8", "close": "float8", "volume": "float8",
+    "quote_volume": "float8", "trade_count": "int8", "is_closed": "bool", "source": "text",
+    "taker_buy_volume": "float8", "taker_buy_quote_volume": "float8",
+}
+
+# 期货指标列 -> COPY BINARY 声明类型（create_time 为 timestamp without time zone）
+METRICS_COPY_TYPES: Dict[str, str] = {
+    "create_time": "timestamp", "symbol": "text", "exchange": "text",
+    "sum_open_interest": "float8", "sum_open_interest_value": "float8",
+    "count_toptrader_long_short_ratio": "float8", "sum_toptrader_long_short_ratio": "float8",
+    "count_long_short_ratio": "float8", "sum_taker_long_short_vol_ratio": "float8",
+    "source": "text", "is_closed": "bool",
+}
+
+
+def _column_values(v: Any, n: Optional[int]) -> list:
+    """列值 -> Python list（numpy/pandas 用 tolist() 走 C 转换；标量按行数广播）"""
+    if isinstance(v, (str, bytes, bool, int, float)) or v is None:
+        return [v] * (n or 0)
+    if getattr(v, "dtype", None) is not None and v.dtype.kind == "f":
+        # NaN -> None（写入 NULL 而非 numeric 'NaN'）
+        missing = v != v
+        if missing.any():
+            v = v.astype(object)
+            v[missing] = None
+    if hasattr(v, "tolist"):
+        return v.tolist()
+    return list(v)
+
+
+def _to_utc(v) -> Optional[datetime]:
+    """bucket_ts 统一为 UTC aware datetime：支持 datetime / 毫秒时间戳 / numpy datetime64.tolist() 的纳秒整数"""
+    if v is None or isinstance(v, datetime):
+        return v if v is None or v.tzinfo else v.replace(tzinfo=timezone.utc)
+    v = int(v)
+    if v > 10**17:      # 纳秒
+        v //= 1_000_000
+    return datetime.fromtimestamp(v / 1000, tz=timezone.utc)
+
+
+def _columns(data: Any, types: Dict[str, str], time_col: str, exchange: Optional[str],
+             source: str) -> Dict[str, list]:
+    """
+    规范化列式输入: DataFrame 或 {列名: 数组/列表/标量}
+
+    - 只保留 types 中的列，exchange/source/is_closed 缺失时用默认值广播（显式 source 覆盖）
+    - 时间列转为 UTC datetime（timestamp 列去掉时区）
+    """
+    if hasattr(data, "columns") and hasattr(data, "__getitem__"):
+        data = {c: data[c] for c in data.columns}
+    n = next((len(v) for v in data.values() if hasattr(v, "__len__") and not isinstance(v, (str, bytes))), 0)
+    cols = {c: _column_values(v, n) for c, v in data.items() if c in types}
+    cols.setdefault("exchange", [exchange or settings.db_exchange] * n)
+    cols.setdefault("is_closed", [True] * n)
+    if source or "source" not in cols:
+        cols["source"] = [source] * n
+    for c, v in cols.items():
+        if len(v) != n:
+            raise ValueError(f"列 {c} 长度 {len(v)} != {n}")
+    if time_col not in cols or "symbol" not in cols:
+        raise ValueError(f"Columns must contain {time_col} and symbol")
+    ts = [_to_utc(v) for v in cols[time_col]]
+    if types[time_col] == "timestamp":
+        ts = [t.replace(tzinfo=None) if t is not None else None for t in ts]
+    cols[time_col] = ts
+    return cols
+
+
+def candle_columns(data: Any, exchange: Optional[str] = None, source: Optional[str] = None) -> Dict[str, list]:
+    """规范化列式 K 线输入（bucket_ts 为 UTC aware datetime）"""
+    return _columns(data, CANDLE_COPY_TYPES, "bucket_ts", exchange, source or settings.ws_source)
+
+
+def metrics_columns(data: Any, exchange: Optional[str] = None, source: Optional[str] = None) -> Dict[str, list]:
+    """规范化列式期货指标输入（create_time 为 UTC naive datetime）"""
+    return _columns(data, METRICS_COPY_TYPES, "create_time", exchange, source or "binance_zip")
+
+
+def _changed_sql(update_cols: Sequence[str]) -> sql.Composed:
+    """ON CONFLICT DO UPDATE 的 WHERE 条件：值未变化的重复写入（spool 回放、补齐重叠）不产生新元组版本"""
+    return sql.SQL("({}) IS DISTINCT FROM ({})").format(
+        sql.SQL(", ").join(sql.SQL("t.{}").format(sql.Identifier(c)) for c in update_cols),
+        sql.SQL(", ").join(sql.SQL("EXCLUDED.{}").format(sql.Identifier(c)) for c in update_cols),
+    )
+
+
+# 已压缩区间边界缓存时长（秒）：只有早于边界的批次才需要查询/解压 chunk
+COMPRESSED_BOUNDARY_TTL = 300
+
+# 覆盖索引表: 每个 (表, exchange, symbol, UTC 日) 一行，slots 为当日槽位位图（第 i 位 = 当日第 i 根）
+COVERAGE_TABLE = "coverage_daily"
+# 维护覆盖位图的表（与 008_coverage_index.sql 的回填一致）；candles_5m 等为连续聚合，不经 upsert 写入，
+# 其余周期的缺口检测走 COUNT / 窗口扫描
+COVERAGE_TABLES = frozenset({"candles_1m", "binance_futures_metrics_5m"})
+METRICS_PERIOD_SECONDS = 300
+
+
+def coverage_cells(keys: Iterator[tuple], period_s: int) -> Dict[tuple, int]:
+    """(exchange, symbol, ts) -> {(exchange, symbol, day): 位掩码}，槽位 0 对应最高位"""
+    slots = 86400 // period_s
+    cells: Dict[tuple, int] = {}
+    for ex, sym, ts in keys:
+        if ts is None:
+            continue
+        if ts.tzinfo is not None:
+            ts = ts.astimezone(timezone.utc)
+        slot = (ts.hour * 3600 + ts.minute * 60 + ts.second) // period_s
+        k = (ex, sym, ts.date())
+        cells[k] = cells.get(k, 0) | (1 << (slots - 1 - slot))
+    return cells
+
 
 class TimescaleAdapter:
     """TimescaleDB 操作"""
@@ -26,6 +143,11 @@ class TimescaleAdapter:
         self._pool_max = pool_max
         self._timeout = timeout
         self._pool: Optional[ConnectionPool] = None
+        # 覆盖索引表是否存在（首次写入/查询时探测；未迁移时回退到 COUNT 扫描）
+        self._coverage: Optional[bool] = None
+        # 是否为 TimescaleDB（timescaledb_information 可用）与各表已压缩区间上界 {表: (过期时间, 上界)}
+        self._timescale: Optional[bool] = None
+        self._compressed: Dict[str, tuple] = {}
 
     @property
     def pool(self) -> ConnectionPool:
@@ -84,11 +206,12 @@ class TimescaleAdapter:
         # ON CONFLICT 更新的列（排除冲突键）
         update_cols = [col for col in cols if col not in ("exchange", "symbol", "bucket_ts")]
         sql_upsert_from_temp = sql.SQL("""
-            INSERT INTO {target_table} ({cols})
+            INSERT INTO {target_table} AS t ({cols})
             SELECT {cols} FROM {temp_table}
             ON CONFLICT (exchange, symbol, bucket_ts) DO UPDATE SET
                 {update_assignments},
-                updated_at = NOW();
+                updated_at = NOW()
+            WHERE {changed};
         """).format(
             target_table=sql.Identifier(self.schema, table_name),
             cols=sql.SQL(", ").join(map(sql.Identifier, cols)),
@@ -96,7 +219,8 @@ class TimescaleAdapter:
             update_assignments=sql.SQL(", ").join(
                 sql.SQL("{col} = EXCLUDED.{col}").format(col=sql.Identifier(col))
                 for col in update_cols
-            )
+            ),
+            changed=_changed_sql(update_cols),
         )
 
         total_inserted = 0
@@ -116,14 +240,186 @@ class TimescaleAdapter:
                         for row in batch:
                             copy.write_row(tuple(row.get(col) for col in cols))
 
-                # 从临时表一次性 upsert 到目标表
+                # 从临时表一次性 upsert 到目标表（迟到数据先解压受影响的 chunk）
+                self._decompress_late(cur, table_name, (r["bucket_ts"] for r in rows))
                 cur.execute(sql_upsert_from_temp)
                 total_inserted = cur.rowcount if cur.rowcount > 0 else len(rows)
+                self._update_coverage(cur, table_name, INTERVAL_TO_MS[interval] // 1000,
+                                      ((r.get("exchange"), r["symbol"], r["bucket_ts"]) for r in rows))
 
             conn.commit()
 
         return total_inserted
 
+    def upsert_candles_columnar(self, interval: str, data: Any, exchange: Optional[str] = None,
+                                source: Optional[str] = None, table: Optional[str] = None) -> int:
+        """
+        列式 K 线写入（DataFrame 或 {列名: 数组}）；table 缺省为 candles_{interval}
+
+        - 追加批次（每个 symbol 的 bucket_ts 都晚于库中最大值，且批内无重复键）:
+          COPY 直接写入目标 hypertable，不建临时表、不走 ON CONFLICT
+        - 有重叠: COPY FORMAT BINARY（声明类型）写入临时表，再 INSERT ... ON CONFLICT DO UPDATE
+        - 追加期间若被并发写入抢先（唯一键冲突），回滚后改走合并路径
+        """
+        cols = candle_columns(data, exchange, source)
+        n = len(cols["symbol"])
+        if n == 0:
+            return 0
+
+        interval = normalize_interval(interval)
+        table_name = table or f"candles_{interval}"
+        period_s = INTERVAL_TO_MS[interval] // 1000
+        names = list(cols)
+        keys = list(zip(cols["exchange"], cols["symbol"], cols["bucket_ts"]))
+        with self.connection() as conn:
+            if self._is_append_only(conn, table_name, cols):
+                try:
+                    with conn.cursor() as cur:
+                        with cur.copy(sql.SQL("COPY {table} ({cols}) FROM STDIN").format(
+                            table=sql.Identifier(self.schema, table_name),
+                            cols=sql.SQL(", ").join(map(sql.Identifier, names)),
+                        )) as copy:
+                            for row in zip(*cols.values()):
+                                copy.write_row(row)
+                        self._update_coverage(cur, table_name, period_s, keys)
+                    conn.commit()
+                    return n
+                except errors.UniqueViolation:
+                    conn.rollback()
+                    logger.debug("%s 追加冲突，回退合并路径", table_name)
+
+            with conn.cursor() as cur:
+                self._copy_binary_stage(cur, table_name, cols, CANDLE_COPY_TYPES)
+                self._decompress_late(cur, table_name, cols["bucket_ts"])
+                cur.execute(self._merge_from_stage_sql(table_name, names, ("exchange", "symbol", "bucket_ts")))
+                total = cur.rowcount if cur.rowcount > 0 else n
+                self._update_coverage(cur, table_name, period_s, keys)
+            conn.commit()
+        return total
+
+    def upsert_metrics_columnar(self, data: Any, exchange: Optional[str] = None,
+                                source: Optional[str] = None) -> int:
+        """列式期货指标写入: COPY FORMAT BINARY 写入临时表，再 INSERT ... ON CONFLICT DO UPDATE"""
+        cols = metrics_columns(data, exchange, source)
+        n = len(cols["symbol"])
+        if n == 0:
+            return 0
+
+        table_name = "binance_futures_metrics_5m"
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                self._copy_binary_stage(cur, table_name, cols, METRICS_COPY_TYPES)
+                self._decompress_late(cur, table_name, cols["create_time"])
+                cur.execute(self._merge_from_stage_sql(table_name, list(cols), ("symbol", "create_time")))
+                total = cur.rowcount if cur.rowcount > 0 else n
+                self._update_coverage(cur, table_name, METRICS_PERIOD_SECONDS,
+                                      zip(cols["exchange"], cols["symbol"], cols["create_time"]))
+            conn.commit()
+        return total
+
+    def _is_append_only(self, conn, table_name: str, cols: Dict[str, list]) -> bool:
+        """批次是否纯追加：批内键唯一，且每个 symbol 的最小 bucket_ts 晚于库中该 symbol 的最大值"""
+        keys = set(zip(cols["exchange"], cols["symbol"], cols["bucket_ts"]))
+        if len(keys) != len(cols["symbol"]):
+            return False
+
+        min_ts: Dict[tuple, datetime] = {}
+        for ex, sym, ts in keys:
+            if ts is None:
+                return False
+            k = (ex, sym)
+            if k not in min_ts or ts < min_ts[k]:
+                min_ts[k] = ts
+
+        exchanges = sorted({ex for ex, _ in min_ts})
+        symbols = sorted({sym for _, sym in min_ts})
+        # 只扫描批次最早时间之后的 chunk（chunk exclusion）
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("""
+                SELECT exchange, symbol, MAX(bucket_ts) FROM {table}
+                WHERE exchange = ANY(%s) AND symbol = ANY(%s) AND bucket_ts >= %s
+                GROUP BY exchange, symbol
+            """).format(table=sql.Identifier(self.schema, table_name)),
+                (exchanges, symbols, min(min_ts.values())))
+            max_ts = {(r[0], r[1]): r[2] for r in cur.fetchall()}
+        conn.commit()
+        return all(k not in max_ts or ts > max_ts[k] for k, ts in min_ts.items())
+
+    def _copy_binary_stage(self, cur, table_name: str, cols: Dict[str, list], type_map: Dict[str, str]) -> None:
+        """COPY FORMAT BINARY 写入事务级临时表（列类型取自 type_map）"""
+        names = list(cols)
+        types = [type_map[c] for c in names]
+        stage = f"_stage_{table_name}"
+        cur.execute(sql.SQL("CREATE TEMP TABLE IF NOT EXISTS {stage} ({defs}) ON COMMIT DROP").format(
+            stage=sql.Identifier(stage),
+            defs=sql.SQL(", ").join(
+                sql.SQL("{} {}").format(sql.Identifier(c), sql.SQL(t)) for c, t in zip(names, types)
+            ),
+        ))
+        with cur.copy(sql.SQL("COPY {stage} ({cols}) FROM STDIN (FORMAT BINARY)").format(
+            stage=sql.Identifier(stage),
+            cols=sql.SQL(", ").join(map(sql.Identifier, names)),
+        )) as copy:
+            copy.set_types(types)
+            for row in zip(*cols.values()):
+                copy.write_row(row)
+
+    def _merge_from_stage_sql(self, table_name: str, names: List[str], keys: Sequence[str]) -> sql.Composed:
+        update_cols = [c for c in names if c not in keys]
+        return sql.SQL("""
+            INSERT INTO {target} AS t ({cols})
+            SELECT {cols} FROM {stage}
+            ON CONFLICT ({keys}) DO UPDATE SET
+                {updates},
+                updated_at = NOW()
+            WHERE {changed};
+        """).format(
+            target=sql.Identifier(self.schema, table_name),
+            stage=sql.Identifier(f"_stage_{table_name}"),
+            cols=sql.SQL(", ").join(map(sql.Identifier, names)),
+            keys=sql.SQL(", ").join(map(sql.Identifier, keys)),
+            updates=sql.SQL(", ").join(
+                sql.SQL("{col} = EXCLUDED.{col}").format(col=sql.Identifier(c)) for c in update_cols
+            ),
+            changed=_changed_sql(update_cols),
+        )
+
+    def rollup_candles(self, interval: str, table: str, start: datetime, end: datetime,
+                       symbols: Sequence[str], exchange: Optional[str] = None, source: str = "ws_rollup") -> int:
+        """从 candles_1m 按连续聚合口径重算 [start, end) 内的高周期桶并 upsert 到 table（采集端聚合的兜底路径）"""
+        if not symbols:
+            return 0
+        interval = normalize_interval(interval)
+        bucket = f"{INTERVAL_TO_MS[interval] // 1000} seconds"
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL("""
+                    INSERT INTO {target} (exchange, symbol, bucket_ts, open, high, low, close, volume, quote_volume,
+                                          trade_count, is_closed, source, taker_buy_volume, taker_buy_quote_volume)
+                    SELECT exchange, symbol, time_bucket(%s::interval, bucket_ts) AS b,
+                           first(open, bucket_ts), max(high), min(low), last(close, bucket_ts),
+                           sum(volume), sum(quote_volume), sum(trade_count), bool_and(is_closed), %s,
+                           sum(taker_buy_volume), sum(taker_buy_quote_volume)
+                    FROM {source}
+                    WHERE exchange = %s AND symbol = ANY(%s) AND bucket_ts >= %s AND bucket_ts < %s
+                    GROUP BY exchange, symbol, b
+                    ON CONFLICT (exchange, symbol, bucket_ts) DO UPDATE SET
+                        open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low, close = EXCLUDED.close,
+                        volume = EXCLUDED.volume, quote_volume = EXCLUDED.quote_volume,
+                        trade_count = EXCLUDED.trade_count, is_closed = EXCLUDED.is_closed, source = EXCLUDED.source,
+                        taker_buy_volume = EXCLUDED.taker_buy_volume,
+                        taker_buy_quote_volume = EXCLUDED.taker_buy_quote_volume,
+                        updated_at = NOW()
+                    RETURNING exchange, symbol, bucket_ts
+                """).format(
+                    target=sql.Identifier(self.schema, table),
+                    source=sql.Identifier(self.schema, "candles_1m"),
+                ), (bucket, source, exchange or settings.db_exchange, list(symbols), start, end))
+                keys = cur.fetchall()
+                self._update_coverage(cur, table, INTERVAL_TO_MS[interval] // 1000, keys)
+            conn.commit()
+        return len(keys)
+
     def upsert_metrics(self, rows: Sequence[dict], batch_size: int = 2000) -> int:
         """使用 COPY 命令批量 upsert 指标数据，实现最高性能。"""
         if not rows:
@@ -147,11 +443,12 @@ class TimescaleAdapter:
 
         update_cols = [col for col in cols if col not in ("symbol", "create_time")]
         sql_upsert_from_temp = sql.SQL("""
-            INSERT INTO {target_table} ({cols})
+            INSERT INTO {target_table} AS t ({cols})
             SELECT {cols} FROM {temp_table}
             ON CONFLICT (symbol, create_time) DO UPDATE SET
                 {update_assignments},
-                updated_at = NOW();
+                updated_at = NOW()
+            WHERE {changed};
         """).format(
             target_table=sql.Identifier(self.schema, table_name),
             cols=sql.SQL(", ").join(map(sql.Identifier, cols)),
@@ -159,7 +456,8 @@ class TimescaleAdapter:
             update_assignments=sql.SQL(", ").join(
                 sql.SQL("{col} = EXCLUDED.{col}").format(col=sql.Identifier(col))
                 for col in update_cols
-            )
+            ),
+            changed=_changed_sql(update_cols),
         )
 
         total_inserted = 0
@@ -176,13 +474,133 @@ class TimescaleAdapter:
                         for row in batch:
                             copy.write_row(tuple(row.get(col) for col in cols))
 
+                self._decompress_late(cur, table_name, (r["create_time"] for r in rows))
                 cur.execute(sql_upsert_from_temp)
                 total_inserted = cur.rowcount if cur.rowcount > 0 else len(rows)
+                self._update_coverage(cur, table_name, METRICS_PERIOD_SECONDS, (
+                    (r.get("exchange") or settings.db_exchange, r["symbol"], r["create_time"]) for r in rows))
 
             conn.commit()
 
         return total_inserted
 
+    # ==================== 迟到数据 ====================
+
+    def _compressed_until(self, cur, table_name: str) -> Optional[datetime]:
+        """已压缩 chunk 的最大 range_end（缓存 COMPRESSED_BOUNDARY_TTL 秒）"""
+        if self._timescale is None:
+            row = cur.execute("SELECT to_regclass('timescaledb_information.chunks')").fetchone()
+            self._timescale = bool(row and row[0])
+        if not self._timescale:
+            return None
+        now = time.monotonic()
+        cached = self._compressed.get(table_name)
+        if cached and cached[0] > now:
+            return cached[1]
+        row = cur.execute(
+            "SELECT max(range_end) FROM timescaledb_information.chunks "
+            "WHERE hypertable_schema = %s AND hypertable_name = %s AND is_compressed",
+            (self.schema, table_name),
+        ).fetchone()
+        until = row[0] if row else None
+        self._compressed[table_name] = (now + COMPRESSED_BOUNDARY_TTL, until)
+        return until
+
+    def _decompress_late(self, cur, table_name: str, timestamps: Iterable[Optional[datetime]]) -> int:
+        """批次中落在已压缩区间的时间点 -> 只解压这些时间点所在的 chunk（维护任务到期后重新压缩）
+
+        与数据写入同一事务；实时批次（晚于已压缩区间）只做一次内存比较。
+        """
+        until = self._compressed_until(cur, table_name)
+        if until is None:
+            return 0
+        late = sorted({_to_utc(t) for t in timestamps if t is not None and _to_utc(t) < until})
+        if not late:
+            return 0
+        rows = cur.execute(
+            """
+            SELECT decompress_chunk(format('%%I.%%I', c.chunk_schema, c.chunk_name)::regclass, if_compressed => true)
+            FROM timescaledb_information.chunks c
+            WHERE c.hypertable_schema = %s AND c.hypertable_name = %s AND c.is_compressed
+              AND EXISTS (SELECT 1 FROM unnest(%s::timestamptz[]) AS l(ts) WHERE l.ts >= c.range_start AND l.ts < c.range_end)
+            """,
+            (self.schema, table_name, late),
+        ).fetchall()
+        if rows:
+            self._compressed.pop(table_name, None)
+            metrics.inc("maint_decompressed", len(rows))
+            logger.info("%s 迟到数据 %d 个时间点，解压 %d 个 chunk", table_name, len(late), len(rows))
+        return len(rows)
+
+    # ==================== 覆盖索引 ====================
+
+    def has_coverage(self, cur=None) -> bool:
+        """覆盖索引表是否已建（schema 008_coverage_index.sql）；写入路径传入当前游标，避免嵌套借连接"""
+        if self._coverage is None:
+            probe = ("SELECT to_regclass(%s)", (f"{self.schema}.{COVERAGE_TABLE}",))
+            if cur is not None:
+                row = cur.execute(*probe).fetchone()
+            else:
+                with self.connection() as conn:
+                    row = conn.execute(*probe).fetchone()
+            self._coverage = bool(row and row[0])
+            if not self._coverage:
+                logger.warning("覆盖索引表 %s.%s 不存在，缺口检测回退到 COUNT 扫描", self.schema, COVERAGE_TABLE)
+        return self._coverage
+
+    def tracks_coverage(self, table_name: str, cur=None) -> bool:
+        """该表是否有完整的覆盖位图（在 COVERAGE_TABLES 中且覆盖索引表已建）"""
+        return table_name in COVERAGE_TABLES and self.has_coverage(cur)
+
+    def _update_coverage(self, cur, table_name: str, period_s: int, keys) -> None:
+        """与数据写入同一事务: 按 (symbol, 日) 位图 OR 合并，幂等，与插入/更新无关"""
+        if period_s >= 86400 or not self.tracks_coverage(table_name, cur):
+            return
+        cells = coverage_cells(keys, period_s)
+        if not cells:
+            return
+        slots = 86400 // period_s
+        # 固定顺序加锁，避免并发写入者互相死锁
+        items = sorted(cells.items())
+        cur.execute(sql.SQL("""
+            INSERT INTO {cov} (table_name, exchange, symbol, day, slots)
+            SELECT %s, e, s, d, b::varbit FROM unnest(%s::text[], %s::text[], %s::date[], %s::text[]) AS t(e, s, d, b)
+            ON CONFLICT (table_name, exchange, symbol, day) DO UPDATE SET
+                slots = {cov}.slots | EXCLUDED.slots,
+                updated_at = NOW()
+            WHERE {cov}.slots | EXCLUDED.slots <> {cov}.slots
+        """).format(cov=sql.Identifier(self.schema, COVERAGE_TABLE)), (
+            table_name,
+            [k[0] for k, _ in items], [k[1] for k, _ in items], [k[2] for k, _ in items],
+            [format(mask, f"0{slots}b") for _, mask in items],
+        ))
+
+    def coverage_counts(self, table_name: str, symbols: Sequence[str], start: date, end: date,
+                        exchange: Optional[str] = None) -> Dict[tuple, int]:
+        """覆盖索引查询 {(symbol, day): 已有根数}，代价与 symbol × 天数成正比，与行数无关"""
+        conds = ["table_name = %s", "symbol = ANY(%s)", "day BETWEEN %s AND %s"]
+        params: list = [table_name, list(symbols), start, end]
+        if exchange:
+            conds.append("exchange = %s")
+            params.append(exchange)
+        with self.connection() as conn:
+            rows = conn.execute(
+                f"SELECT symbol, day, MAX(filled) FROM {self.schema}.{COVERAGE_TABLE} "
+                f"WHERE {' AND '.join(conds)} GROUP BY symbol, day", params,
+            ).fetchall()
+        return {(r[0], r[1]): r[2] for r in rows}
+
+    def coverage_bitmaps(self, table_name: str, exchange: str, symbols: Sequence[str],
+                         start: date, end: date) -> Dict[tuple, str]:
+        """覆盖索引位图 {(symbol, day): '0101...'}"""
+        with self.connection() as conn:
+            rows = conn.execute(
+                f"SELECT symbol, day, slots::text FROM {self.schema}.{COVERAGE_TABLE} "
+                "WHERE table_name = %s AND exchange = %s AND symbol = ANY(%s) AND day BETWEEN %s AND %s",
+                (table_name, exchange, list(symbols), start, end),
+            ).fetchall()
+        return {(r[0], r[1]): r[2] for r in rows}
+
     def _quote_val(self, v) -> str:
         """SQL 值转义 (在此重构中已不再需要，保留以兼容旧代码)"""
         if v is None:
@@ -213,7 +631,11 @@ class TimescaleAdapter:
                 return {r[0]: r[1] for r in cur.fetchall()}
 
     def detect_gaps(self, exchange: str, interval: str, symbols: Sequence[str], lookback_min: int = 10080, threshold_sec: int = 120, limit: int = 50) -> List[tuple]:
-        table = f"{self.schema}.candles_{normalize_interval(interval)}"
+        interval = normalize_interval(interval)
+        period_s = INTERVAL_TO_MS[interval] // 1000
+        if period_s < 86400 and self.tracks_coverage(f"candles_{interval}"):
+            return self._detect_gaps_coverage(exchange, interval, symbols, lookback_min, threshold_sec, limit)
+        table = f"{self.schema}.candles_{interval}"
         sql = f"""
             WITH o AS (SELECT symbol, bucket_ts, LEAD(bucket_ts) OVER (PARTITION BY symbol ORDER BY bucket_ts) AS next_ts
                        FROM {table} WHERE exchange = %(ex)s AND symbol = ANY(%(sym)s) AND bucket_ts >= NOW() - INTERVAL '{lookback_min} minutes')
@@ -224,6 +646,32 @@ class TimescaleAdapter:
                 cur.execute(sql, {"ex": exchange, "sym": list(symbols), "lim": limit})
                 return cur.fetchall()
 
+    def _detect_gaps_coverage(self, exchange: str, interval: str, symbols: Sequence[str],
+                              lookback_min: int, threshold_sec: int, limit: int) -> List[tuple]:
+        """基于覆盖位图的缺口检测：返回与窗口扫描相同的 (symbol, bucket_ts, next_ts)，只看已有两根之间的空洞"""
+        period_s = INTERVAL_TO_MS[interval] // 1000
+        slots = 86400 // period_s
+        now = datetime.now(timezone.utc)
+        since = now - timedelta(minutes=lookback_min)
+        first, last = since.date(), now.date()
+        bitmaps = self.coverage_bitmaps(f"candles_{interval}", exchange, symbols, first, last)
+        base = datetime.combine(first, datetime.min.time(), tzinfo=timezone.utc)
+        # 窗口内第一根所在槽位（向上取整，与 bucket_ts >= since 一致）
+        lo = -(-int((since - base).total_seconds()) // period_s)
+        empty = "0" * slots
+        days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+
+        gaps = []
+        for sym in symbols:
+            bits = "".join(bitmaps.get((sym, d), empty) for d in days)
+            for m in re.finditer(r"(?<=1)0+(?=1)", bits):
+                prev, nxt = m.start() - 1, m.end()
+                if prev < lo or (nxt - prev) * period_s < threshold_sec:
+                    continue
+                gaps.append((sym, base + timedelta(seconds=prev * period_s), base + timedelta(seconds=nxt * period_s)))
+        gaps.sort(key=lambda g: g[1])
+        return gaps[:limit]
+
     def query(self, exchange: str, symbol: str, interval: str, start: Optional[datetime] = None, end: Optional[datetime] = None, limit: int = 1000) -> List[dict]:
         table = f"{self.schema}.candles_{normalize_interval(interval)}"
         conds, params = ["exchange = %s", "symbol = %s"], [exchange, symbol]
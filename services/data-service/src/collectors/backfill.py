@@ -10,26 +10,41 @@
 from __future__ import annotations
 
 import argparse
-import csv
+import io
+import itertools
 import logging
 import sys
 import time
+import warnings
 import zipfile
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
 from pathlib import Path
-from typing import Dict, List, Optional, Sequence
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
+import numpy as np
 import requests
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from adapters import rate_limiter
 from adapters.ccxt import fetch_ohlcv, load_symbols, to_rows
 from adapters.metrics import Timer, metrics
 from adapters.rate_limiter import acquire, parse_ban, release, set_ban
 from adapters.timescale import TimescaleAdapter
+from collectors.planner import (
+    MS_PER_MIN,
+    ZIP_MONTHLY_MIN_DAYS,
+    KlineRequest,
+    UnfillableStore,
+    missing_ranges,
+    plan_backfill,
+    split_days,
+    subtract,
+)
+from collectors.rollup import reroll
 from config import INTERVAL_TO_MS, settings
 
 logger = logging.getLogger(__name__)
@@ -38,6 +53,124 @@ BINANCE_DATA_URL = "https://data.binance.vision"
 EXPECTED_1M_PER_DAY = 1440  # 1分钟 * 1440 = 1天
 EXPECTED_5M_PER_DAY = 288   # 5分钟 * 288 = 1天
 
+# ZIP 流式导入: 每块行数（限制单次解析/写入的内存）
+ZIP_CHUNK_ROWS = 50_000
+MS_PER_DAY = 86_400_000
+# open_time,open,high,low,close,volume,close_time,quote_volume,count,taker_buy_volume,taker_buy_quote_volume
+KLINE_COLUMNS = 11
+# create_time,symbol,sum_open_interest,sum_open_interest_value,...,sum_taker_long_short_vol_ratio
+METRICS_COLUMNS = 8
+
+
+def _iter_zip_csv(path: Path, chunk_rows: int = ZIP_CHUNK_ROWS) -> Iterator[List[str]]:
+    """逐块读取 ZIP 内所有 CSV（跳过表头与空行），每块最多 chunk_rows 行"""
+    with zipfile.ZipFile(path) as zf:
+        for name in zf.namelist():
+            if not name.endswith(".csv"):
+                continue
+            with zf.open(name) as raw:
+                f = io.TextIOWrapper(raw, encoding="utf-8")
+                while True:
+                    lines = list(itertools.islice(f, chunk_rows))
+                    if not lines:
+                        break
+                    lines = [ln for ln in lines if ln[:1].isdigit()]
+                    if lines:
+                        yield lines
+
+
+def _parse_numeric(lines: List[str], ncols: int) -> Optional[np.ndarray]:
+    """CSV 行 -> float64 矩阵（前 ncols 列，缺失列补 NaN）；格式异常时逐行容错解析"""
+    width = lines[0].count(",") + 1
+    usecols = range(min(width, ncols))
+    try:
+        a = np.loadtxt(lines, delimiter=",", usecols=usecols, dtype=np.float64, ndmin=2)
+    except ValueError:
+        # 空字段/列数不一致: genfromtxt 以 NaN 填空并跳过异常行
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            a = np.genfromtxt(lines, delimiter=",", usecols=usecols, dtype=np.float64,
+                              invalid_raise=False, ndmin=2)
+        a = a[~np.isnan(a[:, :min(width, 6)]).any(axis=1)] if a.size else a
+    if not a.size or a.shape[1] < 6:
+        return None
+    return _pad_columns(a, ncols)
+
+
+def _metrics_ts(raw: np.ndarray) -> np.ndarray:
+    """create_time 列 -> 毫秒时间戳（毫秒整数或 ISO 时间字符串）"""
+    if raw[0].isdigit():
+        return raw.astype(np.int64)
+    return np.char.replace(raw, "Z", "").astype("datetime64[ms]").astype(np.int64)
+
+
+def _parse_metrics(lines: List[str]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """metrics CSV 行 -> (毫秒时间戳, 第 2.. 列的 float64 矩阵)；格式异常时逐行容错解析并跳过异常行"""
+    try:
+        a = np.loadtxt(lines, delimiter=",", dtype=str, ndmin=2)
+        if not a.size or a.shape[1] < 4:
+            return None
+        a = _pad_columns(a, METRICS_COLUMNS)
+        return _metrics_ts(a[:, 0]), np.column_stack([_float_column(a[:, i]) for i in range(2, METRICS_COLUMNS)])
+    except ValueError:
+        pass
+    # 列数不一致/时间或数值无法解析：逐行解析，只丢弃异常行
+    stamps, values = [], []
+    for line in lines:
+        row = line.rstrip("\r\n").split(",")
+        if len(row) < 4:
+            continue
+        row += [""] * (METRICS_COLUMNS - len(row))
+        try:
+            t = _metrics_ts(np.array(row[:1]))[0]
+            v = _float_column(np.array(row[2:METRICS_COLUMNS]))
+        except ValueError:
+            continue
+        stamps.append(t)
+        values.append(v)
+    if not stamps:
+        return None
+    return np.array(stamps, dtype=np.int64), np.vstack(values)
+
+
+def _pad_columns(a: np.ndarray, ncols: int) -> np.ndarray:
+    """列数不足时右侧补缺失值（float 补 NaN，字符串补空串）"""
+    if a.shape[1] >= ncols:
+        return a
+    fill = np.full((len(a), ncols - a.shape[1]), np.nan if a.dtype.kind == "f" else "", dtype=a.dtype)
+    return np.hstack([a, fill])
+
+
+def _float_column(col: np.ndarray) -> np.ndarray:
+    """字符串列 -> float64（空串为 NaN，写入时转为 NULL）"""
+    return np.where(col == "", "nan", col).astype(np.float64)
+
+
+def _int_column(col: np.ndarray) -> np.ndarray:
+    """float 列 -> int64；含 NaN 时返回 object 数组（NaN 为 None）"""
+    missing = np.isnan(col)
+    if not missing.any():
+        return col.astype(np.int64)
+    out = col.astype(object)
+    out[~missing] = col[~missing].astype(np.int64).tolist()
+    out[missing] = None
+    return out
+
+
+def _day_numbers(dates: Optional[Iterable[date]]) -> Optional[np.ndarray]:
+    """日期集合 -> 自 1970-01-01 起的天数数组（与 ts_ms // MS_PER_DAY 比较）"""
+    if dates is None:
+        return None
+    return np.array(sorted({(d - date(1970, 1, 1)).days for d in dates}), dtype=np.int64)
+
+
+def _utc_ms(ms: int) -> datetime:
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+
+
+def _day_ms(d: date) -> int:
+    return int(datetime.combine(d, datetime.min.time(), tzinfo=timezone.utc).timestamp() * 1000)
+
 
 # ==================== 缺口检测 ====================
 @dataclass
@@ -54,7 +187,7 @@ class GapInfo:
 
 
 class GapScanner:
-    """精确缺口扫描器"""
+    """精确缺口扫描器 - 优先查覆盖索引（按 symbol×天），未建索引时回退到 COUNT 扫描"""
 
     def __init__(self, ts: TimescaleAdapter):
         self._ts = ts
@@ -63,7 +196,10 @@ class GapScanner:
                     interval: str = "1m", threshold: float = 0.95) -> Dict[str, List[GapInfo]]:
         """扫描 K 线缺口，返回 {symbol: [GapInfo]}"""
         expected = EXPECTED_1M_PER_DAY if interval == "1m" else int(EXPECTED_1M_PER_DAY / INTERVAL_TO_MS.get(interval, 60000) * 60000)
-        min_count = int(expected * threshold)
+
+        if self._ts.tracks_coverage(f"candles_{interval}"):
+            counts = self._ts.coverage_counts(f"candles_{interval}", symbols, start, end, settings.db_exchange)
+            return self._collect_gaps(symbols, start, end, expected, threshold, counts)
 
         table = f"{self._ts.schema}.candles_{interval}"
         sql = f"""
@@ -82,23 +218,14 @@ class GapScanner:
                 cur.execute(sql, (settings.db_exchange, list(symbols), start_ts, end_ts))
                 for sym, d, c in cur.fetchall():
                     counts[(sym, d)] = c
-
-        gaps: Dict[str, List[GapInfo]] = {}
-        for sym in symbols:
-            sym_gaps = []
-            for i in range((end - start).days + 1):
-                d = start + timedelta(days=i)
-                actual = counts.get((sym, d), 0)
-                if actual < min_count:
-                    sym_gaps.append(GapInfo(sym, d, expected, actual))
-            if sym_gaps:
-                gaps[sym] = sym_gaps
-        return gaps
+        return self._collect_gaps(symbols, start, end, expected, threshold, counts)
 
     def scan_metrics(self, symbols: Sequence[str], start: date, end: date,
                      threshold: float = 0.95) -> Dict[str, List[GapInfo]]:
         """扫描期货指标缺口"""
-        min_count = int(EXPECTED_5M_PER_DAY * threshold)
+        if self._ts.tracks_coverage("binance_futures_metrics_5m"):
+            counts = self._ts.coverage_counts("binance_futures_metrics_5m", symbols, start, end)
+            return self._collect_gaps(symbols, start, end, EXPECTED_5M_PER_DAY, threshold, counts)
 
         sql = """
             SELECT symbol, DATE(create_time) AS d, COUNT(*) AS c
@@ -115,7 +242,13 @@ class GapScanner:
                 cur.execute(sql, (list(symbols), start_ts, end_ts))
                 for sym, d, c in cur.fetchall():
                     counts[(sym, d)] = c
+        return self._collect_gaps(symbols, start, end, EXPECTED_5M_PER_DAY, threshold, counts)
 
+    @staticmethod
+    def _collect_gaps(symbols: Sequence[str], start: date, end: date, expected: int,
+                      threshold: float, counts: Dict[tuple, int]) -> Dict[str, List[GapInfo]]:
+        """{(symbol, day): 根数} -> 低于阈值的日期"""
+        min_count = int(expected * threshold)
         gaps: Dict[str, List[GapInfo]] = {}
         for sym in symbols:
             sym_gaps = []
@@ -123,7 +256,7 @@ class GapScanner:
                 d = start + timedelta(days=i)
                 actual = counts.get((sym, d), 0)
                 if actual < min_count:
-                    sym_gaps.append(GapInfo(sym, d, EXPECTED_5M_PER_DAY, actual))
+                    sym_gaps.append(GapInfo(sym, d, expected, actual))
             if sym_gaps:
                 gaps[sym] = sym_gaps
         return gaps
@@ -131,61 +264,66 @@ class GapScanner:
 
 # ==================== REST 分页补齐 ====================
 class RestBackfiller:
-    """REST API 分页补齐 (用于小缺口) - 并行版"""
+    """REST API 补齐 - 执行规划器生成的请求（合并缺口、按权重档选 limit），并行版"""
 
-    def __init__(self, ts: TimescaleAdapter, workers: int = 8):
+    def __init__(self, ts: TimescaleAdapter, workers: int = 8, fetch: Optional[Callable[..., list]] = None):
         self._ts = ts
         self._workers = workers
-
-    def fill_kline_gap(self, symbol: str, gap: GapInfo, interval: str = "1m") -> int:
-        """补齐单个 K 线缺口 - 收集后一次性写入"""
-        start_ts = datetime.combine(gap.date, datetime.min.time(), tzinfo=timezone.utc)
-        end_ts = datetime.combine(gap.date + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
-        since_ms = int(start_ts.timestamp() * 1000)
-        target_ms = int(end_ts.timestamp() * 1000)
-
-        all_rows = []  # 收集所有数据
-        max_iterations = 100
-
-        for _ in range(max_iterations):
-            candles = fetch_ohlcv(settings.ccxt_exchange, symbol, interval, since_ms, 1000)
-            if not candles:
-                break
-
-            rows = [r for r in to_rows(settings.db_exchange, symbol, candles, "ccxt_gap")
-                    if start_ts <= r["bucket_ts"] < end_ts]
-            all_rows.extend(rows)
-
-            last_ms = int(candles[-1][0])
-            if last_ms == since_ms or last_ms >= target_ms:
-                break
-            since_ms = last_ms + INTERVAL_TO_MS.get(interval, 60000)
-
-        # 一次性写入
-        if all_rows:
-            self._ts.upsert_candles(interval, all_rows)
-        return len(all_rows)
-
-    def fill_gaps(self, gaps: Dict[str, List[GapInfo]], interval: str = "1m") -> int:
-        """并行批量补齐缺口"""
-        tasks = [(sym, gap, interval) for sym, sym_gaps in gaps.items() for gap in sym_gaps]
-        if not tasks:
+        # fetch(symbol, interval, since_ms, limit) -> [[ts_ms, o, h, l, c, v], ...]；失败抛异常
+        self._fetch = fetch or (lambda sym, iv, since, limit: fetch_ohlcv(
+            settings.ccxt_exchange, sym, iv, since, limit, raise_errors=True))
+
+    def fill_gaps(self, gaps: Dict[str, List[GapInfo]], interval: str = "1m",
+                  store: Optional[UnfillableStore] = None) -> int:
+        """按日缺口补齐：整日区间交给规划器合并（相邻缺失日共用请求）"""
+        ranges = {sym: [(_day_ms(g.date), _day_ms(g.date) + MS_PER_DAY) for g in sym_gaps] for sym, sym_gaps in gaps.items()}
+        plan = plan_backfill(ranges, store=store, allow_zip=False, period_ms=INTERVAL_TO_MS.get(interval, 60000))
+        return self.run_requests(plan.requests, interval, store)
+
+    def run_requests(self, requests: Sequence[KlineRequest], interval: str = "1m",
+                     store: Optional[UnfillableStore] = None) -> int:
+        """并行执行请求；交易所未返回的缺失区间记入 store"""
+        if not requests:
             return 0
-
         total = 0
         with ThreadPoolExecutor(max_workers=self._workers) as pool:
-            futures = {pool.submit(self.fill_kline_gap, sym, gap, iv): (sym, gap.date) for sym, gap, iv in tasks}
+            futures = {pool.submit(self._run_request, req, interval, store): req for req in requests}
             for future in as_completed(futures):
-                sym, d = futures[future]
+                req = futures[future]
                 try:
                     n = future.result()
                     if n > 0:
-                        logger.info("[%s] %s REST补齐 %d 条", sym, d, n)
+                        logger.debug("[%s] REST补齐 %d 条 (limit=%d)", req.symbol, n, req.limit)
                         total += n
                 except Exception as e:
-                    logger.warning("[%s] %s REST失败: %s", sym, d, e)
+                    logger.warning("[%s] %s REST失败: %s", req.symbol,
+                                   datetime.fromtimestamp(req.start_ms / 1000, tz=timezone.utc), e)
+        if store is not None:
+            store.save()
         return total
 
+    def _run_request(self, req: KlineRequest, interval: str, store: Optional[UnfillableStore]) -> int:
+        candles = self._fetch(req.symbol, interval, req.start_ms, req.limit)
+        metrics.inc("backfill_requests")
+        metrics.inc("backfill_weight", req.weight)
+        # 只写缺失的根（窗口内已有的根不重复写）
+        got = sorted(int(c[0]) for c in candles)
+        wanted = [c for c in candles if any(s <= int(c[0]) < e for s, e in req.ranges)]
+        if wanted:
+            self._ts.upsert_candles(interval, to_rows(settings.db_exchange, req.symbol, wanted, "ccxt_gap"))
+            if interval == "1m":
+                lo, hi = min(int(c[0]) for c in wanted), max(int(c[0]) for c in wanted)
+                reroll(self._ts, [req.symbol], _utc_ms(lo), _utc_ms(hi + MS_PER_MIN), settings.db_exchange)
+        if store is not None:
+            if not got:
+                # klines 返回 startTime 之后的根：整个响应为空说明此后再无数据（下架）
+                store.mark_delisted(req.symbol, req.start_ms)
+            else:
+                for s, e in req.ranges:
+                    for hole in subtract([(s, e)], [(t, t + req.period_ms) for t in got if s <= t < e]):
+                        store.add(req.symbol, *hole)
+        return len(wanted)
+
 
 # ==================== Metrics REST 补齐 ====================
 class MetricsRestBackfiller:
@@ -366,8 +504,8 @@ class ZipBackfiller:
         finally:
             release()
 
-    def fill_kline_gaps(self, gaps: Dict[str, List[GapInfo]], interval: str = "1m") -> int:
-        """批量补齐 K 线缺口 - 按月分组避免重复下载"""
+    def fill_kline_gaps(self, gaps: Dict[str, List[GapInfo]], interval: str = "1m", monthly_min_days: int = 1) -> int:
+        """批量补齐 K 线缺口 - 按月分组避免重复下载；缺失天数少于 monthly_min_days 的月份只下日度 ZIP"""
         if not gaps:
             return 0
 
@@ -384,7 +522,8 @@ class ZipBackfiller:
 
         total = 0
         with ThreadPoolExecutor(max_workers=self.workers) as pool:
-            futures = {pool.submit(self._download_kline_month, sym, month, dates, iv): (sym, month) for sym, month, dates, iv in tasks}
+            futures = {pool.submit(self._download_kline_month, sym, month, dates, iv, len(dates) >= monthly_min_days): (sym, month)
+                       for sym, month, dates, iv in tasks}
             for future in as_completed(futures):
                 sym, month = futures[future]
                 try:
@@ -397,14 +536,15 @@ class ZipBackfiller:
 
         return total
 
-    def _download_kline_month(self, symbol: str, month: str, dates: List[date], interval: str) -> int:
+    def _download_kline_month(self, symbol: str, month: str, dates: List[date], interval: str,
+                              monthly: bool = True) -> int:
         """下载并导入一个月的 K 线数据"""
         sym = symbol.upper()
         total = 0
         current_month = date.today().strftime("%Y-%m")
 
-        # 当月数据直接用日度ZIP（月度ZIP还没生成）
-        if month == current_month:
+        # 当月数据直接用日度ZIP（月度ZIP还没生成）；缺失天数少时日度 ZIP 字节更少
+        if month == current_month or not monthly:
             for d in dates:
                 day_str = d.strftime("%Y-%m-%d")
                 day_fname = f"{sym}-{interval}-{day_str}.zip"
@@ -424,11 +564,8 @@ class ZipBackfiller:
             self._download_with_retry(month_url, month_path)
 
         if month_path.exists():
-            # 月度 ZIP 存在，导入所有需要的日期
-            for d in dates:
-                n = self._import_kline_zip(month_path, symbol, interval, d)
-                total += n
-            return total
+            # 月度 ZIP 存在，一次流式导入所有需要的日期
+            return self._import_kline_zip(month_path, symbol, interval, dates)
 
         # 2. 月度不存在，降级到日度
         for d in dates:
@@ -500,10 +637,7 @@ class ZipBackfiller:
             self._download_with_retry(month_url, month_path)
 
         if month_path.exists():
-            for d in dates:
-                n = self._import_metrics_zip(month_path, symbol, d)
-                total += n
-            return total
+            return self._import_metrics_zip(month_path, symbol, dates)
 
         # 2. 降级到日度
         for d in dates:
@@ -518,102 +652,139 @@ class ZipBackfiller:
 
         return total
 
-    def _import_kline_zip(self, path: Path, symbol: str, interval: str, filter_date: date = None) -> int:
-        """导入 K 线 ZIP，可选按日期过滤"""
-        rows = []
+    def _import_kline_zip(self, path: Path, symbol: str, interval: str,
+                          filter_dates: Optional[Iterable[date]] = None) -> int:
+        """流式导入 K 线 ZIP：按块解析为列数组，向量化日期过滤，逐块写入 COPY 路径"""
+        days = _day_numbers(filter_dates)
+        total = 0
         try:
-            with zipfile.ZipFile(path) as zf:
-                for name in zf.namelist():
-                    if not name.endswith(".csv"):
-                        continue
-                    with zf.open(name) as f:
-                        for row in csv.reader(line.decode() for line in f):
-                            if len(row) < 6:
-                                continue
-                            try:
-                                ts = datetime.fromtimestamp(int(row[0]) / 1000, tz=timezone.utc)
-                                # 月度ZIP时只导入指定日期
-                                if filter_date and ts.date() != filter_date:
-                                    continue
-                                rows.append({
-                                    "exchange": settings.db_exchange,
-                                    "symbol": symbol.upper(),
-                                    "bucket_ts": ts,
-                                    "open": float(row[1]), "high": float(row[2]),
-                                    "low": float(row[3]), "close": float(row[4]),
-                                    "volume": float(row[5]),
-                                    "quote_volume": float(row[7]) if len(row) > 7 and row[7] else None,
-                                    "trade_count": int(row[8]) if len(row) > 8 and row[8] else None,
-                                    "is_closed": True,
-                                    "source": "binance_zip",
-                                    "taker_buy_volume": float(row[9]) if len(row) > 9 and row[9] else None,
-                                    "taker_buy_quote_volume": float(row[10]) if len(row) > 10 and row[10] else None,
-                                })
-                            except (ValueError, IndexError):
-                                pass
+            for lines in _iter_zip_csv(path):
+                a = _parse_numeric(lines, KLINE_COLUMNS)
+                if a is None:
+                    continue
+                ts = a[:, 0].astype(np.int64)
+                # 月度ZIP时只导入指定日期
+                if days is not None:
+                    mask = np.isin(ts // MS_PER_DAY, days)
+                    a, ts = a[mask], ts[mask]
+                if not len(ts):
+                    continue
+                total += self._ts.upsert_candles_columnar(interval, {
+                    "symbol": symbol.upper(),
+                    "bucket_ts": ts.astype("datetime64[ms]"),
+                    "open": a[:, 1], "high": a[:, 2], "low": a[:, 3], "close": a[:, 4],
+                    "volume": a[:, 5],
+                    "quote_volume": a[:, 7],
+                    "trade_count": _int_column(a[:, 8]),
+                    "taker_buy_volume": a[:, 9],
+                    "taker_buy_quote_volume": a[:, 10],
+                }, source="binance_zip")
+                if interval == "1m":
+                    reroll(self._ts, [symbol.upper()], _utc_ms(int(ts.min())), _utc_ms(int(ts.max()) + MS_PER_MIN))
         except Exception as e:
             logger.error("解析失败 %s: %s", path, e)
-            return 0
-
-        if rows:
-            return self._ts.upsert_candles(interval, rows)
-        return 0
+        return total
 
-    def _import_metrics_zip(self, path: Path, symbol: str, filter_date: date = None) -> int:
-        """导入 metrics ZIP，可选按日期过滤"""
-        rows = []
+    def _import_metrics_zip(self, path: Path, symbol: str, filter_dates: Optional[Iterable[date]] = None) -> int:
+        """流式导入 metrics ZIP：按块解析，时间对齐到 5 分钟，向量化日期过滤，逐块写入 COPY 路径"""
+        days = _day_numbers(filter_dates)
+        total = 0
         try:
-            with zipfile.ZipFile(path) as zf:
-                for name in zf.namelist():
-                    if not name.endswith(".csv"):
-                        continue
-                    with zf.open(name) as f:
-                        for row in csv.reader(line.decode() for line in f):
-                            if len(row) < 4:
-                                continue
-                            try:
-                                ts_val = row[0]
-                                if ts_val.isdigit():
-                                    ts = int(ts_val)
-                                else:
-                                    ts = int(datetime.fromisoformat(ts_val.replace("Z", "+00:00")).timestamp() * 1000)
-
-                                # 对齐到 5 分钟边界
-                                ts = (ts // 300000) * 300000
-                                dt = datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
-                                if filter_date and dt.date() != filter_date:
-                                    continue
-
-                                rows.append({
-                                    "create_time": dt.replace(tzinfo=None),
-                                    "symbol": symbol.upper(),
-                                    "exchange": settings.db_exchange,
-                                    "sum_open_interest": Decimal(row[2]) if len(row) > 2 and row[2] else None,
-                                    "sum_open_interest_value": Decimal(row[3]) if len(row) > 3 and row[3] else None,
-                                    "count_toptrader_long_short_ratio": Decimal(row[5]) if len(row) > 5 and row[5] else None,
-                                    "sum_toptrader_long_short_ratio": Decimal(row[4]) if len(row) > 4 and row[4] else None,
-                                    "count_long_short_ratio": Decimal(row[6]) if len(row) > 6 and row[6] else None,
-                                    "sum_taker_long_short_vol_ratio": Decimal(row[7]) if len(row) > 7 and row[7] else None,
-                                    "source": "binance_zip",
-                                    "is_closed": True,
-                                })
-                            except (ValueError, IndexError):
-                                pass
+            for lines in _iter_zip_csv(path):
+                parsed = _parse_metrics(lines)
+                if parsed is None:
+                    continue
+                ts, a = parsed
+                # 对齐到 5 分钟边界
+                ts = ts // 300000 * 300000
+                if days is not None:
+                    mask = np.isin(ts // MS_PER_DAY, days)
+                    a, ts = a[mask], ts[mask]
+                if not len(ts):
+                    continue
+                n = self._ts.upsert_metrics_columnar({
+                    "create_time": ts.astype("datetime64[ms]"),
+                    "symbol": symbol.upper(),
+                    # a 的列 0 对应 CSV 第 2 列
+                    "sum_open_interest": a[:, 0],
+                    "sum_open_interest_value": a[:, 1],
+                    "count_toptrader_long_short_ratio": a[:, 3],
+                    "sum_toptrader_long_short_ratio": a[:, 2],
+                    "count_long_short_ratio": a[:, 4],
+                    "sum_taker_long_short_vol_ratio": a[:, 5],
+                }, source="binance_zip")
+                metrics.inc("rows_written", n)
+                total += n
         except Exception as e:
             logger.error("解析失败 %s: %s", path, e)
-            return 0
+        return total
 
-        if rows:
-            return self._upsert_metrics(rows)
-        return 0
 
-    def _upsert_metrics(self, rows: List[dict]) -> int:
-        """批量 upsert metrics - 使用 COPY 高性能写入"""
-        if not rows:
-            return 0
-        n = self._ts.upsert_metrics(rows)
-        metrics.inc("rows_written", n)
-        return n
+# ==================== 自适应补齐 ====================
+class AdaptiveBackfiller:
+    """缺口区间 -> 规划（合并/选档/ZIP 或 REST/预算）-> 执行 -> 不可补区间持久化（采集器周期巡检用）"""
+
+    def __init__(self, ts: TimescaleAdapter, workers: int = 2, store: Optional[UnfillableStore] = None,
+                 budget: Optional[Callable[[], float]] = None, budget_ratio: float = 0.5,
+                 rest: Optional[RestBackfiller] = None, zip_bf: Optional[ZipBackfiller] = None):
+        self._ts = ts
+        self._scanner = GapScanner(ts)
+        self._rest = rest or RestBackfiller(ts, workers)
+        self._zip = zip_bf or ZipBackfiller(ts, workers)
+        self.store = store if store is not None else UnfillableStore(settings.data_dir / "backfill" / "unfillable.json")
+        # 单轮可用权重：限流器当前余量的一部分，其余留给实时采集
+        self._budget = budget or (lambda: rate_limiter.available() * budget_ratio)
+
+    def gap_ranges(self, symbols: Sequence[str], start: date, end: date, interval: str = "1m",
+                   threshold: float = 0.95) -> Dict[str, List[tuple]]:
+        """缺失区间 {symbol: [(start_ms, end_ms)]}：覆盖索引精确到根，否则按缺口日整日"""
+        period_ms = INTERVAL_TO_MS.get(interval, 60000)
+        base = _day_ms(start)
+        if period_ms < MS_PER_DAY and self._ts.tracks_coverage(f"candles_{interval}"):
+            bitmaps = self._ts.coverage_bitmaps(f"candles_{interval}", settings.db_exchange, symbols, start, end)
+            empty = "0" * (MS_PER_DAY // period_ms)
+            days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+            out = {}
+            for sym in symbols:
+                ranges = missing_ranges("".join(bitmaps.get((sym, d), empty) for d in days), base, period_ms)
+                if ranges:
+                    out[sym] = ranges
+            return out
+        gaps = self._scanner.scan_klines(symbols, start, end, interval, threshold)
+        return {sym: [(_day_ms(g.date), _day_ms(g.date) + MS_PER_DAY) for g in sym_gaps] for sym, sym_gaps in gaps.items()}
+
+    def run(self, symbols: Sequence[str], start: date, end: date, interval: str = "1m") -> tuple:
+        """补齐一轮，返回 (计划, 写入条数)"""
+        period_ms = INTERVAL_TO_MS.get(interval, 60000)
+        self._zip.cleanup_old_files()
+        gaps = self.gap_ranges(symbols, start, end, interval)
+        plan = plan_backfill(gaps, store=self.store, budget=self._budget(), period_ms=period_ms)
+        if not plan.missing:
+            return plan, 0
+        logger.info("补齐计划: %s", plan.summary())
+
+        # 1. REST（近期缺口优先，已按预算截断）
+        filled = self._rest.run_requests(plan.requests, interval, self.store)
+
+        # 2. ZIP；未发布/404 的日期改走 REST
+        if plan.zip_days:
+            zip_gaps = {sym: [GapInfo(sym, d, EXPECTED_1M_PER_DAY * MS_PER_MIN // period_ms, 0) for d in days]
+                        for sym, days in plan.zip_days.items()}
+            filled += self._zip.fill_kline_gaps(zip_gaps, interval, ZIP_MONTHLY_MIN_DAYS)
+            left = {}
+            for sym, ranges in self.gap_ranges(list(plan.zip_days), start, end, interval).items():
+                zip_days = {_day_ms(d) for d in plan.zip_days[sym]}
+                left[sym] = [r for day, rs in split_days(ranges).items() if day in zip_days for r in rs]
+            retry = plan_backfill(left, store=self.store, budget=self._budget(), allow_zip=False, period_ms=period_ms)
+            if retry.requests:
+                logger.info("ZIP 未覆盖，改走 REST: %s", retry.summary())
+                filled += self._rest.run_requests(retry.requests, interval, self.store)
+            plan.requests += retry.requests
+            plan.deferred += retry.deferred
+
+        metrics.inc("backfill_deferred", len(plan.deferred))
+        self.store.save()
+        return plan, filled
 
 
 # ==================== 统一补齐器 ====================
@@ -0,0 +1,148 @@
+"""K线写入队列 - 单一常驻 ingest 事件循环 + 有界无锁队列
+
+- 生产者（cryptofeed 回调线程）只做 put_nowait：deque.append，队列满则丢弃并计数
+- 消费者（专用线程内的常驻事件循环）按条数/时间窗口攒批后写库
+- 背压指标：队列深度/峰值、刷新耗时、丢弃/迟到条数
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+from adapters.metrics import metrics
+
+logger = logging.getLogger("ws.ingest")
+
+
+class CandleIngestor:
+    """有界 K 线写入队列
+
+    攒批规则（与原时间窗口写入一致）：
+    - 攒满 max_batch 条立即写入
+    - 最后一条到达后安静 flush_window 秒写入（覆盖每分钟整点 1-2 秒的推送尖峰）
+    - 首条等待超过 max_wait 秒强制写入（持续有数据时不饿死）
+    """
+
+    def __init__(self, writer: Callable[[List[dict]], int], max_queue: int = 20000, max_batch: int = 1000,
+                 flush_window: float = 3.0, max_wait: float = 10.0, late_after: float = 10.0,
+                 period: float = 60.0, clock: Callable[[], float] = time.time):
+        self._writer = writer
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.flush_window = flush_window
+        self.max_wait = max_wait
+        # K 线收盘后超过 late_after 秒才到达视为迟到（仍写入，只计数）
+        self.late_after = late_after
+        self.period = period
+        self._clock = clock
+
+        self._queue: deque = deque()
+        self._first_put = 0.0
+        self._last_put = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    # ==================== 生产者 ====================
+
+    def put_nowait(self, row: dict) -> bool:
+        """非阻塞入队（任意线程）；队列满返回 False"""
+        depth = len(self._queue)
+        if depth >= self.max_queue:
+            metrics.inc("ws_dropped")
+            return False
+
+        ts = row.get("bucket_ts")
+        if ts is not None and self._clock() - (ts.timestamp() + self.period) > self.late_after:
+            metrics.inc("ws_late")
+
+        now = time.monotonic()
+        if depth == 0:
+            self._first_put = now
+        self._last_put = now
+        self._queue.append(row)
+        if depth + 1 > metrics.ws_queue_peak:
+            metrics.set("ws_queue_peak", depth + 1)
+        # 只在空 -> 非空时唤醒消费者（每批一次跨线程调用，而非每条）
+        if depth == 0 and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return True
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    # ==================== 消费者 ====================
+
+    def start(self) -> None:
+        """启动专用 ingest 线程（常驻事件循环）"""
+        self._thread = threading.Thread(target=self._run, name="ws-ingest", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """停止并写完队列剩余数据"""
+        self._stopping = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._wakeup = asyncio.Event()
+        self._ready.set()
+        try:
+            self._loop.run_until_complete(self._consume())
+        finally:
+            self._loop.close()
+
+    async def _consume(self) -> None:
+        while True:
+            if not self._queue:
+                if self._stopping:
+                    return
+                self._wakeup.clear()
+                # 超时兜底：生产者判空与消费者取空交错时可能漏掉一次唤醒
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_window)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # 攒批：满批 / 安静窗口 / 最长等待
+            while not self._stopping and len(self._queue) < self.max_batch:
+                now = time.monotonic()
+                quiet, age = now - self._last_put, now - self._first_put
+                if quiet >= self.flush_window or age >= self.max_wait:
+                    break
+                await asyncio.sleep(min(self.flush_window - quiet, self.max_wait - age))
+
+            batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.max_batch))]
+            if self._queue:
+                self._first_put = time.monotonic()
+            await self._flush(batch)
+
+    async def _flush(self, rows: List[dict]) -> None:
+        metrics.set("ws_queue_depth", len(self._queue))
+        t0 = time.perf_counter()
+        try:
+            n = await asyncio.to_thread(self._writer, rows)
+            metrics.inc("rows_written", n)
+            metrics.inc("ws_batches")
+            logger.debug("批量写入 %d 条 K 线", n)
+        except Exception as e:
+            metrics.inc("ws_write_failed", len(rows))
+            logger.error("批量写入失败: %s", e)
+        finally:
+            latency = time.perf_counter() - t0
+            metrics.set("ws_flush_latency", latency)
+            if latency > metrics.ws_flush_latency_max:
+                metrics.set("ws_flush_latency_max", latency)
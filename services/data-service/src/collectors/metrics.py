@@ -1,22 +1,22 @@
-"""期货指标采集器 - 高性能版"""
+"""期货指标采集器 - 异步版（aiohttp 长连接 + 按端点扇出）"""
 from __future__ import annotations
 
+import asyncio
 import logging
 import sys
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from decimal import Decimal
 from pathlib import Path
-from typing import List, Optional, Sequence
+from typing import Dict, List, Optional, Sequence
 
-import requests
+import aiohttp
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from adapters.ccxt import load_symbols
 from adapters.metrics import Timer, metrics
-from adapters.rate_limiter import acquire, parse_ban, release, set_ban
+from adapters.rate_limiter import acquire_async, parse_ban, set_ban
 from adapters.timescale import TimescaleAdapter
 from config import settings
 
@@ -24,12 +24,14 @@ logger = logging.getLogger(__name__)
 
 FAPI = "https://fapi.binance.com"
 
-
-# 配置连接池
-_adapter = requests.adapters.HTTPAdapter(pool_connections=30, pool_maxsize=30)
-_session = requests.Session()
-_session.mount("https://", _adapter)
-_session.mount("http://", _adapter)
+# 端点: (键, 路径, 请求权重)
+ENDPOINTS = (
+    ("oi", "/futures/data/openInterestHist", 1),
+    ("pos", "/futures/data/topLongShortPositionRatio", 1),
+    ("acc", "/futures/data/topLongShortAccountRatio", 1),
+    ("glb", "/futures/data/globalLongShortAccountRatio", 1),
+    ("taker", "/futures/data/takerlongshortRatio", 1),
+)
 
 
 def _to_decimal(value) -> Optional[Decimal]:
@@ -42,62 +44,52 @@ def _to_decimal(value) -> Optional[Decimal]:
 
 
 class MetricsCollector:
-    """Binance 期货指标采集（5m 粒度）- 并发版"""
+    """Binance 期货指标采集（5m 粒度）- 异步并发版"""
 
-    def __init__(self, workers: int = 8):
-        self._ts = TimescaleAdapter()
+    def __init__(self, workers: int = 20, base_url: str = FAPI, ts: Optional[TimescaleAdapter] = None):
+        self._ts = ts or TimescaleAdapter()
+        # 全局并发上限（所有端点、所有符号共享）
         self._workers = workers
-        self._proxies = {"http": settings.http_proxy, "https": settings.http_proxy} if settings.http_proxy else {}
-
-    def _get(self, url: str, params: dict) -> Optional[list]:
-        """REST 请求 - 使用全局限流"""
-        acquire(1)
-        metrics.inc("requests_total")
-        try:
-            r = _session.get(url, params=params, proxies=self._proxies, timeout=10)
-            if r.status_code == 429:
-                # 429: 警告，立即停止，解析 Retry-After
-                retry_after = int(r.headers.get("Retry-After", 60))
-                set_ban(time.time() + retry_after)
-                logger.warning("429 限流警告，等待 %ds", retry_after)
-                metrics.inc("requests_failed")
-                return None
-            if r.status_code == 418:
-                # 418: 已被 ban，解析 ban 结束时间
-                retry_after = int(r.headers.get("Retry-After", 0))
-                ban_time = parse_ban(r.text) if not retry_after else time.time() + retry_after
-                set_ban(ban_time if ban_time > time.time() else time.time() + 120)
-                logger.warning("418 IP 被 ban")
+        self._base_url = base_url.rstrip("/")
+        self._proxy = settings.http_proxy or None
+
+    async def _get(self, session: aiohttp.ClientSession, sem: asyncio.Semaphore,
+                   path: str, params: dict, weight: int) -> Optional[list]:
+        """REST 请求 - 全局限流（按权重）+ 并发上限"""
+        async with sem:
+            await acquire_async(weight)
+            metrics.inc("requests_total")
+            try:
+                async with session.get(f"{self._base_url}{path}", params=params, proxy=self._proxy) as r:
+                    if r.status == 429:
+                        # 429: 警告，立即停止，解析 Retry-After
+                        retry_after = int(r.headers.get("Retry-After", 60))
+                        set_ban(time.time() + retry_after)
+                        logger.warning("429 限流警告，等待 %ds", retry_after)
+                        metrics.inc("requests_failed")
+                        return None
+                    if r.status == 418:
+                        # 418: 已被 ban，解析 ban 结束时间
+                        retry_after = int(r.headers.get("Retry-After", 0))
+                        ban_time = parse_ban(await r.text()) if not retry_after else time.time() + retry_after
+                        set_ban(ban_time if ban_time > time.time() else time.time() + 120)
+                        logger.warning("418 IP 被 ban")
+                        metrics.inc("requests_failed")
+                        return None
+                    r.raise_for_status()
+                    return await r.json(content_type=None)
+            except Exception as e:
                 metrics.inc("requests_failed")
+                logger.debug("请求失败 %s: %s", params.get("symbol", ""), e)
                 return None
-            r.raise_for_status()
-            return r.json()
-        except Exception as e:
-            metrics.inc("requests_failed")
-            logger.debug("请求失败 %s: %s", params.get("symbol", ""), e)
-            return None
-        finally:
-            release()
-
-    def _collect_one(self, sym: str) -> Optional[dict]:
-        """采集单个符号 - 串行请求避免并发放大"""
-        sym = sym.upper()
-        apis = [
-            ("oi", f"{FAPI}/futures/data/openInterestHist", {"symbol": sym, "period": "5m", "limit": 1}),
-            ("pos", f"{FAPI}/futures/data/topLongShortPositionRatio", {"symbol": sym, "period": "5m", "limit": 1}),
-            ("acc", f"{FAPI}/futures/data/topLongShortAccountRatio", {"symbol": sym, "period": "5m", "limit": 1}),
-            ("glb", f"{FAPI}/futures/data/globalLongShortAccountRatio", {"symbol": sym, "period": "5m", "limit": 1}),
-            ("taker", f"{FAPI}/futures/data/takerlongshortRatio", {"symbol": sym, "period": "5m", "limit": 1}),
-        ]
-
-        results = {}
-        for key, url, params in apis:
-            results[key] = self._get(url, params)
-
-        oi, pos, acc, glb, taker = results.get("oi"), results.get("pos"), results.get("acc"), results.get("glb"), results.get("taker")
+
+    @staticmethod
+    def _build_row(sym: str, results: Dict[str, Optional[list]]) -> Optional[dict]:
+        """合并单个符号各端点结果"""
+        oi, pos, acc, glb, taker = (results.get(k) for k in ("oi", "pos", "acc", "glb", "taker"))
 
         # 至少要有 oi 数据才有意义
-        if not oi or not isinstance(oi, list) or not oi:
+        if not oi or not isinstance(oi, list):
             return None
 
         ts = int(oi[0].get("timestamp", 0))
@@ -107,8 +99,8 @@ class MetricsCollector:
             "create_time": datetime.fromtimestamp(ts / 1000, tz=timezone.utc).replace(tzinfo=None),
             "symbol": sym,
             "exchange": settings.db_exchange,
-            "sum_open_interest": _to_decimal(oi[0].get("sumOpenInterest")) if oi else None,
-            "sum_open_interest_value": _to_decimal(oi[0].get("sumOpenInterestValue")) if oi else None,
+            "sum_open_interest": _to_decimal(oi[0].get("sumOpenInterest")),
+            "sum_open_interest_value": _to_decimal(oi[0].get("sumOpenInterestValue")),
             "count_toptrader_long_short_ratio": _to_decimal(acc[0].get("longShortRatio")) if acc else None,
             "sum_toptrader_long_short_ratio": _to_decimal(pos[0].get("longShortRatio")) if pos else None,
             "count_long_short_ratio": _to_decimal(glb[0].get("longShortRatio")) if glb else None,
@@ -117,20 +109,37 @@ class MetricsCollector:
             "is_closed": True,
         }
 
-    def collect(self, symbols: Sequence[str]) -> List[dict]:
-        """并发采集"""
+    async def collect_async(self, symbols: Sequence[str]) -> List[dict]:
+        """按端点扇出：所有 (端点, 符号) 请求共享一个长连接会话与并发上限"""
+        syms = [s.upper() for s in symbols]
+        sem = asyncio.Semaphore(self._workers)
+        connector = aiohttp.TCPConnector(limit=self._workers, keepalive_timeout=60)
+        timeout = aiohttp.ClientTimeout(total=10)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            async def fetch(key: str, path: str, weight: int, sym: str):
+                params = {"symbol": sym, "period": "5m", "limit": 1}
+                return key, sym, await self._get(session, sem, path, params, weight)
+
+            tasks = [fetch(key, path, weight, sym) for key, path, weight in ENDPOINTS for sym in syms]
+            results: Dict[str, Dict[str, Optional[list]]] = {sym: {} for sym in syms}
+            for key, sym, data in await asyncio.gather(*tasks):
+                results[sym][key] = data
+
         rows = []
-        with ThreadPoolExecutor(max_workers=self._workers) as pool:
-            futures = {pool.submit(self._collect_one, sym): sym for sym in symbols}
-            for future in as_completed(futures):
-                try:
-                    row = future.result()
-                    if row:
-                        rows.append(row)
-                except Exception as e:
-                    logger.debug("采集异常 %s: %s", futures[future], e)
+        for sym in syms:
+            try:
+                row = self._build_row(sym, results[sym])
+                if row:
+                    rows.append(row)
+            except Exception as e:
+                logger.debug("采集异常 %s: %s", sym, e)
         return rows
 
+    def collect(self, symbols: Sequence[str]) -> List[dict]:
+        """并发采集（同步入口）"""
+        return asyncio.run(self.collect_async(symbols))
+
     def save(self, rows: List[dict]) -> int:
         """批量保存 - 使用 COPY 高性能写入"""
         if not rows:
@@ -0,0 +1,316 @@
+"""REST 补齐规划器 - 缺口 -> 最少 API 权重的 (symbol, startTime, limit) 请求
+
+- 缺口以毫秒半开区间 [start, end) 表示：有覆盖索引时来自位图（精确到根），否则按整日
+- 合并：相邻/相近的缺口在同一请求窗口内（跨度 <= 1500 根）一次取回；
+  按 权重 + 每次调用固定成本 做动态规划，决定哪些缺口合并、每个请求的 limit（落在哪个权重档）
+- ZIP / REST 按 (symbol, 日) 选择：REST 成本折算字节后与日度 ZIP 下载比较
+- 按限流器当前可用权重排程（近期缺口优先），超出预算的请求留到下一轮
+- 交易所确认没有数据的区间（未上线/下架/停牌）持久化，重启后不再重复请求
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from adapters.ccxt import KLINE_MAX_LIMIT, KLINE_WEIGHT_TIERS, kline_weight
+
+logger = logging.getLogger(__name__)
+
+Range = Tuple[int, int]
+
+MS_PER_MIN = 60_000
+MS_PER_DAY = 86_400_000
+
+# 每次调用的固定成本（折算为权重）：往返延迟、连接与写库开销，避免为省 1 点权重拆成多次调用
+CALL_COST = 2.0
+# Binance Vision 1m K 线 ZIP 大小估算（字节）
+ZIP_DAY_BYTES = 60_000
+ZIP_MONTH_BYTES = 1_700_000
+# 1 点 REST 权重折算的字节数（权重由所有采集器共享，比带宽稀缺）
+BYTES_PER_WEIGHT = 20_000
+# ZipBackfiller 每次下载占用的限流权重
+ZIP_WEIGHT = 1
+# 日度 ZIP 次日发布：早于今天的日期才考虑 ZIP（未发布时 404，回退 REST）
+ZIP_LAG_DAYS = 1
+# 月度 ZIP 只在缺失天数足够多时比逐日下载省字节
+ZIP_MONTHLY_MIN_DAYS = math.ceil(ZIP_MONTH_BYTES / ZIP_DAY_BYTES)
+
+UNFILLABLE_TTL_DAYS = 30
+DELISTED_TTL_DAYS = 3
+
+
+# ==================== 区间工具 ====================
+def missing_ranges(bits: str, base_ms: int, period_ms: int = MS_PER_MIN) -> List[Range]:
+    """覆盖位图 '0101...' -> 缺失区间"""
+    return [(base_ms + m.start() * period_ms, base_ms + m.end() * period_ms) for m in re.finditer("0+", bits)]
+
+
+def normalize(ranges: Iterable[Range]) -> List[Range]:
+    """排序并合并重叠/相接的区间"""
+    out: List[Range] = []
+    for s, e in sorted(r for r in ranges if r[1] > r[0]):
+        if out and s <= out[-1][1]:
+            out[-1] = (out[-1][0], max(out[-1][1], e))
+        else:
+            out.append((s, e))
+    return out
+
+
+def subtract(ranges: Sequence[Range], holes: Sequence[Range]) -> List[Range]:
+    """ranges - holes（均为已 normalize 的区间）"""
+    out: List[Range] = []
+    j = 0
+    for s, e in ranges:
+        while j < len(holes) and holes[j][1] <= s:
+            j += 1
+        k = j
+        while k < len(holes) and holes[k][0] < e:
+            hs, he = holes[k]
+            if hs > s:
+                out.append((s, hs))
+            s = max(s, he)
+            k += 1
+        if s < e:
+            out.append((s, e))
+    return out
+
+
+def split_days(ranges: Sequence[Range]) -> Dict[int, List[Range]]:
+    """按 UTC 日切分 -> {日起点 ms: [区间]}"""
+    out: Dict[int, List[Range]] = {}
+    for s, e in ranges:
+        while s < e:
+            day = s - s % MS_PER_DAY
+            cut = min(e, day + MS_PER_DAY)
+            out.setdefault(day, []).append((s, cut))
+            s = cut
+    return out
+
+
+def _bars(r: Range, period_ms: int) -> int:
+    return (r[1] - r[0]) // period_ms
+
+
+# ==================== 请求规划 ====================
+@dataclass(frozen=True)
+class KlineRequest:
+    """一次 klines 调用: 从 start_ms 起取 limit 根，覆盖 ranges 内的缺失"""
+    symbol: str
+    start_ms: int
+    limit: int
+    weight: int
+    ranges: Tuple[Range, ...]
+    period_ms: int = MS_PER_MIN
+
+    @property
+    def end_ms(self) -> int:
+        return self.start_ms + self.limit * self.period_ms
+
+    @property
+    def missing(self) -> int:
+        return sum(_bars(r, self.period_ms) for r in self.ranges)
+
+
+def _best_chunk(max_limit: int, call_cost: float) -> int:
+    """长缺口按单根成本最低的权重档切块"""
+    tiers = [m for m, _ in KLINE_WEIGHT_TIERS if m <= max_limit] or [max_limit]
+    return min(tiers, key=lambda m: ((kline_weight(m) + call_cost) / m, -m))
+
+
+def plan_requests(symbol: str, ranges: Sequence[Range], period_ms: int = MS_PER_MIN,
+                  max_limit: int = KLINE_MAX_LIMIT, call_cost: float = CALL_COST) -> List[KlineRequest]:
+    """缺失区间 -> 总成本（权重 + 调用数 × call_cost）最低的请求集合
+
+    动态规划：cost[j] = min(cost[i] + weight(跨度 i..j) + call_cost)，跨度 <= max_limit 根；
+    长于 max_limit 的缺口先按最优权重档切块。
+    """
+    chunk = _best_chunk(max_limit, call_cost) * period_ms
+    pieces: List[Range] = []
+    for s, e in normalize(ranges):
+        while e - s > max_limit * period_ms:
+            pieces.append((s, s + chunk))
+            s += chunk
+        pieces.append((s, e))
+    n = len(pieces)
+    if not n:
+        return []
+
+    cost = [0.0] + [math.inf] * n
+    prev = [0] * (n + 1)
+    for j in range(1, n + 1):
+        end = pieces[j - 1][1]
+        for i in range(j, 0, -1):
+            span = (end - pieces[i - 1][0]) // period_ms
+            if span > max_limit:
+                break
+            c = cost[i - 1] + kline_weight(span) + call_cost
+            if c < cost[j]:
+                cost[j], prev[j] = c, i - 1
+
+    out: List[KlineRequest] = []
+    j = n
+    while j > 0:
+        i = prev[j]
+        group = pieces[i:j]
+        span = (group[-1][1] - group[0][0]) // period_ms
+        out.append(KlineRequest(symbol, group[0][0], span, kline_weight(span), tuple(normalize(group)), period_ms))
+        j = i
+    out.reverse()
+    return out
+
+
+def request_cost(requests: Sequence[KlineRequest], call_cost: float = CALL_COST) -> float:
+    return sum(r.weight + call_cost for r in requests)
+
+
+@dataclass
+class BackfillPlan:
+    """规划结果"""
+    requests: List[KlineRequest] = field(default_factory=list)
+    zip_days: Dict[str, List[date]] = field(default_factory=dict)
+    deferred: List[KlineRequest] = field(default_factory=list)
+    gaps: int = 0          # 缺失区间数
+    missing: int = 0       # 规划覆盖的缺失根数（已排除持久化的不可补区间）
+    excluded: int = 0      # 因不可补/下架而跳过的根数
+
+    @property
+    def weight(self) -> int:
+        return sum(r.weight for r in self.requests) + ZIP_WEIGHT * sum(len(d) for d in self.zip_days.values())
+
+    @property
+    def calls(self) -> int:
+        return len(self.requests) + sum(len(d) for d in self.zip_days.values())
+
+    def summary(self) -> str:
+        return (f"缺失 {self.missing} 根 | REST {len(self.requests)} 次 (权重 {sum(r.weight for r in self.requests)}) | "
+                f"ZIP {sum(len(d) for d in self.zip_days.values())} 日 | 延后 {len(self.deferred)} 次 | 跳过 {self.excluded} 根")
+
+
+def plan_backfill(gaps: Dict[str, List[Range]], now_ms: Optional[int] = None, store: Optional["UnfillableStore"] = None,
+                  budget: float = math.inf, allow_zip: bool = True, period_ms: int = MS_PER_MIN,
+                  max_limit: int = KLINE_MAX_LIMIT, call_cost: float = CALL_COST) -> BackfillPlan:
+    """{symbol: 缺失区间} -> 按 ZIP/REST 分流、按预算排程的补齐计划"""
+    now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+    # 未收盘的当前根不算缺口
+    horizon = now_ms - now_ms % period_ms - period_ms
+    zip_cutoff = (now_ms - now_ms % MS_PER_DAY) - (ZIP_LAG_DAYS - 1) * MS_PER_DAY
+    zip_cost = ZIP_DAY_BYTES + (ZIP_WEIGHT + call_cost) * BYTES_PER_WEIGHT
+
+    plan = BackfillPlan()
+    requests: List[KlineRequest] = []
+    for sym, ranges in gaps.items():
+        ranges = subtract(normalize(ranges), [(horizon, math.inf)])
+        if store is not None:
+            kept = store.exclude(sym, ranges)
+            plan.excluded += sum(_bars(r, period_ms) for r in ranges) - sum(_bars(r, period_ms) for r in kept)
+            ranges = kept
+        if not ranges:
+            continue
+        plan.gaps += len(ranges)
+        plan.missing += sum(_bars(r, period_ms) for r in ranges)
+
+        rest: List[Range] = []
+        for day, day_ranges in sorted(split_days(ranges).items()):
+            # 单日 REST 成本折算字节 vs 日度 ZIP
+            if allow_zip and day + MS_PER_DAY <= zip_cutoff and \
+                    request_cost(plan_requests(sym, day_ranges, period_ms, max_limit, call_cost), call_cost) \
+                    * BYTES_PER_WEIGHT > zip_cost:
+                plan.zip_days.setdefault(sym, []).append(datetime.fromtimestamp(day / 1000, tz=timezone.utc).date())
+            else:
+                rest.extend(day_ranges)
+        requests.extend(plan_requests(sym, rest, period_ms, max_limit, call_cost))
+
+    # 近期缺口优先（对信号影响最大），预算外的留到下一轮
+    spent = ZIP_WEIGHT * sum(len(d) for d in plan.zip_days.values())
+    for req in sorted(requests, key=lambda r: -r.start_ms):
+        if spent + req.weight <= budget:
+            plan.requests.append(req)
+            spent += req.weight
+        else:
+            plan.deferred.append(req)
+    return plan
+
+
+# ==================== 不可补区间持久化 ====================
+class UnfillableStore:
+    """交易所确认没有数据的区间 + 下架 symbol（JSON 文件，带过期，线程安全）
+
+    {"ranges": {symbol: [[start_ms, end_ms, marked_at], ...]}, "delisted": {symbol: [since_ms, marked_at]}}
+    """
+
+    def __init__(self, path: Optional[Path] = None, ttl_days: float = UNFILLABLE_TTL_DAYS,
+                 delisted_ttl_days: float = DELISTED_TTL_DAYS, clock=time.time):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.delisted_ttl = delisted_ttl_days * 86400
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._ranges: Dict[str, List[List[float]]] = {}
+        self._delisted: Dict[str, List[float]] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning("不可补区间文件损坏，忽略: %s", e)
+            return
+        now = self._clock()
+        self._ranges = {s: [r for r in rs if now - r[2] < self.ttl] for s, rs in data.get("ranges", {}).items()}
+        self._ranges = {s: rs for s, rs in self._ranges.items() if rs}
+        self._delisted = {s: v for s, v in data.get("delisted", {}).items() if now - v[1] < self.delisted_ttl}
+
+    def exclude(self, symbol: str, ranges: Sequence[Range]) -> List[Range]:
+        """去掉已知不可补的部分"""
+        with self._lock:
+            holes = [(int(s), int(e)) for s, e, _ in self._ranges.get(symbol, ())]
+            if symbol in self._delisted:
+                holes.append((int(self._delisted[symbol][0]), math.inf))
+        return subtract(ranges, normalize(holes)) if holes else list(ranges)
+
+    def add(self, symbol: str, start_ms: int, end_ms: int) -> None:
+        if end_ms <= start_ms:
+            return
+        now = self._clock()
+        with self._lock:
+            # 已记录的部分保留原标记时间（按各自的时间过期），只为新增部分打上当前时间
+            known = self._ranges.setdefault(symbol, [])
+            fresh = subtract([(start_ms, end_ms)], normalize([(int(s), int(e)) for s, e, _ in known]))
+            if fresh:
+                known.extend([s, e, now] for s, e in fresh)
+                known.sort()
+                self._dirty = True
+
+    def mark_delisted(self, symbol: str, since_ms: int) -> None:
+        with self._lock:
+            cur = self._delisted.get(symbol)
+            if cur is None or since_ms < cur[0]:
+                self._delisted[symbol] = [since_ms, self._clock()]
+                self._dirty = True
+        logger.info("[%s] 自 %s 起无数据，视为下架/停牌", symbol,
+                    datetime.fromtimestamp(since_ms / 1000, tz=timezone.utc).isoformat())
+
+    def is_delisted(self, symbol: str) -> bool:
+        return symbol in self._delisted
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty or self.path is None:
+                return
+            data = {"ranges": self._ranges, "delisted": self._delisted}
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+        tmp.replace(self.path)
@@ -0,0 +1,251 @@
+"""采集端多周期聚合 - 1m 流滚动生成 5m/15m/1h/4h/1d/1w 闭合 K 线
+
+聚合语义与连续聚合（003_continuous_aggregates.sql）一致：
+first(open) / max(high) / min(low) / last(close) / sum(volume, quote_volume, trade_count, taker_*)
+/ bool_and(is_closed)，桶边界与 time_bucket 默认 origin（2000-01-03 周一 00:00 UTC）对齐。
+
+- 每个 (symbol, 周期) 维护未闭合桶；桶内所有分钟到齐或下一个桶开始时闭合输出
+- 已输出的桶保留 keep 个，迟到的 1m 合并后重新输出；同一分钟重复到达（spool 回放）忽略
+- 采集进程启动前已开始的桶在内存中不完整，标记 partial，由写入方改用 SQL 从 candles_1m 重算
+"""
+from __future__ import annotations
+
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from adapters.metrics import metrics
+from config import settings
+
+logger = logging.getLogger("ws.rollup")
+
+ROLLUP_INTERVALS: Dict[str, int] = {
+    "5m": 300, "15m": 900, "1h": 3600, "4h": 14400, "1d": 86400, "1w": 604800,
+}
+# time_bucket 默认 origin（周桶从周一开始）
+_BUCKET_ORIGIN = 946857600  # 2000-01-03 00:00:00 UTC
+
+_SUM_COLUMNS = ("volume", "quote_volume", "trade_count", "taker_buy_volume", "taker_buy_quote_volume")
+
+# 写入失败的桶最多重试次数（超过后丢弃，由 SQL 连续聚合兜底），避免数据库长时间故障时重试队列无限增长
+MAX_RETRY = 5
+
+
+def bucket_start(ts: int, period: int) -> int:
+    """与 time_bucket(period, ts) 相同的桶起点（秒）"""
+    return ts - (ts - _BUCKET_ORIGIN) % period
+
+
+def _num(v):
+    return None if v is None else float(v)
+
+
+class RollupBar:
+    """单个高周期桶的累加器"""
+
+    __slots__ = ("exchange", "symbol", "interval", "start", "period", "open", "open_ts", "high", "low",
+                 "close", "close_ts", "sums", "is_closed", "seen", "partial", "emitted")
+
+    def __init__(self, exchange: str, symbol: str, interval: str, start: int, period: int, partial: bool):
+        self.exchange, self.symbol, self.interval = exchange, symbol, interval
+        self.start, self.period = start, period
+        self.open = self.high = self.low = self.close = None
+        self.open_ts = self.close_ts = None
+        self.sums: Dict[str, Optional[float]] = dict.fromkeys(_SUM_COLUMNS)
+        self.is_closed = True
+        self.seen = 0          # 分钟位图（去重 + 完整性判断）
+        self.partial = partial
+        self.emitted = False
+
+    @property
+    def complete(self) -> bool:
+        return self.seen == (1 << (self.period // 60)) - 1
+
+    def add(self, ts: int, row: dict) -> bool:
+        """合并一根 1m；同一分钟重复到达返回 False"""
+        bit = 1 << ((ts - self.start) // 60)
+        if self.seen & bit:
+            return False
+        self.seen |= bit
+
+        o, h, lo, c = _num(row.get("open")), _num(row.get("high")), _num(row.get("low")), _num(row.get("close"))
+        if self.open_ts is None or ts < self.open_ts:
+            self.open, self.open_ts = o, ts
+        if self.close_ts is None or ts > self.close_ts:
+            self.close, self.close_ts = c, ts
+        if h is not None and (self.high is None or h > self.high):
+            self.high = h
+        if lo is not None and (self.low is None or lo < self.low):
+            self.low = lo
+        for col in _SUM_COLUMNS:
+            v = row.get(col)
+            if v is not None:
+                cur = self.sums[col]
+                self.sums[col] = (cur or 0) + (int(v) if col == "trade_count" else float(v))
+        self.is_closed = self.is_closed and bool(row.get("is_closed", True))
+        return True
+
+    def to_row(self, source: str) -> dict:
+        return {
+            "exchange": self.exchange, "symbol": self.symbol,
+            "bucket_ts": datetime.fromtimestamp(self.start, tz=timezone.utc),
+            "open": self.open, "high": self.high, "low": self.low, "close": self.close,
+            **self.sums, "is_closed": self.is_closed, "source": source,
+        }
+
+
+class RollupStage:
+    """1m 行 -> 各周期闭合桶"""
+
+    def __init__(self, intervals: Iterable[str] = ROLLUP_INTERVALS, started_at: Optional[float] = None,
+                 keep: int = 2, source: str = "ws_rollup"):
+        self.periods = {iv: ROLLUP_INTERVALS[iv] for iv in intervals}
+        self.started_at = int(started_at if started_at is not None else time.time())
+        self.keep = keep
+        self.source = source
+        # (exchange, symbol, interval) -> {桶起点: RollupBar}（按起点递增）
+        self._bars: Dict[Tuple[str, str, str], Dict[int, RollupBar]] = {}
+
+    def feed(self, rows: Iterable[dict]) -> List[RollupBar]:
+        """合并一批 1m 行，返回本批新闭合（或因迟到数据更新）的桶"""
+        out: Dict[int, RollupBar] = {}
+        for row in rows:
+            ts = int(row["bucket_ts"].timestamp())
+            for iv, period in self.periods.items():
+                for bar in self._add(row, ts, iv, period):
+                    out[id(bar)] = bar
+        return list(out.values())
+
+    def _add(self, row: dict, ts: int, iv: str, period: int) -> List[RollupBar]:
+        key = (row["exchange"], row["symbol"], iv)
+        bars = self._bars.setdefault(key, {})
+        start = bucket_start(ts, period)
+        bar = bars.get(start)
+        if bar is None:
+            if bars and start < min(bars):
+                # 比保留窗口更早的迟到数据：交给 SQL 连续聚合/补齐
+                metrics.inc("ws_rollup_late")
+                return []
+            bar = bars[start] = RollupBar(key[0], key[1], iv, start, period, partial=start < self.started_at)
+
+        closed = []
+        if bar.add(ts, row):
+            # 桶已输出后又收到迟到分钟：重新输出；或分钟到齐：闭合
+            if bar.emitted or bar.complete:
+                closed.append(bar)
+        # 更晚的桶开始 -> 之前未输出的桶闭合
+        for s, b in bars.items():
+            if s < start and not b.emitted and b not in closed:
+                closed.append(b)
+        for b in closed:
+            b.emitted = True
+        # 只保留最近 keep 个已输出桶 + 未闭合桶
+        done = sorted(s for s, b in bars.items() if b.emitted)
+        for s in done[:-self.keep] if len(done) > self.keep else ():
+            del bars[s]
+        return closed
+
+    def open_bars(self) -> int:
+        return sum(len(b) for b in self._bars.values())
+
+
+def bar_columns(bars: List[RollupBar], source: str) -> Dict[str, list]:
+    """闭合桶 -> 列式输入 {列名: [值...]}（upsert_candles_columnar 只接受 DataFrame 或列字典）"""
+    rows = [b.to_row(source) for b in bars]
+    return {c: [r[c] for r in rows] for c in rows[0]} if rows else {}
+
+
+def rollup_table(interval: str) -> str:
+    """采集端聚合目标表（candles_5m 等为连续聚合，不能直接 upsert）"""
+    return f"candles_{interval}_rollup"
+
+
+def reroll(ts: Any, symbols: Sequence[str], start: datetime, end: datetime, exchange: Optional[str] = None,
+           intervals: Optional[Iterable[str]] = None) -> int:
+    """回补路径写入 [start, end) 的 1m 后，从 candles_1m 重算受影响的聚合桶（REST/ZIP 写入不经过 RollupStage）
+
+    intervals 缺省为 BINANCE_WS_ROLLUP；未启用时不做任何事。失败只记日志，不影响回补结果。
+    """
+    intervals = settings.ws_rollup_intervals if intervals is None else intervals
+    if not symbols or not intervals:
+        return 0
+    lo, hi = int(start.timestamp()), int(end.timestamp())
+    written = 0
+    for iv in intervals:
+        period = ROLLUP_INTERVALS[iv]
+        begin = datetime.fromtimestamp(bucket_start(lo, period), tz=timezone.utc)
+        stop = datetime.fromtimestamp(bucket_start(hi - 1, period) + period, tz=timezone.utc)
+        try:
+            written += ts.rollup_candles(iv, rollup_table(iv), begin, stop, symbols, exchange=exchange)
+        except Exception as e:
+            metrics.inc("ws_rollup_failed")
+            logger.warning("回补后重算 %s 聚合失败 %s [%s, %s): %s", iv, list(symbols)[:5], begin, stop, e)
+    metrics.inc("ws_rollup_rerolled", written)
+    return written
+
+
+class RollupWriter:
+    """1m 写库成功后调用：聚合闭合桶并写入 candles_{周期}_rollup
+
+    - 完整桶走列式 COPY upsert；partial 桶按 (周期, 桶起点) 分组，由 SQL 从 candles_1m 重算
+    - 写入失败的桶保留到下一批重试（同键后到的版本覆盖旧版本），连续失败 MAX_RETRY 次后丢弃
+    """
+
+    def __init__(self, ts: Any, intervals: Iterable[str] = ROLLUP_INTERVALS, started_at: Optional[float] = None):
+        self._ts = ts
+        self.stage = RollupStage(intervals, started_at)
+        self._retry: Dict[Tuple[str, str, str, int], RollupBar] = {}
+        self._attempts: Dict[Tuple[str, str, str, int], int] = {}
+
+    def __call__(self, rows: List[dict]) -> int:
+        for bar in self.stage.feed(rows):
+            key = (bar.interval, bar.exchange, bar.symbol, bar.start)
+            self._retry[key] = bar
+            self._attempts.pop(key, None)  # 新版本重新计数
+        if not self._retry:
+            return 0
+        bars, self._retry = self._retry, {}
+
+        full: Dict[str, List[RollupBar]] = {}
+        partial: Dict[Tuple[str, str, int], List[RollupBar]] = {}
+        for bar in bars.values():
+            if bar.partial:
+                partial.setdefault((bar.interval, bar.exchange, bar.start), []).append(bar)
+            else:
+                full.setdefault(bar.interval, []).append(bar)
+
+        written = 0
+        for iv, group in full.items():
+            try:
+                written += self._ts.upsert_candles_columnar(
+                    iv, bar_columns(group, self.stage.source), source=self.stage.source, table=rollup_table(iv))
+            except Exception as e:
+                self._defer(group, f"{iv} 写入失败: {e}")
+        for (iv, exchange, start), group in partial.items():
+            begin = datetime.fromtimestamp(start, tz=timezone.utc)
+            try:
+                written += self._ts.rollup_candles(
+                    iv, rollup_table(iv), begin, begin + timedelta(seconds=group[0].period),
+                    [b.symbol for b in group], exchange=exchange, source=self.stage.source)
+            except Exception as e:
+                self._defer(group, f"{iv} SQL 重算失败: {e}")
+        for key in bars:
+            if key not in self._retry:
+                self._attempts.pop(key, None)
+        metrics.inc("ws_rollup_bars", written)
+        return written
+
+    def _defer(self, group: List[RollupBar], reason: str) -> None:
+        metrics.inc("ws_rollup_failed", len(group))
+        dropped = 0
+        for bar in group:
+            key = (bar.interval, bar.exchange, bar.symbol, bar.start)
+            attempts = self._attempts.get(key, 0) + 1
+            if attempts >= MAX_RETRY:
+                self._attempts.pop(key, None)
+                dropped += 1
+                continue
+            self._attempts[key] = attempts
+            self._retry.setdefault(key, bar)
+        logger.warning("聚合 %s（%d 根，下批重试，%d 根超过重试次数已丢弃）", reason, len(group), dropped)
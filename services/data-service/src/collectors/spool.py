@@ -0,0 +1,222 @@
+"""WS K线预写日志（spool）- 数据库故障时只消耗磁盘，不消耗 API 权重与补齐时间
+
+- 分段追加写文件: 每条记录 = 头部(类型, seq, 长度, crc32) + JSON 负载
+- 批次先落盘（fsync）再写库，写库提交后追加 ACK 记录
+- 启动/写库恢复后回放未 ACK 的批次；段内批次全部 ACK 且非当前段时删除
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from adapters.metrics import metrics
+
+logger = logging.getLogger("ws.spool")
+
+_HEADER = struct.Struct("<cQII")   # 类型, seq, 负载长度, crc32
+_BATCH, _ACK = b"B", b"A"
+
+# 行列顺序（负载按列表存储，bucket_ts 存为秒级时间戳）
+SPOOL_COLUMNS = (
+    "exchange", "symbol", "bucket_ts", "open", "high", "low", "close", "volume",
+    "quote_volume", "trade_count", "is_closed", "source", "taker_buy_volume", "taker_buy_quote_volume",
+)
+
+
+def _encode(rows: List[dict]) -> bytes:
+    out = []
+    for r in rows:
+        vals = [r.get(c) for c in SPOOL_COLUMNS]
+        vals[2] = vals[2].timestamp()
+        out.append(vals)
+    # cryptofeed 的 OHLCV 为 Decimal，按 float 落盘（与列式 COPY 路径的 float8 精度一致）
+    return json.dumps(out, separators=(",", ":"), default=float).encode()
+
+
+def _decode(payload: bytes) -> List[dict]:
+    rows = []
+    for vals in json.loads(payload):
+        row = dict(zip(SPOOL_COLUMNS, vals))
+        row["bucket_ts"] = datetime.fromtimestamp(row["bucket_ts"], tz=timezone.utc)
+        rows.append(row)
+    return rows
+
+
+class CandleSpool:
+    """分段追加写的批次日志"""
+
+    def __init__(self, directory: Path, segment_bytes: int = 64 << 20, fsync: bool = True):
+        self.dir = directory
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        # 未 ACK 批次: seq -> (段路径, 偏移)
+        self._pending: Dict[int, Tuple[Path, int]] = {}
+        # 段 -> 段内未 ACK seq
+        self._segments: Dict[Path, set] = {}
+        self._seq = 0
+        self._seg_no = 0
+        self._active: Optional[Path] = None
+        self._fh = None
+        self._recover()
+
+    # ==================== 恢复 ====================
+
+    def _iter_records(self, path: Path) -> Iterator[Tuple[bytes, int, int, bytes]]:
+        """(类型, seq, 偏移, 负载)；遇到截断/损坏的尾部记录即停止"""
+        with path.open("rb") as f:
+            data = f.read()
+        pos = 0
+        while pos + _HEADER.size <= len(data):
+            kind, seq, length, crc = _HEADER.unpack_from(data, pos)
+            payload = data[pos + _HEADER.size:pos + _HEADER.size + length]
+            if len(payload) != length or zlib.crc32(payload) != crc:
+                logger.warning("spool 段 %s 在偏移 %d 处截断/损坏，忽略其后内容", path.name, pos)
+                break
+            yield kind, seq, pos, payload
+            pos += _HEADER.size + length
+
+    def _recover(self) -> None:
+        acked = set()
+        for path in sorted(self.dir.glob("*.seg")):
+            self._seg_no = max(self._seg_no, int(path.stem))
+            self._segments[path] = set()
+            for kind, seq, pos, _ in self._iter_records(path):
+                self._seq = max(self._seq, seq)
+                if kind == _BATCH:
+                    self._pending[seq] = (path, pos)
+                    self._segments[path].add(seq)
+                elif kind == _ACK:
+                    acked.add(seq)
+        for seq in acked:
+            self._forget(seq)
+        for path in [p for p, seqs in self._segments.items() if not seqs]:
+            self._remove_segment(path)
+        metrics.set("ws_spool_pending", len(self._pending))
+        if self._pending:
+            logger.warning("spool 恢复 %d 个未确认批次", len(self._pending))
+
+    # ==================== 写入 ====================
+
+    def _write(self, kind: bytes, seq: int, payload: bytes, sync: bool) -> Tuple[Path, int]:
+        if self._fh is None or self._fh.tell() >= self.segment_bytes:
+            self._roll()
+        pos = self._fh.tell()
+        self._fh.write(_HEADER.pack(kind, seq, len(payload), zlib.crc32(payload)) + payload)
+        self._fh.flush()
+        if sync:
+            os.fsync(self._fh.fileno())
+        return self._active, pos
+
+    def _roll(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            old = self._active
+            if old in self._segments and not self._segments[old]:
+                self._remove_segment(old)
+        self._seg_no += 1
+        self._active = self.dir / f"{self._seg_no:016d}.seg"
+        self._segments.setdefault(self._active, set())
+        self._fh = self._active.open("ab")
+
+    def append(self, rows: List[dict]) -> int:
+        """批次落盘（写库之前），返回 seq"""
+        payload = _encode(rows)
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            path, pos = self._write(_BATCH, seq, payload, self.fsync)
+            self._pending[seq] = (path, pos)
+            self._segments[path].add(seq)
+            metrics.set("ws_spool_pending", len(self._pending))
+        return seq
+
+    def ack(self, seq: int) -> None:
+        """写库提交后确认（ACK 丢失只会导致一次幂等重放，不 fsync）"""
+        with self._lock:
+            self._write(_ACK, seq, b"", False)
+            self._forget(seq)
+            metrics.set("ws_spool_pending", len(self._pending))
+
+    def _forget(self, seq: int) -> None:
+        entry = self._pending.pop(seq, None)
+        if entry is None:
+            return
+        path = entry[0]
+        seqs = self._segments.get(path)
+        if seqs is not None:
+            seqs.discard(seq)
+            if not seqs and path != self._active:
+                self._remove_segment(path)
+
+    def _remove_segment(self, path: Path) -> None:
+        self._segments.pop(path, None)
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    # ==================== 回放 ====================
+
+    def pending(self) -> List[Tuple[int, List[dict]]]:
+        """未 ACK 批次（seq 升序）"""
+        with self._lock:
+            entries = sorted(self._pending.items())
+        out = []
+        for seq, (path, pos) in entries:
+            with path.open("rb") as f:
+                f.seek(pos)
+                _, _, length, _ = _HEADER.unpack(f.read(_HEADER.size))
+                out.append((seq, _decode(f.read(length))))
+        return out
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+
+class SpooledWriter:
+    """先落盘再写库；写库成功后 ACK 并顺带回放之前失败的批次"""
+
+    def __init__(self, spool: CandleSpool, writer: Callable[[List[dict]], int]):
+        self._spool = spool
+        self._writer = writer
+        self._lock = threading.Lock()
+
+    def __call__(self, rows: List[dict]) -> int:
+        seq = self._spool.append(rows)
+        with self._lock:
+            n = self._writer(rows)
+            self._spool.ack(seq)
+        if len(self._spool):
+            self.replay()
+        return n
+
+    def replay(self) -> int:
+        """回放未确认批次（启动时 / 数据库恢复后）；遇到失败即停止，等下次再试"""
+        total = 0
+        with self._lock:
+            for seq, rows in self._spool.pending():
+                try:
+                    total += self._writer(rows)
+                except Exception as e:
+                    logger.warning("spool 回放失败（剩余 %d 批）: %s", len(self._spool), e)
+                    break
+                self._spool.ack(seq)
+                metrics.inc("ws_spool_replayed", len(rows))
+        if total:
+            logger.info("spool 回放写入 %d 条", total)
+        return total
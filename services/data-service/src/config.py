@@ -5,7 +5,7 @@ import os
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
 # 服务根目录
 SERVICE_ROOT = Path(__file__).parent.parent  # src/config.py -> data-service
@@ -47,6 +47,17 @@ class Settings:
     ws_gap_interval: int = field(default_factory=lambda: _int_env("BINANCE_WS_GAP_INTERVAL", 600))
     ws_gap_lookback: int = field(default_factory=lambda: _int_env("BINANCE_WS_GAP_LOOKBACK", 10080))
     ws_source: str = field(default_factory=lambda: os.getenv("BINANCE_WS_SOURCE", "binance_ws"))
+    # 写入队列上限（条），满则丢弃并计数，由缺口巡检补回
+    ws_queue_size: int = field(default_factory=lambda: _int_env("BINANCE_WS_QUEUE_SIZE", 20000))
+    # 录制 CandleEvent 流（JSONL），供 scripts/replay_ws.py 回放
+    ws_record_file: Optional[Path] = field(default_factory=lambda: Path(p) if (p := os.getenv("BINANCE_WS_RECORD_FILE")) else None)
+    # 采集端聚合周期（逗号分隔，如 5m,15m,1h,4h,1d,1w，写入 candles_{周期}_rollup）
+    # 下游经 candles_{周期}_live 视图读取（_rollup 优先、连续聚合兜底）；默认关闭，此时视图等同连续聚合
+    ws_rollup_intervals: Tuple[str, ...] = field(default_factory=lambda: tuple(
+        i.strip() for i in os.getenv("BINANCE_WS_ROLLUP", "").split(",") if i.strip()
+    ))
+    # chunk 维护（保留/压缩/重排）间隔（秒）
+    maint_interval: int = field(default_factory=lambda: _int_env("DATA_MAINT_INTERVAL", 3600))
 
     db_schema: str = field(default_factory=lambda: os.getenv("KLINE_DB_SCHEMA", "market_data"))
     db_exchange: str = field(default_factory=lambda: os.getenv("BINANCE_WS_DB_EXCHANGE", "binance_futures_um"))
@@ -0,0 +1 @@
+"""数据维护"""
@@ -0,0 +1,269 @@
+"""
+chunk 级维护: 按 chunk 粒度执行保留（drop）、压缩、重排（reorder）与 VACUUM
+
+与 004_policies.sql 中的 Timescale 后台作业并存，所有动作幂等：
+- drop:     整个 chunk 早于 drop_after（采集端聚合表按 500 根保留，与滑动窗口保留一致）
+- compress: 未压缩且早于 compress_after（包括迟到数据写入时被临时解压的 chunk，见
+            TimescaleAdapter._decompress_late）
+- reorder:  冷区未压缩 chunk 死元组比例过高时按主键重写（压缩前整理，避免膨胀被压进冷数据）
+- vacuum:   热区 chunk 死元组过多时单独 VACUUM，不对整个 hypertable 扫描
+
+用法: python src/maintenance/chunks.py [--once] [--dry-run] [--stats]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import psycopg
+from psycopg import sql
+
+from adapters.metrics import Timer, metrics
+from adapters.timescale import TimescaleAdapter
+from collectors.rollup import ROLLUP_INTERVALS, rollup_table
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 采集端聚合表保留根数（与 scripts/ddl/sliding_window_retention.sql 一致）
+RETAIN_BARS = 500
+# 冷区 chunk 死元组比例超过该值时先 reorder 再压缩
+REORDER_DEAD_RATIO = 0.2
+# 热区 chunk 死元组比例与绝对数同时超过阈值时 VACUUM
+VACUUM_DEAD_RATIO = 0.1
+VACUUM_MIN_DEAD = 10_000
+
+
+@dataclass(frozen=True, slots=True)
+class ChunkPolicy:
+    """单个 hypertable 的 chunk 策略（None 表示不执行该动作）"""
+    table: str
+    time_col: str = "bucket_ts"
+    compress_after: Optional[timedelta] = None
+    drop_after: Optional[timedelta] = None
+    # 热区: range_end 晚于 now - hot_window 的 chunk 仍在写入，不 reorder/压缩
+    hot_window: timedelta = timedelta(days=1)
+    segmentby: Optional[str] = None
+    orderby: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class ChunkInfo:
+    """chunk 元数据与 pg_stat 元组统计（已压缩 chunk 的统计不参与判断）"""
+    schema: str
+    name: str
+    range_start: datetime
+    range_end: datetime
+    compressed: bool
+    live: int = 0
+    dead: int = 0
+
+    @property
+    def dead_ratio(self) -> float:
+        total = self.live + self.dead
+        return self.dead / total if total else 0.0
+
+
+@dataclass(frozen=True, slots=True)
+class ChunkAction:
+    kind: str       # drop / compress / reorder / vacuum
+    table: str
+    chunk: ChunkInfo
+    reason: str
+
+
+DEFAULT_POLICIES: tuple = (
+    ChunkPolicy("candles_1m", compress_after=timedelta(days=30),
+                segmentby="exchange,symbol", orderby="bucket_ts"),
+    ChunkPolicy("binance_futures_metrics_5m", time_col="create_time", compress_after=timedelta(days=30),
+                segmentby="symbol", orderby="create_time DESC"),
+    *(ChunkPolicy(rollup_table(iv), drop_after=timedelta(seconds=RETAIN_BARS * p))
+      for iv, p in ROLLUP_INTERVALS.items()),
+)
+
+
+def plan_actions(policy: ChunkPolicy, chunks: Sequence[ChunkInfo], now: datetime) -> List[ChunkAction]:
+    """按策略为 chunk 列表生成动作（纯函数；drop 优先，冷区膨胀 chunk 先 reorder 再压缩）"""
+    actions: List[ChunkAction] = []
+    for c in chunks:
+        age = now - c.range_end
+        if policy.drop_after is not None and age >= policy.drop_after:
+            actions.append(ChunkAction("drop", policy.table, c, f"range_end 早于 {policy.drop_after}"))
+            continue
+        if c.compressed:
+            continue
+        hot = age < policy.hot_window
+        if hot:
+            if c.dead >= VACUUM_MIN_DEAD and c.dead_ratio >= VACUUM_DEAD_RATIO:
+                actions.append(ChunkAction("vacuum", policy.table, c, f"dead={c.dead} ({c.dead_ratio:.0%})"))
+            continue
+        if c.dead_ratio >= REORDER_DEAD_RATIO:
+            actions.append(ChunkAction("reorder", policy.table, c, f"dead={c.dead} ({c.dead_ratio:.0%})"))
+        if policy.compress_after is not None and age >= policy.compress_after:
+            actions.append(ChunkAction("compress", policy.table, c, f"range_end 早于 {policy.compress_after}"))
+    return actions
+
+
+class ChunkMaintainer:
+    """chunk 维护执行器（独立 autocommit 连接：VACUUM 不能在事务内执行）"""
+
+    def __init__(self, ts: Optional[TimescaleAdapter] = None, policies: Sequence[ChunkPolicy] = DEFAULT_POLICIES):
+        self._ts = ts or TimescaleAdapter()
+        self.policies = list(policies)
+
+    def _connect(self) -> psycopg.Connection:
+        return psycopg.connect(self._ts.db_url, autocommit=True)
+
+    def chunks(self, conn, table: str) -> List[ChunkInfo]:
+        rows = conn.execute("""
+            SELECT c.chunk_schema, c.chunk_name, c.range_start, c.range_end, c.is_compressed,
+                   COALESCE(s.n_live_tup, 0), COALESCE(s.n_dead_tup, 0)
+            FROM timescaledb_information.chunks c
+            LEFT JOIN pg_stat_user_tables s ON s.schemaname = c.chunk_schema AND s.relname = c.chunk_name
+            WHERE c.hypertable_schema = %s AND c.hypertable_name = %s
+            ORDER BY c.range_start
+        """, (self._ts.schema, table)).fetchall()
+        return [ChunkInfo(*r) for r in rows]
+
+    def plan(self, conn, now: Optional[datetime] = None) -> List[ChunkAction]:
+        now = now or datetime.now(timezone.utc)
+        actions: List[ChunkAction] = []
+        for p in self.policies:
+            if conn.execute("SELECT to_regclass(%s)", (f"{self._ts.schema}.{p.table}",)).fetchone()[0] is None:
+                continue
+            actions.extend(plan_actions(p, self.chunks(conn, p.table), now))
+        return actions
+
+    def _ensure_compression(self, conn, policy: ChunkPolicy) -> None:
+        """compress_chunk 前确保表已开启压缩（与 004_policies.sql 同参数）"""
+        enabled = conn.execute(
+            "SELECT compression_enabled FROM timescaledb_information.hypertables "
+            "WHERE hypertable_schema = %s AND hypertable_name = %s",
+            (self._ts.schema, policy.table),
+        ).fetchone()
+        if enabled and enabled[0]:
+            return
+        opts = [sql.SQL("timescaledb.compress = TRUE")]
+        if policy.segmentby:
+            opts.append(sql.SQL("timescaledb.compress_segmentby = {}").format(sql.Literal(policy.segmentby)))
+        if policy.orderby:
+            opts.append(sql.SQL("timescaledb.compress_orderby = {}").format(sql.Literal(policy.orderby)))
+        conn.execute(sql.SQL("ALTER TABLE {} SET ({})").format(
+            sql.Identifier(self._ts.schema, policy.table), sql.SQL(", ").join(opts)))
+
+    def execute(self, conn, action: ChunkAction) -> None:
+        c = action.chunk
+        chunk = sql.Identifier(c.schema, c.name)
+        if action.kind == "drop":
+            # 以 chunk 上界作为 older_than，只删除整块落在范围外的 chunk
+            conn.execute("SELECT drop_chunks(%s::regclass, older_than => %s)",
+                         (f"{self._ts.schema}.{action.table}", c.range_end))
+        elif action.kind == "compress":
+            policy = next(p for p in self.policies if p.table == action.table)
+            self._ensure_compression(conn, policy)
+            conn.execute(sql.SQL("SELECT compress_chunk({}::regclass, if_not_compressed => true)").format(
+                sql.Literal(f"{c.schema}.{c.name}")))
+        elif action.kind == "reorder":
+            # 按主键（无主键时取唯一索引）重写：同一 symbol 的相邻时间行落在相邻页
+            index = conn.execute(
+                "SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = %s::regclass "
+                "ORDER BY indisprimary DESC, indisunique DESC LIMIT 1",
+                (f"{self._ts.schema}.{action.table}",),
+            ).fetchone()
+            if not index:
+                raise ValueError(f"{action.table} 无可用于 reorder 的索引")
+            conn.execute("SELECT reorder_chunk(%s::regclass, %s::regclass)", (f"{c.schema}.{c.name}", index[0]))
+        elif action.kind == "vacuum":
+            conn.execute(sql.SQL("VACUUM (ANALYZE) {}").format(chunk))
+        else:
+            raise ValueError(f"未知动作: {action.kind}")
+
+    def run_once(self, dry_run: bool = False) -> List[ChunkAction]:
+        """规划并执行一轮；单个动作失败只记录，不影响其余 chunk"""
+        done: List[ChunkAction] = []
+        with Timer("last_maint_duration"), self._connect() as conn:
+            actions = self.plan(conn)
+            metrics.set("maint_dead_tuples", sum(a.chunk.dead for a in actions if a.kind in ("reorder", "vacuum")))
+            for a in actions:
+                logger.info("%s%s %s.%s: %s", "[dry-run] " if dry_run else "", a.kind, a.chunk.schema,
+                            a.chunk.name, a.reason)
+                if dry_run:
+                    continue
+                try:
+                    self.execute(conn, a)
+                except (psycopg.Error, ValueError) as e:
+                    metrics.inc("maint_failed")
+                    logger.warning("%s %s 失败: %s", a.kind, a.chunk.name, e)
+                    continue
+                metrics.inc({"drop": "maint_dropped", "compress": "maint_compressed",
+                             "reorder": "maint_reordered", "vacuum": "maint_vacuumed"}[a.kind])
+                done.append(a)
+        return done
+
+    def stats(self) -> Dict[str, dict]:
+        """各表 chunk 数、压缩比与死元组统计"""
+        out: Dict[str, dict] = {}
+        with self._connect() as conn:
+            for p in self.policies:
+                name = f"{self._ts.schema}.{p.table}"
+                if conn.execute("SELECT to_regclass(%s)", (name,)).fetchone()[0] is None:
+                    continue
+                chunks = self.chunks(conn, p.table)
+                row = {
+                    "chunks": len(chunks),
+                    "compressed": sum(c.compressed for c in chunks),
+                    "dead_tuples": sum(c.dead for c in chunks if not c.compressed),
+                    "bytes": conn.execute("SELECT hypertable_size(%s::regclass)", (name,)).fetchone()[0],
+                }
+                if row["compressed"]:
+                    before, after = conn.execute(
+                        "SELECT sum(before_compression_total_bytes), sum(after_compression_total_bytes) "
+                        "FROM chunk_compression_stats(%s::regclass)", (name,)).fetchone()
+                    row["compression_ratio"] = round(before / after, 2) if before and after else None
+                out[p.table] = row
+        return out
+
+    def run_forever(self, interval: int) -> None:
+        while True:
+            try:
+                self.run_once()
+                logger.info("维护完成 | %s", metrics)
+            except psycopg.Error as e:
+                logger.error("维护失败: %s", e)
+            time.sleep(interval)
+
+    def close(self) -> None:
+        self._ts.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="chunk 级保留/压缩/重排维护")
+    parser.add_argument("--once", action="store_true", help="只执行一轮")
+    parser.add_argument("--dry-run", action="store_true", help="只输出计划，不执行")
+    parser.add_argument("--stats", action="store_true", help="输出各表 chunk 统计")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    m = ChunkMaintainer()
+    try:
+        if args.stats:
+            print(json.dumps(m.stats(), ensure_ascii=False, indent=2, default=str))
+        elif args.once or args.dry_run:
+            m.run_once(dry_run=args.dry_run)
+        else:
+            m.run_forever(settings.maint_interval)
+    finally:
+        m.close()
+
+
+if __name__ == "__main__":
+    main()
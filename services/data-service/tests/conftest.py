@@ -1,7 +1,15 @@
 """Pytest configuration for data-service tests."""
 
+import sys
+from pathlib import Path
+
 import pytest
 
+# 模块内使用 `from adapters...` / `from config...`，确保 src 在路径中
+SRC_DIR = Path(__file__).parent.parent / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
 
 @pytest.fixture
 def sample_symbol():
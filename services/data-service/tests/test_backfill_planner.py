@@ -0,0 +1,162 @@
+"""REST 补齐规划器测试：本地假交易所上的调用数/权重、不可补区间持久化、预算排程"""
+
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from adapters.ccxt import kline_weight
+from collectors.backfill import AdaptiveBackfiller, RestBackfiller
+from collectors.planner import MS_PER_DAY, MS_PER_MIN, UnfillableStore, plan_backfill, plan_requests
+
+
+class FakeExchange:
+    """按 startTime/limit 返回 K 线（每个 symbol 只在 [listed, delisted) 内有数据），记录调用与权重"""
+
+    def __init__(self, lifetimes):
+        self.lifetimes = lifetimes
+        self.calls = []
+
+    def __call__(self, symbol, interval, since_ms, limit):
+        self.calls.append((symbol, since_ms, limit))
+        lo, hi = self.lifetimes[symbol]
+        t = max(since_ms, lo)
+        t += (-t) % MS_PER_MIN
+        out = []
+        while t < hi and len(out) < limit:
+            out.append([t, 1.0, 2.0, 0.5, 1.5, 10.0])
+            t += MS_PER_MIN
+        return out
+
+    @property
+    def weight(self):
+        return sum(kline_weight(limit) for _, _, limit in self.calls)
+
+
+class FakeTS:
+    """内存中的 candles_1m + 覆盖位图"""
+
+    def __init__(self, present):
+        self.present = present  # {symbol: set(ms)}
+
+    def tracks_coverage(self, table_name, cur=None):
+        return table_name == "candles_1m"
+
+    def coverage_bitmaps(self, table, exchange, symbols, start, end):
+        out = {}
+        for sym in symbols:
+            for i in range((end - start).days + 1):
+                d = start + timedelta(days=i)
+                base = int(datetime.combine(d, datetime.min.time(), tzinfo=timezone.utc).timestamp() * 1000)
+                out[(sym, d)] = "".join("1" if base + k * MS_PER_MIN in self.present[sym] else "0" for k in range(1440))
+        return out
+
+    def upsert_candles(self, interval, rows):
+        for r in rows:
+            self.present[r["symbol"]].add(int(r["bucket_ts"].timestamp() * 1000))
+        return len(rows)
+
+
+class NoZip:
+    def cleanup_old_files(self):
+        return 0
+
+    def fill_kline_gaps(self, gaps, interval="1m", monthly_min_days=1):
+        return 0
+
+
+def _scenario():
+    """昨天 + 今天：零散缺失分钟、全市场 3 小时中断、一个新上线、一个已下架"""
+    now = int(time.time() * 1000)
+    start = date.today() - timedelta(days=1)
+    t0 = int(datetime.combine(start, datetime.min.time(), tzinfo=timezone.utc).timestamp() * 1000)
+    # 交易所只有已收盘的根
+    horizon = now - now % MS_PER_MIN - MS_PER_MIN
+    outage = (t0 + 6 * 3600_000, t0 + 9 * 3600_000)
+    lifetimes = {
+        "AUSDT": (0, horizon), "BUSDT": (0, horizon), "CUSDT": (0, horizon),
+        "NEWUSDT": (t0 + 20 * 3600_000, horizon),            # 昨天 20:00 上线
+        "OLDUSDT": (0, t0 + 12 * 3600_000),                  # 昨天 12:00 下架
+    }
+    rnd = random.Random(5)
+    present = {}
+    for sym, (lo, hi) in lifetimes.items():
+        minutes = set()
+        for t in range(t0, horizon, MS_PER_MIN):
+            if lo <= t < hi and not (outage[0] <= t < outage[1]) and rnd.random() > 0.003:
+                minutes.add(t)
+        present[sym] = minutes
+    fillable = {sym: {t for t in range(max(t0, lo), min(horizon, hi), MS_PER_MIN)} for sym, (lo, hi) in lifetimes.items()}
+    return start, lifetimes, present, fillable
+
+
+def test_plan_merges_nearby_gaps_and_picks_weight_tier():
+    t = 1_700_000_000_000 - 1_700_000_000_000 % MS_PER_DAY
+    # 相距 300 根的两个小缺口：一次请求（limit 跨度 302，权重 2）优于两次（1+1 + 2 次调用成本）
+    reqs = plan_requests("AUSDT", [(t, t + MS_PER_MIN), (t + 301 * MS_PER_MIN, t + 302 * MS_PER_MIN)])
+    assert len(reqs) == 1 and reqs[0].limit == 302 and reqs[0].weight == 2
+    # 相距 1400 根：合并要权重 10，拆开只要 1+1
+    reqs = plan_requests("AUSDT", [(t, t + MS_PER_MIN), (t + 1400 * MS_PER_MIN, t + 1401 * MS_PER_MIN)])
+    assert [r.limit for r in reqs] == [1, 1]
+    # 整日缺失：按单根成本最优的档切块，覆盖全部 1440 根
+    reqs = plan_requests("AUSDT", [(t, t + MS_PER_DAY)])
+    assert sum(r.missing for r in reqs) == 1440 and all(r.limit <= 1500 for r in reqs)
+
+
+def test_fake_exchange_fewer_calls_and_persisted_unfillable(tmp_path):
+    start, lifetimes, present, fillable = _scenario()
+    ts, exchange = FakeTS(present), FakeExchange(lifetimes)
+    missing_before = sum(len(fillable[s] - present[s]) for s in present)
+    gap_days = sum(1 for s in present for d in (0, 1)
+                   if any(t not in present[s] for t in fillable[s]
+                          if (t - min(fillable[s])) // MS_PER_DAY == d))
+
+    store_path = tmp_path / "unfillable.json"
+    bf = AdaptiveBackfiller(ts, store=UnfillableStore(store_path), budget=lambda: 1e9,
+                            rest=RestBackfiller(ts, workers=2, fetch=exchange), zip_bf=NoZip())
+    plan, filled = bf.run(list(present), start, date.today())
+
+    # 所有交易所有数据的分钟都已补齐
+    assert all(fillable[s] <= present[s] for s in present)
+    assert filled == missing_before
+    # 旧实现：每个缺口日按 1000 根分页（2 次调用，权重 5）
+    assert len(exchange.calls) < gap_days * 2
+    assert exchange.weight < gap_days * 2 * 5
+    assert len(exchange.calls) / filled < 0.05
+
+    # 重启后：不可补区间（上线前 / 下架后）从文件恢复，不再发请求
+    exchange.calls.clear()
+    bf = AdaptiveBackfiller(ts, store=UnfillableStore(store_path), budget=lambda: 1e9,
+                            rest=RestBackfiller(ts, workers=2, fetch=exchange), zip_bf=NoZip())
+    plan, filled = bf.run(list(present), start, date.today())
+    assert not exchange.calls and plan.missing == 0 and plan.excluded > 0
+    assert bf.store.is_delisted("OLDUSDT") and not bf.store.is_delisted("NEWUSDT")
+
+
+def test_budget_defers_oldest_requests():
+    t = int(time.time() * 1000) - 8 * MS_PER_DAY
+    t -= t % MS_PER_DAY
+    # 相距 20 小时的 10 分钟缺口：各自一次请求（权重 1）
+    gaps = {"AUSDT": [(t + k * 20 * 3600_000, t + k * 20 * 3600_000 + 10 * MS_PER_MIN) for k in range(8)]}
+    plan = plan_backfill(gaps, budget=3, allow_zip=False)
+    assert [r.weight for r in plan.requests] == [1, 1, 1]
+    assert len(plan.deferred) == 5
+    assert min(r.start_ms for r in plan.requests) > max(r.start_ms for r in plan.deferred)
+
+
+def test_unfillable_keeps_original_mark_time(tmp_path):
+    clock = [1_000_000.0]
+    path = tmp_path / "unfillable.json"
+    store = UnfillableStore(path, ttl_days=1, clock=lambda: clock[0])
+    store.add("AUSDT", 0, 100)
+    clock[0] += 3600
+    # 与已有区间重叠/相接：旧部分保留原标记时间，只有新增部分用当前时间
+    store.add("AUSDT", 50, 200)
+    store.add("AUSDT", 20, 80)
+    assert store._ranges["AUSDT"] == [[0, 100, 1_000_000.0], [100, 200, 1_003_600.0]]
+    assert store.exclude("AUSDT", [(0, 300)]) == [(200, 300)]
+    store.save()
+
+    # 重复标记不会续期：旧部分按最初标记时间过期，新增部分仍在
+    clock[0] = 1_000_000.0 + 86400 + 1
+    reloaded = UnfillableStore(path, ttl_days=1, clock=lambda: clock[0])
+    assert reloaded.exclude("AUSDT", [(0, 300)]) == [(0, 100), (200, 300)]
@@ -0,0 +1,176 @@
+"""列式 K 线写入测试：纯追加判定、追加直写 / 临时表合并 / 追加冲突回退合并"""
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from psycopg import errors
+
+from adapters.timescale import TimescaleAdapter, candle_columns
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+EX = "binance_futures_um"
+KEY = ("exchange", "symbol", "bucket_ts")
+
+
+class FakeDB:
+    """内存中的单表 + 事务：COPY 直写遇到已有键抛 UniqueViolation，临时表合并按键覆盖"""
+
+    def __init__(self):
+        self.committed = {}
+        self.statements = []
+        self.on_max_query = None  # 纯追加判定查询后的钩子（模拟并发写入抢先）
+
+
+class FakeCopy:
+    def __init__(self, cur, target):
+        self.cur, self.target, self.types = cur, target, None
+
+    def set_types(self, types):
+        self.types = types
+
+    def write_row(self, row):
+        r = dict(zip(self.cur.copy_cols, row))
+        if self.target == "stage":
+            self.cur.conn.stage.append(r)
+            return
+        k = tuple(r[c] for c in KEY)
+        if k in self.cur.conn.view():
+            raise errors.UniqueViolation("duplicate key")
+        self.cur.conn.pending[k] = r
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn, self.rowcount, self._result, self.copy_cols = conn, -1, [], []
+
+    def execute(self, query, params=None):
+        text = query.as_string(None) if hasattr(query, "as_string") else query
+        self.conn.db.statements.append(text)
+        if "MAX(bucket_ts)" in text:
+            exchanges, symbols, since = params
+            latest = {}
+            for (ex, sym, ts) in self.conn.view():
+                if ex in exchanges and sym in symbols and ts >= since:
+                    latest[(ex, sym)] = max(latest.get((ex, sym), ts), ts)
+            self._result = [(ex, sym, ts) for (ex, sym), ts in latest.items()]
+            if self.conn.db.on_max_query:
+                self.conn.db.on_max_query()
+        elif text.lstrip().startswith("INSERT INTO") and "_stage_" in text:
+            changed = 0
+            for r in self.conn.stage:
+                k = tuple(r[c] for c in KEY)
+                old = self.conn.view().get(k)
+                if old is None or any(old.get(c) != v for c, v in r.items()):
+                    self.conn.pending[k] = {**(old or {}), **r}
+                    changed += 1
+            self.rowcount = changed
+        return self
+
+    def fetchall(self):
+        return self._result
+
+    @contextmanager
+    def copy(self, query):
+        text = query.as_string(None)
+        self.conn.db.statements.append(text)
+        self.copy_cols = [c.strip().strip('"') for c in text[text.index("(") + 1:text.index(")")].split(",")]
+        yield FakeCopy(self, "stage" if "FORMAT BINARY" in text else "target")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConn:
+    def __init__(self, db):
+        self.db, self.pending, self.stage = db, {}, []
+
+    def view(self):
+        return {**self.db.committed, **self.pending}
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.db.committed.update(self.pending)
+        self.pending, self.stage = {}, []
+
+    def rollback(self):
+        self.pending, self.stage = {}, []
+
+
+def _adapter(db: FakeDB) -> TimescaleAdapter:
+    ts = TimescaleAdapter(db_url="postgresql://unused")
+    ts._coverage = ts._timescale = False  # 无覆盖索引、非 TimescaleDB：只测写入路径
+
+    @contextmanager
+    def connection():
+        yield FakeConn(db)
+
+    ts.connection = connection
+    return ts
+
+
+def _cols(symbols, minutes, close=1.0):
+    pairs = [(s, T0 + timedelta(minutes=m)) for s in symbols for m in minutes]
+    return {
+        "symbol": [s for s, _ in pairs], "bucket_ts": [t for _, t in pairs],
+        "open": [close] * len(pairs), "high": [close] * len(pairs), "low": [close] * len(pairs),
+        "close": [close] * len(pairs), "volume": [1.0] * len(pairs),
+    }
+
+
+def _used_stage(db):
+    return any("FORMAT BINARY" in s for s in db.statements)
+
+
+def test_is_append_only():
+    db = FakeDB()
+    ts = _adapter(db)
+    db.committed[(EX, "AUSDT", T0 + timedelta(minutes=5))] = {}
+
+    def check(data):
+        with ts.connection() as conn:
+            return ts._is_append_only(conn, "candles_1m", candle_columns(data, EX))
+
+    assert check(_cols(["AUSDT"], [6, 7])) is True
+    assert check(_cols(["AUSDT"], [5, 6])) is False         # 与库中最大值重叠
+    assert check(_cols(["AUSDT", "BUSDT"], [0])) is False    # 任一 symbol 早于库中最大值
+    assert check(_cols(["BUSDT"], [0, 1])) is True           # 库中无此 symbol
+    n = len(db.statements)
+    assert check(_cols(["AUSDT"], [8, 8])) is False          # 批内重复键：不查库
+    assert len(db.statements) == n
+
+
+def test_append_copies_directly_then_overlap_merges():
+    db = FakeDB()
+    ts = _adapter(db)
+    assert ts.upsert_candles_columnar("1m", _cols(["AUSDT", "BUSDT"], range(3)), exchange=EX) == 6
+    assert not _used_stage(db) and len(db.committed) == 6
+
+    db.statements.clear()
+    # 与已有数据重叠：临时表 + ON CONFLICT，未变化的行不计入
+    assert ts.upsert_candles_columnar("1m", _cols(["AUSDT"], [1, 2, 3], close=2.0), exchange=EX) == 3
+    assert _used_stage(db) and any("ON CONFLICT" in s for s in db.statements)
+    assert len(db.committed) == 7
+    assert db.committed[(EX, "AUSDT", T0 + timedelta(minutes=1))]["close"] == 2.0
+    assert db.committed[(EX, "BUSDT", T0 + timedelta(minutes=1))]["close"] == 1.0
+
+
+def test_append_race_rolls_back_and_merges():
+    db = FakeDB()
+    ts = _adapter(db)
+    # 判定为纯追加后、COPY 之前被并发写入抢先
+    race_key = (EX, "AUSDT", T0 + timedelta(minutes=1))
+    db.on_max_query = lambda: db.committed.setdefault(race_key, {"close": 9.0})
+    assert ts.upsert_candles_columnar("1m", _cols(["AUSDT"], range(3)), exchange=EX) == 3
+    assert _used_stage(db)
+    assert len(db.committed) == 3 and db.committed[race_key]["close"] == 1.0
@@ -0,0 +1,172 @@
+"""覆盖位图测试：槽位下标（UTC 日边界、5m 指标周期）、每日根数与 COUNT 一致、缺口检测与窗口扫描一致"""
+
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from adapters.timescale import COVERAGE_TABLE, METRICS_PERIOD_SECONDS, TimescaleAdapter, coverage_cells
+
+EX = "binance_futures_um"
+UTC = timezone.utc
+
+
+def _slots(cells, key, period_s):
+    """位图 -> 置位的槽位下标（槽位 0 为最高位）"""
+    n = 86400 // period_s
+    mask = cells[key]
+    return [i for i in range(n) if mask >> (n - 1 - i) & 1]
+
+
+def test_slot_index_across_utc_day_boundary():
+    d1 = datetime(2024, 1, 1, 23, 58, tzinfo=UTC)
+    keys = [(EX, "A", d1 + timedelta(minutes=m)) for m in range(4)]          # 23:58 .. 次日 00:01
+    keys.append((EX, "A", datetime(2024, 1, 2, 8, 0, tzinfo=timezone(timedelta(hours=8)))))  # = 次日 00:00 UTC
+    keys.append((EX, "A", None))
+    cells = coverage_cells(keys, 60)
+    assert set(cells) == {(EX, "A", d1.date()), (EX, "A", d1.date() + timedelta(days=1))}
+    assert _slots(cells, (EX, "A", d1.date()), 60) == [1438, 1439]
+    assert _slots(cells, (EX, "A", d1.date() + timedelta(days=1)), 60) == [0, 1]
+    assert cells[(EX, "A", d1.date())] == 0b11  # 当日最后两根在最低位
+    assert cells[(EX, "A", d1.date() + timedelta(days=1))].bit_length() == 1440
+
+
+def test_metrics_period_slots_naive_utc():
+    # 期货指标 create_time 为 UTC naive，5 分钟一槽，每日 288 槽
+    t = datetime(2024, 1, 1, 0, 0)
+    keys = [(EX, "A", t + timedelta(minutes=m)) for m in (0, 4, 5, 1435, 1439)]
+    cells = coverage_cells(keys, METRICS_PERIOD_SECONDS)
+    assert _slots(cells, (EX, "A", t.date()), METRICS_PERIOD_SECONDS) == [0, 1, 287]
+    assert cells[(EX, "A", t.date())].bit_length() == 288
+
+
+def test_daily_filled_matches_count_scan():
+    """位图置位数 = 按 UTC 日 COUNT(*)（GapScanner 回退路径的口径）"""
+    rnd = random.Random(3)
+    start = datetime(2024, 2, 28, 20, 0, tzinfo=UTC)
+    keys = [(EX, s, start + timedelta(minutes=m)) for s in ("A", "B") for m in range(3 * 1440) if rnd.random() > 0.1]
+    counts = {}
+    for _, s, ts in keys:
+        counts[(s, ts.date())] = counts.get((s, ts.date()), 0) + 1
+    cells = coverage_cells(keys, 60)
+    assert {(s, d): bin(mask).count("1") for (_, s, d), mask in cells.items()} == counts
+
+
+def _window_scan(series, since, threshold_sec):
+    """detect_gaps 窗口扫描 SQL 的 Python 版本：窗口内相邻两根间隔 >= threshold"""
+    gaps = []
+    for sym, stamps in series.items():
+        inside = sorted(t for t in stamps if t >= since)
+        gaps += [(sym, a, b) for a, b in zip(inside, inside[1:]) if (b - a).total_seconds() >= threshold_sec]
+    return gaps
+
+
+@pytest.mark.parametrize("interval,period_s,threshold", [("1m", 60, 120), ("1m", 60, 600), ("5m", 300, 600)])
+def test_coverage_gaps_match_window_scan(monkeypatch, interval, period_s, threshold):
+    rnd = random.Random(period_s + threshold)
+    now = datetime.now(UTC)
+    lookback_min = 3 * 1440 + 17  # 窗口起点不在日边界、跨 4 个 UTC 日
+    end = datetime.fromtimestamp(now.timestamp() // period_s * period_s, tz=UTC)
+    n = (lookback_min * 60 + 2 * 86400) // period_s  # 数据从窗口之前开始
+    series = {}
+    for sym in ("AUSDT", "BUSDT"):
+        stamps, t, i = [], end, 0
+        while i < n:
+            if rnd.random() < 0.02:
+                skip = rnd.randrange(1, 30)  # 缺口
+                t -= timedelta(seconds=period_s * skip)
+                i += skip
+                continue
+            stamps.append(t)
+            t -= timedelta(seconds=period_s)
+            i += 1
+        series[sym] = stamps
+
+    cells = coverage_cells(((EX, s, t) for s, stamps in series.items() for t in stamps), period_s)
+    slots = 86400 // period_s
+    bitmaps = {(s, d): format(mask, f"0{slots}b") for (_, s, d), mask in cells.items()}
+
+    ts = TimescaleAdapter(db_url="postgresql://unused")
+    calls = []
+
+    def coverage_bitmaps(table_name, exchange, symbols, start, stop):
+        calls.append((table_name, exchange, start, stop))
+        return {k: v for k, v in bitmaps.items() if k[0] in symbols and start <= k[1] <= stop}
+
+    monkeypatch.setattr(ts, "coverage_bitmaps", coverage_bitmaps)
+    before = datetime.now(UTC) - timedelta(minutes=lookback_min)
+    got = ts._detect_gaps_coverage(EX, interval, ["AUSDT", "BUSDT"], lookback_min, threshold, limit=10_000)
+    after = datetime.now(UTC) - timedelta(minutes=lookback_min)
+    # 窗口起点随调用时刻变化：与调用前后任一时刻的窗口扫描一致
+    expected = _window_scan(series, after, threshold)
+
+    assert calls[0][:2] == (f"candles_{interval}", EX)
+    assert len(expected) > 5
+    assert sorted(got) in (sorted(expected), sorted(_window_scan(series, before, threshold)))
+    assert [g[1] for g in got] == sorted(g[1] for g in got)
+    # limit 截取最早的缺口
+    limited = ts._detect_gaps_coverage(EX, interval, ["AUSDT", "BUSDT"], lookback_min, threshold, limit=3)
+    assert [g[1] for g in limited] == sorted(g[1] for g in expected)[:3]
+
+
+class _Cursor:
+    """记录语句；目标表 upsert 影响 2 行，覆盖位图 upsert 影响 1 行"""
+
+    def __init__(self, statements):
+        self.statements, self.rowcount = statements, -1
+
+    def execute(self, query, params=None):
+        text = query.as_string(None) if hasattr(query, "as_string") else query
+        self.statements.append(text)
+        self.rowcount = 1 if COVERAGE_TABLE in text else 2 if text.lstrip().startswith("INSERT") else -1
+        return self
+
+    @contextmanager
+    def copy(self, query):
+        yield type("Copy", (), {"write_row": lambda self, row: None})()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _adapter(statements):
+    ts = TimescaleAdapter(db_url="postgresql://unused")
+    ts._coverage, ts._timescale = True, False
+
+    @contextmanager
+    def connection():
+        yield type("Conn", (), {"cursor": lambda self: _Cursor(statements), "commit": lambda self: None})()
+
+    ts.connection = connection
+    return ts
+
+
+def _rows(n, minutes=1):
+    t0 = datetime(2024, 1, 1, tzinfo=UTC)
+    return [{"exchange": EX, "symbol": "AUSDT", "bucket_ts": t0 + timedelta(minutes=i * minutes), "close": 1.0}
+            for i in range(n)]
+
+
+def test_upsert_candles_counts_target_rows_not_coverage():
+    statements = []
+    assert _adapter(statements).upsert_candles("1m", _rows(5)) == 2
+    assert any(COVERAGE_TABLE in s for s in statements)
+
+
+def test_coverage_only_for_backfilled_tables(monkeypatch):
+    statements = []
+    ts = _adapter(statements)
+    assert ts.tracks_coverage("candles_1m") and ts.tracks_coverage("binance_futures_metrics_5m")
+    assert not ts.tracks_coverage("candles_5m")
+
+    # 非回填表：写入不维护位图，缺口检测走窗口扫描
+    ts.upsert_candles("5m", _rows(3, 5))
+    assert not any(COVERAGE_TABLE in s for s in statements)
+    monkeypatch.setattr(ts, "coverage_bitmaps", lambda *a: pytest.fail("candles_5m 无回填位图"))
+    monkeypatch.setattr(_Cursor, "fetchall", lambda self: [], raising=False)
+    assert ts.detect_gaps(EX, "5m", ["AUSDT"]) == []
+    assert "LEAD(bucket_ts)" in statements[-1]
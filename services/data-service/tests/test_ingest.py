@@ -0,0 +1,54 @@
+"""CandleIngestor 攒批/背压测试"""
+
+import threading
+import time
+from datetime import datetime, timezone
+
+from adapters.metrics import metrics
+from collectors.ingest import CandleIngestor
+
+
+def _row(i: int) -> dict:
+    return {"symbol": f"S{i}", "bucket_ts": datetime.fromtimestamp(time.time() // 60 * 60 - 60, tz=timezone.utc)}
+
+
+def test_batches_by_size_and_window():
+    """满批立即写入，剩余数据在安静窗口后写入"""
+    batches = []
+    ingest = CandleIngestor(lambda rows: batches.append(len(rows)) or len(rows),
+                            max_batch=100, flush_window=0.05)
+    ingest.start()
+    for i in range(250):
+        assert ingest.put_nowait(_row(i))
+    time.sleep(0.3)
+    ingest.stop()
+
+    assert sum(batches) == 250
+    assert batches[:2] == [100, 100]
+
+
+def test_drops_when_full_and_drains_on_stop():
+    """写库阻塞时队列满则丢弃计数，停止时写完剩余数据"""
+    gate = threading.Event()
+    written = []
+
+    def writer(rows):
+        gate.wait(5)
+        written.extend(rows)
+        return len(rows)
+
+    dropped = metrics.ws_dropped
+    ingest = CandleIngestor(writer, max_queue=10, max_batch=5, flush_window=0.01)
+    ingest.start()
+    for i in range(5):
+        ingest.put_nowait(_row(i))
+    time.sleep(0.1)  # 第一批已出队，写库阻塞中
+
+    accepted = sum(ingest.put_nowait(_row(i)) for i in range(5, 20))
+    assert accepted == 10
+    assert metrics.ws_dropped - dropped == 5
+
+    gate.set()
+    ingest.stop()
+    assert len(written) == 15
+    assert ingest.depth == 0
@@ -0,0 +1,61 @@
+"""chunk 维护规划测试：保留/压缩/重排/VACUUM 的 chunk 级判定与迟到数据的重新压缩"""
+
+from datetime import datetime, timedelta, timezone
+
+from maintenance.chunks import (
+    DEFAULT_POLICIES,
+    RETAIN_BARS,
+    VACUUM_MIN_DEAD,
+    ChunkInfo,
+    ChunkPolicy,
+    plan_actions,
+)
+
+NOW = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+
+def _chunks(days: int, width: int = 7, **kw) -> list:
+    """从 NOW 往前 days 天、每块 width 天的 chunk（最新一块包含 NOW）"""
+    out = []
+    end = NOW + timedelta(days=1)
+    while end > NOW - timedelta(days=days):
+        start = end - timedelta(days=width)
+        out.append(ChunkInfo("_timescaledb_internal", f"_hyper_1_{len(out)}_chunk", start, end, **kw))
+        end = start
+    return out[::-1]
+
+
+def test_compress_only_cold_chunks_and_recompress_after_late_write():
+    policy = ChunkPolicy("candles_1m", compress_after=timedelta(days=30))
+    chunks = _chunks(70, compressed=False, live=1000)
+    actions = plan_actions(policy, chunks, NOW)
+    assert {a.kind for a in actions} == {"compress"}
+    assert all(NOW - a.chunk.range_end >= timedelta(days=30) for a in actions)
+    assert len(actions) == sum(NOW - c.range_end >= timedelta(days=30) for c in chunks)
+
+    # 全部压缩后无动作；迟到数据解压了其中一块 -> 只重新压缩这一块
+    done = {a.chunk.name for a in actions}
+    chunks = [ChunkInfo(c.schema, c.name, c.range_start, c.range_end, c.name in done, c.live) for c in chunks]
+    assert plan_actions(policy, chunks, NOW) == []
+    late = chunks[1]
+    chunks[1] = ChunkInfo(late.schema, late.name, late.range_start, late.range_end, False, 1000)
+    assert [(a.kind, a.chunk.name) for a in plan_actions(policy, chunks, NOW)] == [("compress", late.name)]
+
+
+def test_drop_by_bar_count_and_bloat_handling():
+    policy = next(p for p in DEFAULT_POLICIES if p.table == "candles_1h_rollup")
+    assert policy.drop_after == timedelta(hours=RETAIN_BARS)
+    chunks = _chunks(60, compressed=False, live=1000)
+    drops = [a for a in plan_actions(policy, chunks, NOW) if a.kind == "drop"]
+    # 只删除整块早于保留窗口的 chunk，跨越边界的 chunk 保留
+    assert drops and all(a.chunk.range_end <= NOW - policy.drop_after for a in drops)
+    assert all(c.range_end > NOW - policy.drop_after for c in chunks if c not in [a.chunk for a in drops])
+
+    # 热区膨胀 -> VACUUM；冷区膨胀 -> 先 reorder 再压缩；已压缩 chunk 的统计不参与
+    policy = ChunkPolicy("candles_1m", compress_after=timedelta(days=30))
+    hot = ChunkInfo("s", "hot", NOW - timedelta(days=6), NOW + timedelta(days=1), False, 50_000, VACUUM_MIN_DEAD * 2)
+    warm = ChunkInfo("s", "warm", NOW - timedelta(days=13), NOW - timedelta(days=6), False, 1000, 5)
+    cold = ChunkInfo("s", "cold", NOW - timedelta(days=47), NOW - timedelta(days=40), False, 1000, 400)
+    frozen = ChunkInfo("s", "frozen", NOW - timedelta(days=54), NOW - timedelta(days=47), True, 0, 900)
+    got = [(a.kind, a.chunk.name) for a in plan_actions(policy, [frozen, cold, warm, hot], NOW)]
+    assert got == [("reorder", "cold"), ("compress", "cold"), ("vacuum", "hot")]
@@ -0,0 +1,104 @@
+"""MetricsCollector 异步采集测试 - 本地假服务器回放录制的 Binance 响应"""
+
+import asyncio
+import json
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+
+from adapters.rate_limiter import GlobalLimiter
+from collectors import metrics as metrics_mod
+from collectors.metrics import ENDPOINTS, MetricsCollector
+
+FIXTURE = json.loads((Path(__file__).parent / "fixtures" / "futures_data_5m.json").read_text())
+
+
+@pytest.fixture(autouse=True)
+def isolated_limiter(tmp_path, monkeypatch):
+    """独立的令牌桶与 ban 状态：不从部署的共享内存令牌桶取令牌，也不写入部署的 ban 文件"""
+    limiter = GlobalLimiter.isolated(tmp_path / "logs")
+    monkeypatch.setattr(metrics_mod, "acquire_async", limiter.acquire_async)
+    monkeypatch.setattr(metrics_mod, "set_ban", limiter.set_ban)
+    yield limiter
+    limiter.close(unlink=True)
+
+
+class FakeExchange:
+    """回放 fixture 的本地 HTTP 服务器，记录请求数与峰值并发"""
+
+    def __init__(self, status: dict = None, delay: float = 0.01):
+        self.status = status or {}
+        self.delay = delay
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            path, sym = request.path, request.query.get("symbol")
+            self.requests.append((path, sym))
+            if path in self.status:
+                return web.Response(status=self.status[path], headers={"Retry-After": "1"})
+            data = FIXTURE.get(path, {}).get(sym)
+            return web.json_response(data if data is not None else [])
+        finally:
+            self.active -= 1
+
+    async def collect(self, symbols, workers=4):
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            collector = MetricsCollector(workers=workers, base_url=f"http://127.0.0.1:{port}")
+            return await collector.collect_async(symbols)
+        finally:
+            await runner.cleanup()
+
+
+def test_collect_replays_fixtures():
+    """每个端点对每个符号扇出一次，结果与录制数据一致，并发不超过上限"""
+    fake = FakeExchange()
+    rows = asyncio.run(fake.collect(["btcusdt", "ETHUSDT", "XRPUSDT"], workers=4))
+
+    assert len(fake.requests) == len(ENDPOINTS) * 3
+    assert fake.peak <= 4
+
+    by_symbol = {r["symbol"]: r for r in rows}
+    # XRPUSDT 无 oi 数据，跳过
+    assert set(by_symbol) == {"BTCUSDT", "ETHUSDT"}
+
+    btc = by_symbol["BTCUSDT"]
+    assert btc["create_time"] == datetime(2024, 1, 1, 0, 5)
+    assert btc["sum_open_interest"] == Decimal("81234.56700000")
+    assert btc["sum_open_interest_value"] == Decimal("7012345678.90123456")
+    assert btc["sum_toptrader_long_short_ratio"] == Decimal("1.2345")
+    assert btc["count_toptrader_long_short_ratio"] == Decimal("1.5000")
+    assert btc["count_long_short_ratio"] == Decimal("1.1111")
+    assert btc["sum_taker_long_short_vol_ratio"] == Decimal("0.8765")
+
+    # 时间戳对齐到 5 分钟
+    assert by_symbol["ETHUSDT"]["create_time"] == datetime(2024, 1, 1, 0, 5)
+
+
+def test_rate_limited_endpoint_sets_ban(monkeypatch):
+    """429 端点设置 ban，其余端点结果照常合并"""
+    bans = []
+    monkeypatch.setattr(metrics_mod, "set_ban", bans.append)
+
+    fake = FakeExchange(status={"/futures/data/takerlongshortRatio": 429})
+    rows = asyncio.run(fake.collect(["BTCUSDT"]))
+
+    assert len(bans) == 1
+    assert len(rows) == 1
+    assert rows[0]["sum_taker_long_short_vol_ratio"] is None
+    assert rows[0]["sum_open_interest"] == Decimal("81234.56700000")
@@ -0,0 +1,137 @@
+"""跨进程限流测试：令牌跨进程计数、ban 传播与只延长、fork 后重开锁文件、异步取令牌不阻塞事件循环"""
+
+import asyncio
+import fcntl
+import multiprocessing as mp
+import os
+import threading
+import time
+import uuid
+
+import pytest
+
+from adapters.rate_limiter import GlobalLimiter, SharedTokenBucket
+
+FORK = mp.get_context("fork")
+# 本测试有意在 fork 子进程中验证锁与共享内存（Queue 的后台线程使进程成为多线程）
+pytestmark = pytest.mark.filterwarnings("ignore:This process .* is multi-threaded:DeprecationWarning")
+
+
+@pytest.fixture
+def make_bucket(tmp_path):
+    """同名共享内存段上的多个桶实例（模拟多个进程各自 attach），结束时删除段"""
+    name = f"tradecat_rl_test_{uuid.uuid4().hex[:8]}"
+    made = []
+
+    def make(capacity=1000, rate=1e-9):
+        bucket = SharedTokenBucket(name, capacity, rate, tmp_path / "rl.lock")
+        made.append(bucket)
+        return bucket
+
+    yield make
+    made[0].unlink()
+    for bucket in made:
+        bucket.close()
+
+
+@pytest.fixture
+def limiter(tmp_path):
+    lim = GlobalLimiter.isolated(tmp_path / "logs")
+    yield lim
+    lim.close(unlink=True)
+
+
+def _drain(make, out):
+    bucket = make()
+    n = 0
+    while bucket.take(1) == 0:
+        n += 1
+    out.put(n)
+
+
+def test_tokens_shared_across_processes(make_bucket):
+    make_bucket()  # 父进程先建段
+    out = FORK.Queue()
+    procs = [FORK.Process(target=_drain, args=(make_bucket, out)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    taken = [out.get(timeout=30) for _ in procs]
+    for p in procs:
+        p.join(timeout=30)
+    # 容量 1000、几乎不回填：各进程合计恰好取走 1000 个，不超发
+    assert sum(taken) == 1000
+    assert make_bucket().available() < 1
+
+
+def test_ban_propagates_and_only_extends(make_bucket, limiter, tmp_path):
+    a, b = make_bucket(), make_bucket()
+    until = time.time() + 100
+    assert a.extend_ban(until) is True
+    assert b.ban_until == until
+    assert b.extend_ban(until - 50) is False  # 不缩短
+    assert a.ban_until == until
+    assert b.extend_ban(until + 10) is True and a.ban_until == until + 10
+
+    # GlobalLimiter：子进程设置的 ban 对父进程可见，并写入 ban 文件供重启恢复
+    child = FORK.Process(target=lambda: GlobalLimiter.isolated(tmp_path / "logs").set_ban(time.time() + 60))
+    child.start()
+    child.join(timeout=30)
+    assert 50 < limiter.ban_remaining() <= 60
+    assert limiter.available() == 0
+    limiter.set_ban(time.time() + 10)
+    assert limiter.ban_remaining() > 50
+    limiter.close(unlink=True)
+    restored = GlobalLimiter.isolated(tmp_path / "logs")  # 共享内存已删除，从 ban 文件恢复
+    try:
+        assert restored.ban_remaining() > 50
+    finally:
+        restored.close()
+
+
+def _try_take(bucket, out):
+    out.put((bucket.take(1, blocking=False), bucket._fd, bucket._pid == os.getpid()))
+
+
+def test_child_reopens_lock_file_after_fork(make_bucket):
+    bucket = make_bucket()
+    fd = bucket._lock_fd()
+    fcntl.flock(fd, fcntl.LOCK_EX)  # 父进程持有跨进程锁
+    try:
+        out = FORK.Queue()
+        child = FORK.Process(target=_try_take, args=(bucket, out))
+        child.start()
+        result, _, reopened = out.get(timeout=30)
+        child.join(timeout=30)
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    # 子进程重新打开锁文件：与父进程不是同一把 flock，父进程持锁时取不到
+    assert reopened and result is None
+    assert bucket.take(1, blocking=False) == 0
+
+
+def test_acquire_async_does_not_block_event_loop(limiter, tmp_path):
+    fd = os.open(tmp_path / "logs" / ".rate_limit.lock", os.O_RDWR)
+    fcntl.flock(fd, fcntl.LOCK_EX)  # 另一个打开的文件描述 = 另一个持锁者
+    threading.Timer(0.2, fcntl.flock, (fd, fcntl.LOCK_UN)).start()
+    ticks = []
+
+    async def ticker():
+        while len(ticks) < 10:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        t0 = time.monotonic()
+        tick = asyncio.create_task(ticker())
+        await limiter.acquire_async(1)
+        done = time.monotonic()
+        await tick
+        return t0, done
+
+    try:
+        t0, done = asyncio.run(main())
+    finally:
+        os.close(fd)
+    assert done - t0 >= 0.15
+    # 等锁期间事件循环仍在调度其他协程
+    assert sum(1 for t in ticks if t < done) >= 5
@@ -0,0 +1,203 @@
+"""采集端聚合测试：与连续聚合 SQL 口径逐桶一致、迟到/重复分钟、启动前已开始的桶"""
+
+import random
+import zipfile
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from adapters.timescale import candle_columns
+from collectors import backfill
+from collectors.planner import KlineRequest
+from collectors.rollup import MAX_RETRY, ROLLUP_INTERVALS, RollupWriter, bucket_start, reroll, rollup_table
+from config import settings
+
+SUMS = ("volume", "quote_volume", "trade_count", "taker_buy_volume", "taker_buy_quote_volume")
+
+
+def _stream(symbols, start: datetime, minutes: int, seed: int = 7) -> list:
+    rnd = random.Random(seed)
+    rows = []
+    for m in range(minutes):
+        ts = start + timedelta(minutes=m)
+        for s in symbols:
+            if rnd.random() < 0.01:
+                continue  # 缺失分钟
+            o = 100 + rnd.random()
+            rows.append({
+                "exchange": "binance_futures_um", "symbol": s, "bucket_ts": ts,
+                "open": o, "high": o + rnd.random(), "low": o - rnd.random(), "close": o + rnd.random() - 0.5,
+                "volume": rnd.random() * 10, "quote_volume": None if rnd.random() < 0.05 else rnd.random() * 1000,
+                "trade_count": rnd.randrange(100), "is_closed": rnd.random() > 0.001, "source": "binance_ws",
+                "taker_buy_volume": rnd.random(), "taker_buy_quote_volume": None,
+            })
+    return rows
+
+
+def _reference(rows, period: int) -> dict:
+    """连续聚合 SQL 的纯 Python 版本：first/max/min/last/sum(忽略 NULL)/bool_and"""
+    groups = {}
+    for r in rows:
+        ts = int(r["bucket_ts"].timestamp())
+        groups.setdefault((r["symbol"], bucket_start(ts, period)), []).append(r)
+    out = {}
+    for key, g in groups.items():
+        g = sorted(g, key=lambda r: r["bucket_ts"])
+        row = {"open": g[0]["open"], "close": g[-1]["close"],
+               "high": max(r["high"] for r in g), "low": min(r["low"] for r in g),
+               "is_closed": all(r["is_closed"] for r in g)}
+        for c in SUMS:
+            vals = [r[c] for r in g if r[c] is not None]
+            row[c] = sum(vals) if vals else None
+        out[key] = row
+    return out
+
+
+class FakeTS:
+    def __init__(self):
+        self.tables = {}
+        self.recomputed = []
+        self.fail = False
+
+    def upsert_candles_columnar(self, interval, data, exchange=None, source=None, table=None):
+        # 与 TimescaleAdapter 相同的输入规范化（只接受 DataFrame 或列字典）
+        cols = candle_columns(data, exchange, source)
+        if self.fail:
+            raise ConnectionError("db down")
+        t = self.tables.setdefault(table, {})
+        rows = [dict(zip(cols, values)) for values in zip(*cols.values())]
+        for r in rows:
+            t[(r["symbol"], int(r["bucket_ts"].timestamp()))] = r
+        return len(rows)
+
+    def rollup_candles(self, interval, table, start, end, symbols, exchange=None, source=None):
+        self.recomputed.append((interval, start, end, sorted(symbols)))
+        return len(symbols)
+
+    def upsert_candles(self, interval, rows):
+        return len(rows)
+
+
+def test_matches_continuous_aggregate_semantics():
+    """乱序到达 + 重复推送（spool 回放）下，闭合桶与 SQL 聚合结果一致，周线按周一对齐"""
+    start = datetime(2024, 1, 6, 22, 0, tzinfo=timezone.utc)  # 周六，跨越周一边界
+    rows = _stream(["AUSDT", "BUSDT"], start, 60 * 24 * 9)
+    # 批内（约 3 分钟）乱序 + 1% 重复
+    rnd = random.Random(1)
+    batches = []
+    for i in range(0, len(rows), 6):
+        batch = rows[i:i + 6]
+        rnd.shuffle(batch)
+        batches.append(batch + [r for r in batch if rnd.random() < 0.01])
+
+    ts = FakeTS()
+    writer = RollupWriter(ts, started_at=start.timestamp())
+    for batch in batches:
+        writer(batch)
+
+    # 启动前已开始的 4h/1d/1w 桶交给 SQL 重算（迟到分钟触发的重复重算是幂等的）
+    assert {(iv, t) for iv, t, _, _ in ts.recomputed} == set(
+        (iv, datetime.fromtimestamp(bucket_start(int(start.timestamp()), p), tz=timezone.utc))
+        for iv, p in ROLLUP_INTERVALS.items() if bucket_start(int(start.timestamp()), p) < start.timestamp())
+    for iv, period in ROLLUP_INTERVALS.items():
+        got = ts.tables[rollup_table(iv)]
+        ref = _reference(rows, period)
+        # 早于启动时间的桶（partial）不在内存聚合结果中；最后一个桶分钟未到齐时尚未闭合
+        expected = {k for k in ref if k[1] >= start.timestamp()}
+        last = max(k[1] for k in ref)
+        assert {k for k in expected if k[1] != last} <= set(got) <= expected, iv
+        for key in got:
+            g, r = got[key], ref[key]
+            assert g["bucket_ts"].timestamp() == key[1] and g["source"] == "ws_rollup"
+            for c in ("open", "high", "low", "close", "is_closed"):
+                assert g[c] == r[c], (iv, key, c)
+            for c in SUMS:
+                assert g[c] == pytest.approx(r[c]), (iv, key, c)
+
+    week = {k[1] for k in ts.tables["candles_1w_rollup"]}
+    assert all(datetime.fromtimestamp(t, tz=timezone.utc).weekday() == 0 for t in week)
+
+
+def test_late_minutes_partial_buckets_and_retry():
+    start = datetime(2024, 1, 1, 0, 0, tzinfo=timezone.utc)
+    rows = _stream(["AUSDT"], start, 30, seed=3)
+    by_min = {r["bucket_ts"]: r for r in rows}
+    ts = FakeTS()
+    # 进程在 00:02 启动：00:00 开始的桶只有部分分钟在内存中，交给 SQL 重算
+    writer = RollupWriter(ts, intervals=("5m",), started_at=(start + timedelta(minutes=2)).timestamp())
+
+    late = by_min.pop(start + timedelta(minutes=7))
+    writer([r for r in rows if r["bucket_ts"] < start + timedelta(minutes=12) and r is not late])
+    assert ts.recomputed == [("5m", start, start + timedelta(minutes=5), ["AUSDT"])]
+    table = ts.tables["candles_5m_rollup"]
+    first = table[("AUSDT", int((start + timedelta(minutes=5)).timestamp()))]
+
+    # 迟到分钟落在保留窗口内：桶重新输出
+    writer([late])
+    updated = table[("AUSDT", int((start + timedelta(minutes=5)).timestamp()))]
+    assert updated["volume"] == pytest.approx(first["volume"] + late["volume"])
+
+    # 写库失败的桶在下一批重试
+    ts.fail = True
+    writer([r for r in rows if start + timedelta(minutes=12) <= r["bucket_ts"] < start + timedelta(minutes=21)])
+    ts.fail = False
+    writer([r for r in rows if r["bucket_ts"] >= start + timedelta(minutes=21)])
+    # 分钟到齐的桶立即闭合（25 分桶不必等下一个桶开始）
+    assert {k[1] for k in table} == {int((start + timedelta(minutes=m)).timestamp()) for m in (5, 10, 15, 20, 25)}
+
+
+def test_failed_bars_dropped_after_max_retry():
+    """数据库长时间不可用：重试队列不随闭合桶无限增长"""
+    start = datetime(2024, 1, 1, 0, 0, tzinfo=timezone.utc)
+    rows = _stream(["AUSDT"], start, 60, seed=5)
+    ts = FakeTS()
+    ts.fail = True
+    writer = RollupWriter(ts, intervals=("5m",), started_at=start.timestamp())
+    for m in range(0, 60, 5):
+        writer([r for r in rows if start + timedelta(minutes=m) <= r["bucket_ts"] < start + timedelta(minutes=m + 5)])
+        assert len(writer._retry) <= MAX_RETRY
+    ts.fail = False
+    writer([])
+    assert len(ts.tables["candles_5m_rollup"]) < MAX_RETRY
+
+
+def test_reroll_covers_touched_buckets():
+    ts = FakeTS()
+    start = datetime(2024, 1, 3, 23, 58, tzinfo=timezone.utc)  # 周三
+    assert reroll(ts, ["AUSDT"], start, start + timedelta(minutes=5), intervals=()) == 0
+    assert ts.recomputed == []
+
+    reroll(ts, ["AUSDT"], start, start + timedelta(minutes=5), intervals=("5m", "1d", "1w"))
+    day = datetime(2024, 1, 3, tzinfo=timezone.utc)
+    assert ts.recomputed == [
+        ("5m", start - timedelta(minutes=3), start + timedelta(minutes=7), ["AUSDT"]),   # 23:55 .. 次日 00:05
+        ("1d", day, day + timedelta(days=2), ["AUSDT"]),
+        ("1w", datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 1, 8, tzinfo=timezone.utc), ["AUSDT"]),
+    ]
+
+
+def test_backfill_writes_reroll_when_enabled(tmp_path, monkeypatch):
+    """REST / ZIP 回补写入的 1m 触发受影响聚合桶重算（默认关闭时不重算）"""
+    t0 = datetime(2024, 3, 1, 0, 0, tzinfo=timezone.utc)
+    ms0 = int(t0.timestamp() * 1000)
+    candles = [[ms0 + i * 60000, 1.0, 2.0, 0.5, 1.5, 10.0] for i in range(7)]
+    ts = FakeTS()
+    rest = backfill.RestBackfiller(ts, workers=1, fetch=lambda *a: candles)
+    req = KlineRequest("AUSDT", ms0, 7, 1, ((ms0, ms0 + 7 * 60000),))
+
+    monkeypatch.setattr(settings, "ws_rollup_intervals", ())
+    assert rest._run_request(req, "1m", None) == 7
+    assert ts.recomputed == []
+
+    monkeypatch.setattr(settings, "ws_rollup_intervals", ("5m",))
+    rest._run_request(req, "1m", None)
+    assert ts.recomputed == [("5m", t0, t0 + timedelta(minutes=10), ["AUSDT"])]
+
+    ts.recomputed.clear()
+    monkeypatch.setattr(settings, "data_dir", tmp_path)
+    path = tmp_path / "BTCUSDT-1m.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("BTCUSDT-1m.csv", "".join(
+            f"{ms0 + i * 60000},1,2,0.5,1.5,10,{ms0 + i * 60000 + 59999},15,3,5,7.5,0\n" for i in range(3, 12)))
+    assert backfill.ZipBackfiller(ts, workers=1)._import_kline_zip(path, "btcusdt", "1m") == 9
+    assert ts.recomputed == [("5m", t0, t0 + timedelta(minutes=15), ["BTCUSDT"])]
@@ -0,0 +1,94 @@
+"""WS K线 spool 测试：先落盘后确认、重启回放、段清理"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from collectors.spool import CandleSpool, SpooledWriter
+
+
+def _rows(minute: int, n: int = 3) -> list:
+    ts = datetime(2024, 1, 1, 0, minute, tzinfo=timezone.utc)
+    return [{"exchange": "binance_futures_um", "symbol": f"S{i}USDT", "bucket_ts": ts,
+             "open": 1.5, "high": 2.0, "low": 1.0, "close": 1.75, "volume": 10.0,
+             "quote_volume": None, "trade_count": 7, "is_closed": True, "source": "binance_ws",
+             "taker_buy_volume": 5.0, "taker_buy_quote_volume": None} for i in range(n)]
+
+
+class FlakyDB:
+    def __init__(self):
+        self.up = True
+        self.rows = []
+
+    def __call__(self, rows):
+        if not self.up:
+            raise ConnectionError("db down")
+        self.rows.extend(rows)
+        return len(rows)
+
+
+def test_failed_batches_survive_restart(tmp_path):
+    """写库失败的批次保留在 spool，重启后按顺序回放且与原数据一致"""
+    db = FlakyDB()
+    spool = CandleSpool(tmp_path, fsync=False)
+    writer = SpooledWriter(spool, db)
+
+    writer(_rows(0))
+    db.up = False
+    for m in (1, 2):
+        with pytest.raises(ConnectionError):
+            writer(_rows(m))
+    assert len(spool) == 2
+    spool.close()
+
+    # 重启
+    db.up = True
+    spool = CandleSpool(tmp_path, fsync=False)
+    assert len(spool) == 2
+    writer = SpooledWriter(spool, db)
+    assert writer.replay() == 6
+    assert len(spool) == 0
+    assert db.rows[3:] == _rows(1) + _rows(2)
+
+
+def test_recovery_after_db_comes_back(tmp_path):
+    """数据库恢复后下一次成功写入顺带回放积压批次，已确认的段被删除"""
+    db = FlakyDB()
+    spool = CandleSpool(tmp_path, segment_bytes=200, fsync=False)
+    writer = SpooledWriter(spool, db)
+
+    db.up = False
+    with pytest.raises(ConnectionError):
+        writer(_rows(0))
+    db.up = True
+    writer(_rows(1))
+
+    assert len(spool) == 0
+    assert {r["bucket_ts"].minute for r in db.rows} == {0, 1}
+    # 只剩当前活动段
+    assert len(list(tmp_path.glob("*.seg"))) == 1
+
+
+def test_truncated_tail_is_ignored(tmp_path):
+    """崩溃导致的半条记录被忽略，之前的完整批次照常恢复"""
+    spool = CandleSpool(tmp_path, fsync=False)
+    spool.append(_rows(0))
+    spool.close()
+    seg = next(tmp_path.glob("*.seg"))
+    with seg.open("ab") as f:
+        f.write(b"B\x02\x00\x00")
+
+    spool = CandleSpool(tmp_path, fsync=False)
+    pending = spool.pending()
+    assert [seq for seq, _ in pending] == [1]
+    assert pending[0][1] == _rows(0)
+
+
+def test_decimal_fields_are_spooled(tmp_path):
+    """cryptofeed 推送的 Decimal 价格可落盘并还原"""
+    rows = _rows(0, 1)
+    rows[0]["open"] = Decimal("0.00001234")
+    spool = CandleSpool(tmp_path, fsync=False)
+    spool.append(rows)
+    assert spool.pending()[0][1][0]["open"] == 0.00001234
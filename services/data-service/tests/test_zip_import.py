@@ -0,0 +1,213 @@
+"""ZIP 流式导入测试：表头/无表头、分块边界、按日过滤、列映射与原逐行解析一致"""
+
+import csv
+import functools
+import random
+import zipfile
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from adapters.timescale import candle_columns, metrics_columns
+from collectors import backfill
+from config import settings
+
+KLINE_HEADER = ("open_time,open,high,low,close,volume,close_time,quote_volume,count,"
+                "taker_buy_volume,taker_buy_quote_volume,ignore")
+METRICS_HEADER = ("create_time,symbol,sum_open_interest,sum_open_interest_value,count_toptrader_long_short_ratio,"
+                  "sum_toptrader_long_short_ratio,count_long_short_ratio,sum_taker_long_short_vol_ratio")
+T0 = datetime(2024, 3, 1, 23, 0, tzinfo=timezone.utc)
+
+
+def _zip(path, lines, header=None):
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(path.stem + ".csv", "\n".join(([header] if header else []) + lines) + "\n")
+    return path
+
+
+def _kline_lines(n, step_min=1, seed=1):
+    rnd = random.Random(seed)
+    lines = []
+    for i in range(n):
+        ms = int((T0 + timedelta(minutes=i * step_min)).timestamp() * 1000)
+        o = round(100 + rnd.random(), 4)
+        quote = "" if i % 17 == 5 else f"{rnd.random() * 1e5:.4f}"   # 空字段 -> NULL
+        count = "" if i % 23 == 7 else str(rnd.randrange(1000))
+        lines.append(f"{ms},{o},{o + 1},{o - 1},{o + 0.5},{rnd.random() * 10:.6f},{ms + 59999},"
+                     f"{quote},{count},{rnd.random():.6f},{rnd.random() * 100:.6f},0")
+    return lines
+
+
+def _metrics_lines(n, seed=2):
+    rnd = random.Random(seed)
+    return [
+        f"{(T0 + timedelta(minutes=5 * i)).strftime('%Y-%m-%d %H:%M:%S')},BTCUSDT,"
+        + ",".join(f"{rnd.random() * 1e3:.5f}" for _ in range(6))
+        for i in range(n)
+    ]
+
+
+def _old_kline_rows(path, symbol, filter_date=None):
+    """原逐行解析（csv.reader + float/int，空字段为 None）"""
+    rows = []
+    with zipfile.ZipFile(path) as zf:
+        for name in zf.namelist():
+            with zf.open(name) as f:
+                for row in csv.reader(line.decode() for line in f):
+                    if len(row) < 6:
+                        continue
+                    try:
+                        ts = datetime.fromtimestamp(int(row[0]) / 1000, tz=timezone.utc)
+                        if filter_date and ts.date() != filter_date:
+                            continue
+                        rows.append({
+                            "exchange": settings.db_exchange, "symbol": symbol.upper(), "bucket_ts": ts,
+                            "open": float(row[1]), "high": float(row[2]), "low": float(row[3]),
+                            "close": float(row[4]), "volume": float(row[5]),
+                            "quote_volume": float(row[7]) if len(row) > 7 and row[7] else None,
+                            "trade_count": int(row[8]) if len(row) > 8 and row[8] else None,
+                            "is_closed": True, "source": "binance_zip",
+                            "taker_buy_volume": float(row[9]) if len(row) > 9 and row[9] else None,
+                            "taker_buy_quote_volume": float(row[10]) if len(row) > 10 and row[10] else None,
+                        })
+                    except (ValueError, IndexError):
+                        pass
+    return rows
+
+
+def _old_metrics_rows(path, symbol, filter_date=None):
+    """原逐行解析（create_time 对齐到 5 分钟，列 4/5 为 sum/count 大户多空比）"""
+    rows = []
+    with zipfile.ZipFile(path) as zf:
+        for name in zf.namelist():
+            with zf.open(name) as f:
+                for row in csv.reader(line.decode() for line in f):
+                    if len(row) < 4:
+                        continue
+                    try:
+                        if row[0].isdigit():
+                            ts = int(row[0])
+                        else:
+                            dt = datetime.fromisoformat(row[0]).replace(tzinfo=timezone.utc)
+                            ts = int(dt.timestamp() * 1000)
+                        ts = ts // 300000 * 300000
+                        dt = datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
+                        if filter_date and dt.date() != filter_date:
+                            continue
+                        rows.append({
+                            "create_time": dt.replace(tzinfo=None), "symbol": symbol.upper(),
+                            "exchange": settings.db_exchange,
+                            "sum_open_interest": float(row[2]), "sum_open_interest_value": float(row[3]),
+                            "count_toptrader_long_short_ratio": float(row[5]),
+                            "sum_toptrader_long_short_ratio": float(row[4]),
+                            "count_long_short_ratio": float(row[6]),
+                            "sum_taker_long_short_vol_ratio": float(row[7]),
+                            "source": "binance_zip", "is_closed": True,
+                        })
+                    except (ValueError, IndexError):
+                        pass
+    return rows
+
+
+class FakeTS:
+    """按 TimescaleAdapter 的列式规范化收集写入行"""
+
+    def __init__(self):
+        self.candles, self.metrics, self.batches = [], [], []
+
+    @staticmethod
+    def _rows(cols):
+        return [dict(zip(cols, values)) for values in zip(*cols.values())]
+
+    def upsert_candles_columnar(self, interval, data, exchange=None, source=None, table=None):
+        rows = self._rows(candle_columns(data, exchange, source))
+        self.candles += rows
+        self.batches.append(len(rows))
+        return len(rows)
+
+    def upsert_metrics_columnar(self, data, exchange=None, source=None):
+        rows = self._rows(metrics_columns(data, exchange, source))
+        self.metrics += rows
+        self.batches.append(len(rows))
+        return len(rows)
+
+
+@pytest.fixture
+def zip_bf(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "data_dir", tmp_path / "data")
+    ts = FakeTS()
+    return backfill.ZipBackfiller(ts, workers=1), ts
+
+
+def _assert_same(got, expected):
+    assert len(got) == len(expected) > 0
+    for g, e in zip(got, expected):
+        assert g.keys() >= e.keys()
+        for k, v in e.items():
+            assert g[k] == (pytest.approx(v) if isinstance(v, float) else v), k
+
+
+def test_iter_zip_csv_skips_header_and_chunks(tmp_path):
+    lines = _kline_lines(20)
+    with_header = _zip(tmp_path / "h.zip", lines, KLINE_HEADER)
+    no_header = _zip(tmp_path / "n.zip", lines)
+    for path in (with_header, no_header):
+        chunks = list(backfill._iter_zip_csv(path, chunk_rows=7))
+        assert [ln.rstrip("\n") for c in chunks for ln in c] == lines
+        assert all(len(c) <= 7 for c in chunks)
+    # 表头占用首块的一行：首块少一行，不丢数据
+    assert [len(c) for c in backfill._iter_zip_csv(with_header, chunk_rows=7)] == [6, 7, 7]
+
+
+@pytest.mark.parametrize("header", [KLINE_HEADER, None])
+def test_kline_import_matches_old_parser(zip_bf, tmp_path, monkeypatch, header):
+    bf, ts = zip_bf
+    monkeypatch.setattr(backfill, "_iter_zip_csv", functools.partial(backfill._iter_zip_csv, chunk_rows=50))
+    path = _zip(tmp_path / "BTCUSDT-1m.zip", _kline_lines(120), header)
+    assert bf._import_kline_zip(path, "btcusdt", "1m") == 120
+    # 表头在首块中被跳过：分块边界前移一行
+    assert ts.batches == ([50, 50, 20] if header is None else [49, 50, 21])
+    _assert_same(ts.candles, _old_kline_rows(path, "btcusdt"))
+    assert any(r["quote_volume"] is None for r in ts.candles)
+    assert any(r["trade_count"] is None for r in ts.candles)
+
+
+def test_kline_import_day_mask(zip_bf, tmp_path):
+    bf, ts = zip_bf
+    # 月度 ZIP：23:00 起每 30 分钟一根，跨 3 个 UTC 日
+    path = _zip(tmp_path / "BTCUSDT-1m-2024-03.zip", _kline_lines(100, step_min=30), KLINE_HEADER)
+    days = {date(2024, 3, 2), date(2024, 3, 3)}
+    n = bf._import_kline_zip(path, "BTCUSDT", "1m", filter_dates=days)
+    expected = [r for d in sorted(days) for r in _old_kline_rows(path, "BTCUSDT", d)]
+    assert n == len(expected) == 96
+    _assert_same(sorted(ts.candles, key=lambda r: r["bucket_ts"]), expected)
+
+
+def test_metrics_import_matches_old_parser(zip_bf, tmp_path):
+    bf, ts = zip_bf
+    path = _zip(tmp_path / "BTCUSDT-metrics.zip", _metrics_lines(400), METRICS_HEADER)
+    day = date(2024, 3, 2)
+    assert bf._import_metrics_zip(path, "BTCUSDT") == 400
+    _assert_same(ts.metrics, _old_metrics_rows(path, "BTCUSDT"))
+
+    ts.metrics.clear()
+    assert bf._import_metrics_zip(path, "BTCUSDT", filter_dates=[day]) == 288
+    _assert_same(ts.metrics, _old_metrics_rows(path, "BTCUSDT", day))
+
+
+def test_metrics_import_skips_malformed_lines(zip_bf, tmp_path):
+    bf, ts = zip_bf
+    good = _metrics_lines(20)
+    lines = list(good)
+    lines.insert(3, "2024-03-02 02:00:00,BTCUSDT,1.0,2.0")             # 列数不足：整块列数不一致
+    lines.insert(7, "2024-03-01 23:40:00,BTCUSDT,abc,1,1,1,1,1")       # 数值无法解析
+    lines.insert(11, "2024-13-45 99:99:99,BTCUSDT,1,1,1,1,1,1")        # 时间无法解析
+    lines.insert(15, "2024-03-02 02:05:00,BTCUSDT,1,1,,1,1,1")         # 空字段 -> NULL，保留
+    path = _zip(tmp_path / "BTCUSDT-metrics-bad.zip", lines, METRICS_HEADER)
+    # 异常行只丢弃该行，不丢掉整块；列数不足补 NULL、空字段为 NULL（与列式快路径一致）
+    assert bf._import_metrics_zip(path, "BTCUSDT") == len(good) + 2
+    by_time = {r["create_time"]: r for r in ts.metrics}
+    short, blank = by_time.pop(datetime(2024, 3, 2, 2, 0)), by_time.pop(datetime(2024, 3, 2, 2, 5))
+    assert short["sum_open_interest_value"] == 2.0 and short["count_long_short_ratio"] is None
+    assert blank["sum_toptrader_long_short_ratio"] is None and blank["sum_open_interest"] == 1.0
+    _assert_same(sorted(by_time.values(), key=lambda r: r["create_time"]), _old_metrics_rows(path, "BTCUSDT"))
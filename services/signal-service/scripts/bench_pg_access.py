@@ -0,0 +1,170 @@
+"""
+PG 信号引擎查询延迟基准（需本地 TimescaleDB，且已建 market_data.candles_1m / binance_futures_metrics_5m）
+
+用法: python scripts/bench_pg_access.py --symbols 20 --days 365 --runs 20
+
+在独立 schema（默认 bench_pg）中按线上表结构建 hypertable，用 generate_series 写入 --days 天合成数据
+（1m K 线 + 5m 期货指标），测试结束后删除。对比每轮检测的取数延迟：
+- row_number: 原实现，全表 ROW_NUMBER() OVER (PARTITION BY symbol ...) 取最新一根
+- distinct_on: DISTINCT ON (symbol) + 时间下界，取最新一根
+- lateral:     pg_access 的 LATERAL ... LIMIT 2 + 时间下界，同时返回上一根
+- pooled:      引擎实际路径 PGDataAccess.fetch_latest（连接池 + 预编译 + pipeline 一次往返）
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import psycopg
+from psycopg import sql
+
+import engines.pg_access as pg_access
+from config import get_database_url
+from engines.pg_access import CANDLES_SQL, METRICS_SQL, PGDataAccess
+
+ROW_NUMBER_SQL = (
+    """
+    WITH ranked AS (
+        SELECT symbol, bucket_ts, open, high, low, close, volume,
+               quote_volume, trade_count, taker_buy_volume, taker_buy_quote_volume,
+               ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY bucket_ts DESC) as rn
+        FROM market_data.candles_1m
+        WHERE symbol = ANY(%(symbols)s)
+    )
+    SELECT * FROM ranked WHERE rn = 1
+    """,
+    """
+    WITH ranked AS (
+        SELECT symbol, create_time, sum_open_interest, sum_open_interest_value,
+               count_toptrader_long_short_ratio, sum_toptrader_long_short_ratio,
+               count_long_short_ratio, sum_taker_long_short_vol_ratio,
+               ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY create_time DESC) as rn
+        FROM market_data.binance_futures_metrics_5m
+        WHERE symbol = ANY(%(symbols)s)
+    )
+    SELECT * FROM ranked WHERE rn = 1
+    """,
+)
+
+DISTINCT_ON_SQL = (
+    """
+    SELECT DISTINCT ON (symbol) symbol, bucket_ts, open, high, low, close, volume,
+           quote_volume, trade_count, taker_buy_volume, taker_buy_quote_volume
+    FROM market_data.candles_1m
+    WHERE exchange = %(exchange)s AND symbol = ANY(%(symbols)s) AND bucket_ts >= %(since)s
+    ORDER BY symbol, bucket_ts DESC
+    """,
+    """
+    SELECT DISTINCT ON (symbol) symbol, create_time, sum_open_interest, sum_open_interest_value,
+           count_toptrader_long_short_ratio, sum_toptrader_long_short_ratio,
+           count_long_short_ratio, sum_taker_long_short_vol_ratio
+    FROM market_data.binance_futures_metrics_5m
+    WHERE symbol = ANY(%(symbols)s) AND create_time >= %(msince)s
+    ORDER BY symbol, create_time DESC
+    """,
+)
+
+LATERAL_SQL = (CANDLES_SQL, METRICS_SQL.replace("%(since)s", "%(msince)s"))
+
+
+def populate(conn: psycopg.Connection, schema: str, symbols: list[str], end: datetime, days: int) -> None:
+    """按线上表结构建表并写入合成数据（服务端 generate_series，逐日提交）"""
+    conn.execute(sql.SQL("DROP SCHEMA IF EXISTS {s} CASCADE").format(s=sql.Identifier(schema)))
+    conn.execute(sql.SQL("CREATE SCHEMA {s}").format(s=sql.Identifier(schema)))
+    for table, col, chunk in (("candles_1m", "bucket_ts", "1 day"), ("binance_futures_metrics_5m", "create_time", "7 days")):
+        conn.execute(sql.SQL("CREATE TABLE {t} (LIKE {src} INCLUDING ALL)").format(
+            t=sql.Identifier(schema, table), src=sql.Identifier("market_data", table)))
+        conn.execute(f"SELECT create_hypertable('{schema}.{table}', '{col}', chunk_time_interval => INTERVAL '{chunk}')")
+    conn.commit()
+
+    start = end - timedelta(days=days)
+    for d in range(days):
+        day = start + timedelta(days=d)
+        conn.execute(sql.SQL("""
+            INSERT INTO {t} (exchange, symbol, bucket_ts, open, high, low, close, volume,
+                             quote_volume, trade_count, is_closed, taker_buy_volume, taker_buy_quote_volume)
+            SELECT 'binance_futures_um', s, ts, p, p + 1, p - 1, p + random() - 0.5, v, v * p, 100, TRUE, v / 2, v * p / 2
+            FROM unnest(%s::text[]) AS s,
+                 generate_series(%s::timestamptz, %s::timestamptz - INTERVAL '1 minute', INTERVAL '1 minute') AS ts,
+                 LATERAL (SELECT 100 + random() * 10 AS p, 10 + random() * 100 AS v) r
+        """).format(t=sql.Identifier(schema, "candles_1m")), (symbols, day, day + timedelta(days=1)))
+        conn.execute(sql.SQL("""
+            INSERT INTO {t} (create_time, symbol, sum_open_interest, sum_open_interest_value,
+                             count_toptrader_long_short_ratio, sum_toptrader_long_short_ratio,
+                             count_long_short_ratio, sum_taker_long_short_vol_ratio)
+            SELECT ts, s, 1e6, 1e8, 1 + random(), 1 + random(), 1 + random(), 0.5 + random()
+            FROM unnest(%s::text[]) AS s,
+                 generate_series(%s::timestamp, %s::timestamp - INTERVAL '5 minutes', INTERVAL '5 minutes') AS ts
+        """).format(t=sql.Identifier(schema, "binance_futures_metrics_5m")),
+            (symbols, day.replace(tzinfo=None), (day + timedelta(days=1)).replace(tzinfo=None)))
+        conn.commit()
+    conn.execute(sql.SQL("ANALYZE {t}").format(t=sql.Identifier(schema, "candles_1m")))
+    conn.execute(sql.SQL("ANALYZE {t}").format(t=sql.Identifier(schema, "binance_futures_metrics_5m")))
+    conn.commit()
+
+
+def measure(fn, runs: int) -> tuple[float, float]:
+    """(首次, 中位数) 毫秒"""
+    times = []
+    for _ in range(runs + 1):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return times[0], statistics.median(times[1:])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="PG 信号引擎查询延迟基准")
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--schema", default="bench_pg")
+    args = parser.parse_args()
+
+    db_url = get_database_url()
+    symbols = [f"BENCH{i:03d}USDT" for i in range(args.symbols)]
+    end = datetime.now(UTC).replace(second=0, microsecond=0)
+    params = {"symbols": symbols, "exchange": "binance_futures_um",
+              "since": end - timedelta(minutes=30), "msince": (end - timedelta(minutes=60)).replace(tzinfo=None)}
+
+    def scoped(query: str) -> str:
+        return query.replace("market_data.", f"{args.schema}.")
+
+    with psycopg.connect(db_url) as conn:
+        t0 = time.perf_counter()
+        populate(conn, args.schema, symbols, end, args.days)
+        print(f"setup        {args.symbols} symbols x {args.days} days ({time.perf_counter() - t0:.0f}s)")
+
+        def run(pair: tuple[str, str]):
+            def fn():
+                for q in pair:
+                    conn.execute(scoped(q), params).fetchall()
+            return fn
+
+        for name, pair in (("row_number", ROW_NUMBER_SQL), ("distinct_on", DISTINCT_ON_SQL), ("lateral", LATERAL_SQL)):
+            first, median = measure(run(pair), args.runs)
+            print(f"{name:<12} 首次 {first:9.2f}ms  中位数 {median:9.2f}ms")
+        conn.commit()
+
+    # 引擎实际路径：连接池 + 预编译 + pipeline
+    access = PGDataAccess(db_url, "binance_futures_um", timedelta(minutes=30), timedelta(minutes=60))
+    pg_access.CANDLES_SQL, pg_access.METRICS_SQL = scoped(CANDLES_SQL), scoped(METRICS_SQL)
+    try:
+        first, median = measure(lambda: access.fetch_latest(symbols, now=end), args.runs)
+        candles, _ = access.fetch_latest(symbols, now=end)
+        paired = sum(prev is not None for _, prev in candles.values())
+        print(f"{'pooled':<12} 首次 {first:9.2f}ms  中位数 {median:9.2f}ms  (返回上一根 {paired}/{len(symbols)})")
+    finally:
+        access.close()
+        with psycopg.connect(db_url) as conn:
+            conn.execute(sql.SQL("DROP SCHEMA IF EXISTS {s} CASCADE").format(s=sql.Identifier(args.schema)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+订阅路由基准：按表取订阅用户的延迟
+
+用法: python scripts/bench_subscription_routing.py --users 100000 --signals 1000
+
+在临时目录建 signal_subs，写入 --users 个用户（约 10% 关闭推送；订阅分布见 populate），对比：
+- legacy:  原实现，先查启用用户，再逐用户新建连接加载并解析 tables（--legacy-users 限制其用户数，按比例折算）
+- rebuild: 从 signal_subs 全量重建路由索引（外部写入后首次分发的代价）
+- routed:  SubscriptionManager.subscribers，随机表连续分发 --signals 个信号（库无变更时为缓存查找）
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from storage.subscription import ALL_TABLES, SubscriptionManager
+
+
+def populate(db_path: str, users: int, random_sets: bool = False, seed: int = 7) -> None:
+    """
+    默认分布贴近实际使用：新用户默认订阅全部（tables 为 NULL），部分用户在此基础上关掉 1~3 张表或全部关闭；
+    random_sets 为最坏情况：每个用户随机订阅任意子集（几乎没有相同的表集合）
+    """
+    rnd = random.Random(seed)
+    rows = []
+    for uid in rnd.sample(range(10**6, 10**10), users):
+        if random_sets:
+            tables = json.dumps(rnd.sample(ALL_TABLES, rnd.randint(0, len(ALL_TABLES))))
+        else:
+            r = rnd.random()
+            if r < 0.6:
+                tables = None
+            elif r < 0.9:
+                off = set(rnd.sample(ALL_TABLES, rnd.randint(1, 3)))
+                tables = json.dumps([t for t in ALL_TABLES if t not in off])
+            else:
+                tables = json.dumps([])
+        rows.append((uid, int(rnd.random() >= 0.1), tables))
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("INSERT INTO signal_subs (user_id, enabled, tables) VALUES (?, ?, ?)", rows)
+
+
+def legacy_subscribers(db_path: str, table: str, limit: int) -> list[int]:
+    """原 get_subscribers_for_table：逐用户 _load（每次新建连接）"""
+    conn = sqlite3.connect(db_path)
+    uids = [r[0] for r in conn.execute("SELECT user_id FROM signal_subs WHERE enabled = 1 LIMIT ?", (limit,))]
+    conn.close()
+    result = []
+    for uid in uids:
+        conn = sqlite3.connect(db_path)
+        row = conn.execute("SELECT enabled, tables FROM signal_subs WHERE user_id = ?", (uid,)).fetchone()
+        conn.close()
+        tables = set(json.loads(row[1])) if row[1] else set(ALL_TABLES)
+        if row[0] and table in tables:
+            result.append(uid)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="订阅路由基准")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--signals", type=int, default=1000)
+    parser.add_argument("--random-sets", action="store_true", help="最坏情况：每个用户订阅随机子集")
+    parser.add_argument("--legacy-users", type=int, default=5000, help="legacy 路径实测的用户数（0 跳过）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "signal_subs.db")
+        mgr = SubscriptionManager(db_path)
+        t0 = time.perf_counter()
+        populate(db_path, args.users, args.random_sets)
+        print(f"setup        {args.users} users ({time.perf_counter() - t0:.1f}s)")
+        rnd = random.Random(1)
+
+        if args.legacy_users:
+            n = min(args.legacy_users, args.users)
+            t0 = time.perf_counter()
+            legacy_subscribers(db_path, ALL_TABLES[0], n)
+            ms = (time.perf_counter() - t0) * 1000
+            print(f"{'legacy':<12} {ms:10.1f}ms / 信号 ({n} 用户实测，折算 {args.users} 用户约 {ms * args.users / n:.0f}ms)")
+
+        rebuilds = []
+        for _ in range(5):
+            t0 = time.perf_counter()
+            mgr.refresh_index(force=True)
+            rebuilds.append((time.perf_counter() - t0) * 1000)
+        print(f"{'rebuild':<12} {statistics.median(rebuilds):10.1f}ms（中位数，5 次）")
+
+        times, fanout = [], 0
+        for _ in range(args.signals):
+            table = rnd.choice(ALL_TABLES)
+            t0 = time.perf_counter()
+            fanout += len(mgr.subscribers(table))
+            times.append((time.perf_counter() - t0) * 1e6)
+        times.sort()
+        print(
+            f"{'routed':<12} 中位数 {statistics.median(times):8.1f}µs  p99 {times[int(len(times) * 0.99)]:10.1f}µs"
+            f"  （首次按表展开位图，平均每信号 {fanout / args.signals:.0f} 个用户）"
+        )
+
+        # 本进程修改：原地置位，只失效受影响表的缓存
+        uid = rnd.choice(mgr.subscribers(ALL_TABLES[0]))
+        t0 = time.perf_counter()
+        mgr.toggle_table(uid, ALL_TABLES[0])
+        print(f"{'update':<12} {(time.perf_counter() - t0) * 1000:10.2f}ms（单用户切换一张表，含落盘）")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,16 @@ Signal Service 入口
 用法:
     python -m src --sqlite          # 启动 SQLite 引擎
     python -m src --pg              # 启动 PG 引擎
-    python -m src --all             # 启动所有引擎
-    python -m src --once            # 单次检查
+    python -m src --all             # 启动所有引擎（同一调度器驱动）
+    python -m src --all --once      # 单次检查
     python -m src --stats           # 显示统计
+    python -m src --backtest history.db --candles candles.db   # 离线回测
 """
 
 import argparse
 import logging
 import sys
+import time
 from pathlib import Path
 
 # 确保 src 在路径中
@@ -32,6 +34,11 @@ def main():
     parser.add_argument("--interval", type=int, default=60, help="检查间隔（秒）")
     parser.add_argument("--stats", action="store_true", help="显示统计")
     parser.add_argument("--test", action="store_true", help="测试配置")
+    parser.add_argument("--backtest", metavar="PATH", help="离线回测：历史指标序列（SQLite 库或 Parquet 目录）")
+    parser.add_argument("--candles", metavar="PATH", help="回测用本地 K 线（candles_1m 表或 Parquet），用于前向收益")
+    parser.add_argument("--horizons", default="1,4,12", help="前向收益根数（按信号周期，逗号分隔）")
+    parser.add_argument("--rules", help="只回测指定规则（逗号分隔，默认全部启用的规则）")
+    parser.add_argument("--json", metavar="PATH", help="回测结果写入 JSON 文件")
     args = parser.parse_args()
 
     if args.test:
@@ -64,62 +71,53 @@ def main():
             logger.warning(f"PG 引擎不可用: {e}")
         return
 
-    if args.once:
-        # 单次检查
-        if args.sqlite or args.all:
-            from engines import get_sqlite_engine
-
-            engine = get_sqlite_engine()
-            signals = engine.check_signals()
-            logger.info(f"SQLite 检测到 {len(signals)} 个信号")
-
-        if args.pg or args.all:
-            from engines import get_pg_engine
-
-            engine = get_pg_engine()
-            signals = engine.check_signals()
-            logger.info(f"PG 检测到 {len(signals)} 个信号")
+    if args.backtest:
+        import json
+
+        from backtest import Backtester, load_candles, load_series
+
+        tester = Backtester(
+            rules=args.rules.split(",") if args.rules else None,
+            candles=load_candles(args.candles) if args.candles else None,
+            horizons=[int(h) for h in args.horizons.split(",") if h],
+        )
+        report = tester.run(load_series(args.backtest))
+        logger.info(f"=== 回测结果 ===\n{report.format()}")
+        if args.json:
+            Path(args.json).write_text(json.dumps(report.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+            logger.info(f"回测结果已写入 {args.json}")
         return
 
-    # 持续运行
-    import threading
-
-    threads = []
-
-    if args.sqlite or args.all:
-        from engines import get_sqlite_engine
-
-        def run_sqlite():
-            engine = get_sqlite_engine()
-            engine.run_loop(interval=args.interval)
-
-        t = threading.Thread(target=run_sqlite, daemon=True, name="SQLiteEngine")
-        t.start()
-        threads.append(t)
-        logger.info("SQLite 引擎已启动")
-
-    if args.pg or args.all:
-        from engines import get_pg_engine
+    names = [name for name, on in (("sqlite", args.sqlite or args.all), ("pg", args.pg or args.all)) if on]
+    if not names:
+        logger.error("请指定要启动的引擎: --sqlite, --pg, 或 --all")
+        sys.exit(1)
 
-        def run_pg():
-            engine = get_pg_engine()
-            engine.run_loop(interval=args.interval)
+    # 两个数据源由同一调度器驱动（共享冷却表、发布链路与有界线程池）
+    from engines import get_scheduler
+    from events import SignalPublisher
 
-        t = threading.Thread(target=run_pg, daemon=True, name="PGEngine")
-        t.start()
-        threads.append(t)
-        logger.info("PG 引擎已启动")
+    scheduler = get_scheduler()
+    if args.once:
+        for name in names:
+            scheduler.register(name, interval=args.interval)
+        for name, signals in scheduler.run_once(names).items():
+            logger.info(f"{name} 检测到 {len(signals)} 个信号")
+        SignalPublisher.flush()  # 回调在订阅者线程中执行，退出前等待投递完毕
+        return
 
-    if not threads:
-        logger.error("请指定要启动的引擎: --sqlite, --pg, 或 --all")
-        sys.exit(1)
+    for name in names:
+        scheduler.enable(name, interval=args.interval)
+        logger.info(f"{name} 数据源已启用")
 
     # 等待
     try:
-        for t in threads:
-            t.join()
+        while True:
+            time.sleep(60)
     except KeyboardInterrupt:
         logger.info("收到中断信号，退出...")
+        scheduler.stop()
+        SignalPublisher.flush(timeout=3)
 
 
 if __name__ == "__main__":
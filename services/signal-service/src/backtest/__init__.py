@@ -0,0 +1,15 @@
+"""
+离线信号回测
+"""
+
+from .runner import DEFAULT_HORIZONS, Backtester, BacktestReport, RuleStats
+from .source import load_candles, load_series
+
+__all__ = [
+    "Backtester",
+    "BacktestReport",
+    "RuleStats",
+    "DEFAULT_HORIZONS",
+    "load_series",
+    "load_candles",
+]
@@ -0,0 +1,229 @@
+"""
+离线信号回测
+把历史指标序列按 SQLiteSignalEngine 的规则集回放（无 sleep、无 IO 等待）：
+- 同一 (表, 币种, 周期) 相邻两根配对为 (prev, curr)，每个 (表, 周期) 的全部配对拼成一个 TableFrame，
+  CompiledRuleSet 一次求值；与线上一致，首根只作基线
+- 窗口规则按时间顺序逐根推进 WindowTracker
+- 冷却按 K 线时间模拟（距上次触发超过 rule.cooldown 才触发），统计被冷却压掉的次数
+- 提供本地 K 线时，计算触发后 N 根（信号周期）的前向收益
+"""
+
+import re
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+import numpy as np
+
+try:
+    from ..rules import ALL_RULES, RULES_BY_TABLE, WINDOW_RULES, SignalRule
+    from ..rules.vector import CompiledRuleSet, TableFrame
+    from ..rules.window import WindowTracker
+except ImportError:
+    from rules import ALL_RULES, RULES_BY_TABLE, WINDOW_RULES, SignalRule
+    from rules.vector import CompiledRuleSet, TableFrame
+    from rules.window import WindowTracker
+
+from .source import BAR_TIME_FIELD, Candles, to_epoch
+
+DEFAULT_HORIZONS = (1, 4, 12)
+_TF_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def timeframe_seconds(timeframe: str) -> int:
+    """周期 -> 秒（5m / 1h / 4h / 1d / 1w）"""
+    m = re.fullmatch(r"(\d+)([mhdw])", timeframe)
+    if not m:
+        raise ValueError(f"无法识别的周期: {timeframe}")
+    return int(m.group(1)) * _TF_UNITS[m.group(2)]
+
+
+@dataclass
+class RuleStats:
+    """单条规则的回测结果"""
+
+    rule: str
+    table: str
+    direction: str
+    hits: int = 0  # 条件成立次数
+    fired: int = 0  # 通过冷却、实际触发次数
+    suppressed: int = 0  # 被冷却压掉的次数
+    symbols: set[str] = field(default_factory=set)
+    returns: dict[int, list[float]] = field(default_factory=dict)  # 前向 N 根 -> 按方向调整后的收益
+
+    def summary(self) -> dict:
+        out = {
+            "rule": self.rule,
+            "table": self.table,
+            "direction": self.direction,
+            "hits": self.hits,
+            "fired": self.fired,
+            "suppressed": self.suppressed,
+            "symbols": len(self.symbols),
+        }
+        for h, rets in sorted(self.returns.items()):
+            arr = np.array(rets, dtype=np.float64)
+            out[f"fwd{h}"] = {
+                "n": len(arr),
+                "mean": round(float(arr.mean()), 6) if len(arr) else None,
+                "win_rate": round(float((arr > 0).mean()), 4) if len(arr) else None,
+            }
+        return out
+
+
+@dataclass
+class BacktestReport:
+    """回测报告：每条规则的触发/冷却/前向收益统计"""
+
+    rules: dict[str, RuleStats]
+    horizons: tuple[int, ...]
+    rows: int = 0  # 参与回放的行数
+    skipped_rows: int = 0  # 缺少交易对/周期/数据时间的行
+    elapsed_ms: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "skipped_rows": self.skipped_rows,
+            "elapsed_ms": self.elapsed_ms,
+            "horizons": list(self.horizons),
+            "rules": [s.summary() for s in sorted(self.rules.values(), key=lambda s: (-s.fired, s.rule))],
+        }
+
+    def format(self) -> str:
+        """文本报表（按触发次数降序；前向收益为按方向调整后的均值与胜率）"""
+        head = f"{'规则':<24} {'方向':<6} {'成立':>7} {'触发':>7} {'冷却':>7}"
+        head += "".join(f" {f'fwd{h} 均值/胜率':>20}" for h in self.horizons)
+        lines = [head]
+        for s in self.to_dict()["rules"]:
+            line = f"{s['rule']:<24} {s['direction']:<6} {s['hits']:>7} {s['fired']:>7} {s['suppressed']:>7}"
+            for h in self.horizons:
+                r = s.get(f"fwd{h}") or {}
+                cell = f"{r['mean'] * 100:+.2f}% / {r['win_rate'] * 100:.0f}%" if r.get("n") else "-"
+                line += f" {cell:>20}"
+            lines.append(line)
+        lines.append(f"共 {self.rows} 行（跳过 {self.skipped_rows}），耗时 {self.elapsed_ms:.0f}ms")
+        return "\n".join(lines)
+
+
+class Backtester:
+    """
+    规则回测器
+
+    Args:
+        rules: 参与回测的规则名（默认与 SQLiteSignalEngine 一致：全部启用的规则，含窗口规则）
+        candles: 本地 K 线（load_candles），为空时不计算前向收益
+        horizons: 前向收益的根数（按信号周期）
+    """
+
+    def __init__(
+        self,
+        rules: Iterable[str] | None = None,
+        candles: Candles | None = None,
+        horizons: Iterable[int] = DEFAULT_HORIZONS,
+    ):
+        known = {r.name: r for r in (*ALL_RULES, *WINDOW_RULES)}
+        if rules is None:
+            self.active = {name for name, r in known.items() if r.enabled}
+        else:
+            self.active = set(rules)
+            unknown = self.active - set(known)
+            if unknown:
+                raise ValueError(f"未知规则: {', '.join(sorted(unknown))}")
+        self.candles = candles or {}
+        self.horizons = tuple(horizons)
+        self._compiled = {table: CompiledRuleSet(rules) for table, rules in RULES_BY_TABLE.items()}
+        self._window_rules = [r for r in WINDOW_RULES if r.name in self.active]
+
+    def run(self, series: dict[str, list[dict]]) -> BacktestReport:
+        """回放 {表名: 历史行}，返回报告"""
+        t0 = time.perf_counter()
+        report = BacktestReport(
+            rules={
+                r.name: RuleStats(r.name, r.table, r.direction)
+                for r in (*ALL_RULES, *WINDOW_RULES)
+                if r.name in self.active
+            },
+            horizons=self.horizons,
+        )
+        windows = WindowTracker(self._window_rules)
+        # (时间, 序号, 表, 周期, 币种, 规则)：序号保证同一时刻先向量规则、后窗口规则（与引擎顺序一致）
+        events: list[tuple] = []
+
+        for table, rows in series.items():
+            compiled = self._compiled.get(table)
+            window_tfs = windows.timeframes(table)
+            timeframes = set(window_tfs)
+            if compiled is not None:
+                timeframes.update(tf for r in compiled.rules if r.name in self.active for tf in r.timeframes)
+            if not timeframes:
+                continue
+
+            # (周期, 币种) -> [(时间, 行)]
+            bars: dict[tuple[str, str], list[tuple[float, dict]]] = {}
+            for row in rows:
+                tf, symbol, ts = row.get("周期"), row.get("交易对"), to_epoch(row.get(BAR_TIME_FIELD))
+                if tf is None or symbol is None or ts is None:
+                    report.skipped_rows += 1
+                    continue
+                if tf in timeframes:
+                    bars.setdefault((tf, symbol), []).append((ts, row))
+                    report.rows += 1
+
+            by_tf: dict[str, list[tuple[str, list[tuple[float, dict]]]]] = {}
+            for (tf, symbol), seq in bars.items():
+                seq.sort(key=lambda x: x[0])
+                by_tf.setdefault(tf, []).append((symbol, seq))
+
+            for tf, groups in by_tf.items():
+                if compiled is not None:
+                    symbols, curr, prev, times = [], [], [], []
+                    for symbol, seq in groups:
+                        for k in range(1, len(seq)):
+                            symbols.append(symbol)
+                            curr.append(seq[k][1])
+                            prev.append(seq[k - 1][1])
+                            times.append(seq[k][0])
+                    frame = TableFrame(symbols, curr, prev)
+                    for i, j in compiled.evaluate(frame, tf, self.active):
+                        events.append((times[i], 0, table, tf, symbols[i], compiled.rules[j]))
+                if tf in window_tfs:
+                    for symbol, seq in groups:
+                        for ts, row in seq:
+                            for _, rule in windows.observe(table, tf, {symbol: row}):
+                                events.append((ts, 1, table, tf, symbol, rule))
+
+        events.sort(key=lambda e: (e[0], e[1]))
+        last_fired: dict[tuple[str, str, str], float] = {}
+        for ts, _, _table, tf, symbol, rule in events:
+            stats = report.rules[rule.name]
+            stats.hits += 1
+            key = (rule.name, symbol, tf)
+            if ts - last_fired.get(key, -np.inf) <= rule.cooldown:
+                stats.suppressed += 1
+                continue
+            last_fired[key] = ts
+            stats.fired += 1
+            stats.symbols.add(symbol)
+            self._forward_returns(stats, rule, symbol, tf, ts)
+
+        report.elapsed_ms = round((time.perf_counter() - t0) * 1000, 1)
+        return report
+
+    def _forward_returns(self, stats: RuleStats, rule: SignalRule, symbol: str, timeframe: str, ts: float):
+        """以不晚于触发时刻的最后一根收盘价为入场价，N 根后同口径为出场价；SELL 取反"""
+        candles = self.candles.get(symbol)
+        if candles is None:
+            return
+        times, closes = candles
+        i = np.searchsorted(times, ts, side="right") - 1
+        if i < 0 or closes[i] == 0:
+            return
+        sign = -1.0 if rule.direction == "SELL" else 1.0
+        step = timeframe_seconds(timeframe)
+        for h in self.horizons:
+            target = ts + h * step
+            if target > times[-1]:
+                continue  # K 线未覆盖到出场时刻
+            j = np.searchsorted(times, target, side="right") - 1
+            stats.returns.setdefault(h, []).append(sign * float(closes[j] / closes[i] - 1))
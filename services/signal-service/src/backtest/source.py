@@ -0,0 +1,98 @@
+"""
+回测数据源
+- 指标序列：与线上指标库同名同列的表，每个 (交易对, 周期) 按数据时间保留多行；
+  SQLite 库文件，或 Parquet（目录下 <表名>.parquet，或单个文件）
+- 本地 K 线：与 market_data.candles_1m 同列（symbol, bucket_ts, close）的表或 Parquet 文件
+"""
+
+import sqlite3
+from collections.abc import Iterable
+from contextlib import closing
+from datetime import UTC, datetime
+from pathlib import Path
+
+import numpy as np
+
+BAR_TIME_FIELD = "数据时间"
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+# K 线：{symbol: (时间戳秒, 收盘价)}，时间升序
+Candles = dict[str, tuple[np.ndarray, np.ndarray]]
+
+
+def to_epoch(value) -> float | None:
+    """数据时间 -> UTC 秒；无时区按 UTC，数值超过 1e12 视为毫秒，无法解析返回 None"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        if value != value:  # NaN
+            return None
+        return value / 1000 if value > 1e12 else float(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=UTC)).timestamp()
+    return None
+
+
+def _open_ro(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path.resolve().as_uri() + "?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _read_parquet(path: Path) -> list[dict]:
+    try:
+        import pandas as pd
+    except ImportError as e:
+        raise ImportError("读取 Parquet 需要安装 pandas 与 pyarrow") from e
+    df = pd.read_parquet(path)
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def load_series(path: str | Path, tables: Iterable[str] | None = None) -> dict[str, list[dict]]:
+    """读取历史指标序列 {表名: 行列表}；tables 为空时读取全部表"""
+    path = Path(path)
+    wanted = set(tables) if tables is not None else None
+    if path.suffix in SQLITE_SUFFIXES:
+        with closing(_open_ro(path)) as conn:
+            names = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+            return {
+                name: [dict(r) for r in conn.execute(f'SELECT * FROM "{name}"')]
+                for name in names
+                if wanted is None or name in wanted
+            }
+    files = sorted(path.glob("*.parquet")) if path.is_dir() else [path]
+    out = {}
+    for file in files:
+        name = file.name.removesuffix(".parquet")
+        if wanted is None or name in wanted:
+            out[name] = _read_parquet(file)
+    return out
+
+
+def _pack(rows: Iterable[tuple]) -> Candles:
+    by_symbol: dict[str, list[tuple[float, float]]] = {}
+    for symbol, ts, close in rows:
+        t = to_epoch(ts)
+        if t is not None and close is not None:
+            by_symbol.setdefault(symbol, []).append((t, float(close)))
+    out = {}
+    for symbol, points in by_symbol.items():
+        points.sort()
+        arr = np.array(points, dtype=np.float64)
+        out[symbol] = (arr[:, 0], arr[:, 1])
+    return out
+
+
+def load_candles(path: str | Path, table: str = "candles_1m") -> Candles:
+    """读取本地 K 线（symbol, bucket_ts, close）"""
+    path = Path(path)
+    if path.suffix in SQLITE_SUFFIXES:
+        with closing(_open_ro(path)) as conn:
+            return _pack(conn.execute(f'SELECT symbol, bucket_ts, close FROM "{table}"'))
+    file = path / f"{table}.parquet" if path.is_dir() else path
+    return _pack((r["symbol"], r["bucket_ts"], r["close"]) for r in _read_parquet(file))
@@ -44,6 +44,14 @@ def get_history_db_path() -> Path:
     return REPO_ROOT / "libs/database/services/signal-service/signal_history.db"
 
 
+def get_window_db_path() -> Path:
+    """获取窗口规则缓冲数据库路径"""
+    env_path = os.environ.get("SIGNAL_WINDOW_DB_PATH")
+    if env_path:
+        return Path(env_path)
+    return REPO_ROOT / "libs/database/services/signal-service/window_state.db"
+
+
 def get_subscription_db_path() -> Path:
     """获取订阅数据库路径"""
     return REPO_ROOT / "libs/database/services/signal-service/signal_subs.db"
@@ -53,7 +61,17 @@ def get_subscription_db_path() -> Path:
 DEFAULT_TIMEFRAMES = ["1h", "4h", "1d"]
 DEFAULT_MIN_VOLUME = 100000
 DEFAULT_CHECK_INTERVAL = 60  # 秒
+# 变更驱动检测：data_version 轮询间隔、写入稳定等待、强制全量检查间隔（秒）
+CHANGE_POLL_INTERVAL = float(os.environ.get("SIGNAL_CHANGE_POLL_INTERVAL", "1"))
+CHANGE_SETTLE_SECONDS = float(os.environ.get("SIGNAL_CHANGE_SETTLE_SECONDS", "2"))
+FULL_SCAN_INTERVAL = int(os.environ.get("SIGNAL_FULL_SCAN_INTERVAL", "900"))
 COOLDOWN_SECONDS = 300  # 同一信号冷却时间
+# 统一调度：同时执行的检测轮上限（SQLite/PG 各自至多一轮在执行）
+SCHEDULER_MAX_WORKERS = int(os.environ.get("SIGNAL_SCHEDULER_WORKERS", "2"))
+# PG 引擎：交易所与查询回看窗口（分钟，超出窗口未更新的币种视为停更、不参与检测）
+PG_EXCHANGE = os.environ.get("SIGNAL_PG_EXCHANGE", "binance_futures_um")
+PG_CANDLE_LOOKBACK_MINUTES = int(os.environ.get("SIGNAL_PG_CANDLE_LOOKBACK_MINUTES", "30"))
+PG_METRIC_LOOKBACK_MINUTES = int(os.environ.get("SIGNAL_PG_METRIC_LOOKBACK_MINUTES", "60"))
 
 # 历史记录配置
 MAX_RETENTION_DAYS = int(os.environ.get("SIGNAL_HISTORY_RETENTION_DAYS", "30"))
@@ -4,6 +4,7 @@
 
 from .base import BaseEngine, Signal
 from .pg_engine import PGSignal, PGSignalEngine, get_pg_engine
+from .scheduler import SignalScheduler, get_scheduler
 from .sqlite_engine import SQLiteSignalEngine, get_sqlite_engine
 
 __all__ = [
@@ -14,4 +15,6 @@ __all__ = [
     "PGSignalEngine",
     "PGSignal",
     "get_pg_engine",
+    "SignalScheduler",
+    "get_scheduler",
 ]
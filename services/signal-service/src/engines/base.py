@@ -61,6 +61,13 @@ class BaseEngine(ABC):
         """检查信号（单次）"""
         pass
 
+    def run_cycle(self) -> list:
+        """单轮检测并触发回调（run_loop 与调度器共用）"""
+        signals = self.check_signals()
+        for signal in signals:
+            self._emit_signal(signal)
+        return signals
+
     @abstractmethod
     def run_loop(self, interval: int = 60):
         """运行检测循环"""
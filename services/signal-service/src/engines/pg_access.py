@@ -0,0 +1,120 @@
+"""
+PG 信号引擎数据访问层
+psycopg3 连接池 + 预编译语句；每轮检测在一次往返（pipeline）内取回各币种最新两根 K 线与期货指标，
+查询带时间下界（只触及最近的 chunk），上一根由库中返回而非依赖内存基线
+"""
+
+from datetime import UTC, datetime, timedelta
+
+CANDLE_COLUMNS = (
+    "bucket_ts", "open", "high", "low", "close", "volume",
+    "quote_volume", "trade_count", "taker_buy_volume", "taker_buy_quote_volume",
+)
+METRIC_COLUMNS = (
+    "create_time", "sum_open_interest", "sum_open_interest_value",
+    "count_toptrader_long_short_ratio", "sum_toptrader_long_short_ratio",
+    "count_long_short_ratio", "sum_taker_long_short_vol_ratio",
+)
+
+# 每个币种沿主键/索引倒序取 2 行（LATERAL ... LIMIT 2），时间下界让 hypertable 只扫描最近的 chunk
+CANDLES_SQL = f"""
+    SELECT s.symbol, c.{", c.".join(CANDLE_COLUMNS)}
+    FROM unnest(%(symbols)s::text[]) AS s(symbol)
+    CROSS JOIN LATERAL (
+        SELECT {", ".join(CANDLE_COLUMNS)}
+        FROM market_data.candles_1m
+        WHERE exchange = %(exchange)s AND symbol = s.symbol AND bucket_ts >= %(since)s
+        ORDER BY bucket_ts DESC
+        LIMIT 2
+    ) c
+"""
+
+# create_time 为 UTC 的 timestamp without time zone，下界按 naive UTC 传入
+METRICS_SQL = f"""
+    SELECT s.symbol, m.{", m.".join(METRIC_COLUMNS)}
+    FROM unnest(%(symbols)s::text[]) AS s(symbol)
+    CROSS JOIN LATERAL (
+        SELECT {", ".join(METRIC_COLUMNS)}
+        FROM market_data.binance_futures_metrics_5m
+        WHERE symbol = s.symbol AND create_time >= %(since)s
+        ORDER BY create_time DESC
+        LIMIT 2
+    ) m
+"""
+
+# 单币种最新/上一根: {symbol: (curr, prev | None)}
+Bars = dict[str, tuple[dict, dict | None]]
+
+
+def _pair_rows(rows, columns: tuple[str, ...]) -> Bars:
+    """查询结果（每个币种按时间倒序至多 2 行）-> {symbol: (curr, prev)}"""
+    result: Bars = {}
+    for row in rows:
+        bar = {"symbol": row[0], **dict(zip(columns, row[1:]))}
+        if row[0] in result:
+            result[row[0]] = (result[row[0]][0], bar)
+        else:
+            result[row[0]] = (bar, None)
+    return result
+
+
+class PGDataAccess:
+    """连接池化的 PG 读取（连接断开由池检测并替换，不再单连接重连）"""
+
+    def __init__(
+        self,
+        db_url: str,
+        exchange: str,
+        candle_lookback: timedelta,
+        metric_lookback: timedelta,
+        pool_min: int = 1,
+        pool_max: int = 2,
+        timeout: float = 10.0,
+    ):
+        self.db_url = db_url
+        self.exchange = exchange
+        self.candle_lookback = candle_lookback
+        self.metric_lookback = metric_lookback
+        self._pool_min = pool_min
+        self._pool_max = pool_max
+        self._timeout = timeout
+        self._pool = None
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            from psycopg_pool import ConnectionPool
+
+            self._pool = ConnectionPool(
+                self.db_url,
+                min_size=self._pool_min,
+                max_size=self._pool_max,
+                timeout=self._timeout,  # 获取连接超时
+                max_idle=300,
+                max_lifetime=3600,
+                check=ConnectionPool.check_connection,  # 取出前探活，避免拿到已断开的连接
+                open=True,
+            )
+        return self._pool
+
+    def fetch_latest(self, symbols: list[str], now: datetime | None = None) -> tuple[Bars, Bars]:
+        """
+        一次往返取回 (K线, 期货指标)，各为 {symbol: (最新, 上一根)}
+
+        两条语句以预编译方式在同一 pipeline 中发送；超出回看窗口（停更）的币种不返回
+        """
+        now = now or datetime.now(UTC)
+        metric_since = (now - self.metric_lookback).astimezone(UTC).replace(tzinfo=None)
+        candle_params = {"symbols": symbols, "exchange": self.exchange, "since": now - self.candle_lookback}
+        metric_params = {"symbols": symbols, "since": metric_since}
+        with self.pool.connection() as conn, conn.pipeline(), conn.cursor() as candles, conn.cursor() as metrics:
+            candles.execute(CANDLES_SQL, candle_params, prepare=True)
+            metrics.execute(METRICS_SQL, metric_params, prepare=True)
+            candle_rows = candles.fetchall()
+            metric_rows = metrics.fetchall()
+        return _pair_rows(candle_rows, CANDLE_COLUMNS), _pair_rows(metric_rows, METRIC_COLUMNS)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
@@ -1,6 +1,7 @@
 """
 基于 TimescaleDB 的信号检测引擎
-直接从 PostgreSQL 读取 candles_1m 和 binance_futures_metrics_5m 数据
+直接从 PostgreSQL 读取 candles_1m 和 binance_futures_metrics_5m 数据（连接池与查询见 pg_access），
+规则为 rules/pg 中的声明式 SignalRule，与 SQLite 规则共用 CompiledRuleSet 求值
 
 解耦改进：
 - 移除 from bot.app import I18N 依赖
@@ -8,20 +9,58 @@
 """
 
 import logging
+import math
 import re
 import threading
 import time
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, timedelta
 
 try:
-    from ..config import COOLDOWN_SECONDS, get_database_url
+    from ..config import (
+        PG_CANDLE_LOOKBACK_MINUTES,
+        PG_EXCHANGE,
+        PG_METRIC_LOOKBACK_MINUTES,
+        get_database_url,
+    )
     from ..events import SignalEvent, SignalPublisher
+    from ..rules.pg import PG_RULES, PG_RULES_BY_TABLE
+    from ..rules.realtime import (
+        CANDLE_TABLE,
+        CROSS_TABLE,
+        METRIC_TABLE,
+        REALTIME_TIMEFRAME,
+        RealtimeRule,
+        derive_candle,
+        derive_metric,
+    )
+    from ..rules.vector import CompiledRuleSet, TableFrame
+    from ..storage.cooldown import CooldownTracker, get_cooldown_tracker
+    from ..storage.history import get_history
 except ImportError:
-    from config import COOLDOWN_SECONDS, get_database_url
+    from config import (
+        PG_CANDLE_LOOKBACK_MINUTES,
+        PG_EXCHANGE,
+        PG_METRIC_LOOKBACK_MINUTES,
+        get_database_url,
+    )
     from events import SignalEvent, SignalPublisher
+    from rules.pg import PG_RULES, PG_RULES_BY_TABLE
+    from rules.realtime import (
+        CANDLE_TABLE,
+        CROSS_TABLE,
+        METRIC_TABLE,
+        REALTIME_TIMEFRAME,
+        RealtimeRule,
+        derive_candle,
+        derive_metric,
+    )
+    from rules.vector import CompiledRuleSet, TableFrame
+    from storage.cooldown import CooldownTracker, get_cooldown_tracker
+    from storage.history import get_history
 
 from .base import BaseEngine
+from .pg_access import Bars, PGDataAccess
 
 logger = logging.getLogger(__name__)
 
@@ -143,448 +182,136 @@ def _get_default_symbols() -> list[str]:
 _DEFAULT_SYMBOLS = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT"]
 
 
-class PGSignalRules:
-    """基于 PG 数据的信号规则集（解耦版：返回 i18n key）"""
-
-    def check_price_surge(self, curr: dict, prev: dict, threshold_pct: float = 3.0) -> PGSignal | None:
-        """价格急涨信号"""
-        if not prev or not curr:
-            return None
-        try:
-            curr_close = float(curr.get("close", 0))
-            prev_close = float(prev.get("close", 0))
-            if prev_close == 0:
-                return None
-            change_pct = (curr_close - prev_close) / prev_close * 100
-            if change_pct >= threshold_pct:
-                return PGSignal(
-                    symbol=curr.get("symbol", ""),
-                    signal_type="price_surge",
-                    direction="BUY",
-                    strength=min(90, int(50 + change_pct * 10)),
-                    message_key="signal.pg.msg.price_surge",
-                    message_params={"pct": f"{change_pct:.2f}"},
-                    price=curr_close,
-                    extra={"change_pct": change_pct},
-                )
-        except Exception as e:
-            logger.warning(f"check_price_surge error: {e}")
-        return None
-
-    def check_price_dump(self, curr: dict, prev: dict, threshold_pct: float = 3.0) -> PGSignal | None:
-        """价格急跌信号"""
-        if not prev or not curr:
-            return None
-        try:
-            curr_close = float(curr.get("close", 0))
-            prev_close = float(prev.get("close", 0))
-            if prev_close == 0:
-                return None
-            change_pct = (curr_close - prev_close) / prev_close * 100
-            if change_pct <= -threshold_pct:
-                return PGSignal(
-                    symbol=curr.get("symbol", ""),
-                    signal_type="price_dump",
-                    direction="SELL",
-                    strength=min(90, int(50 + abs(change_pct) * 10)),
-                    message_key="signal.pg.msg.price_dump",
-                    message_params={"pct": f"{abs(change_pct):.2f}"},
-                    price=curr_close,
-                    extra={"change_pct": change_pct},
-                )
-        except Exception as e:
-            logger.warning(f"check_price_dump error: {e}")
-        return None
-
-    def check_volume_spike(self, curr: dict, prev: dict, multiplier: float = 5.0) -> PGSignal | None:
-        """成交量异常放大信号"""
-        if not prev or not curr:
-            return None
-        try:
-            curr_vol = float(curr.get("quote_volume", 0))
-            prev_vol = float(prev.get("quote_volume", 0))
-            if prev_vol == 0:
-                return None
-            vol_ratio = curr_vol / prev_vol
-            if vol_ratio >= multiplier:
-                return PGSignal(
-                    symbol=curr.get("symbol", ""),
-                    signal_type="volume_spike",
-                    direction="ALERT",
-                    strength=min(85, int(50 + vol_ratio * 5)),
-                    message_key="signal.pg.msg.volume_spike",
-                    message_params={"ratio": f"{vol_ratio:.1f}", "vol": f"{curr_vol / 1e6:.2f}"},
-                    price=float(curr.get("close", 0)),
-                    extra={"vol_ratio": vol_ratio, "quote_volume": curr_vol},
-                )
-        except Exception as e:
-            logger.warning(f"check_volume_spike error: {e}")
-        return None
-
-    def check_taker_buy_dominance(self, curr: dict, threshold: float = 0.7) -> PGSignal | None:
-        """主动买入占比异常高"""
-        if not curr:
-            return None
-        try:
-            taker_buy = float(curr.get("taker_buy_quote_volume", 0))
-            total_vol = float(curr.get("quote_volume", 0))
-            if total_vol == 0:
-                return None
-            buy_ratio = taker_buy / total_vol
-            if buy_ratio >= threshold:
-                return PGSignal(
-                    symbol=curr.get("symbol", ""),
-                    signal_type="taker_buy_dominance",
-                    direction="BUY",
-                    strength=int(60 + buy_ratio * 30),
-                    message_key="signal.pg.msg.taker_buy",
-                    message_params={"pct": f"{buy_ratio * 100:.1f}", "threshold": f"{threshold * 100:.0f}"},
-                    price=float(curr.get("close", 0)),
-                    extra={"buy_ratio": buy_ratio},
-                )
-        except Exception as e:
-            logger.warning(f"check_taker_buy_dominance error: {e}")
-        return None
-
-    def check_taker_sell_dominance(self, curr: dict, threshold: float = 0.7) -> PGSignal | None:
-        """主动卖出占比异常高"""
-        if not curr:
-            return None
-        try:
-            taker_buy = float(curr.get("taker_buy_quote_volume", 0))
-            total_vol = float(curr.get("quote_volume", 0))
-            if total_vol == 0:
-                return None
-            sell_ratio = 1 - taker_buy / total_vol
-            if sell_ratio >= threshold:
-                return PGSignal(
-                    symbol=curr.get("symbol", ""),
-                    signal_type="taker_sell_dominance",
-                    direction="SELL",
-                    strength=int(60 + sell_ratio * 30),
-                    message_key="signal.pg.msg.taker_sell",
-                    message_params={"pct": f"{sell_ratio * 100:.1f}", "threshold": f"{threshold * 100:.0f}"},
-                    price=float(curr.get("close", 0)),
-                    extra={"sell_ratio": sell_ratio},
-                )
-        except Exception as e:
-            logger.warning(f"check_taker_sell_dominance error: {e}")
-        return None
-
-    def check_oi_surge(self, curr: dict, prev: dict, threshold_pct: float = 5.0) -> PGSignal | None:
-        """持仓量急增信号"""
-        if not prev or not curr:
-            return None
-        try:
-            curr_oi = float(curr.get("sum_open_interest_value", 0))
-            prev_oi = float(prev.get("sum_open_interest_value", 0))
-            if prev_oi == 0:
-                return None
-            change_pct = (curr_oi - prev_oi) / prev_oi * 100
-            if change_pct >= threshold_pct:
-                return PGSignal(
-                    symbol=curr.get("symbol", ""),
-                    signal_type="oi_surge",
-                    direction="ALERT",
-                    strength=min(80, int(55 + change_pct * 3)),
-                    message_key="signal.pg.msg.oi_surge",
-                    message_params={"pct": f"{change_pct:.2f}", "oi": f"{curr_oi / 1e9:.2f}"},
-                    extra={"oi_change_pct": change_pct, "oi_value": curr_oi},
-                )
-        except Exception as e:
-            logger.warning(f"check_oi_surge error: {e}")
-        return None
-
-    def check_oi_dump(self, curr: dict, prev: dict, threshold_pct: float = 5.0) -> PGSignal | None:
-        """持仓量急减信号"""
-        if not prev or not curr:
-            return None
-        try:
-            curr_oi = float(curr.get("sum_open_interest_value", 0))
-            prev_oi = float(prev.get("sum_open_interest_value", 0))
-            if prev_oi == 0:
-                return None
-            change_pct = (curr_oi - prev_oi) / prev_oi * 100
-            if change_pct <= -threshold_pct:
-                return PGSignal(
-                    symbol=curr.get("symbol", ""),
-                    signal_type="oi_dump",
-                    direction="ALERT",
-                    strength=min(80, int(55 + abs(change_pct) * 3)),
-                    message_key="signal.pg.msg.oi_dump",
-                    message_params={"pct": f"{abs(change_pct):.2f}", "oi": f"{curr_oi / 1e9:.2f}"},
-                    extra={"oi_change_pct": change_pct, "oi_value": curr_oi},
-                )
-        except Exception as e:
-            logger.warning(f"check_oi_dump error: {e}")
-        return None
-
-    def check_top_trader_extreme_long(self, curr: dict, threshold: float = 3.0) -> PGSignal | None:
-        """大户极度看多"""
-        if not curr:
-            return None
-        try:
-            ratio = float(curr.get("count_toptrader_long_short_ratio", 1))
-            if ratio >= threshold:
-                return PGSignal(
-                    symbol=curr.get("symbol", ""),
-                    signal_type="top_trader_extreme_long",
-                    direction="ALERT",
-                    strength=min(85, int(60 + ratio * 8)),
-                    message_key="signal.pg.msg.top_long",
-                    message_params={"ratio": f"{ratio:.2f}", "threshold": f"{threshold}"},
-                    extra={"top_trader_ratio": ratio},
-                )
-        except Exception as e:
-            logger.warning(f"check_top_trader_extreme_long error: {e}")
-        return None
-
-    def check_top_trader_extreme_short(self, curr: dict, threshold: float = 0.5) -> PGSignal | None:
-        """大户极度看空"""
-        if not curr:
-            return None
-        try:
-            ratio = float(curr.get("count_toptrader_long_short_ratio", 1))
-            if ratio <= threshold:
-                return PGSignal(
-                    symbol=curr.get("symbol", ""),
-                    signal_type="top_trader_extreme_short",
-                    direction="ALERT",
-                    strength=min(85, int(60 + (1 / ratio) * 5)),
-                    message_key="signal.pg.msg.top_short",
-                    message_params={"ratio": f"{ratio:.2f}", "threshold": f"{threshold}"},
-                    extra={"top_trader_ratio": ratio},
-                )
-        except Exception as e:
-            logger.warning(f"check_top_trader_extreme_short error: {e}")
-        return None
-
-    def check_taker_ratio_flip_long(self, curr: dict, prev: dict) -> PGSignal | None:
-        """主动成交多空比翻多"""
-        if not prev or not curr:
-            return None
-        try:
-            curr_ratio = float(curr.get("sum_taker_long_short_vol_ratio", 1))
-            prev_ratio = float(prev.get("sum_taker_long_short_vol_ratio", 1))
-            if prev_ratio < 1.0 and curr_ratio >= 1.2:
-                return PGSignal(
-                    symbol=curr.get("symbol", ""),
-                    signal_type="taker_ratio_flip_long",
-                    direction="BUY",
-                    strength=70,
-                    message_key="signal.pg.msg.taker_flip_long",
-                    message_params={"prev": f"{prev_ratio:.2f}", "curr": f"{curr_ratio:.2f}"},
-                    extra={"prev_ratio": prev_ratio, "curr_ratio": curr_ratio},
-                )
-        except Exception as e:
-            logger.warning(f"check_taker_ratio_flip_long error: {e}")
-        return None
-
-    def check_taker_ratio_flip_short(self, curr: dict, prev: dict) -> PGSignal | None:
-        """主动成交多空比翻空"""
-        if not prev or not curr:
-            return None
-        try:
-            curr_ratio = float(curr.get("sum_taker_long_short_vol_ratio", 1))
-            prev_ratio = float(prev.get("sum_taker_long_short_vol_ratio", 1))
-            if prev_ratio > 1.0 and curr_ratio <= 0.8:
-                return PGSignal(
-                    symbol=curr.get("symbol", ""),
-                    signal_type="taker_ratio_flip_short",
-                    direction="SELL",
-                    strength=70,
-                    message_key="signal.pg.msg.taker_flip_short",
-                    message_params={"prev": f"{prev_ratio:.2f}", "curr": f"{curr_ratio:.2f}"},
-                    extra={"prev_ratio": prev_ratio, "curr_ratio": curr_ratio},
-                )
-        except Exception as e:
-            logger.warning(f"check_taker_ratio_flip_short error: {e}")
-        return None
-
-
 class PGSignalEngine(BaseEngine):
     """基于 TimescaleDB 的信号检测引擎（解耦版）"""
 
-    def __init__(self, db_url: str = None, symbols: list[str] = None):
+    def __init__(self, db_url: str = None, symbols: list[str] = None, cooldowns: CooldownTracker = None):
         super().__init__()
         self.db_url = db_url or get_database_url()
         raw_symbols = symbols or _get_default_symbols()
         self.symbols = _validate_symbols(raw_symbols) if symbols else raw_symbols
 
-        # 状态
-        self.baseline_candles: dict[str, dict] = {}
-        self.baseline_metrics: dict[str, dict] = {}
-        self.cooldowns: dict[str, float] = {}
-        self.cooldown_seconds = COOLDOWN_SECONDS
-        self._conn = None
+        # 状态（上一根由查询返回；这里只记录各币种已检测到的最新时间，同一根不重复检测）
+        self.last_bars: dict[tuple[str, str], datetime] = {}
+        # 单独使用时冷却只在内存；调度器下与 SQLite 引擎共享同一冷却表并持久化
+        self.cooldowns = cooldowns if cooldowns is not None else CooldownTracker()
+        self.enabled_rules: set[str] = {r.name for r in PG_RULES if r.enabled}
+        self._compiled = {table: CompiledRuleSet(rules) for table, rules in PG_RULES_BY_TABLE.items()}
+        self._history = get_history()  # 本轮信号缓冲，轮末一个事务写入
+        self._access = PGDataAccess(
+            self.db_url,
+            exchange=PG_EXCHANGE,
+            candle_lookback=timedelta(minutes=PG_CANDLE_LOOKBACK_MINUTES),
+            metric_lookback=timedelta(minutes=PG_METRIC_LOOKBACK_MINUTES),
+        )
 
         # 统计
-        self.stats = {"checks": 0, "signals": 0, "errors": 0}
-
-    def _get_conn(self):
-        """获取数据库连接"""
-        if self._conn is None or self._conn.closed:
-            try:
-                import psycopg2
+        self.stats = {"checks": 0, "signals": 0, "errors": 0, "last_fetch_ms": 0.0}
 
-                self._conn = psycopg2.connect(self.db_url)
-            except ImportError:
-                logger.error("psycopg2 not installed")
-                return None
-            except Exception as e:
-                logger.error(f"Database connection failed: {e}")
-                return None
-        return self._conn
+    def enable_rule(self, name: str) -> bool:
+        """启用规则"""
+        self.enabled_rules.add(name)
+        return True
 
-    def _is_cooled_down(self, signal_key: str) -> bool:
-        last = self.cooldowns.get(signal_key, 0)
-        return time.time() - last > self.cooldown_seconds
+    def disable_rule(self, name: str) -> bool:
+        """禁用规则"""
+        self.enabled_rules.discard(name)
+        return True
 
-    def _set_cooldown(self, signal_key: str):
-        self.cooldowns[signal_key] = time.time()
-
-    def _fetch_latest_candles(self) -> dict[str, dict]:
-        """获取最新K线数据"""
-        conn = self._get_conn()
-        if not conn:
-            return {}
-
-        result = {}
+    def _fetch_latest(self) -> tuple[Bars, Bars]:
+        """获取各币种最新及上一根 K 线 / 期货指标"""
+        t0 = time.perf_counter()
         try:
-            query = """
-                WITH ranked AS (
-                    SELECT symbol, bucket_ts, open, high, low, close, volume,
-                           quote_volume, trade_count, taker_buy_volume, taker_buy_quote_volume,
-                           ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY bucket_ts DESC) as rn
-                    FROM market_data.candles_1m
-                    WHERE symbol = ANY(%s)
-                )
-                SELECT symbol, bucket_ts, open, high, low, close, volume,
-                       quote_volume, trade_count, taker_buy_volume, taker_buy_quote_volume
-                FROM ranked WHERE rn = 1
-            """
-            with conn.cursor() as cur:
-                cur.execute(query, (self.symbols,))
-                for row in cur.fetchall():
-                    result[row[0]] = {
-                        "symbol": row[0],
-                        "bucket_ts": row[1],
-                        "open": row[2],
-                        "high": row[3],
-                        "low": row[4],
-                        "close": row[5],
-                        "volume": row[6],
-                        "quote_volume": row[7],
-                        "trade_count": row[8],
-                        "taker_buy_volume": row[9],
-                        "taker_buy_quote_volume": row[10],
-                    }
+            return self._access.fetch_latest(self.symbols)
+        except ImportError:
+            logger.error("psycopg / psycopg_pool not installed")
         except Exception as e:
-            logger.error(f"Fetch candles error: {e}")
+            logger.error(f"Fetch latest error: {e}")
             self.stats["errors"] += 1
-        return result
+        finally:
+            self.stats["last_fetch_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        return {}, {}
 
-    def _fetch_latest_metrics(self) -> dict[str, dict]:
-        """获取最新期货指标数据"""
-        conn = self._get_conn()
-        if not conn:
-            return {}
+    def _is_new_bar(self, kind: str, symbol: str, ts) -> bool:
+        """该币种此类数据出现了未检测过的新一根"""
+        return ts is not None and self.last_bars.get((kind, symbol)) != ts
 
-        result = {}
-        try:
-            query = """
-                WITH ranked AS (
-                    SELECT symbol, create_time, sum_open_interest, sum_open_interest_value,
-                           count_toptrader_long_short_ratio, sum_toptrader_long_short_ratio,
-                           count_long_short_ratio, sum_taker_long_short_vol_ratio,
-                           ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY create_time DESC) as rn
-                    FROM market_data.binance_futures_metrics_5m
-                    WHERE symbol = ANY(%s)
-                )
-                SELECT symbol, create_time, sum_open_interest, sum_open_interest_value,
-                       count_toptrader_long_short_ratio, sum_toptrader_long_short_ratio,
-                       count_long_short_ratio, sum_taker_long_short_vol_ratio
-                FROM ranked WHERE rn = 1
-            """
-            with conn.cursor() as cur:
-                cur.execute(query, (self.symbols,))
-                for row in cur.fetchall():
-                    result[row[0]] = {
-                        "symbol": row[0],
-                        "create_time": row[1],
-                        "sum_open_interest": row[2],
-                        "sum_open_interest_value": row[3],
-                        "count_toptrader_long_short_ratio": row[4],
-                        "sum_toptrader_long_short_ratio": row[5],
-                        "count_long_short_ratio": row[6],
-                        "sum_taker_long_short_vol_ratio": row[7],
-                    }
-        except Exception as e:
-            logger.error(f"Fetch metrics error: {e}")
-            self.stats["errors"] += 1
-        return result
+    def _derive_rows(self, candles: Bars, metrics: Bars) -> dict[str, dict[str, tuple[dict, dict | None]]]:
+        """
+        出现新一根的币种 -> 各表派生行 {表: {symbol: (curr, prev)}}
+
+        跨源行为同币种最新 K 线与最新期货指标合并，任一侧出现新一根时求值
+        """
+        rows: dict[str, dict[str, tuple[dict, dict | None]]] = {CANDLE_TABLE: {}, METRIC_TABLE: {}, CROSS_TABLE: {}}
+        for symbol in self.symbols:
+            candle, metric = candles.get(symbol), metrics.get(symbol)
+            derived = {}
+            for kind, table, bars, ts_field, derive in (
+                ("candle", CANDLE_TABLE, candle, "bucket_ts", derive_candle),
+                ("metric", METRIC_TABLE, metric, "create_time", derive_metric),
+            ):
+                if not bars or not bars[0]:
+                    continue
+                curr, prev = bars
+                derived[kind] = (derive(curr, prev), derive(prev, None) if prev else None)
+                if self._is_new_bar(kind, symbol, curr[ts_field]):
+                    rows[table][symbol] = derived[kind]
+                self.last_bars[(kind, symbol)] = curr[ts_field]
+            if len(derived) == 2 and (symbol in rows[CANDLE_TABLE] or symbol in rows[METRIC_TABLE]):
+                (c_curr, c_prev), (m_curr, m_prev) = derived["candle"], derived["metric"]
+                rows[CROSS_TABLE][symbol] = ({**c_curr, **m_curr}, {**c_prev, **m_prev} if c_prev and m_prev else None)
+        return rows
 
     def check_signals(self) -> list[PGSignal]:
-        """检查所有信号"""
+        """检查所有信号：每张表（K 线 / 期货指标 / 跨源）对出现新一根的币种一次性求值"""
         signals = []
         self.stats["checks"] += 1
 
-        candles = self._fetch_latest_candles()
-        metrics = self._fetch_latest_metrics()
-        rules = PGSignalRules()
-
-        for symbol in self.symbols:
-            curr_candle = candles.get(symbol)
-            prev_candle = self.baseline_candles.get(symbol)
-            curr_metric = metrics.get(symbol)
-            prev_metric = self.baseline_metrics.get(symbol)
-
-            if not curr_candle:
+        candles, metrics = self._fetch_latest()
+        for table, rows in self._derive_rows(candles, metrics).items():
+            compiled = self._compiled.get(table)
+            if not rows or compiled is None:
                 continue
-
-            checkers = [
-                (rules.check_price_surge, [curr_candle, prev_candle, 2.0]),
-                (rules.check_price_dump, [curr_candle, prev_candle, 2.0]),
-                (rules.check_volume_spike, [curr_candle, prev_candle, 5.0]),
-                (rules.check_taker_buy_dominance, [curr_candle, 0.7]),
-                (rules.check_taker_sell_dominance, [curr_candle, 0.7]),
-            ]
-
-            if curr_metric:
-                checkers.extend(
-                    [
-                        (rules.check_oi_surge, [curr_metric, prev_metric, 3.0]),
-                        (rules.check_oi_dump, [curr_metric, prev_metric, 3.0]),
-                        (rules.check_top_trader_extreme_long, [curr_metric, 3.0]),
-                        (rules.check_top_trader_extreme_short, [curr_metric, 0.5]),
-                        (rules.check_taker_ratio_flip_long, [curr_metric, prev_metric]),
-                        (rules.check_taker_ratio_flip_short, [curr_metric, prev_metric]),
-                    ]
-                )
-
-            for checker, args in checkers:
+            symbols = list(rows)
+            frame = TableFrame(symbols, [rows[s][0] for s in symbols], [rows[s][1] for s in symbols])
+            for i, j in compiled.evaluate(frame, REALTIME_TIMEFRAME, self.enabled_rules):
                 try:
-                    signal = checker(*args)
-                    if signal:
-                        signal_key = f"{signal.symbol}_{signal.signal_type}"
-                        if self._is_cooled_down(signal_key):
-                            signals.append(signal)
-                            self._set_cooldown(signal_key)
-                            self.stats["signals"] += 1
-                            logger.info(f"PG Signal: {signal.symbol} - {signal.signal_type}")
-
-                            # 发布事件
-                            self._publish_event(signal)
+                    self._fire(compiled.rules[j], frame.curr[i], signals)
                 except Exception as e:
-                    logger.warning(f"Check error: {e}")
+                    logger.warning(f"Check error {compiled.rules[j].name}: {e}")
                     self.stats["errors"] += 1
 
-            self.baseline_candles[symbol] = curr_candle
-            if curr_metric:
-                self.baseline_metrics[symbol] = curr_metric
-
+        self.cooldowns.flush()
+        self._history.flush()
         return signals
 
+    def _fire(self, rule: RealtimeRule, row: dict, signals: list[PGSignal]):
+        """命中的规则 -> 冷却判断、构建信号、记录与发布"""
+        signal_key = f"{row['symbol']}_{rule.name}"
+        if not self.cooldowns.ready(signal_key, rule.cooldown):
+            return
+        price = row.get("close", 0.0)
+        signal = PGSignal(
+            symbol=row["symbol"],
+            signal_type=rule.name,
+            direction=rule.direction,
+            strength=rule.signal_strength(row),
+            message_key=rule.message_key,
+            message_params=rule.message_params(row),
+            timeframe=rule.timeframes[0],
+            price=0.0 if math.isnan(price) else price,
+            # message 为翻译缺失时的回退文本（消费端 _translate_message 使用）
+            extra={**rule.signal_extra(row), "message": rule.fallback_message(row)},
+        )
+        signals.append(signal)
+        self.cooldowns.mark(signal_key)
+        self._history.add(signal, source="pg")
+        self.stats["signals"] += 1
+        logger.info(f"PG Signal: {signal.symbol} - {signal.signal_type}")
+
+        # 发布事件
+        self._publish_event(signal)
+
     def _publish_event(self, signal: PGSignal):
         """发布信号事件"""
         event = SignalEvent(
@@ -609,17 +336,26 @@ class PGSignalEngine(BaseEngine):
 
         while self._running:
             try:
-                signals = self.check_signals()
+                signals = self.run_cycle()
                 if signals:
-                    for signal in signals:
-                        self._emit_signal(signal)
                     logger.info(f"Found {len(signals)} PG signals")
             except Exception as e:
                 logger.error(f"Run loop error: {e}")
             time.sleep(interval)
+        self.close()
+
+    def close(self):
+        """关闭连接池"""
+        self._access.close()
 
     def get_stats(self) -> dict:
-        return {**self.stats, "symbols": len(self.symbols), "cooldowns": len(self.cooldowns)}
+        return {
+            **self.stats,
+            "symbols": len(self.symbols),
+            "cooldowns": len(self.cooldowns),
+            "enabled_rules": len(self.enabled_rules),
+            "publisher": SignalPublisher.stats(),
+        }
 
 
 # 单例
@@ -633,17 +369,13 @@ def get_pg_engine(symbols: list[str] = None) -> PGSignalEngine:
     if _pg_engine is None:
         with _pg_engine_lock:
             if _pg_engine is None:
-                _pg_engine = PGSignalEngine(symbols=symbols)
+                _pg_engine = PGSignalEngine(symbols=symbols, cooldowns=get_cooldown_tracker())
     return _pg_engine
 
 
 def start_pg_signal_loop(interval: int = 60, symbols: list[str] = None):
-    """在后台线程启动 PG 信号检测循环"""
-
-    def run():
-        engine = get_pg_engine(symbols)
-        engine.run_loop(interval=interval)
+    """启用统一调度器中的 PG 数据源（与 SQLite 共用调度线程、线程池与冷却表），返回调度线程"""
+    from .scheduler import get_scheduler
 
-    thread = threading.Thread(target=run, daemon=True, name="PGSignalEngine")
-    thread.start()
-    return thread
+    get_pg_engine(symbols)
+    return get_scheduler().enable("pg", interval)
@@ -0,0 +1,199 @@
+"""
+统一信号调度器
+一个调度线程 + 有界线程池驱动 SQLite 与 PG 两个数据源的检测轮，取代各引擎各自的 run_loop 线程：
+- 同一数据源同一时刻至多一轮在执行（到期时上一轮仍未结束则跳过本次并计数）
+- SQLite 为变更驱动（库有新提交且稳定后提前触发，最长 interval 秒），PG 为固定间隔
+- 两个引擎共用一张冷却表（get_cooldown_tracker）与 SignalPublisher 发布链路，数据源可在运行中启用
+"""
+
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+try:
+    from ..config import CHANGE_POLL_INTERVAL, DEFAULT_CHECK_INTERVAL, SCHEDULER_MAX_WORKERS
+    from ..events import SignalPublisher
+except ImportError:
+    from config import CHANGE_POLL_INTERVAL, DEFAULT_CHECK_INTERVAL, SCHEDULER_MAX_WORKERS
+    from events import SignalPublisher
+
+from .base import BaseEngine
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Source:
+    """一个数据源：引擎 + 调度参数 + 统计"""
+
+    name: str
+    engine: BaseEngine
+    interval: float
+    wake: Callable[[], bool] | None = None  # 非阻塞的提前触发判断（仅在空闲时调用）
+    due: float = 0.0  # 下次到期（monotonic）
+    future: Future | None = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    stats: dict = field(
+        default_factory=lambda: {"cycles": 0, "signals": 0, "errors": 0, "overlaps": 0, "woken": 0, "last_ms": 0.0}
+    )
+
+    @property
+    def busy(self) -> bool:
+        return self.future is not None and not self.future.done()
+
+
+class SignalScheduler:
+    """多数据源信号调度器"""
+
+    def __init__(self, max_workers: int = SCHEDULER_MAX_WORKERS, tick: float = CHANGE_POLL_INTERVAL):
+        self.max_workers = max_workers
+        self.tick = tick
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="SignalCycle")
+        self._sources: dict[str, _Source] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add(self, name: str, engine: BaseEngine, interval: float, wake: Callable[[], bool] | None = None):
+        """注册数据源（已存在时只更新间隔），下一个调度刻即执行首轮"""
+        with self._lock:
+            if name in self._sources:
+                self._sources[name].interval = interval
+                return
+            self._sources[name] = _Source(name, engine, interval, wake)
+        logger.info(f"调度器添加数据源 {name}，间隔 {interval}s")
+
+    def enable(self, name: str, interval: float = DEFAULT_CHECK_INTERVAL) -> threading.Thread:
+        """启用内置数据源并确保调度线程在运行（运行中也可调用）"""
+        self.register(name, interval)
+        return self.start()
+
+    def register(self, name: str, interval: float = DEFAULT_CHECK_INTERVAL):
+        """注册内置数据源（sqlite / pg，引擎为共享冷却表的单例），不启动调度线程"""
+        if name == "sqlite":
+            from .sqlite_engine import get_sqlite_engine
+
+            engine = get_sqlite_engine()
+            self.add(name, engine, interval, wake=engine.has_settled_change)
+        elif name == "pg":
+            from .pg_engine import get_pg_engine
+
+            self.add(name, get_pg_engine(), interval)
+        else:
+            raise ValueError(f"未知数据源: {name}")
+
+    @property
+    def sources(self) -> list[str]:
+        with self._lock:
+            return list(self._sources)
+
+    def start(self) -> threading.Thread:
+        """启动调度线程（已在运行时直接返回）"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, daemon=True, name="SignalScheduler")
+                self._thread.start()
+            return self._thread
+
+    def _run(self):
+        logger.info(f"信号调度器启动，并发上限 {self.max_workers}，数据源: {self.sources}")
+        while not self._stop.is_set():
+            now = time.monotonic()
+            with self._lock:
+                sources = list(self._sources.values())
+            for src in sources:
+                self._maybe_submit(src, now)
+            self._stop.wait(self.tick)
+
+    def _maybe_submit(self, src: _Source, now: float):
+        if now < src.due:
+            if src.busy or src.wake is None:
+                return
+            try:
+                if not src.wake():
+                    return
+            except Exception as e:
+                logger.warning(f"{src.name} 变更检测失败: {e}")
+                return
+            src.stats["woken"] += 1
+        elif src.busy:
+            src.stats["overlaps"] += 1
+            src.due = now + src.interval
+            return
+        src.due = now + src.interval
+        src.future = self._executor.submit(self._cycle, src)
+
+    def _cycle(self, src: _Source) -> list:
+        """执行一轮（同一数据源互斥；异常计数后吞掉，不影响其他数据源）"""
+        if not src.lock.acquire(blocking=False):
+            src.stats["overlaps"] += 1
+            return []
+        t0 = time.perf_counter()
+        try:
+            signals = src.engine.run_cycle()
+            src.stats["signals"] += len(signals)
+            if signals:
+                logger.info(f"{src.name} 本轮检测到 {len(signals)} 个信号")
+            return signals
+        except Exception as e:
+            src.stats["errors"] += 1
+            logger.error(f"{src.name} 检测轮异常: {e}")
+            return []
+        finally:
+            src.stats["cycles"] += 1
+            src.stats["last_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+            src.lock.release()
+
+    def run_once(self, names: Iterable[str] | None = None) -> dict[str, list]:
+        """所有（或指定）数据源各执行一轮（并发，受线程池上限约束），返回 {数据源: 信号}"""
+        with self._lock:
+            sources = [s for s in self._sources.values() if names is None or s.name in set(names)]
+        futures = {s.name: self._executor.submit(self._cycle, s) for s in sources}
+        return {name: f.result() for name, f in futures.items()}
+
+    def stop(self, timeout: float = 10.0):
+        """停止调度，等待进行中的检测轮结束并关闭引擎连接"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            sources = list(self._sources.values())
+        for src in sources:
+            close = getattr(src.engine, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception as e:
+                    logger.warning(f"{src.name} 关闭失败: {e}")
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            sources = list(self._sources.values())
+        return {
+            "sources": {
+                s.name: {**s.stats, "interval": s.interval, "running": s.busy, "engine": s.engine.get_stats()}
+                for s in sources
+            },
+            "max_workers": self.max_workers,
+            "publisher": SignalPublisher.stats(),
+        }
+
+
+# 单例
+_scheduler: SignalScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> SignalScheduler:
+    """获取调度器单例"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = SignalScheduler()
+    return _scheduler
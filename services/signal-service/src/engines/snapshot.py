@@ -0,0 +1,164 @@
+"""
+SQLite 指标库单轮快照
+每轮检测在一个只读事务内按 (表, 周期) 各读取一次，按交易对建索引，
+规则检查与格式化器的跨表查询都从内存返回；ChangeWatcher 与 watermarks 用于跳过未变化的库/切片
+"""
+
+import logging
+import sqlite3
+import threading
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class ReadOnlyPool:
+    """SQLite 只读连接池（mode=ro URI，连接跨轮复用；出错的连接直接丢弃）"""
+
+    def __init__(self, db_path: str, size: int = 2):
+        self.db_path = db_path
+        self.size = size
+        self._idle: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def release(self, conn: sqlite3.Connection, broken: bool = False):
+        with self._lock:
+            if not broken and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            for conn in self._idle:
+                conn.close()
+            self._idle.clear()
+
+
+class Snapshot:
+    """单轮快照：(表, 周期) -> {交易对: 行}，首次访问时读取，本轮内不再查询"""
+
+    def __init__(self, conn: sqlite3.Connection | None, tables: Iterable[str], allowed_symbols: set[str] | None = None):
+        self._conn = conn
+        self.tables = list(tables)
+        self._allowed = allowed_symbols or set()
+        self._data: dict[tuple[str, str], dict[str, dict]] = {}
+        self.reads = 0
+
+    def rows(self, table: str, timeframe: str) -> dict[str, dict]:
+        """表中指定周期（及周期为空）的全部行，按交易对索引（同一交易对后出现的行覆盖前者）"""
+        key = (table, timeframe)
+        if key in self._data:
+            return self._data[key]
+        result: dict[str, dict] = {}
+        if table not in self.tables:
+            logger.warning(f"非法表名: {table}")
+        elif self._conn is not None:
+            try:
+                self.reads += 1
+                cursor = self._conn.execute(f'SELECT * FROM "{table}" WHERE "周期" = ? OR "周期" IS NULL', (timeframe,))
+                for row in cursor:
+                    row_dict = dict(row)
+                    symbol = row_dict.get("交易对", "")
+                    if symbol:
+                        if self._allowed and symbol.upper() not in self._allowed:
+                            continue
+                        result[symbol] = row_dict
+            except sqlite3.Error as e:
+                logger.warning(f"读取表 {table} 失败: {e}")
+        self._data[key] = result
+        return result
+
+    def watermarks(self, table: str) -> dict[str | None, tuple] | None:
+        """
+        各周期水位 {周期: (MAX(数据时间), 行数)}，周期为空的行归入 None
+
+        trading-service 只在该周期出现新 K 线时重算并写入，水位不变即该切片数据未变；
+        表无 数据时间 列或读取失败时返回 None（调用方按已变化处理）
+        """
+        if table not in self.tables or self._conn is None:
+            return None
+        try:
+            # 方括号标识符：列不存在时报错（双引号会被 SQLite 回退为字符串字面量）
+            rows = self._conn.execute(f'SELECT [周期], MAX([数据时间]), COUNT(*) FROM "{table}" GROUP BY [周期]')
+            return {r[0]: (r[1], r[2]) for r in rows}
+        except sqlite3.Error:
+            return None
+
+    def symbol_all_tables(self, symbol: str, timeframe: str) -> dict[str, dict]:
+        """单个币种所有表的数据（每张表每个周期本轮只读取一次）"""
+        result = {}
+        for table in self.tables:
+            row = self.rows(table, timeframe).get(symbol)
+            if row is not None:
+                result[table] = row
+        return result
+
+
+class ChangeWatcher:
+    """
+    库级变更检测：专用只读连接上的 PRAGMA data_version
+
+    同一连接两次读取之间只要有其他连接提交过写入，返回值就不同；库不可用时返回 None
+    """
+
+    def __init__(self, db_path: str):
+        self._pool = ReadOnlyPool(db_path, size=1)
+        self._conn: sqlite3.Connection | None = None
+
+    def version(self) -> int | None:
+        try:
+            if self._conn is None:
+                self._conn = self._pool.acquire()
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            if self._conn is not None:
+                self._pool.release(self._conn, broken=True)
+                self._conn = None
+            return None
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+@contextmanager
+def open_snapshot(
+    pool: ReadOnlyPool, tables: Iterable[str], allowed_symbols: set[str] | None = None
+) -> Iterator[Snapshot]:
+    """在一个读事务内打开快照（各表读取的是同一时刻的 WAL 版本）；库不可用时返回空快照"""
+    conn = None
+    try:
+        conn = pool.acquire()
+        conn.execute("BEGIN")
+    except sqlite3.Error as e:
+        logger.warning(f"打开指标库失败 {pool.db_path}: {e}")
+        if conn is not None:
+            pool.release(conn, broken=True)
+        yield Snapshot(None, tables, allowed_symbols)
+        return
+
+    broken = False
+    try:
+        yield Snapshot(conn, tables, allowed_symbols)
+    finally:
+        try:
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            broken = True
+        pool.release(conn, broken)
@@ -4,24 +4,32 @@ SQLite 信号检测引擎
 """
 
 import logging
-import sqlite3
 import threading
 import time
 from collections.abc import Callable
 
 try:
-    from ..config import get_sqlite_path
+    from ..config import CHANGE_POLL_INTERVAL, CHANGE_SETTLE_SECONDS, FULL_SCAN_INTERVAL, get_sqlite_path
     from ..events import SignalEvent, SignalPublisher
-    from ..rules import ALL_RULES, RULES_BY_TABLE, SignalRule
-    from ..storage.cooldown import get_cooldown_storage
+    from ..rules import ALL_RULES, RULES_BY_TABLE, WINDOW_RULES, SignalRule
+    from ..rules.vector import CompiledRuleSet, TableFrame
+    from ..rules.window import WindowTracker
+    from ..storage.cooldown import CooldownTracker, get_cooldown_storage, get_cooldown_tracker
+    from ..storage.history import get_history
+    from ..storage.window import get_window_storage
 except ImportError:
-    from config import get_sqlite_path
+    from config import CHANGE_POLL_INTERVAL, CHANGE_SETTLE_SECONDS, FULL_SCAN_INTERVAL, get_sqlite_path
     from events import SignalEvent, SignalPublisher
-    from rules import ALL_RULES, RULES_BY_TABLE, SignalRule
-    from storage.cooldown import get_cooldown_storage
+    from rules import ALL_RULES, RULES_BY_TABLE, WINDOW_RULES, SignalRule
+    from rules.vector import CompiledRuleSet, TableFrame
+    from rules.window import WindowTracker
+    from storage.cooldown import CooldownTracker, get_cooldown_storage, get_cooldown_tracker
+    from storage.history import get_history
+    from storage.window import get_window_storage
 
 from .base import BaseEngine, Signal
 from .pg_engine import _get_default_symbols  # 复用统一符号选择
+from .snapshot import ChangeWatcher, ReadOnlyPool, Snapshot, open_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -33,20 +41,48 @@ class SQLiteSignalEngine(BaseEngine):
         self,
         db_path: str = None,
         formatter: Callable = None,
+        cooldowns: CooldownTracker = None,
     ):
         super().__init__()
         self.db_path = db_path or str(get_sqlite_path())
         self.formatter = formatter  # 可选的格式化器
+        self._pool = ReadOnlyPool(self.db_path)
+
+        # 变更驱动：库级 data_version + 切片水位 {(表, 周期): 水位}，未变化的切片不读取不求值
+        self._watcher = ChangeWatcher(self.db_path)
+        self._seen_version: int | None = None
+        self._pending_change: tuple[int, float] | None = None  # (新版本, 首次观察到的时间)
+        self._watermarks: dict[tuple[str, str], tuple] = {}
+        self._last_full_scan = 0.0
+        self._force_scan = False
+        self.full_scan_interval = FULL_SCAN_INTERVAL
 
         # 状态
         self.baseline: dict[str, dict] = {}  # {table_symbol_tf: row_data}
         self.baseline_loaded = False
-        self.enabled_rules: set[str] = {r.name for r in ALL_RULES if r.enabled}
+        self.enabled_rules: set[str] = {r.name for r in (*ALL_RULES, *WINDOW_RULES) if r.enabled}
+
+        # 规则按表编译为列表达式（一次），每轮按 (表, 周期) 对全部币种求掩码
+        self._compiled = {table: CompiledRuleSet(rules) for table, rules in RULES_BY_TABLE.items()}
+        logger.info(
+            "规则向量化: %d/%d（其余逐行求值）",
+            sum(c.vectorized for c in self._compiled.values()),
+            len(ALL_RULES),
+        )
+
+        # 窗口规则：每个 (表, 币种, 周期) 的最近若干根（持久化，重启后回放重建状态）
+        self._windows = WindowTracker(WINDOW_RULES)
+        self._window_storage = get_window_storage()
+        try:
+            self._windows.load(self._window_storage.load_all())
+        except Exception as e:
+            logger.warning(f"加载窗口缓冲失败: {e}")
+        self._tables = list(RULES_BY_TABLE) + [t for t in self._windows.tables if t not in RULES_BY_TABLE]
 
-        # 冷却状态（从持久化存储加载）
-        self._cooldown_storage = get_cooldown_storage()
-        self.cooldown: dict[str, float] = self._cooldown_storage.load_all()
-        logger.info(f"加载 {len(self.cooldown)} 条冷却记录")
+        # 冷却状态（从持久化存储加载；判断只查内存，本轮新增的在轮末一个事务内写回；调度器下与 PG 引擎共享）
+        self.cooldowns = cooldowns if cooldowns is not None else CooldownTracker(get_cooldown_storage())
+        self._history = get_history()
+        logger.info(f"加载 {len(self.cooldowns)} 条冷却记录")
 
         # 符号白名单：与 PG 引擎一致，遵守 SIGNAL_SYMBOLS / SYMBOLS_GROUPS / EXTRA / EXCLUDE
         self.allowed_symbols = set(_get_default_symbols())
@@ -57,11 +93,15 @@ class SQLiteSignalEngine(BaseEngine):
             "checks": 0,
             "signals": 0,
             "errors": 0,
+            "table_reads": 0,
+            "idle_checks": 0,
+            "skipped_slices": 0,
         }
 
     def enable_rule(self, name: str) -> bool:
-        """启用规则"""
+        """启用规则（下一轮全量检查）"""
         self.enabled_rules.add(name)
+        self._force_scan = True
         return True
 
     def disable_rule(self, name: str) -> bool:
@@ -69,146 +109,123 @@ class SQLiteSignalEngine(BaseEngine):
         self.enabled_rules.discard(name)
         return True
 
-    def _get_conn(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+    def snapshot(self):
+        """本轮快照（只读事务；每个 (表, 周期) 读取一次，规则检查与格式化器共用）"""
+        return open_snapshot(self._pool, self._tables, self.allowed_symbols)
 
     def _get_table_data(self, table: str, timeframe: str) -> dict[str, dict]:
         """获取表中指定周期的所有数据"""
-        if table not in RULES_BY_TABLE:
-            logger.warning(f"非法表名: {table}")
-            return {}
-        try:
-            conn = self._get_conn()
-            cursor = conn.cursor()
-            cursor.execute(f'SELECT * FROM "{table}" WHERE "周期" = ? OR "周期" IS NULL', (timeframe,))
-            rows = cursor.fetchall()
-            conn.close()
-
-            result = {}
-            for row in rows:
-                row_dict = dict(row)
-                symbol = row_dict.get("交易对", "")
-                if symbol:
-                    if self.allowed_symbols and symbol.upper() not in self.allowed_symbols:
-                        continue
-                    result[symbol] = row_dict
-            return result
-        except Exception as e:
-            logger.warning(f"读取表 {table} 失败: {e}")
-            return {}
+        with self.snapshot() as snap:
+            return snap.rows(table, timeframe)
 
     def _get_symbol_all_tables(self, symbol: str, timeframe: str) -> dict[str, dict]:
         """获取单个币种所有表的数据"""
-        result = {}
-        for table in RULES_BY_TABLE:
-            data = self._get_table_data(table, timeframe)
-            if symbol in data:
-                result[table] = data[symbol]
-        return result
+        with self.snapshot() as snap:
+            return snap.symbol_all_tables(symbol, timeframe)
 
     def _is_cooled_down(self, rule: SignalRule, symbol: str, timeframe: str) -> bool:
         """检查是否在冷却期"""
-        key = f"{rule.name}_{symbol}_{timeframe}"
-        last = self.cooldown.get(key, 0)
-        return time.time() - last > rule.cooldown
+        return self.cooldowns.ready(f"{rule.name}_{symbol}_{timeframe}", rule.cooldown)
 
     def _set_cooldown(self, rule: SignalRule, symbol: str, timeframe: str):
-        """设置冷却（同时持久化）"""
-        key = f"{rule.name}_{symbol}_{timeframe}"
-        ts = time.time()
-        self.cooldown[key] = ts
-        self._cooldown_storage.set(key, ts)
+        """设置冷却（轮末由 _persist 批量落盘）"""
+        self.cooldowns.mark(f"{rule.name}_{symbol}_{timeframe}")
+
+    def _persist(self):
+        """本轮新增的冷却与信号历史落盘（各一个事务）；失败的冷却留待下一轮重试"""
+        self.cooldowns.flush()
+        try:
+            self._window_storage.save_many(self._windows.dump())
+        except Exception as e:
+            logger.warning(f"窗口缓冲写入失败: {e}")
+        self._history.flush()
 
     def check_signals(self) -> list[Signal]:
-        """检查所有规则"""
+        """
+        检查所有规则
+
+        库自上轮以来无提交（data_version 不变）时直接返回；否则只求值水位前进的 (表, 周期) 切片。
+        每隔 full_scan_interval 秒（或启用规则后）做一次全量检查，兜底未经水位反映的变更。
+        """
+        now = time.time()
+        full = self._force_scan or not self.baseline_loaded or now - self._last_full_scan >= self.full_scan_interval
+        version = self._watcher.version()
+        if not full and version is not None and version == self._seen_version:
+            self.stats["idle_checks"] += 1
+            return []
+        self._seen_version = version
+
+        try:
+            with self.snapshot() as snap:
+                signals = self._check_snapshot(snap, full)
+                self.stats["table_reads"] += snap.reads
+        finally:
+            self._persist()
+        if full:
+            self._last_full_scan = now
+            self._force_scan = False
+        return signals
+
+    def _slice_changed(self, snap: Snapshot, marks: dict | None, table: str, timeframe: str) -> bool:
+        """比较切片水位（周期为空的行对所有周期生效），并记录新水位"""
+        if marks is None:
+            return True
+        mark = (marks.get(timeframe), marks.get(None))
+        key = (table, timeframe)
+        changed = self._watermarks.get(key) != mark
+        self._watermarks[key] = mark
+        return changed
+
+    def _check_snapshot(self, snap: Snapshot, full: bool = True) -> list[Signal]:
         signals = []
         self.stats["checks"] += 1
 
-        for table, rules in RULES_BY_TABLE.items():
-            active_rules = [r for r in rules if r.name in self.enabled_rules]
-            if not active_rules:
+        for table in self._tables:
+            active_rules = [r for r in RULES_BY_TABLE.get(table, []) if r.name in self.enabled_rules]
+            window_tfs = self._windows.timeframes(table, self.enabled_rules)
+            if not active_rules and not window_tfs:
                 continue
 
-            all_timeframes = set()
+            all_timeframes = set(window_tfs)
             for r in active_rules:
                 all_timeframes.update(r.timeframes)
 
+            compiled = self._compiled.get(table)
+            marks = snap.watermarks(table)
             for timeframe in all_timeframes:
-                current_data = self._get_table_data(table, timeframe)
+                if not self._slice_changed(snap, marks, table, timeframe) and not full:
+                    self.stats["skipped_slices"] += 1
+                    continue
+                current_data = snap.rows(table, timeframe)
+
+                # 窗口规则：新 K 线推进环形缓冲（缓冲已从磁盘恢复，首轮也可触发）
+                hits = [
+                    (symbol, rule, self.baseline.get(f"{table}_{symbol}_{timeframe}"), current_data[symbol])
+                    for symbol, rule in self._windows.observe(table, timeframe, current_data, self.enabled_rules)
+                ]
+
+                if not self.baseline_loaded:
+                    for symbol, curr_row in current_data.items():
+                        self.baseline[f"{table}_{symbol}_{timeframe}"] = curr_row
+                    self._fire(snap, table, timeframe, hits, signals)
+                    continue
+
+                if compiled is not None and active_rules:
+                    symbols = list(current_data)
+                    frame = TableFrame(
+                        symbols,
+                        [current_data[s] for s in symbols],
+                        [self.baseline.get(f"{table}_{s}_{timeframe}") for s in symbols],
+                    )
+                    # 只有命中的 (币种, 规则) 进入冷却判断与格式化
+                    hits = [
+                        (symbols[i], compiled.rules[j], frame.prev[i], frame.curr[i])
+                        for i, j in compiled.evaluate(frame, timeframe, self.enabled_rules)
+                    ] + hits
+                self._fire(snap, table, timeframe, hits, signals)
 
                 for symbol, curr_row in current_data.items():
-                    volume = curr_row.get("成交额") or curr_row.get("成交额（USDT）") or 0
-                    cache_key = f"{table}_{symbol}_{timeframe}"
-                    prev_row = self.baseline.get(cache_key)
-
-                    if not self.baseline_loaded:
-                        self.baseline[cache_key] = curr_row
-                        continue
-
-                    for rule in active_rules:
-                        if timeframe not in rule.timeframes:
-                            continue
-                        if volume < rule.min_volume:
-                            continue
-
-                        try:
-                            if rule.check_condition(prev_row, curr_row) and self._is_cooled_down(
-                                rule, symbol, timeframe
-                            ):
-                                price = curr_row.get("当前价格") or curr_row.get("价格") or curr_row.get("收盘价") or 0
-                                rule_msg = rule.format_message(prev_row, curr_row)
-
-                                # 构建信号
-                                signal = Signal(
-                                    symbol=symbol,
-                                    direction=rule.direction,
-                                    strength=rule.strength,
-                                    rule_name=rule.name,
-                                    timeframe=timeframe,
-                                    price=price,
-                                    message=rule_msg,
-                                    category=rule.category,
-                                    subcategory=rule.subcategory,
-                                    table=table,
-                                    priority=rule.priority,
-                                )
-
-                                # 格式化完整消息（如果有格式化器）
-                                if self.formatter:
-                                    curr_all = self._get_symbol_all_tables(symbol, timeframe)
-                                    prev_all = {}
-                                    for t in RULES_BY_TABLE:
-                                        pk = f"{t}_{symbol}_{timeframe}"
-                                        if pk in self.baseline:
-                                            prev_all[t] = self.baseline[pk]
-
-                                    signal.full_message = self.formatter(
-                                        symbol=symbol,
-                                        direction=rule.direction,
-                                        rule_name=rule.name,
-                                        timeframe=timeframe,
-                                        strength=rule.strength,
-                                        curr_data=curr_all,
-                                        prev_data=prev_all,
-                                        rule_message=rule_msg,
-                                    )
-
-                                signals.append(signal)
-                                self._set_cooldown(rule, symbol, timeframe)
-                                self.stats["signals"] += 1
-
-                                logger.info(f"信号触发: {symbol} {rule.direction} - {rule.name} ({timeframe})")
-
-                                # 发布事件
-                                self._publish_event(signal, rule)
-
-                        except Exception as e:
-                            self.stats["errors"] += 1
-                            logger.warning(f"规则检查异常 {rule.name}: {e}")
-
-                    self.baseline[cache_key] = curr_row
+                    self.baseline[f"{table}_{symbol}_{timeframe}"] = curr_row
 
         if not self.baseline_loaded:
             self.baseline_loaded = True
@@ -216,6 +233,77 @@ class SQLiteSignalEngine(BaseEngine):
 
         return signals
 
+    def _fire(self, snap: Snapshot, table: str, timeframe: str, hits: list[tuple], signals: list[Signal]):
+        """命中的 (币种, 规则, prev, curr) -> 冷却判断、构建信号、记录与发布"""
+        for symbol, rule, prev_row, curr_row in hits:
+            try:
+                if not self._is_cooled_down(rule, symbol, timeframe):
+                    continue
+                signal = self._build_signal(snap, table, timeframe, symbol, rule, prev_row, curr_row)
+                signals.append(signal)
+                self._set_cooldown(rule, symbol, timeframe)
+                self._history.add(signal, source="sqlite")
+                self.stats["signals"] += 1
+
+                logger.info(f"信号触发: {symbol} {rule.direction} - {rule.name} ({timeframe})")
+
+                # 发布事件
+                self._publish_event(signal, rule)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"规则检查异常 {rule.name}: {e}")
+
+    def _build_signal(
+        self,
+        snap: Snapshot,
+        table: str,
+        timeframe: str,
+        symbol: str,
+        rule: SignalRule,
+        prev_row: dict | None,
+        curr_row: dict,
+    ) -> Signal:
+        """命中规则 -> 信号（含格式化器生成的完整消息）"""
+        price = curr_row.get("当前价格") or curr_row.get("价格") or curr_row.get("收盘价") or 0
+        rule_msg = rule.format_message(prev_row, curr_row)
+
+        # 构建信号
+        signal = Signal(
+            symbol=symbol,
+            direction=rule.direction,
+            strength=rule.strength,
+            rule_name=rule.name,
+            timeframe=timeframe,
+            price=price,
+            message=rule_msg,
+            category=rule.category,
+            subcategory=rule.subcategory,
+            table=table,
+            priority=rule.priority,
+        )
+
+        # 格式化完整消息（如果有格式化器）
+        if self.formatter:
+            curr_all = snap.symbol_all_tables(symbol, timeframe)
+            prev_all = {}
+            for t in RULES_BY_TABLE:
+                pk = f"{t}_{symbol}_{timeframe}"
+                if pk in self.baseline:
+                    prev_all[t] = self.baseline[pk]
+
+            signal.full_message = self.formatter(
+                symbol=symbol,
+                direction=rule.direction,
+                rule_name=rule.name,
+                timeframe=timeframe,
+                strength=rule.strength,
+                curr_data=curr_all,
+                prev_data=prev_all,
+                rule_message=rule_msg,
+            )
+
+        return signal
+
     def _publish_event(self, signal: Signal, rule: SignalRule):
         """发布信号事件"""
         event = SignalEvent(
@@ -248,24 +336,49 @@ class SQLiteSignalEngine(BaseEngine):
 
         while self._running:
             try:
-                signals = self.check_signals()
+                signals = self.run_cycle()
                 if signals:
-                    for signal in signals:
-                        self._emit_signal(signal)
                     logger.info(f"本轮检测到 {len(signals)} 个信号")
             except Exception as e:
                 logger.error(f"检查循环异常: {e}")
 
-            time.sleep(interval)
+            self._wait_for_change(interval)
+
+    def has_settled_change(self) -> bool:
+        """
+        库有上轮之后的新提交，且已稳定 CHANGE_SETTLE_SECONDS 秒（trading-service 逐表提交）；
+        非阻塞，由 _wait_for_change 与调度器按 CHANGE_POLL_INTERVAL 轮询
+        """
+        version = self._watcher.version()
+        if version is None or version == self._seen_version:
+            self._pending_change = None
+            return False
+        if self._pending_change is None or self._pending_change[0] != version:
+            self._pending_change = (version, time.monotonic())
+            return False
+        return time.monotonic() - self._pending_change[1] >= CHANGE_SETTLE_SECONDS
+
+    def _wait_for_change(self, interval: float):
+        """
+        等待下一轮：库有新提交且稳定后立即返回，最长等待 interval 秒；data_version 不可用时退化为固定间隔
+        """
+        deadline = time.monotonic() + interval
+        self._pending_change = None
+        while self._running and time.monotonic() < deadline:
+            time.sleep(CHANGE_POLL_INTERVAL)
+            if self.has_settled_change():
+                return
 
     def get_stats(self) -> dict:
         """获取统计"""
         return {
             **self.stats,
             "baseline_size": len(self.baseline),
-            "cooldown_size": len(self.cooldown),
+            "cooldown_size": len(self.cooldowns),
             "enabled_rules": len(self.enabled_rules),
-            "total_rules": len(ALL_RULES),
+            "total_rules": len(ALL_RULES) + len(WINDOW_RULES),
+            "window_rings": len(self._windows.rings),
+            "publisher": SignalPublisher.stats(),
         }
 
 
@@ -280,5 +393,5 @@ def get_sqlite_engine() -> SQLiteSignalEngine:
     if _engine is None:
         with _engine_lock:
             if _engine is None:
-                _engine = SQLiteSignalEngine()
+                _engine = SQLiteSignalEngine(cooldowns=get_cooldown_tracker())
     return _engine
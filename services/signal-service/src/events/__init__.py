@@ -2,7 +2,7 @@
 事件系统 - 信号发布与订阅
 """
 
-from .publisher import SignalPublisher
+from .publisher import COALESCE, DROP_NEW, DROP_OLDEST, SignalPublisher
 from .types import SignalEvent
 
-__all__ = ["SignalEvent", "SignalPublisher"]
+__all__ = ["SignalEvent", "SignalPublisher", "DROP_OLDEST", "DROP_NEW", "COALESCE"]
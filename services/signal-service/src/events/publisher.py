@@ -1,14 +1,165 @@
 """
 信号发布器 - 支持回调订阅
+
+每个订阅者一个有界队列 + 专属工作线程，publish 只入队不执行回调：
+慢消费者（Telegram 推送、AI 钩子、历史写入）不会阻塞信号检测循环
 """
 
+import asyncio
 import logging
+import threading
+import time
+import zlib
+from collections import deque
 from collections.abc import Callable
 
 from .types import SignalEvent
 
 logger = logging.getLogger(__name__)
 
+# 队列满时的处理策略
+DROP_OLDEST = "drop_oldest"  # 丢弃最旧的事件（默认）
+DROP_NEW = "drop_new"  # 丢弃新事件
+COALESCE = "coalesce"  # 同一 (币种, 信号, 周期) 只保留最新一条；仍满时丢弃最旧
+POLICIES = (DROP_OLDEST, DROP_NEW, COALESCE)
+
+DEFAULT_QUEUE_SIZE = 1000
+
+
+def _coalesce_key(event: SignalEvent) -> tuple:
+    return (event.symbol, event.signal_type, event.timeframe)
+
+
+class _Lane:
+    """单个工作线程及其队列（同一币种总是进入同一 lane，按发布顺序投递）"""
+
+    def __init__(self, sub: "_Subscriber", index: int):
+        self.sub = sub
+        self.queue: deque[tuple[float, SignalEvent]] = deque()
+        self.busy = False
+        self.closed = False
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True, name=f"SignalSub-{sub.name}-{index}")
+        self.thread.start()
+
+    def offer(self, event: SignalEvent):
+        sub = self.sub
+        with self.cond:
+            if sub.policy == COALESCE:
+                key = _coalesce_key(event)
+                for i, (_, queued) in enumerate(self.queue):
+                    if _coalesce_key(queued) == key:
+                        # 删除旧条目、新事件排到队尾：同币种其他事件的相对顺序不变
+                        del self.queue[i]
+                        sub.count("coalesced")
+                        break
+            if len(self.queue) >= sub.maxsize:
+                sub.count("dropped")
+                if sub.policy == DROP_NEW:
+                    return
+                self.queue.popleft()
+            self.queue.append((time.monotonic(), event))
+            self.cond.notify()
+
+    def _run(self):
+        loop = None
+        while True:
+            with self.cond:
+                while not self.queue and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    break
+                enqueued, event = self.queue.popleft()
+                self.busy = True
+            started = time.monotonic()
+            try:
+                result = self.sub.callback(event)
+                if asyncio.iscoroutine(result):
+                    loop = loop or asyncio.new_event_loop()
+                    loop.run_until_complete(result)
+            except Exception as e:
+                self.sub.count("errors")
+                logger.warning(f"信号回调执行失败 [{self.sub.name}]: {e}")
+            finally:
+                self.sub.record(started - enqueued, time.monotonic() - started)
+                with self.cond:
+                    self.busy = False
+                    self.cond.notify_all()
+        if loop is not None:
+            loop.close()
+
+    def wait_idle(self, deadline: float) -> bool:
+        with self.cond:
+            while self.queue or self.busy:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.cond.wait(remaining)
+        return True
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.queue.clear()
+            self.cond.notify_all()
+
+
+class _Subscriber:
+    """订阅者：按币种哈希分到 workers 个 lane，每个 lane 队列上限 maxsize"""
+
+    def __init__(self, callback: Callable, maxsize: int, policy: str, workers: int):
+        if policy not in POLICIES:
+            raise ValueError(f"未知队列策略: {policy}")
+        self.callback = callback
+        self.name = getattr(callback, "__name__", repr(callback))
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.metrics = {
+            "delivered": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "errors": 0,
+            "last_lag_ms": 0.0,
+            "max_lag_ms": 0.0,
+            "last_handle_ms": 0.0,
+            "max_handle_ms": 0.0,
+        }
+        self._metrics_lock = threading.Lock()
+        self.lanes = [_Lane(self, i) for i in range(max(1, workers))]
+
+    def offer(self, event: SignalEvent):
+        self.lanes[zlib.crc32(event.symbol.encode()) % len(self.lanes)].offer(event)
+
+    def count(self, key: str):
+        with self._metrics_lock:
+            self.metrics[key] += 1
+
+    def record(self, lag: float, handle: float):
+        """lag: 入队到开始处理的等待；handle: 回调耗时"""
+        with self._metrics_lock:
+            m = self.metrics
+            m["delivered"] += 1
+            m["last_lag_ms"] = round(lag * 1000, 2)
+            m["max_lag_ms"] = max(m["max_lag_ms"], m["last_lag_ms"])
+            m["last_handle_ms"] = round(handle * 1000, 2)
+            m["max_handle_ms"] = max(m["max_handle_ms"], m["last_handle_ms"])
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        queued, oldest = 0, 0.0
+        for lane in self.lanes:
+            with lane.cond:
+                queued += len(lane.queue)
+                if lane.queue:
+                    oldest = max(oldest, now - lane.queue[0][0])
+        with self._metrics_lock:
+            metrics = dict(self.metrics)
+        return {**metrics, "queued": queued, "oldest_queued_ms": round(oldest * 1000, 2), "policy": self.policy}
+
+    def close(self):
+        for lane in self.lanes:
+            lane.close()
+
 
 class SignalPublisher:
     """
@@ -18,90 +169,103 @@ class SignalPublisher:
     - signal-service 负责检测并发布事件
     - telegram-service 订阅事件并推送消息
 
-    后续可扩展为 Redis Pub/Sub 等分布式方案
+    publish 只把事件放入各订阅者的有界队列（满时按订阅策略丢弃/合并），回调在订阅者专属线程中执行；
+    同一订阅者内同一币种的事件按发布顺序投递。后续可扩展为 Redis Pub/Sub 等分布式方案
     """
 
-    _callbacks: list[Callable[[SignalEvent], None]] = []
-    _async_callbacks: list[Callable[[SignalEvent], None]] = []
+    _subscribers: dict[Callable, _Subscriber] = {}
+    _lock = threading.Lock()
 
     @classmethod
-    def subscribe(cls, callback: Callable[[SignalEvent], None], is_async: bool = False):
+    def subscribe(
+        cls,
+        callback: Callable[[SignalEvent], None],
+        is_async: bool = False,
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+        policy: str = DROP_OLDEST,
+        workers: int = 1,
+    ):
         """
         订阅信号事件
 
         Args:
-            callback: 回调函数，接收 SignalEvent 参数
-            is_async: 是否为异步回调
+            callback: 回调函数，接收 SignalEvent 参数（协程函数在工作线程的事件循环中执行）
+            is_async: 是否为异步回调（兼容参数，协程回调会被自动识别）
+            maxsize: 每个工作线程的队列上限
+            policy: 队列满时的策略 drop_oldest / drop_new / coalesce
+            workers: 工作线程数（按币种分配，同币种保持顺序）
         """
-        if is_async:
-            if callback not in cls._async_callbacks:
-                cls._async_callbacks.append(callback)
-                logger.info(f"注册异步信号回调: {callback.__name__}")
-        else:
-            if callback not in cls._callbacks:
-                cls._callbacks.append(callback)
-                logger.info(f"注册同步信号回调: {callback.__name__}")
+        with cls._lock:
+            if callback in cls._subscribers:
+                return
+            cls._subscribers[callback] = _Subscriber(callback, maxsize, policy, workers)
+        kind = "异步" if is_async or asyncio.iscoroutinefunction(callback) else "同步"
+        logger.info(f"注册{kind}信号回调: {getattr(callback, '__name__', callback)} (policy={policy}, maxsize={maxsize})")
 
     @classmethod
     def unsubscribe(cls, callback: Callable[[SignalEvent], None]):
-        """取消订阅"""
-        if callback in cls._callbacks:
-            cls._callbacks.remove(callback)
-        if callback in cls._async_callbacks:
-            cls._async_callbacks.remove(callback)
+        """取消订阅（未投递的事件丢弃）"""
+        with cls._lock:
+            sub = cls._subscribers.pop(callback, None)
+        if sub:
+            sub.close()
 
     @classmethod
     def publish(cls, event: SignalEvent):
         """
-        发布信号事件（同步）
+        发布信号事件（只入队，不等待回调）
 
         Args:
             event: 信号事件
         """
         logger.debug(f"发布信号: {event.symbol} {event.direction} - {event.signal_type}")
-
-        for callback in cls._callbacks:
-            try:
-                callback(event)
-            except Exception as e:
-                logger.warning(f"信号回调执行失败 [{callback.__name__}]: {e}")
+        with cls._lock:
+            subscribers = list(cls._subscribers.values())
+        for sub in subscribers:
+            sub.offer(event)
 
     @classmethod
     async def publish_async(cls, event: SignalEvent):
         """
-        发布信号事件（异步）
+        发布信号事件（异步接口，与 publish 相同只入队）
 
         Args:
             event: 信号事件
         """
-        import asyncio
-
-        logger.debug(f"异步发布信号: {event.symbol} {event.direction} - {event.signal_type}")
+        cls.publish(event)
 
-        # 先执行同步回调
-        for callback in cls._callbacks:
-            try:
-                callback(event)
-            except Exception as e:
-                logger.warning(f"信号回调执行失败 [{callback.__name__}]: {e}")
+    @classmethod
+    def flush(cls, timeout: float = 5.0) -> bool:
+        """等待所有队列投递完毕（用于退出前与测试），超时返回 False"""
+        deadline = time.monotonic() + timeout
+        with cls._lock:
+            subscribers = list(cls._subscribers.values())
+        return all(lane.wait_idle(deadline) for sub in subscribers for lane in sub.lanes)
 
-        # 再执行异步回调
-        for callback in cls._async_callbacks:
-            try:
-                if asyncio.iscoroutinefunction(callback):
-                    await callback(event)
-                else:
-                    callback(event)
-            except Exception as e:
-                logger.warning(f"异步信号回调执行失败 [{callback.__name__}]: {e}")
+    @classmethod
+    def stats(cls) -> dict[str, dict]:
+        """各订阅者的投递/丢弃/合并/错误计数、排队长度与延迟（毫秒）"""
+        with cls._lock:
+            subscribers = list(cls._subscribers.values())
+        result: dict[str, dict] = {}
+        for sub in subscribers:
+            name, n = sub.name, 1
+            while name in result:  # 同名回调（如多个 lambda）加序号区分
+                n += 1
+                name = f"{sub.name}#{n}"
+            result[name] = sub.snapshot()
+        return result
 
     @classmethod
     def clear(cls):
         """清除所有订阅（用于测试）"""
-        cls._callbacks.clear()
-        cls._async_callbacks.clear()
+        with cls._lock:
+            subscribers = list(cls._subscribers.values())
+            cls._subscribers.clear()
+        for sub in subscribers:
+            sub.close()
 
     @classmethod
     def subscriber_count(cls) -> int:
         """返回订阅者数量"""
-        return len(cls._callbacks) + len(cls._async_callbacks)
+        return len(cls._subscribers)
@@ -8,6 +8,7 @@ from .core import CORE_RULES
 from .futures import FUTURES_RULES
 from .misc import MISC_RULES
 from .momentum import MOMENTUM_RULES
+from .multibar import WINDOW_RULES
 from .pattern import PATTERN_RULES
 from .trend import TREND_RULES
 from .volatility import VOLATILITY_RULES
@@ -44,6 +45,11 @@ for rule in ALL_RULES:
         RULES_BY_TABLE[rule.table] = []
     RULES_BY_TABLE[rule.table].append(rule)
 
+# 窗口规则（多根 K 线，由 WindowTracker 求值，不参与逐表向量化）
+WINDOW_RULES_BY_TABLE: dict[str, list[SignalRule]] = {}
+for rule in WINDOW_RULES:
+    WINDOW_RULES_BY_TABLE.setdefault(rule.table, []).append(rule)
+
 # 统计
 RULE_COUNT = len(ALL_RULES)
 TABLE_COUNT = len(RULES_BY_TABLE)
@@ -56,4 +62,6 @@ __all__ = [
     "RULES_BY_TABLE",
     "RULE_COUNT",
     "TABLE_COUNT",
+    "WINDOW_RULES",
+    "WINDOW_RULES_BY_TABLE",
 ]
@@ -3,6 +3,7 @@
 """
 
 import logging
+import math
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Any
@@ -21,7 +22,10 @@ class ConditionType(Enum):
     CONTAINS = "contains"  # 字符串包含
     RANGE_ENTER = "range_enter"  # 进入区间
     RANGE_EXIT = "range_exit"  # 离开区间
+    ABOVE = "above"  # 当前值不低于阈值（电平条件，不要求 prev）
+    BELOW = "below"  # 当前值不高于阈值
     CUSTOM = "custom"  # 自定义lambda
+    WINDOW = "window"  # 多根窗口条件（见 rules/window.py，由 WindowTracker 求值）
 
 
 @dataclass
@@ -136,6 +140,14 @@ class SignalRule:
                 curr_in = min_v <= curr_val <= max_v
                 return prev_in and not curr_in
 
+            elif ct in (ConditionType.ABOVE, ConditionType.BELOW):
+                fld = cfg.get("field", "")
+                threshold = cfg.get("threshold", 0)
+                val = curr.get(fld)
+                if not isinstance(val, (int, float)) or math.isnan(val):
+                    return False
+                return val >= threshold if ct == ConditionType.ABOVE else val <= threshold
+
             elif ct == ConditionType.CUSTOM:
                 func = cfg.get("func")
                 if callable(func):
@@ -0,0 +1,60 @@
+"""
+多根窗口类规则（连续 N 根、K 根内穿越、z 分数），由 WindowTracker 增量求值
+"""
+
+from ..window import All, Bar, Consecutive, Within, ZScore, window_rule
+
+WINDOW_RULES = [
+    window_rule(
+        name="RSI连续3根超买",
+        table="智能RSI扫描器.py",
+        window=Consecutive(Bar("RSI14", ">", 70), 3),
+        direction="SELL",
+        strength=65,
+        category="momentum",
+        message_template="RSI14 连续 3 根高于 70: {rsi14:.1f}",
+        fields={"rsi14": "RSI14"},
+    ),
+    window_rule(
+        name="RSI连续3根超卖",
+        table="智能RSI扫描器.py",
+        window=Consecutive(Bar("RSI14", "<", 30), 3),
+        direction="BUY",
+        strength=65,
+        category="momentum",
+        message_template="RSI14 连续 3 根低于 30: {rsi14:.1f}",
+        fields={"rsi14": "RSI14"},
+    ),
+    window_rule(
+        name="MACD金叉后上穿零轴",
+        table="MACD柱状扫描器.py",
+        window=All((Within(Bar("DIF", "cross_above", other="DEA"), 5), Bar("DIF", "cross_above", 0))),
+        direction="BUY",
+        strength=75,
+        priority="high",
+        category="trend",
+        message_template="MACD 金叉后 5 根内 DIF 上穿零轴: DIF={dif:.4f}",
+        fields={"dif": "DIF"},
+    ),
+    window_rule(
+        name="MACD死叉后下穿零轴",
+        table="MACD柱状扫描器.py",
+        window=All((Within(Bar("DIF", "cross_below", other="DEA"), 5), Bar("DIF", "cross_below", 0))),
+        direction="SELL",
+        strength=75,
+        priority="high",
+        category="trend",
+        message_template="MACD 死叉后 5 根内 DIF 下穿零轴: DIF={dif:.4f}",
+        fields={"dif": "DIF"},
+    ),
+    window_rule(
+        name="成交额Z分数异常放大",
+        table="基础数据同步器.py",
+        window=ZScore("成交额", 20, 3.0),
+        direction="ALERT",
+        strength=70,
+        category="volume",
+        message_template="成交额显著高于近 20 根均值(z≥3): {vol:,.0f}",
+        fields={"vol": "成交额"},
+    ),
+]
@@ -0,0 +1,169 @@
+"""
+PG 实时规则（candles_1m / binance_futures_metrics_5m 最新两根，字段见 rules/realtime.py 的派生行）
+阈值、强度公式与消息参数与原 PGSignalRules 的检查方法一致；跨源规则在同币种 K 线 + 期货指标的合并行上求值
+"""
+
+from ..base import ConditionType
+from ..realtime import CANDLE_TABLE, CROSS_TABLE, METRIC_TABLE, level, realtime_rule
+
+PG_RULES = [
+    # ==================== K 线 ====================
+    realtime_rule(
+        name="price_surge",
+        table=CANDLE_TABLE,
+        condition=level("close_pct", ">=", 2.0),
+        direction="BUY",
+        strength=50,
+        strength_from=("close_pct", 50, 10, 90),
+        message_key="signal.pg.msg.price_surge",
+        message_template="🚀 价格急涨! 5分钟涨幅 {pct}%",
+        params={"pct": ("close_pct", ".2f", 1)},
+        extra_fields={"change_pct": "close_pct"},
+    ),
+    realtime_rule(
+        name="price_dump",
+        table=CANDLE_TABLE,
+        condition=level("close_pct", "<=", -2.0),
+        direction="SELL",
+        strength=50,
+        strength_from=("close_pct", 50, 10, 90),
+        message_key="signal.pg.msg.price_dump",
+        message_template="💥 价格急跌! 5分钟跌幅 {pct}%",
+        params={"pct": ("close_pct", ".2f", -1)},
+        extra_fields={"change_pct": "close_pct"},
+    ),
+    realtime_rule(
+        name="volume_spike",
+        table=CANDLE_TABLE,
+        condition=level("volume_ratio", ">=", 5.0),
+        direction="ALERT",
+        strength=50,
+        strength_from=("volume_ratio", 50, 5, 85),
+        message_key="signal.pg.msg.volume_spike",
+        message_template="📊 成交量暴增! {ratio}倍 ({vol}M)",
+        params={"ratio": ("volume_ratio", ".1f", 1), "vol": ("quote_volume", ".2f", 1e-6)},
+        extra_fields={"vol_ratio": "volume_ratio", "quote_volume": "quote_volume"},
+    ),
+    realtime_rule(
+        name="taker_buy_dominance",
+        table=CANDLE_TABLE,
+        condition=level("taker_buy_ratio", ">=", 0.7),
+        direction="BUY",
+        strength=60,
+        strength_from=("taker_buy_ratio", 60, 30, 100),
+        message_key="signal.pg.msg.taker_buy",
+        message_template="🟢 主动买入占比 {pct}% (>{threshold}%)",
+        params={"pct": ("taker_buy_ratio", ".1f", 100), "threshold": "70"},
+        extra_fields={"buy_ratio": "taker_buy_ratio"},
+    ),
+    realtime_rule(
+        name="taker_sell_dominance",
+        table=CANDLE_TABLE,
+        condition=level("taker_sell_ratio", ">=", 0.7),
+        direction="SELL",
+        strength=60,
+        strength_from=("taker_sell_ratio", 60, 30, 100),
+        message_key="signal.pg.msg.taker_sell",
+        message_template="🔴 主动卖出占比 {pct}% (>{threshold}%)",
+        params={"pct": ("taker_sell_ratio", ".1f", 100), "threshold": "70"},
+        extra_fields={"sell_ratio": "taker_sell_ratio"},
+    ),
+    # ==================== 期货指标 ====================
+    realtime_rule(
+        name="oi_surge",
+        table=METRIC_TABLE,
+        condition=level("oi_pct", ">=", 3.0),
+        direction="ALERT",
+        strength=55,
+        strength_from=("oi_pct", 55, 3, 80),
+        message_key="signal.pg.msg.oi_surge",
+        message_template="📈 持仓量急增! 5分钟增加 {pct}% (${oi}B)",
+        params={"pct": ("oi_pct", ".2f", 1), "oi": ("oi_value", ".2f", 1e-9)},
+        extra_fields={"oi_change_pct": "oi_pct", "oi_value": "oi_value"},
+    ),
+    realtime_rule(
+        name="oi_dump",
+        table=METRIC_TABLE,
+        condition=level("oi_pct", "<=", -3.0),
+        direction="ALERT",
+        strength=55,
+        strength_from=("oi_pct", 55, 3, 80),
+        message_key="signal.pg.msg.oi_dump",
+        message_template="📉 持仓量急减! 5分钟减少 {pct}% (${oi}B)",
+        params={"pct": ("oi_pct", ".2f", -1), "oi": ("oi_value", ".2f", 1e-9)},
+        extra_fields={"oi_change_pct": "oi_pct", "oi_value": "oi_value"},
+    ),
+    realtime_rule(
+        name="top_trader_extreme_long",
+        table=METRIC_TABLE,
+        condition=level("top_ratio", ">=", 3.0),
+        direction="ALERT",
+        strength=60,
+        strength_from=("top_ratio", 60, 8, 85),
+        message_key="signal.pg.msg.top_long",
+        message_template="⚠️ 大户极度看多! 多空比 {ratio} (>{threshold})",
+        params={"ratio": ("top_ratio", ".2f", 1), "threshold": "3.0"},
+        extra_fields={"top_trader_ratio": "top_ratio"},
+    ),
+    realtime_rule(
+        name="top_trader_extreme_short",
+        table=METRIC_TABLE,
+        condition=level("top_ratio", "<=", 0.5),
+        direction="ALERT",
+        strength=60,
+        strength_from=("top_ratio_inv", 60, 5, 85),
+        message_key="signal.pg.msg.top_short",
+        message_template="⚠️ 大户极度看空! 多空比 {ratio} (<{threshold})",
+        params={"ratio": ("top_ratio", ".2f", 1), "threshold": "0.5"},
+        extra_fields={"top_trader_ratio": "top_ratio"},
+    ),
+    realtime_rule(
+        name="taker_ratio_flip_long",
+        table=METRIC_TABLE,
+        condition=(
+            ConditionType.CUSTOM,
+            {"func": lambda prev, curr: curr["prev_taker_ratio"] < 1.0 and curr["taker_ratio"] >= 1.2},
+        ),
+        direction="BUY",
+        strength=70,
+        message_key="signal.pg.msg.taker_flip_long",
+        message_template="🔄 主动成交翻多! {prev} → {curr}",
+        params={"prev": ("prev_taker_ratio", ".2f", 1), "curr": ("taker_ratio", ".2f", 1)},
+        extra_fields={"prev_ratio": "prev_taker_ratio", "curr_ratio": "taker_ratio"},
+    ),
+    realtime_rule(
+        name="taker_ratio_flip_short",
+        table=METRIC_TABLE,
+        condition=(
+            ConditionType.CUSTOM,
+            {"func": lambda prev, curr: curr["prev_taker_ratio"] > 1.0 and curr["taker_ratio"] <= 0.8},
+        ),
+        direction="SELL",
+        strength=70,
+        message_key="signal.pg.msg.taker_flip_short",
+        message_template="🔄 主动成交翻空! {prev} → {curr}",
+        params={"prev": ("prev_taker_ratio", ".2f", 1), "curr": ("taker_ratio", ".2f", 1)},
+        extra_fields={"prev_ratio": "prev_taker_ratio", "curr_ratio": "taker_ratio"},
+    ),
+    # ==================== 跨源 ====================
+    realtime_rule(
+        name="price_oi_surge",
+        table=CROSS_TABLE,
+        condition=(
+            ConditionType.CUSTOM,
+            {"func": lambda prev, curr: curr["close_pct"] >= 2.0 and curr["oi_pct"] >= 3.0},
+        ),
+        direction="BUY",
+        strength=60,
+        strength_from=("oi_pct", 60, 3, 90),
+        priority="high",
+        message_key="signal.pg.msg.price_oi_surge",
+        message_template="🚀 价格与持仓同步急增! 涨幅 {pct}%，持仓增加 {oi_pct}%",
+        params={"pct": ("close_pct", ".2f", 1), "oi_pct": ("oi_pct", ".2f", 1)},
+        extra_fields={"change_pct": "close_pct", "oi_change_pct": "oi_pct", "oi_value": "oi_value"},
+    ),
+]
+
+PG_RULES_BY_TABLE: dict[str, list] = {}
+for rule in PG_RULES:
+    PG_RULES_BY_TABLE.setdefault(rule.table, []).append(rule)
@@ -0,0 +1,139 @@
+"""
+实时（PG）规则定义
+candles_1m / binance_futures_metrics_5m 各币种最新两根，求值前由 derive_* 换算为派生行
+（涨跌幅、量比、主动买卖占比、持仓变化等，全部为 float，无法计算时为 NaN，任何条件都不成立）；
+条件沿用 SignalRule 的条件类型，与 SQLite 规则共用 CompiledRuleSet 求值；
+消息为 i18n key + 参数（由消费端翻译），强度可随触发值变化
+"""
+
+from dataclasses import dataclass, field
+
+from .base import ConditionType, SignalRule
+
+CANDLE_TABLE = "candles_1m"
+METRIC_TABLE = "binance_futures_metrics_5m"
+CROSS_TABLE = "candles_1m+metrics_5m"  # 跨源：同币种最新 K 线与最新期货指标合并为一行
+REALTIME_TIMEFRAME = "5m"
+
+NAN = float("nan")
+
+# 消息参数: 参数名 -> 字面量，或 (字段, 格式, 倍数)
+Param = str | tuple[str, str, float]
+
+
+def _num(row: dict | None, key: str) -> float:
+    """PG 数值（可能为 Decimal/None）-> float，缺失为 NaN"""
+    v = (row or {}).get(key)
+    try:
+        return NAN if v is None else float(v)
+    except (TypeError, ValueError):
+        return NAN
+
+
+def _ratio(a: float, b: float) -> float:
+    return a / b if b else NAN
+
+
+def _pct(curr: float, prev: float) -> float:
+    return (curr - prev) / prev * 100 if prev else NAN
+
+
+def derive_candle(curr: dict, prev: dict | None) -> dict:
+    """K 线派生行（prev 为 None 时与上一根相关的字段为 NaN）"""
+    close, quote_volume = _num(curr, "close"), _num(curr, "quote_volume")
+    buy_ratio = _ratio(_num(curr, "taker_buy_quote_volume"), quote_volume)
+    return {
+        "symbol": curr.get("symbol", ""),
+        "close": close,
+        "quote_volume": quote_volume,
+        "close_pct": _pct(close, _num(prev, "close")),
+        "volume_ratio": _ratio(quote_volume, _num(prev, "quote_volume")),
+        "taker_buy_ratio": buy_ratio,
+        "taker_sell_ratio": 1 - buy_ratio,
+    }
+
+
+def derive_metric(curr: dict, prev: dict | None) -> dict:
+    """期货指标派生行（大户多空比的倒数供极度看空的强度使用）"""
+    oi_value, top_ratio = _num(curr, "sum_open_interest_value"), _num(curr, "count_toptrader_long_short_ratio")
+    return {
+        "symbol": curr.get("symbol", ""),
+        "oi_value": oi_value,
+        "oi_pct": _pct(oi_value, _num(prev, "sum_open_interest_value")),
+        "top_ratio": top_ratio,
+        "top_ratio_inv": _ratio(1.0, top_ratio),
+        "taker_ratio": _num(curr, "sum_taker_long_short_vol_ratio"),
+        "prev_taker_ratio": _num(prev, "sum_taker_long_short_vol_ratio"),
+    }
+
+
+@dataclass
+class RealtimeRule(SignalRule):
+    """实时规则：在 SignalRule 基础上携带 i18n 消息参数、动态强度与 extra 字段"""
+
+    message_key: str = ""
+    params: dict[str, Param] = field(default_factory=dict)
+    strength_from: tuple[str, float, float, int] | None = None  # (字段, 基数, 斜率, 上限)：min(上限, 基数 + |值| × 斜率)
+    extra_fields: dict[str, str] = field(default_factory=dict)  # extra 键 -> 字段
+
+    def signal_strength(self, row: dict) -> int:
+        if not self.strength_from:
+            return self.strength
+        fld, base, slope, cap = self.strength_from
+        return min(cap, int(base + abs(row[fld]) * slope))
+
+    def message_params(self, row: dict) -> dict[str, str]:
+        result = {}
+        for name, spec in self.params.items():
+            if isinstance(spec, str):
+                result[name] = spec
+            else:
+                fld, fmt, scale = spec
+                result[name] = format(row[fld] * scale, fmt)
+        return result
+
+    def signal_extra(self, row: dict) -> dict:
+        return {key: row[fld] for key, fld in self.extra_fields.items()}
+
+    def fallback_message(self, row: dict) -> str:
+        """翻译缺失时的回退文本（message_template 按消息参数格式化）"""
+        try:
+            return self.message_template.format(**self.message_params(row))
+        except (KeyError, ValueError):
+            return self.message_template
+
+
+def level(fld: str, op: str, threshold: float) -> tuple[ConditionType, dict]:
+    """电平条件简写: level("close_pct", ">=", 2.0)"""
+    return (ConditionType.ABOVE if op == ">=" else ConditionType.BELOW), {"field": fld, "threshold": threshold}
+
+
+def realtime_rule(
+    name: str,
+    table: str,
+    condition: tuple[ConditionType, dict],
+    direction: str,
+    strength: int,
+    message_key: str,
+    message_template: str,
+    **kwargs,
+) -> RealtimeRule:
+    """实时规则构造（周期 5m、冷却 300 秒与原 PG 引擎一致；成交额口径不同，不设 min_volume）"""
+    condition_type, condition_config = condition
+    return RealtimeRule(
+        name=name,
+        table=table,
+        category=kwargs.pop("category", "realtime"),
+        subcategory=kwargs.pop("subcategory", name),
+        direction=direction,
+        strength=strength,
+        timeframes=[REALTIME_TIMEFRAME],
+        cooldown=kwargs.pop("cooldown", 300),
+        min_volume=0,
+        condition_type=condition_type,
+        condition_config=condition_config,
+        message_key=message_key,
+        message_template=message_template,
+        **kwargs,
+    )
+
@@ -0,0 +1,206 @@
+"""
+规则向量化求值
+把声明式规则（阈值穿越/电平/双线交叉/状态变化/字符串包含/区间进出）编译为列表达式，
+按 (表, 周期) 对全部币种一次性计算布尔掩码；CUSTOM 规则与非数值行回退到 SignalRule.check_condition
+"""
+
+import math
+from collections.abc import Callable, Sequence
+
+import numpy as np
+
+from .base import ConditionType, SignalRule
+
+# 掩码函数: frame -> (命中, 需逐行回退)
+MaskFn = Callable[["TableFrame"], tuple[np.ndarray, np.ndarray]]
+
+
+def _is_number(v) -> bool:
+    return isinstance(v, (int, float)) and not (isinstance(v, float) and math.isnan(v))
+
+
+def _numeric(raw: list) -> tuple[np.ndarray, np.ndarray]:
+    """Python 值列表 -> (float64 值, 是否为数值)；全为 int/float 时走 numpy 整列转换"""
+    if set(map(type, raw)) <= {int, float}:
+        vals = np.array(raw, dtype=np.float64).reshape(len(raw))
+        return vals, ~np.isnan(vals)
+    valid = np.fromiter((_is_number(v) for v in raw), dtype=bool, count=len(raw))
+    vals = np.zeros(len(raw), dtype=np.float64)
+    if valid.any():
+        vals[valid] = [v for v, ok in zip(raw, valid) if ok]
+    return vals, valid
+
+
+class TableFrame:
+    """单个 (表, 周期) 的列式快照：curr/prev 行按同一币种顺序对齐，列按需构建并缓存"""
+
+    def __init__(self, symbols: Sequence[str], curr: Sequence[dict], prev: Sequence[dict | None]):
+        self.symbols = list(symbols)
+        self.curr = list(curr)
+        self.prev = list(prev)
+        self.n = len(self.symbols)
+        self.has_prev = np.fromiter((bool(p) for p in self.prev), dtype=bool, count=self.n)
+        self._num: dict[tuple[str, str], tuple[np.ndarray, np.ndarray]] = {}
+        self._str: dict[tuple[str, str], np.ndarray] = {}
+
+    def _rows(self, side: str) -> list[dict]:
+        return self.curr if side == "curr" else [p or {} for p in self.prev]
+
+    def num(self, side: str, field: str) -> tuple[np.ndarray, np.ndarray]:
+        """数值列（row.get(field, 0) or 0 口径）-> (float64 值, 是否为数值)"""
+        key = (side, field)
+        if key not in self._num:
+            self._num[key] = _numeric([r.get(field, 0) or 0 for r in self._rows(side)])
+        return self._num[key]
+
+    def text(self, side: str, field: str) -> np.ndarray:
+        """字符串列（str(row.get(field, "")) 口径）"""
+        key = (side, field)
+        if key not in self._str:
+            self._str[key] = np.array([str(r.get(field, "")) for r in self._rows(side)], dtype=str).reshape(self.n)
+        return self._str[key]
+
+    def volume(self) -> np.ndarray:
+        """成交额（成交额 / 成交额（USDT）），非数值视为 0"""
+        vals, valid = _numeric([r.get("成交额") or r.get("成交额（USDT）") or 0 for r in self.curr])
+        return np.where(valid, vals, 0.0)
+
+
+def _none(frame: TableFrame) -> np.ndarray:
+    return np.zeros(frame.n, dtype=bool)
+
+
+def _threshold(field: str, threshold: float, up: bool) -> MaskFn:
+    def mask(frame: TableFrame):
+        p, pv = frame.num("prev", field)
+        c, cv = frame.num("curr", field)
+        ok = frame.has_prev & pv & cv
+        hit = (p <= threshold) & (threshold < c) if up else (p >= threshold) & (threshold > c)
+        return ok & hit, frame.has_prev & ~(pv & cv)
+
+    return mask
+
+
+def _level(field: str, threshold: float, above: bool) -> MaskFn:
+    def mask(frame: TableFrame):
+        c, cv = frame.num("curr", field)
+        # num 把缺失/None 记为 0，而逐行口径下缺失不成立：值为 0 的行交回逐行判断
+        zero = c == 0
+        hit = c >= threshold if above else c <= threshold
+        return cv & ~zero & hit, ~cv | zero
+
+    return mask
+
+
+def _line_cross(fa: str, fb: str, up: bool) -> MaskFn:
+    def mask(frame: TableFrame):
+        pa, pav = frame.num("prev", fa)
+        pb, pbv = frame.num("prev", fb)
+        ca, cav = frame.num("curr", fa)
+        cb, cbv = frame.num("curr", fb)
+        valid = pav & pbv & cav & cbv
+        hit = (pa <= pb) & (ca > cb) if up else (pa >= pb) & (ca < cb)
+        return frame.has_prev & valid & hit, frame.has_prev & ~valid
+
+    return mask
+
+
+def _range(field: str, lo: float, hi: float, enter: bool) -> MaskFn:
+    def mask(frame: TableFrame):
+        p, pv = frame.num("prev", field)
+        c, cv = frame.num("curr", field)
+        prev_in = (lo <= p) & (p <= hi)
+        curr_in = (lo <= c) & (c <= hi)
+        hit = ~prev_in & curr_in if enter else prev_in & ~curr_in
+        return frame.has_prev & pv & cv & hit, frame.has_prev & ~(pv & cv)
+
+    return mask
+
+
+def _state_change(field: str, from_vals: list, to_vals: list) -> MaskFn:
+    def mask(frame: TableFrame):
+        if not from_vals or not to_vals:
+            return _none(frame), _none(frame)
+        hit = np.isin(frame.text("prev", field), from_vals) & np.isin(frame.text("curr", field), to_vals)
+        return frame.has_prev & hit, _none(frame)
+
+    return mask
+
+
+def _contains(field: str, patterns: list, match_any: bool) -> MaskFn:
+    def mask(frame: TableFrame):
+        col = frame.text("curr", field)
+        if not patterns:
+            hit = np.full(frame.n, not match_any, dtype=bool)
+        else:
+            found = [np.char.find(col, p) >= 0 for p in patterns]
+            hit = np.logical_or.reduce(found) if match_any else np.logical_and.reduce(found)
+        return hit, _none(frame)
+
+    return mask
+
+
+def _fallback(frame: TableFrame):
+    return _none(frame), np.ones(frame.n, dtype=bool)
+
+
+def compile_rule(rule: SignalRule) -> MaskFn:
+    """规则 -> 掩码函数；无法编译的条件（CUSTOM、非数值/非字符串配置）整列回退逐行求值"""
+    if not rule.enabled:
+        return lambda frame: (_none(frame), _none(frame))
+    ct, cfg = rule.condition_type, rule.condition_config
+    num = _is_number
+    if ct in (ConditionType.THRESHOLD_CROSS_UP, ConditionType.THRESHOLD_CROSS_DOWN):
+        th = cfg.get("threshold", 0)
+        if num(th):
+            return _threshold(cfg.get("field", ""), th, ct == ConditionType.THRESHOLD_CROSS_UP)
+    elif ct in (ConditionType.ABOVE, ConditionType.BELOW):
+        th = cfg.get("threshold", 0)
+        if num(th):
+            return _level(cfg.get("field", ""), th, ct == ConditionType.ABOVE)
+    elif ct in (ConditionType.CROSS_UP, ConditionType.CROSS_DOWN):
+        return _line_cross(cfg.get("field_a", ""), cfg.get("field_b", ""), ct == ConditionType.CROSS_UP)
+    elif ct in (ConditionType.RANGE_ENTER, ConditionType.RANGE_EXIT):
+        lo, hi = cfg.get("min_value", float("-inf")), cfg.get("max_value", float("inf"))
+        if num(lo) and num(hi):
+            return _range(cfg.get("field", ""), lo, hi, ct == ConditionType.RANGE_ENTER)
+    elif ct == ConditionType.STATE_CHANGE:
+        from_vals, to_vals = cfg.get("from_values", []), cfg.get("to_values", [])
+        if all(isinstance(v, str) for v in (*from_vals, *to_vals)):
+            return _state_change(cfg.get("field", ""), list(from_vals), list(to_vals))
+    elif ct == ConditionType.CONTAINS:
+        patterns = list(cfg.get("patterns", []))
+        if all(isinstance(p, str) for p in patterns):
+            return _contains(cfg.get("field", ""), patterns, cfg.get("match_any", True))
+    return _fallback
+
+
+class CompiledRuleSet:
+    """同一张表的规则集合（编译一次，每轮按周期求值）"""
+
+    def __init__(self, rules: Sequence[SignalRule]):
+        self.rules = list(rules)
+        self.masks = [compile_rule(r) for r in self.rules]
+        self.vectorized = sum(m is not _fallback for m in self.masks)
+
+    def evaluate(self, frame: TableFrame, timeframe: str, active: set[str] | None = None) -> list[tuple[int, int]]:
+        """
+        返回命中的 (币种下标, 规则下标)，按币种、再按规则顺序排序（与逐行求值的输出顺序一致）
+
+        成交额低于 min_volume 的币种不参与该规则；回退行调用 rule.check_condition 逐行判断。
+        """
+        if frame.n == 0:
+            return []
+        volume = frame.volume()
+        hits: list[tuple[int, int]] = []
+        for j, (rule, mask_fn) in enumerate(zip(self.rules, self.masks)):
+            if (active is not None and rule.name not in active) or timeframe not in rule.timeframes:
+                continue
+            eligible = volume >= rule.min_volume
+            hit, fallback = mask_fn(frame)
+            hits.extend((int(i), j) for i in np.flatnonzero(hit & eligible))
+            for i in np.flatnonzero(fallback & eligible):
+                if rule.check_condition(frame.prev[i], frame.curr[i]):
+                    hits.append((int(i), j))
+        hits.sort()
+        return hits
@@ -0,0 +1,357 @@
+"""
+多根 K 线窗口规则
+
+SignalRule 只能比较 prev/curr 两行；窗口规则在每个 (表, 币种, 周期) 的环形缓冲上求值：
+- Bar:         单根上的谓词（字段与常量/另一字段比较、上穿/下穿、递增/递减）
+- Consecutive: 谓词连续 n 根成立
+- Within:      谓词在最近 k 根内成立过
+- ZScore:      当前值相对前 n 根的 z 分数超过阈值
+- All:         组合条件同时成立
+
+每个条件保存增量状态（计数/距上次成立的根数/滚动和与平方和），新 K 线到来时 O(1) 更新；
+规则在整体条件由不成立变为成立的那一根触发。缓冲持久化后重启时按缓冲回放重建状态，无需预热。
+"""
+
+import math
+from collections import deque
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from .base import ConditionType, SignalRule
+
+BAR_TIME_FIELD = "数据时间"
+VOLUME_FIELDS = ("成交额", "成交额（USDT）")
+
+_COMPARE = {
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+}
+
+
+def _num(v) -> float | None:
+    if isinstance(v, bool) or not isinstance(v, (int, float)) or (isinstance(v, float) and math.isnan(v)):
+        return None
+    return float(v)
+
+
+@dataclass(frozen=True)
+class Bar:
+    """
+    单根 K 线上的谓词
+
+    op: > >= < <= （与 value 或 other 字段比较）、== / in（字符串状态）、
+        cross_above / cross_below（相对上一根穿越 value 或 other）、rising / falling（相对上一根）
+    """
+
+    field: str
+    op: str
+    value: Any = None
+    other: str | None = None
+
+    span = 1  # 当前根的结果依赖的历史根数（上一根）
+
+    def fields(self) -> set[str]:
+        return {self.field} | ({self.other} if self.other else set())
+
+    def _rhs(self, row: dict):
+        return _num(row.get(self.other)) if self.other else _num(self.value)
+
+    def test(self, prev: dict | None, row: dict) -> bool:
+        if self.op == "==":
+            return str(row.get(self.field, "")) == str(self.value)
+        if self.op == "in":
+            return str(row.get(self.field, "")) in self.value
+        a = _num(row.get(self.field))
+        if a is None:
+            return False
+        if self.op in _COMPARE:
+            b = self._rhs(row)
+            return b is not None and _COMPARE[self.op](a, b)
+        if prev is None:
+            return False
+        pa = _num(prev.get(self.field))
+        if pa is None:
+            return False
+        if self.op == "rising":
+            return a > pa
+        if self.op == "falling":
+            return a < pa
+        b, pb = self._rhs(row), self._rhs(prev)
+        if b is None or pb is None:
+            return False
+        if self.op == "cross_above":
+            return pa <= pb and a > b
+        if self.op == "cross_below":
+            return pa >= pb and a < b
+        raise ValueError(f"未知谓词: {self.op}")
+
+    def init(self):
+        return None
+
+    def step(self, state, ring: deque, prev: dict | None, row: dict):
+        return state, self.test(prev, row)
+
+
+@dataclass(frozen=True)
+class Consecutive:
+    """谓词连续 n 根成立（状态：当前连续根数）"""
+
+    pred: Bar
+    n: int
+
+    @property
+    def span(self) -> int:
+        # 最早一根 (当前 - n + 1) 的谓词还需要它自己的历史
+        return self.pred.span + self.n - 1
+
+    def fields(self) -> set[str]:
+        return self.pred.fields()
+
+    def init(self):
+        return 0
+
+    def step(self, count: int, ring: deque, prev: dict | None, row: dict):
+        count = count + 1 if self.pred.test(prev, row) else 0
+        return count, count >= self.n
+
+
+@dataclass(frozen=True)
+class Within:
+    """谓词在最近 k 根（含当前）内成立过（状态：距上次成立的根数）"""
+
+    pred: Bar
+    k: int
+
+    @property
+    def span(self) -> int:
+        return self.pred.span + self.k - 1
+
+    def fields(self) -> set[str]:
+        return self.pred.fields()
+
+    def init(self):
+        return math.inf
+
+    def step(self, since: float, ring: deque, prev: dict | None, row: dict):
+        since = 0 if self.pred.test(prev, row) else since + 1
+        return since, since < self.k
+
+
+@dataclass(frozen=True)
+class ZScore:
+    """
+    当前值相对前 n 根的 z 分数：threshold > 0 时 z >= threshold，< 0 时 z <= threshold
+
+    状态为前 n 根的 (和, 平方和, 有效根数)；移出窗口的值从环形缓冲读取，不另存序列
+    """
+
+    field: str
+    n: int
+    threshold: float
+
+    @property
+    def span(self) -> int:
+        return self.n
+
+    def fields(self) -> set[str]:
+        return {self.field}
+
+    def init(self):
+        return (0.0, 0.0, 0)
+
+    def step(self, state, ring: deque, prev: dict | None, row: dict):
+        s, ss, cnt = state
+        x = _num(row.get(self.field))
+        hit = False
+        if x is not None and cnt == self.n:
+            var = max(ss / cnt - (s / cnt) ** 2, 0.0)
+            if var > 0:
+                z = (x - s / cnt) / math.sqrt(var)
+                hit = z >= self.threshold if self.threshold > 0 else z <= self.threshold
+        if x is not None:
+            s, ss, cnt = s + x, ss + x * x, cnt + 1
+        if len(ring) >= self.n:
+            old = _num(ring[-self.n].get(self.field))
+            if old is not None:
+                s, ss, cnt = s - old, ss - old * old, cnt - 1
+        return (s, ss, cnt), hit
+
+
+@dataclass(frozen=True)
+class All:
+    """组合条件同时成立"""
+
+    conds: tuple
+
+    @property
+    def span(self) -> int:
+        return max(c.span for c in self.conds)
+
+    def fields(self) -> set[str]:
+        return set().union(*(c.fields() for c in self.conds))
+
+    def init(self):
+        return tuple(c.init() for c in self.conds)
+
+    def step(self, state, ring: deque, prev: dict | None, row: dict):
+        out, hit = [], True
+        for cond, sub in zip(self.conds, state):
+            sub, ok = cond.step(sub, ring, prev, row)
+            out.append(sub)
+            hit = hit and ok
+        return tuple(out), hit
+
+
+@dataclass
+class WindowRule(SignalRule):
+    """窗口规则：window 条件由不成立变为成立时触发（prev/curr 仅用于消息格式化）"""
+
+    window: Any = None
+    condition_type: ConditionType = ConditionType.WINDOW
+
+
+@dataclass
+class _Ring:
+    rows: deque
+    last_key: Any = None
+
+
+def _volume(row: dict) -> float:
+    for f in VOLUME_FIELDS:
+        v = _num(row.get(f))
+        if v:
+            return v
+    return 0.0
+
+
+class WindowTracker:
+    """
+    窗口规则状态：(表, 币种, 周期) -> 最近若干根的投影行（只保留规则用到的字段），
+    (规则, 币种, 周期) -> (条件状态, 上一根是否成立)
+    """
+
+    def __init__(self, rules: Iterable[WindowRule]):
+        self.by_table: dict[str, list[WindowRule]] = {}
+        for rule in rules:
+            self.by_table.setdefault(rule.table, []).append(rule)
+        self.fields: dict[str, tuple[str, ...]] = {}
+        self.capacity: dict[str, int] = {}
+        for table, rules in self.by_table.items():
+            needed = set().union(*(r.window.fields() for r in rules))
+            self.fields[table] = tuple(sorted(needed | {BAR_TIME_FIELD}))
+            # 回放 span + 1 根：既重建下一根所需的状态，也重建最后一根"是否已成立"（避免进行中的条件重启后重复触发）
+            self.capacity[table] = 1 + max(r.window.span for r in rules)
+        self.rings: dict[tuple[str, str, str], _Ring] = {}
+        self.states: dict[tuple[str, str, str], tuple] = {}
+        self.dirty: set[tuple[str, str, str]] = set()
+
+    @property
+    def tables(self) -> list[str]:
+        return list(self.by_table)
+
+    def timeframes(self, table: str, active: set[str] | None = None) -> set[str]:
+        """表中（已启用的）窗口规则覆盖的周期"""
+        return {
+            tf for r in self.by_table.get(table, []) if active is None or r.name in active for tf in r.timeframes
+        }
+
+    def _bar_key(self, table: str, row: dict):
+        key = row.get(BAR_TIME_FIELD)
+        return key if key is not None else tuple(row.get(f) for f in self.fields[table])
+
+    def _advance(self, table: str, symbol: str, timeframe: str, ring: _Ring, row: dict) -> list[WindowRule]:
+        """推进一根：更新各规则状态并追加到缓冲，返回由不成立变为成立的规则"""
+        prev = ring.rows[-1] if ring.rows else None
+        fired = []
+        for rule in self.by_table[table]:
+            if timeframe not in rule.timeframes:
+                continue
+            key = (rule.name, symbol, timeframe)
+            state, was = self.states.get(key, (rule.window.init(), False))
+            state, hit = rule.window.step(state, ring.rows, prev, row)
+            self.states[key] = (state, hit)
+            if hit and not was:
+                fired.append(rule)
+        ring.rows.append(row)
+        return fired
+
+    def observe(
+        self, table: str, timeframe: str, rows: dict[str, dict], active: set[str] | None = None
+    ) -> list[tuple[str, WindowRule]]:
+        """
+        本轮 (表, 周期) 的最新行；出现新 K 线（数据时间变化）的币种推进一根，返回触发的 (币种, 规则)
+
+        未启用的规则照常更新状态（启用后无需预热），但不触发；成交额低于 min_volume 不触发
+        """
+        if table not in self.by_table:
+            return []
+        fields = self.fields[table]
+        hits = []
+        for symbol, row in rows.items():
+            key = (table, symbol, timeframe)
+            ring = self.rings.get(key)
+            if ring is None:
+                ring = self.rings[key] = _Ring(deque(maxlen=self.capacity[table]))
+            bar_key = self._bar_key(table, row)
+            if ring.last_key == bar_key:
+                continue
+            ring.last_key = bar_key
+            projected = {f: row.get(f) for f in fields}
+            for f in VOLUME_FIELDS:
+                if f in row:
+                    projected[f] = row[f]
+            volume = _volume(row)
+            for rule in self._advance(table, symbol, timeframe, ring, projected):
+                if (active is None or rule.name in active) and volume >= rule.min_volume:
+                    hits.append((symbol, rule))
+            self.dirty.add(key)
+        return hits
+
+    def dump(self, keys: Iterable[tuple[str, str, str]] | None = None) -> list[tuple]:
+        """缓冲 -> [(表, 币种, 周期, 最新一根的键, 行列表)]，默认只导出有变化的并清空变化标记"""
+        if keys is None:
+            keys, self.dirty = self.dirty, set()
+        out = []
+        for key in keys:
+            ring = self.rings.get(key)
+            if ring is not None:
+                out.append((*key, ring.last_key, list(ring.rows)))
+        return out
+
+    def load(self, records: Iterable[tuple]):
+        """从持久化的缓冲恢复：按顺序回放各行重建规则状态（不触发）"""
+        for table, symbol, timeframe, last_key, rows in records:
+            if table not in self.by_table:
+                continue
+            ring = self.rings[(table, symbol, timeframe)] = _Ring(deque(maxlen=self.capacity[table]))
+            for row in rows[-self.capacity[table]:]:
+                self._advance(table, symbol, timeframe, ring, row)
+            ring.last_key = tuple(last_key) if isinstance(last_key, list) else last_key
+
+
+def window_rule(
+    name: str,
+    table: str,
+    window,
+    direction: str,
+    strength: int,
+    message_template: str,
+    fields: dict[str, str] | None = None,
+    **kwargs,
+) -> WindowRule:
+    """窗口规则构造（category/subcategory 默认 pattern/window）"""
+    return WindowRule(
+        name=name,
+        table=table,
+        category=kwargs.pop("category", "pattern"),
+        subcategory=kwargs.pop("subcategory", "window"),
+        direction=direction,
+        strength=strength,
+        message_template=message_template,
+        fields=fields or {},
+        window=window,
+        **kwargs,
+    )
@@ -2,15 +2,22 @@
 存储层
 """
 
+from .cooldown import CooldownStorage, CooldownTracker, get_cooldown_storage, get_cooldown_tracker
 from .history import SignalHistory, get_history
+from .routing import SubscriptionIndex
 from .subscription import SubscriptionManager, get_subscription_manager
-from .cooldown import CooldownStorage, get_cooldown_storage
+from .window import WindowStorage, get_window_storage
 
 __all__ = [
     "SignalHistory",
     "get_history",
     "SubscriptionManager",
+    "SubscriptionIndex",
     "get_subscription_manager",
     "CooldownStorage",
     "get_cooldown_storage",
+    "CooldownTracker",
+    "get_cooldown_tracker",
+    "WindowStorage",
+    "get_window_storage",
 ]
@@ -6,8 +6,9 @@
 import logging
 import os
 import sqlite3
+import threading
 import time
-from contextlib import contextmanager
+from contextlib import contextmanager, suppress
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
@@ -24,16 +25,19 @@ def _get_cooldown_db_path() -> str:
 
 
 class CooldownStorage:
-    """冷却状态持久化存储"""
+    """冷却状态持久化存储（单连接复用，WAL）"""
 
     def __init__(self, db_path: str = None):
         self.db_path = db_path or _get_cooldown_db_path()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
         self._ensure_db()
 
     def _ensure_db(self):
         """确保数据库存在"""
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS cooldown (
                     key TEXT PRIMARY KEY,
@@ -44,12 +48,20 @@ class CooldownStorage:
 
     @contextmanager
     def _conn(self):
-        conn = sqlite3.connect(self.db_path, timeout=5)
-        try:
-            yield conn
-            conn.commit()
-        finally:
-            conn.close()
+        """复用的连接，一个 with 块为一个事务；出错时回滚并丢弃连接"""
+        with self._lock:
+            if self._db is None:
+                self._db = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+                self._db.execute("PRAGMA synchronous=NORMAL")
+            try:
+                yield self._db
+                self._db.commit()
+            except Exception:
+                with suppress(sqlite3.Error):
+                    self._db.rollback()
+                    self._db.close()
+                self._db = None
+                raise
 
     def get(self, key: str) -> float:
         """获取冷却时间戳，不存在返回 0"""
@@ -66,11 +78,18 @@ class CooldownStorage:
                 (key, ts)
             )
 
+    def set_many(self, items: dict[str, float]):
+        """批量设置冷却时间戳（一个事务）"""
+        if not items:
+            return
+        with self._conn() as conn:
+            conn.executemany("INSERT OR REPLACE INTO cooldown (key, timestamp) VALUES (?, ?)", list(items.items()))
+
     def load_all(self) -> dict[str, float]:
         """加载所有冷却状态"""
         with self._conn() as conn:
             rows = conn.execute("SELECT key, timestamp FROM cooldown").fetchall()
-            return {k: v for k, v in rows}
+            return dict(rows)
 
     def cleanup(self, max_age: int = 86400):
         """清理过期记录（默认24小时）"""
@@ -78,9 +97,62 @@ class CooldownStorage:
         with self._conn() as conn:
             conn.execute("DELETE FROM cooldown WHERE timestamp < ?", (cutoff,))
 
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class CooldownTracker:
+    """
+    内存冷却表（线程安全，SQLite/PG 引擎共享同一实例）
+
+    判断只查内存；新增的冷却记为待写，由引擎在轮末 flush 一个事务写回（storage 为 None 时只在内存）
+    """
+
+    def __init__(self, storage: CooldownStorage | None = None):
+        self._storage = storage
+        self._lock = threading.Lock()
+        self._last: dict[str, float] = storage.load_all() if storage else {}
+        self._dirty: dict[str, float] = {}
+
+    def ready(self, key: str, seconds: float) -> bool:
+        """距上次触发已超过 seconds 秒"""
+        with self._lock:
+            return time.time() - self._last.get(key, 0) > seconds
+
+    def mark(self, key: str, timestamp: float = None):
+        ts = timestamp or time.time()
+        with self._lock:
+            self._last[key] = ts
+            self._dirty[key] = ts
+
+    def flush(self):
+        """待写冷却落盘（一个事务）；失败的留待下一轮重试"""
+        with self._lock:
+            pending = dict(self._dirty)
+        if not pending:
+            return
+        if self._storage is not None:
+            try:
+                self._storage.set_many(pending)
+            except Exception as e:
+                logger.warning(f"冷却状态写入失败: {e}")
+                return
+        with self._lock:
+            for key, ts in pending.items():
+                if self._dirty.get(key) == ts:
+                    del self._dirty[key]
+
+    def __len__(self) -> int:
+        return len(self._last)
+
 
 # 单例
 _storage: CooldownStorage | None = None
+_tracker: CooldownTracker | None = None
+_tracker_lock = threading.Lock()
 
 
 def get_cooldown_storage() -> CooldownStorage:
@@ -88,3 +160,13 @@ def get_cooldown_storage() -> CooldownStorage:
     if _storage is None:
         _storage = CooldownStorage()
     return _storage
+
+
+def get_cooldown_tracker() -> CooldownTracker:
+    """进程内共享的冷却表（持久化到 get_cooldown_storage）"""
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = CooldownTracker(get_cooldown_storage())
+    return _tracker
@@ -8,6 +8,7 @@ import os
 import sqlite3
 import stat
 import threading
+import time
 from contextlib import contextmanager, suppress
 from datetime import datetime, timedelta
 
@@ -26,14 +27,23 @@ def _get_db_path() -> str:
 
 # 最大保留天数
 _MAX_RETENTION_DAYS = int(os.environ.get("SIGNAL_HISTORY_RETENTION_DAYS", "30"))
+# 写入失败时缓冲区最多保留的条数
+_MAX_PENDING = 10000
+
+_INSERT_SQL = """
+    INSERT INTO signal_history
+    (timestamp, symbol, signal_type, direction, strength, message, timeframe, price, source, extra)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
 
 
 def _init_db(db_path: str):
     """初始化历史数据库"""
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
 
-    # 创建数据库文件
+    # 创建数据库文件（WAL：批量写入不阻塞 telegram-service 的读取）
     conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("""
         CREATE TABLE IF NOT EXISTS signal_history (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -69,6 +79,11 @@ class SignalHistory:
         self.db_path = db_path or _get_db_path()
         self._lock = threading.Lock()
         self._initialized = False
+        # 写连接与待写缓冲
+        self._write_lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._pending_lock = threading.Lock()
+        self._pending: list[tuple] = []
         self._ensure_initialized()
 
     def _ensure_initialized(self):
@@ -92,79 +107,120 @@ class SignalHistory:
                 with suppress(Exception):
                     conn.close()
 
+    @contextmanager
+    def _writer(self):
+        """复用的写连接（WAL），一个 with 块为一个事务；出错时回滚并丢弃连接"""
+        with self._write_lock:
+            if self._db is None:
+                self._db = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+                self._db.execute("PRAGMA synchronous=NORMAL")
+            try:
+                yield self._db
+                self._db.commit()
+            except Exception:
+                with suppress(Exception):
+                    self._db.rollback()
+                    self._db.close()
+                self._db = None
+                raise
+
+    @staticmethod
+    def _row(signal, source: str) -> tuple:
+        """信号对象 -> signal_history 行"""
+        if hasattr(signal, "signal_type"):
+            # PGSignal / SignalEvent
+            return (
+                signal.timestamp.isoformat(),
+                signal.symbol,
+                signal.signal_type,
+                signal.direction,
+                signal.strength,
+                getattr(signal, "message", "") or getattr(signal, "message_key", ""),
+                getattr(signal, "timeframe", "5m"),
+                getattr(signal, "price", 0),
+                source,
+                str(getattr(signal, "extra", {})),
+            )
+        # SQLite Signal
+        return (
+            signal.timestamp.isoformat() if hasattr(signal, "timestamp") else datetime.now().isoformat(),
+            signal.symbol,
+            signal.rule_name,
+            signal.direction,
+            signal.strength,
+            signal.message,
+            getattr(signal, "timeframe", "1h"),
+            getattr(signal, "price", 0),
+            source,
+            "",
+        )
+
     def save(self, signal, source: str = "sqlite", max_retries: int = 2) -> int:
-        """保存信号到历史记录（带重试）"""
+        """保存信号到历史记录（立即写入，带重试）"""
+        try:
+            row = self._row(signal, source)
+        except Exception as e:
+            logger.error(f"保存信号历史失败: {e}")
+            return -1
         for attempt in range(max_retries + 1):
             try:
-                with self._get_conn() as conn:
-                    # 处理不同类型的信号对象
-                    if hasattr(signal, "signal_type"):
-                        # PGSignal
-                        data = {
-                            "timestamp": signal.timestamp.isoformat(),
-                            "symbol": signal.symbol,
-                            "signal_type": signal.signal_type,
-                            "direction": signal.direction,
-                            "strength": signal.strength,
-                            "message": signal.message,
-                            "timeframe": getattr(signal, "timeframe", "5m"),
-                            "price": getattr(signal, "price", 0),
-                            "source": source,
-                            "extra": str(getattr(signal, "extra", {})),
-                        }
-                    else:
-                        # SQLite Signal
-                        data = {
-                            "timestamp": signal.timestamp.isoformat()
-                            if hasattr(signal, "timestamp")
-                            else datetime.now().isoformat(),
-                            "symbol": signal.symbol,
-                            "signal_type": signal.rule_name,
-                            "direction": signal.direction,
-                            "strength": signal.strength,
-                            "message": signal.message,
-                            "timeframe": getattr(signal, "timeframe", "1h"),
-                            "price": getattr(signal, "price", 0),
-                            "source": source,
-                            "extra": "",
-                        }
-
-                    cursor = conn.execute(
-                        """
-                        INSERT INTO signal_history
-                        (timestamp, symbol, signal_type, direction, strength, message, timeframe, price, source, extra)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                        (
-                            data["timestamp"],
-                            data["symbol"],
-                            data["signal_type"],
-                            data["direction"],
-                            data["strength"],
-                            data["message"],
-                            data["timeframe"],
-                            data["price"],
-                            data["source"],
-                            data["extra"],
-                        ),
-                    )
-
-                    conn.commit()
-                    return cursor.lastrowid
+                with self._writer() as conn:
+                    return conn.execute(_INSERT_SQL, row).lastrowid
             except sqlite3.OperationalError as e:
                 if attempt < max_retries:
                     logger.warning(f"保存信号历史失败(重试{attempt + 1}): {e}")
-                    import time
-
                     time.sleep(0.1 * (attempt + 1))
                 else:
                     logger.error(f"保存信号历史失败(已重试{max_retries}次): {e}")
-                    return -1
             except Exception as e:
                 logger.error(f"保存信号历史失败: {e}")
-                return -1
+                break
         return -1
 
+    def add(self, signal, source: str = "sqlite"):
+        """缓冲一条信号，由 flush() 批量写入"""
+        try:
+            row = self._row(signal, source)
+        except Exception as e:
+            logger.error(f"缓冲信号历史失败: {e}")
+            return
+        with self._pending_lock:
+            self._pending.append(row)
+
+    def flush(self, max_retries: int = 2) -> int:
+        """
+        缓冲的信号一次性写入（executemany，一个事务），返回写入条数
+
+        写入失败时放回缓冲区等待下次 flush（超过 _MAX_PENDING 条丢弃最旧的）
+        """
+        with self._pending_lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return 0
+        for attempt in range(max_retries + 1):
+            try:
+                with self._writer() as conn:
+                    conn.executemany(_INSERT_SQL, rows)
+                return len(rows)
+            except sqlite3.OperationalError as e:
+                if attempt < max_retries:
+                    logger.warning(f"批量写入信号历史失败(重试{attempt + 1}): {e}")
+                    time.sleep(0.1 * (attempt + 1))
+                else:
+                    logger.error(f"批量写入信号历史失败(已重试{max_retries}次): {e}")
+            except Exception as e:
+                logger.error(f"批量写入信号历史失败: {e}")
+                break
+        with self._pending_lock:
+            self._pending = (rows + self._pending)[-_MAX_PENDING:]
+        return 0
+
+    def close(self):
+        with self._write_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
     def get_recent(self, limit: int = 20, symbol: str = None, direction: str = None) -> list[dict]:
         """获取最近的信号记录"""
         try:
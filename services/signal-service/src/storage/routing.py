@@ -0,0 +1,104 @@
+"""
+订阅路由索引
+每个用户分配一个槽位，每张表一个按槽位压缩的位图（np.packbits 布局，10 万用户每表约 12KB）；
+某表的订阅用户 = 位图展开后取槽位对应的 user_id，结果按表缓存到下次变更，信号分发为一次字典查找；
+10 万用户全量重建为按表的 searchsorted + packbits，不逐用户解析
+"""
+
+import threading
+from collections.abc import Iterable, Sequence
+
+import numpy as np
+
+
+class SubscriptionIndex:
+    """
+    内存订阅位图（线程安全）
+
+    rebuild 从 signal_subs 全量重建；本进程内的单用户修改用 update 原地置位，新用户追加槽位；
+    停用推送的用户在所有表的位图中清零
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset(0)
+
+    def _reset(self, capacity: int):
+        self._slots: dict[int, int] = {}  # user_id -> 槽位
+        self._uids = np.zeros(max(capacity, 64), dtype=np.int64)  # 槽位 -> user_id
+        self._bits: dict[str, np.ndarray] = {}  # 表 -> 位图（uint8，每字节 8 个槽位，高位在前）
+        self._cache: dict[str, tuple[int, ...]] = {}
+
+    def _bitmap(self, table: str) -> np.ndarray:
+        bits = self._bits.get(table)
+        if bits is None:
+            bits = self._bits[table] = np.zeros(len(self._uids) // 8 + 1, dtype=np.uint8)
+        return bits
+
+    def _grow(self, size: int):
+        """槽位容量不足时按倍数扩容"""
+        if size <= len(self._uids):
+            return
+        capacity = max(size, len(self._uids) * 2)
+        self._uids = np.resize(self._uids, capacity)
+        for table, bits in self._bits.items():
+            grown = np.zeros(capacity // 8 + 1, dtype=np.uint8)
+            grown[: len(bits)] = bits
+            self._bits[table] = grown
+
+    def rebuild(self, user_ids: Sequence[int], members: dict[str, Sequence[int]]):
+        """
+        全量重建
+
+        Args:
+            user_ids: 全部用户（含关闭推送的，槽位按 user_id 排序分配）
+            members: 表 -> 订阅了该表且开启推送的 user_id
+        """
+        uids = np.unique(np.asarray(user_ids, dtype=np.int64))
+        packed = {}
+        for table, ids in members.items():
+            mask = np.zeros(max(len(uids), 64), dtype=bool)
+            mask[np.searchsorted(uids, np.asarray(ids, dtype=np.int64))] = True
+            packed[table] = np.packbits(mask)
+        with self._lock:
+            self._reset(len(uids))
+            self._uids[: len(uids)] = uids
+            self._slots = dict(zip(uids.tolist(), range(len(uids))))
+            for table, bits in packed.items():
+                self._bitmap(table)[: len(bits)] = bits
+
+    def update(self, user_id: int, enabled: bool, tables: Iterable[str]):
+        """单用户订阅变更：原地置位/清零，只失效受影响表的缓存"""
+        tables = set(tables) if enabled else set()
+        with self._lock:
+            slot = self._slots.get(user_id)
+            if slot is None:
+                slot = len(self._slots)
+                self._grow(slot + 1)
+                self._slots[user_id] = slot
+                self._uids[slot] = user_id
+            byte, bit = slot >> 3, np.uint8(0x80 >> (slot & 7))
+            for table in tables | set(self._bits):
+                bits = self._bitmap(table)
+                was = bool(bits[byte] & bit)
+                if was != (table in tables):
+                    bits[byte] ^= bit
+                    self._cache.pop(table, None)
+
+    def subscribers(self, table: str) -> tuple[int, ...]:
+        """订阅了该表且开启推送的用户（按槽位顺序，结果缓存到下次变更）"""
+        with self._lock:
+            cached = self._cache.get(table)
+            if cached is None:
+                bits = self._bits.get(table)
+                n = len(self._slots)
+                if bits is None or n == 0:
+                    cached = ()
+                else:
+                    mask = np.unpackbits(bits, count=n).view(bool)
+                    cached = tuple(self._uids[:n][mask].tolist())
+                self._cache[table] = cached
+            return cached
+
+    def __len__(self) -> int:
+        return len(self._slots)
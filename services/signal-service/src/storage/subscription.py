@@ -1,5 +1,6 @@
 """
 订阅管理（纯逻辑，不依赖 Telegram）
+按表分发信号时查内存路由索引（SubscriptionIndex），signal_subs 有其他连接写入时全量重建
 """
 
 import json
@@ -7,6 +8,9 @@ import logging
 import os
 import sqlite3
 import threading
+from contextlib import contextmanager, suppress
+
+import numpy as np
 
 try:
     from ..config import get_subscription_db_path
@@ -15,11 +19,21 @@ except ImportError:
     from config import get_subscription_db_path
     from rules import RULES_BY_TABLE
 
+from .routing import SubscriptionIndex
+
 logger = logging.getLogger(__name__)
 
 # 所有表
 ALL_TABLES = list(RULES_BY_TABLE.keys())
 
+# 开启推送用户按订阅内容（tables 文本）聚合：相同的表集合只解析一次
+_GROUPS_SQL = "SELECT tables, group_concat(user_id) FROM signal_subs WHERE enabled = 1 GROUP BY tables"
+
+
+def _ids(text: str | None) -> np.ndarray:
+    """group_concat 结果 -> int64 数组"""
+    return np.array(text.split(","), dtype=np.int64) if text else np.zeros(0, dtype=np.int64)
+
 
 class SubscriptionManager:
     """订阅管理器（解耦版）"""
@@ -28,28 +42,48 @@ class SubscriptionManager:
         self.db_path = db_path or str(get_subscription_db_path())
         self._cache: dict[int, dict] = {}
         self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._index = SubscriptionIndex()
+        self._index_version: int | None = None  # 建索引时的 data_version；None 表示需要重建
         self._init_db()
 
     def _init_db(self):
         """初始化数据库"""
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        conn = sqlite3.connect(self.db_path)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS signal_subs (
-                user_id INTEGER PRIMARY KEY,
-                enabled INTEGER DEFAULT 1,
-                tables TEXT
-            )
-        """)
-        conn.commit()
-        conn.close()
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS signal_subs (
+                    user_id INTEGER PRIMARY KEY,
+                    enabled INTEGER DEFAULT 1,
+                    tables TEXT
+                )
+            """)
+
+    @contextmanager
+    def _conn(self):
+        """复用的连接，一个 with 块为一个事务；出错时回滚并丢弃连接（索引随之重建）"""
+        with self._db_lock:
+            if self._db is None:
+                self._db = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+                self._index_version = None  # data_version 只在同一连接上可比
+            try:
+                yield self._db
+                self._db.commit()
+            except Exception:
+                with suppress(sqlite3.Error):
+                    self._db.rollback()
+                    self._db.close()
+                self._db = None
+                self._index_version = None
+                raise
 
     def _load(self, user_id: int) -> dict | None:
         """从数据库加载订阅"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            row = conn.execute("SELECT enabled, tables FROM signal_subs WHERE user_id = ?", (user_id,)).fetchone()
-            conn.close()
+            with self._conn() as conn:
+                row = conn.execute("SELECT enabled, tables FROM signal_subs WHERE user_id = ?", (user_id,)).fetchone()
             if row:
                 tables = set(json.loads(row[1])) if row[1] else set(ALL_TABLES)
                 return {"enabled": bool(row[0]), "tables": tables}
@@ -58,18 +92,60 @@ class SubscriptionManager:
         return None
 
     def _save(self, user_id: int, sub: dict):
-        """保存订阅到数据库"""
+        """保存订阅到数据库（本连接的写入不改变 data_version，索引原地更新）"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.execute(
-                "INSERT OR REPLACE INTO signal_subs (user_id, enabled, tables) VALUES (?, ?, ?)",
-                (user_id, int(sub["enabled"]), json.dumps(list(sub["tables"]))),
-            )
-            conn.commit()
-            conn.close()
+            with self._conn() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO signal_subs (user_id, enabled, tables) VALUES (?, ?, ?)",
+                    (user_id, int(sub["enabled"]), json.dumps(list(sub["tables"]))),
+                )
+            self._index.update(user_id, sub["enabled"], sub["tables"])
         except Exception as e:
             logger.warning(f"保存订阅失败 uid={user_id}: {e}")
 
+    @staticmethod
+    def _read_members(conn: sqlite3.Connection) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+        """(全部 user_id, 表 -> 订阅用户)；按 tables 文本分组，每种表集合只解析一次"""
+        # 两条 SELECT 在同一读事务内执行：期间其他连接的提交不会只出现在其中一条的结果里
+        own_txn = not conn.in_transaction
+        if own_txn:
+            conn.execute("BEGIN")
+        try:
+            user_ids = _ids(conn.execute("SELECT group_concat(user_id) FROM signal_subs").fetchone()[0])
+            rows = conn.execute(_GROUPS_SQL).fetchall()
+        finally:
+            if own_txn:
+                conn.commit()
+        groups: dict[str, list[np.ndarray]] = {}
+        for raw, ids in rows:
+            try:
+                tables = set(json.loads(raw)) if raw else ALL_TABLES
+            except ValueError:
+                logger.warning(f"订阅记录无法解析，已跳过: {raw[:50]}")
+                continue
+            arr = _ids(ids)
+            for table in tables:
+                groups.setdefault(table, []).append(arr)
+        return user_ids, {table: np.concatenate(arrs) for table, arrs in groups.items()}
+
+    def refresh_index(self, force: bool = False) -> bool:
+        """其他连接（如 telegram-service）提交过 signal_subs 写入时全量重建路由索引，返回是否重建"""
+        try:
+            with self._conn() as conn:
+                version = conn.execute("PRAGMA data_version").fetchone()[0]
+                if not force and version == self._index_version:
+                    return False
+                # 持有连接锁重建：期间的本进程写入排在重建之后，以 update 补上
+                self._index.rebuild(*self._read_members(conn))
+                self._index_version = version
+        except Exception as e:
+            logger.warning(f"重建订阅索引失败: {e}")
+            return False
+        # 其他进程修改过的用户，内存中的配置也作废
+        with self._lock:
+            self._cache.clear()
+        return True
+
     def get(self, user_id: int) -> dict:
         """获取用户订阅配置"""
         with self._lock:
@@ -123,21 +199,21 @@ class SubscriptionManager:
     def get_enabled_subscribers(self) -> list[int]:
         """获取所有启用推送的用户ID"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            rows = conn.execute("SELECT user_id FROM signal_subs WHERE enabled = 1").fetchall()
-            conn.close()
+            with self._conn() as conn:
+                rows = conn.execute("SELECT user_id FROM signal_subs WHERE enabled = 1").fetchall()
             return [r[0] for r in rows]
         except Exception as e:
             logger.warning(f"获取订阅用户失败: {e}")
             return []
 
     def get_subscribers_for_table(self, table: str) -> list[int]:
-        """获取订阅了指定表的用户列表"""
-        result = []
-        for uid in self.get_enabled_subscribers():
-            if self.is_table_enabled(uid, table):
-                result.append(uid)
-        return result
+        """获取订阅了指定表的用户列表（路由索引查找，不逐用户加载）"""
+        return list(self.subscribers(table))
+
+    def subscribers(self, table: str) -> tuple[int, ...]:
+        """信号分发用：订阅了指定表且开启推送的用户（只读，库无外部写入时为缓存结果）"""
+        self.refresh_index()
+        return self._index.subscribers(table)
 
 
 # 单例
@@ -145,11 +221,11 @@ _manager: SubscriptionManager | None = None
 _manager_lock = threading.Lock()
 
 
-def get_subscription_manager() -> SubscriptionManager:
-    """获取订阅管理器单例"""
+def get_subscription_manager(db_path: str = None) -> SubscriptionManager:
+    """获取订阅管理器单例（db_path 只在首次创建时生效，供 telegram-service 指向自己的订阅库）"""
     global _manager
     if _manager is None:
         with _manager_lock:
             if _manager is None:
-                _manager = SubscriptionManager()
+                _manager = SubscriptionManager(db_path)
     return _manager
@@ -0,0 +1,101 @@
+"""
+窗口规则缓冲持久化
+每个 (表, 币种, 周期) 最近若干根的投影行，重启后回放重建规则状态，无需预热
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager, suppress
+
+try:
+    from ..config import get_window_db_path
+except ImportError:
+    from config import get_window_db_path
+
+logger = logging.getLogger(__name__)
+
+
+class WindowStorage:
+    """窗口缓冲存储（单连接复用，WAL；每轮有变化的缓冲一个事务写回）"""
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or str(get_window_db_path())
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._ensure_db()
+
+    def _ensure_db(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS window_ring (
+                    tbl TEXT NOT NULL,
+                    symbol TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    last_key TEXT,
+                    rows TEXT NOT NULL,
+                    PRIMARY KEY (tbl, symbol, timeframe)
+                )
+            """)
+
+    @contextmanager
+    def _conn(self):
+        """复用的连接，一个 with 块为一个事务；出错时回滚并丢弃连接"""
+        with self._lock:
+            if self._db is None:
+                self._db = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+                self._db.execute("PRAGMA synchronous=NORMAL")
+            try:
+                yield self._db
+                self._db.commit()
+            except Exception:
+                with suppress(sqlite3.Error):
+                    self._db.rollback()
+                    self._db.close()
+                self._db = None
+                raise
+
+    def load_all(self) -> list[tuple]:
+        """[(表, 币种, 周期, 最新一根的键, 行列表)]"""
+        with self._conn() as conn:
+            rows = conn.execute("SELECT tbl, symbol, timeframe, last_key, rows FROM window_ring").fetchall()
+        out = []
+        for tbl, symbol, tf, last_key, data in rows:
+            try:
+                out.append((tbl, symbol, tf, json.loads(last_key) if last_key else None, json.loads(data)))
+            except ValueError as e:
+                logger.warning(f"窗口缓冲解析失败 {tbl} {symbol} {tf}: {e}")
+        return out
+
+    def save_many(self, records: list[tuple]):
+        """批量写入缓冲（一个事务）"""
+        if not records:
+            return
+        params = [
+            (tbl, symbol, tf, json.dumps(last_key, ensure_ascii=False, default=str),
+             json.dumps(rows, ensure_ascii=False, default=str))
+            for tbl, symbol, tf, last_key, rows in records
+        ]
+        with self._conn() as conn:
+            conn.executemany("INSERT OR REPLACE INTO window_ring VALUES (?, ?, ?, ?, ?)", params)
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# 单例
+_storage: WindowStorage | None = None
+
+
+def get_window_storage() -> WindowStorage:
+    global _storage
+    if _storage is None:
+        _storage = WindowStorage()
+    return _storage
@@ -41,3 +41,14 @@ def clean_publisher():
     SignalPublisher.clear()
     yield SignalPublisher
     SignalPublisher.clear()
+
+
+@pytest.fixture(autouse=True)
+def isolated_history(tmp_path, monkeypatch):
+    """引擎每轮写入信号历史与窗口缓冲：测试中指向临时库"""
+    from src.storage import history, window
+
+    monkeypatch.setenv("SIGNAL_HISTORY_DB_PATH", str(tmp_path / "signal_history.db"))
+    monkeypatch.setenv("SIGNAL_WINDOW_DB_PATH", str(tmp_path / "window_state.db"))
+    monkeypatch.setattr(history, "_history", None)
+    monkeypatch.setattr(window, "_storage", None)
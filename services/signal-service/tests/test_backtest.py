@@ -0,0 +1,106 @@
+"""
+离线回测测试：成立次数与逐行求值一致、冷却按 K 线时间压制、前向收益按方向调整、命令行可在 CI 中对夹具数据运行
+"""
+import json
+import sqlite3
+import subprocess
+import sys
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from src.backtest import Backtester, load_candles, load_series
+from src.rules import ALL_RULES
+
+TABLE = "智能RSI扫描器.py"
+T0 = datetime(2024, 1, 1, tzinfo=UTC)
+RULE = next(r for r in ALL_RULES if r.name == "RSI进入超买区")
+
+
+def _fixture(path: Path, candle_hours: int = 15) -> None:
+    """AUSDT 每 30 分钟一行、位置在中性区/超买区间切换；BUSDT 持续超买（RSI14=80）；K 线 1m 单边上涨"""
+    with sqlite3.connect(path) as conn:
+        conn.execute(f'CREATE TABLE "{TABLE}" ("交易对", "周期", "数据时间", "成交额", "位置", "RSI7", "RSI14", "RSI21")')
+        rows = []
+        for k in range(40):
+            ts = (T0 + timedelta(minutes=30 * k)).strftime("%Y-%m-%dT%H:%M:%S")
+            pos = "超买区" if k % 2 else "中性区"
+            rows.append(("AUSDT", "1h", ts, 1e7, pos, 60, 75 if k % 2 else 50, 60))
+            rows.append(("BUSDT", "1h", ts, 1e7, "超买区", 80, 80, 80))
+        rows.append(("CUSDT", "1h", None, 1e7, "超买区", 80, 80, 80))  # 无数据时间
+        conn.executemany(f'INSERT INTO "{TABLE}" VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        conn.execute("CREATE TABLE candles_1m (symbol, bucket_ts, close)")
+        conn.executemany(
+            "INSERT INTO candles_1m VALUES (?, ?, ?)",
+            [("AUSDT", (T0 + timedelta(minutes=m)).isoformat(), 100 + m * 0.01) for m in range(candle_hours * 60 + 1)],
+        )
+
+
+def test_counts_cooldown_and_forward_returns(tmp_path):
+    db = tmp_path / "history.db"
+    _fixture(db)
+    series = load_series(db)
+    tester = Backtester(rules={"RSI进入超买区", "RSI连续3根超买"}, candles=load_candles(db), horizons=(1, 4))
+    report = tester.run(series)
+    stats = report.rules["RSI进入超买区"]
+
+    # 参考：逐行求值 + 按 K 线时间的冷却
+    expected_hits, fired, last = 0, [], None
+    a_rows = [r for r in series[TABLE] if r["交易对"] == "AUSDT"]
+    for prev, curr in zip(a_rows, a_rows[1:]):
+        if RULE.check_condition(prev, curr):
+            expected_hits += 1
+            ts = datetime.fromisoformat(curr["数据时间"]).replace(tzinfo=UTC).timestamp()
+            if last is None or ts - last > RULE.cooldown:
+                fired.append(ts)
+                last = ts
+    assert (stats.hits, stats.fired) == (expected_hits, len(fired))
+    assert stats.suppressed == expected_hits - len(fired) > 0
+    assert report.skipped_rows == 1
+
+    # 价格单边上涨，SELL 信号的调整后收益为负；K 线只覆盖前 15 小时，之后的触发没有前向收益
+    end = (T0 + timedelta(hours=15)).timestamp()
+    assert len(stats.returns[1]) == sum(ts + 3600 <= end for ts in fired) < stats.fired
+    assert len(stats.returns[4]) == sum(ts + 4 * 3600 <= end for ts in fired)
+    assert all(r < 0 for r in stats.returns[1])
+    assert stats.summary()["fwd1"]["win_rate"] == 0
+
+    # 窗口规则：BUSDT 连续超买只在第 3 根触发一次（AUSDT 从未连续 3 根）
+    window = report.rules["RSI连续3根超买"]
+    assert (window.hits, window.fired, window.symbols) == (1, 1, {"BUSDT"})
+
+
+def test_unknown_rule_rejected():
+    with pytest.raises(ValueError):
+        Backtester(rules={"不存在的规则"})
+
+
+def test_parquet_matches_sqlite(tmp_path):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    db = tmp_path / "history.db"
+    _fixture(db)
+    with sqlite3.connect(db) as conn:
+        pd.read_sql(f'SELECT * FROM "{TABLE}"', conn).to_parquet(tmp_path / f"{TABLE}.parquet")
+        pd.read_sql("SELECT * FROM candles_1m", conn).to_parquet(tmp_path / "candles_1m.parquet")
+    tester = Backtester(candles=load_candles(db))
+    expected = tester.run(load_series(db, [TABLE])).to_dict()["rules"]
+    tester = Backtester(candles=load_candles(tmp_path))
+    assert tester.run(load_series(tmp_path)).to_dict()["rules"] == expected
+
+
+def test_cli_on_fixture(tmp_path):
+    db = tmp_path / "history.db"
+    out = tmp_path / "report.json"
+    _fixture(db)
+    subprocess.run(
+        [sys.executable, "-m", "src", "--backtest", str(db), "--candles", str(db), "--horizons", "1", "--json", str(out)],
+        cwd=Path(__file__).parent.parent,
+        check=True,
+        capture_output=True,
+    )
+    report = json.loads(out.read_text(encoding="utf-8"))
+    by_rule = {r["rule"]: r for r in report["rules"]}
+    assert len(by_rule) > 100  # 默认回测全部启用的规则，未触发的也列出
+    assert by_rule["RSI进入超买区"]["fired"] > 0 and by_rule["RSI进入超买区"]["fwd1"]["n"] > 0
@@ -0,0 +1,76 @@
+"""
+变更驱动检测测试：库无提交时不读表、只求值水位前进的切片、有写入时提前唤醒
+"""
+import sqlite3
+import threading
+import time
+
+TABLE = "智能RSI扫描器.py"
+
+
+def _write(db, rows, replace: bool = True) -> None:
+    with sqlite3.connect(db) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        if replace:
+            conn.execute(f'DROP TABLE IF EXISTS "{TABLE}"')
+            conn.execute(f'CREATE TABLE "{TABLE}" ("交易对", "周期", "数据时间", "成交额", "位置", "RSI7", "RSI14", "RSI21")')
+        conn.executemany(f'INSERT INTO "{TABLE}" VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+
+def _engine(tmp_path, monkeypatch, db):
+    from src.engines import sqlite_engine
+    from src.storage.cooldown import CooldownStorage
+
+    monkeypatch.setattr(sqlite_engine, "get_cooldown_storage", lambda: CooldownStorage(str(tmp_path / "cd.db")))
+    engine = sqlite_engine.SQLiteSignalEngine(db_path=db)
+    engine.allowed_symbols = set()
+    engine.enabled_rules = {"RSI进入超买区"}
+    return engine
+
+
+def test_only_advanced_slices_are_evaluated(tmp_path, monkeypatch):
+    db = str(tmp_path / "market_data.db")
+    symbols = [f"S{i:02d}USDT" for i in range(20)]
+    _write(db, [(s, tf, "2024-01-01T00:00:00", 1e7, "中性区", 50, 50, 50) for s in symbols for tf in ("1h", "4h", "1d")])
+    engine = _engine(tmp_path, monkeypatch, db)
+    engine.check_signals()
+    reads = engine.stats["table_reads"]
+
+    # 无写入：不打开快照、不读表
+    assert engine.check_signals() == []
+    assert engine.stats["idle_checks"] == 1 and engine.stats["table_reads"] == reads
+
+    # 只有 1h 出现新 K 线：1h 切片求值并触发，4h/1d 切片跳过
+    with sqlite3.connect(db) as conn:
+        conn.execute(f'DELETE FROM "{TABLE}" WHERE "周期" = ?', ("1h",))
+    _write(db, [(s, "1h", "2024-01-01T01:00:00", 1e7, "超买区", 80, 80, 80) for s in symbols], replace=False)
+    signals = engine.check_signals()
+    assert {s.timeframe for s in signals} == {"1h"} and len(signals) == 20
+    assert engine.stats["skipped_slices"] == 2
+    assert engine.stats["table_reads"] == reads + 1
+
+    # 到达全量检查间隔：即使水位未变也全部求值（冷却中，不重复触发）
+    engine.full_scan_interval = 0
+    assert engine.check_signals() == []
+    assert engine.stats["table_reads"] == reads + 4
+
+
+def test_wait_wakes_on_commit(tmp_path, monkeypatch):
+    from src.engines import sqlite_engine
+
+    db = str(tmp_path / "market_data.db")
+    _write(db, [("AUSDT", "1h", "2024-01-01T00:00:00", 1e7, "中性区", 50, 50, 50)])
+    engine = _engine(tmp_path, monkeypatch, db)
+    engine.check_signals()
+    monkeypatch.setattr(sqlite_engine, "CHANGE_POLL_INTERVAL", 0.05)
+    monkeypatch.setattr(sqlite_engine, "CHANGE_SETTLE_SECONDS", 0.1)
+    engine._running = True
+
+    t0 = time.monotonic()
+    engine._wait_for_change(0.3)  # 无写入：等满间隔
+    assert time.monotonic() - t0 >= 0.3
+
+    threading.Timer(0.1, _write, (db, [("BUSDT", "1h", "2024-01-01T01:00:00", 1e7, "超买区", 80, 80, 80)], False)).start()
+    t0 = time.monotonic()
+    engine._wait_for_change(30)
+    assert time.monotonic() - t0 < 5
@@ -91,6 +91,7 @@ def test_signal_publisher_subscribe():
         message_key="test.key",
     )
     SignalPublisher.publish(event)
+    assert SignalPublisher.flush(timeout=5)
     
     assert len(received) == 1
     assert received[0].symbol == "BTCUSDT"
@@ -117,3 +118,72 @@ def test_signal_publisher_unsubscribe():
     assert SignalPublisher.subscriber_count() == 0
     
     SignalPublisher.clear()
+
+
+def _event(symbol: str, signal_type: str = "test", strength: int = 50):
+    from src.events.types import SignalEvent
+
+    return SignalEvent(symbol=symbol, signal_type=signal_type, direction="BUY", strength=strength, message_key="k")
+
+
+def test_slow_subscriber_does_not_block_publish(clean_publisher):
+    """慢消费者只积压自己的队列：发布立即返回，其他订阅者照常收到，按币种保持顺序"""
+    import threading
+    import time
+
+    gate = threading.Event()
+    fast = []
+    def slow(e):
+        gate.wait(5)
+
+    clean_publisher.subscribe(slow, maxsize=10)
+    clean_publisher.subscribe(lambda e: fast.append((e.symbol, e.strength)), workers=4)
+
+    t0 = time.monotonic()
+    for i in range(100):
+        clean_publisher.publish(_event(f"S{i % 7}USDT", strength=i))
+    assert time.monotonic() - t0 < 1
+
+    deadline = time.monotonic() + 5
+    while len(fast) < 100 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(fast) == 100
+    for s in {s for s, _ in fast}:
+        seq = [n for sym, n in fast if sym == s]
+        assert seq == sorted(seq)
+    assert clean_publisher.stats()["slow"]["dropped"] >= 89  # 队列上限 10（另 1 条已被工作线程取走）
+    gate.set()
+    assert clean_publisher.flush(timeout=5)
+
+
+def test_queue_policies(clean_publisher):
+    """drop_new 保留最早的，coalesce 同键只留最新一条并排到队尾"""
+    import threading
+
+    from src.events.publisher import COALESCE, DROP_NEW
+
+    gate = threading.Event()
+    got = {"drop": [], "merge": []}
+
+    def drop(e):
+        gate.wait(5)
+        got["drop"].append(e.strength)
+
+    def merge(e):
+        gate.wait(5)
+        got["merge"].append((e.symbol, e.signal_type, e.strength))
+
+    clean_publisher.subscribe(drop, maxsize=3, policy=DROP_NEW)
+    clean_publisher.subscribe(merge, maxsize=10, policy=COALESCE)
+    clean_publisher.publish(_event("BTCUSDT", "blocker", 0))  # 被工作线程取走、阻塞在 gate
+    assert not clean_publisher.flush(timeout=0.2)
+    for n, sig in enumerate(["a", "b", "a", "c", "a"], start=1):
+        clean_publisher.publish(_event("BTCUSDT", sig, n))
+    gate.set()
+    assert clean_publisher.flush(timeout=5)
+
+    assert got["drop"] == [0, 1, 2, 3]
+    assert [x[1:] for x in got["merge"]] == [("blocker", 0), ("b", 2), ("c", 4), ("a", 5)]
+    stats = clean_publisher.stats()
+    assert stats["drop"]["dropped"] == 2 and stats["merge"]["coalesced"] == 2
+    assert stats["merge"]["delivered"] == 4 and stats["merge"]["queued"] == 0
@@ -0,0 +1,61 @@
+"""
+冷却/历史持久化测试：每轮一个事务批量落盘、写入失败保留待重试
+"""
+import sqlite3
+
+from src.engines.pg_engine import PGSignal
+from src.storage.cooldown import CooldownStorage
+from src.storage.history import SignalHistory
+
+TABLE = "智能RSI扫描器.py"
+
+
+def _write(db, rows) -> None:
+    with sqlite3.connect(db) as conn:
+        conn.execute(f'DROP TABLE IF EXISTS "{TABLE}"')
+        conn.execute(f'CREATE TABLE "{TABLE}" ("交易对", "周期", "数据时间", "成交额", "位置", "RSI7", "RSI14", "RSI21")')
+        conn.executemany(f'INSERT INTO "{TABLE}" VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+
+def test_cycle_persists_in_one_batch(tmp_path, monkeypatch):
+    from src.engines import sqlite_engine
+
+    storage = CooldownStorage(str(tmp_path / "cd.db"))
+    calls = []
+    set_many = storage.set_many
+    monkeypatch.setattr(storage, "set_many", lambda items: (calls.append(len(items)), set_many(items)))
+    monkeypatch.setattr(storage, "set", lambda *a: calls.append("set"))
+    monkeypatch.setattr(sqlite_engine, "get_cooldown_storage", lambda: storage)
+
+    db = str(tmp_path / "market_data.db")
+    symbols = [f"S{i:02d}USDT" for i in range(30)]
+    _write(db, [(s, "1h", "2024-01-01T00:00:00", 1e7, "中性区", 50, 50, 50) for s in symbols])
+    engine = sqlite_engine.SQLiteSignalEngine(db_path=db)
+    engine.allowed_symbols = set()
+    engine.enabled_rules = {"RSI进入超买区"}
+    engine.check_signals()
+    _write(db, [(s, "1h", "2024-01-01T01:00:00", 1e7, "超买区", 80, 80, 80) for s in symbols])
+
+    signals = engine.check_signals()
+    assert len(signals) == 30 and calls == [30]
+    assert len(CooldownStorage(storage.db_path).load_all()) == 30
+    assert len(engine._history.get_recent(limit=100)) == 30
+    with sqlite3.connect(engine._history.db_path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_history_flush_keeps_rows_on_failure(tmp_path, monkeypatch):
+    history = SignalHistory(str(tmp_path / "h.db"))
+    for i in range(3):
+        history.add(PGSignal(symbol=f"S{i}USDT", signal_type="price_surge", direction="BUY", strength=60,
+                             message_key="signal.pg.msg.price_surge"), source="pg")
+
+    def broken():
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(history, "_writer", broken)
+    assert history.flush(max_retries=0) == 0
+    monkeypatch.undo()
+    assert history.flush() == 3 and history.flush() == 0
+    records = history.get_recent(limit=10)
+    assert {r["message"] for r in records} == {"signal.pg.msg.price_surge"} and len(records) == 3
@@ -0,0 +1,43 @@
+"""
+PG 引擎数据访问测试：LIMIT 2 结果配对为 (最新, 上一根)、上一根取自查询结果、同一根不重复检测
+"""
+from datetime import UTC, datetime, timedelta
+
+from src.engines.pg_access import CANDLE_COLUMNS, CANDLES_SQL, METRICS_SQL, _pair_rows
+from src.storage.cooldown import CooldownTracker
+
+T0 = datetime(2024, 1, 1, tzinfo=UTC)
+
+
+def _candle(symbol: str, minute: int, close: float) -> tuple:
+    values = {"bucket_ts": T0 + timedelta(minutes=minute), "close": close, "quote_volume": 1e6,
+              "taker_buy_quote_volume": 5e5}
+    return (symbol, *(values.get(c) for c in CANDLE_COLUMNS))
+
+
+def test_pair_rows_and_time_bound():
+    rows = [_candle("BTCUSDT", 2, 101), _candle("BTCUSDT", 1, 100), _candle("ETHUSDT", 2, 10)]
+    bars = _pair_rows(rows, CANDLE_COLUMNS)
+    assert bars["BTCUSDT"][0]["close"] == 101 and bars["BTCUSDT"][1]["close"] == 100
+    assert bars["ETHUSDT"][1] is None  # 窗口内只有一根：无上一根
+    for sql in (CANDLES_SQL, METRICS_SQL):
+        assert "LIMIT 2" in sql and "%(since)s" in sql
+
+
+def test_engine_uses_queried_prev_bar(monkeypatch):
+    from src.engines.pg_engine import PGSignalEngine
+
+    engine = PGSignalEngine(db_url="postgresql://unused", symbols=["BTCUSDT", "ETHUSDT"])
+    monkeypatch.setattr(engine, "_publish_event", lambda signal: None)
+    state = {"rows": [_candle("BTCUSDT", 2, 103), _candle("BTCUSDT", 1, 100), _candle("ETHUSDT", 2, 10)]}
+    monkeypatch.setattr(engine._access, "fetch_latest", lambda symbols: (_pair_rows(state["rows"], CANDLE_COLUMNS), {}))
+
+    # 首轮即可检测（上一根来自库，不依赖上一轮的内存基线）
+    assert [s.signal_type for s in engine.check_signals()] == ["price_surge"]
+    # 没有新 K 线：不重复检测（换一张空冷却表，确认拦下的是新 K 线判断而不是冷却）
+    engine.cooldowns = CooldownTracker()
+    assert engine.check_signals() == []
+    # ETH 出现新一根
+    state["rows"] = [_candle("BTCUSDT", 2, 103), _candle("BTCUSDT", 1, 100),
+                     _candle("ETHUSDT", 3, 9.5), _candle("ETHUSDT", 2, 10)]
+    assert [(s.symbol, s.signal_type) for s in engine.check_signals()] == [("ETHUSDT", "price_dump")]
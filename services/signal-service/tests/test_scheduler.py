@@ -0,0 +1,150 @@
+"""
+统一调度测试：PG 声明式规则与原检查方法口径一致、跨源规则、冷却表跨引擎共享、
+同一数据源不重叠、并发有上限、变更驱动提前触发
+"""
+import threading
+import time
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from src.engines.base import BaseEngine
+from src.engines.pg_access import CANDLE_COLUMNS, METRIC_COLUMNS, _pair_rows
+from src.engines.scheduler import SignalScheduler
+from src.storage.cooldown import CooldownStorage, CooldownTracker
+
+T0 = datetime(2024, 1, 1, tzinfo=UTC)
+
+
+def _candle(symbol, minute, close, quote_volume=1e6, taker_buy=5e5):
+    values = {"bucket_ts": T0 + timedelta(minutes=minute), "close": Decimal(str(close)),
+              "quote_volume": quote_volume, "taker_buy_quote_volume": taker_buy}
+    return (symbol, *(values.get(c) for c in CANDLE_COLUMNS))
+
+
+def _metric(symbol, minute, oi, top=1.0, taker=1.0):
+    values = {"create_time": T0 + timedelta(minutes=minute), "sum_open_interest_value": oi,
+              "count_toptrader_long_short_ratio": top, "sum_taker_long_short_vol_ratio": taker}
+    return (symbol, *(values.get(c) for c in METRIC_COLUMNS))
+
+
+def _pg_engine(monkeypatch, state, cooldowns=None):
+    from src.engines.pg_engine import PGSignalEngine
+
+    engine = PGSignalEngine(db_url="postgresql://unused", symbols=["BTCUSDT", "ETHUSDT"], cooldowns=cooldowns)
+    monkeypatch.setattr(engine, "_publish_event", lambda signal: None)
+    monkeypatch.setattr(engine._access, "fetch_latest", lambda symbols: (
+        _pair_rows(state["candles"], CANDLE_COLUMNS), _pair_rows(state["metrics"], METRIC_COLUMNS)))
+    return engine
+
+
+def test_pg_rules_match_legacy_checks(monkeypatch):
+    state = {
+        "candles": [_candle("BTCUSDT", 2, 103, 6e6, 4.5e6), _candle("BTCUSDT", 1, 100, 1e6),
+                    _candle("ETHUSDT", 2, 10)],
+        "metrics": [_metric("BTCUSDT", 5, 2.08e9, top=0.4, taker=1.3), _metric("BTCUSDT", 0, 2e9, taker=0.9),
+                    _metric("ETHUSDT", 5, 1e9, top=None)],
+    }
+    engine = _pg_engine(monkeypatch, state)
+    by_type = {s.signal_type: s for s in engine.check_signals()}
+    assert set(by_type) == {
+        "price_surge", "volume_spike", "taker_buy_dominance",
+        "oi_surge", "top_trader_extreme_short", "taker_ratio_flip_long",
+        "price_oi_surge",
+    }
+    # 强度与消息参数沿用原 PGSignalRules 的公式
+    surge = by_type["price_surge"]
+    assert (surge.strength, surge.message_params, surge.price) == (80, {"pct": "3.00"}, 103.0)
+    assert by_type["volume_spike"].strength == min(85, int(50 + 6 * 5))
+    assert by_type["volume_spike"].message_params == {"ratio": "6.0", "vol": "6.00"}
+    assert by_type["taker_buy_dominance"].message_params == {"pct": "75.0", "threshold": "70"}
+    assert by_type["oi_surge"].strength == min(80, int(55 + 4 * 3))
+    assert by_type["oi_surge"].message_params == {"pct": "4.00", "oi": "2.08"}
+    assert by_type["top_trader_extreme_short"].strength == min(85, int(60 + (1 / 0.4) * 5))
+    assert by_type["taker_ratio_flip_long"].message_params == {"prev": "0.90", "curr": "1.30"}
+    # 跨源：同币种价格 +3% 且持仓 +4%；未编译翻译时消费端回退到 extra["message"]
+    cross = by_type["price_oi_surge"]
+    assert cross.extra["message"] == "🚀 价格与持仓同步急增! 涨幅 3.00%，持仓增加 4.00%"
+    assert cross.extra["oi_change_pct"] == pytest.approx(4.0) and cross.price == 103.0
+
+
+def test_cooldown_shared_across_engines(tmp_path, monkeypatch):
+    storage = CooldownStorage(str(tmp_path / "cd.db"))
+    tracker = CooldownTracker(storage)
+    state = {"candles": [_candle("BTCUSDT", 2, 103), _candle("BTCUSDT", 1, 100)], "metrics": []}
+    assert [s.signal_type for s in _pg_engine(monkeypatch, state, tracker).check_signals()] == ["price_surge"]
+    # 另一个引擎实例（同一冷却表）看到同一根：仍在冷却
+    assert _pg_engine(monkeypatch, state, tracker).check_signals() == []
+    # 轮末落盘：重启后的冷却表也包含
+    assert CooldownTracker(CooldownStorage(storage.db_path)).ready("BTCUSDT_price_surge", 300) is False
+
+
+class _FakeEngine(BaseEngine):
+    def __init__(self, delay=0.0, fail=False):
+        super().__init__()
+        self.delay, self.fail, self.calls = delay, fail, 0
+        self.peak = None  # 跨引擎共享的 [当前并发, 峰值]
+        self.changed = threading.Event()
+
+    def check_signals(self):
+        self.calls += 1
+        if self.peak is not None:
+            self.peak[0] += 1
+            self.peak[1] = max(self.peak[1], self.peak[0])
+        try:
+            time.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError("boom")
+            return ["sig"]
+        finally:
+            if self.peak is not None:
+                self.peak[0] -= 1
+
+    def run_loop(self, interval=60):
+        pass
+
+    def get_stats(self):
+        return {"calls": self.calls}
+
+    def has_change(self):
+        if self.changed.is_set():
+            self.changed.clear()
+            return True
+        return False
+
+
+def test_scheduler_bounds_and_overlap():
+    peak = [0, 0]
+    slow, fast, broken = _FakeEngine(delay=0.3), _FakeEngine(delay=0.05), _FakeEngine(fail=True)
+    for e in (slow, fast, broken):
+        e.peak = peak
+    scheduler = SignalScheduler(max_workers=2, tick=0.02)
+    scheduler.add("slow", slow, interval=0.05)
+    scheduler.add("fast", fast, interval=0.05)
+    scheduler.add("broken", broken, interval=0.05)
+    emitted = []
+    fast.register_callback(emitted.append)
+    scheduler.start()
+    time.sleep(0.8)
+    scheduler.stop()
+
+    stats = scheduler.get_stats()["sources"]
+    assert peak[1] <= 2  # 线程池上限
+    assert stats["slow"]["overlaps"] > 0 and slow.calls < fast.calls  # 上一轮未结束：跳过而非堆积
+    assert stats["broken"]["errors"] == broken.calls > 1  # 异常不影响后续调度
+    assert emitted and len(emitted) == stats["fast"]["signals"]  # 回调经 run_cycle 触发
+
+
+def test_scheduler_wakes_on_change_and_run_once():
+    engine = _FakeEngine()
+    scheduler = SignalScheduler(max_workers=1, tick=0.02)
+    scheduler.add("sqlite", engine, interval=60, wake=engine.has_change)
+    scheduler.start()
+    time.sleep(0.1)
+    assert engine.calls == 1  # 首轮立即执行，之后间隔很长
+    engine.changed.set()
+    time.sleep(0.1)
+    assert engine.calls == 2 and scheduler.get_stats()["sources"]["sqlite"]["woken"] == 1
+    assert scheduler.run_once(["sqlite"]) == {"sqlite": ["sig"]}
+    scheduler.stop()
@@ -0,0 +1,76 @@
+"""
+单轮快照测试：每个 (表, 周期) 每轮只读取一次，格式化器跨表查询从内存返回
+"""
+import sqlite3
+
+
+def _write(db, rows_by_table: dict) -> None:
+    with sqlite3.connect(db) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        for table, rows in rows_by_table.items():
+            conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+            conn.execute(f'CREATE TABLE "{table}" ("交易对", "周期", "成交额", "位置", "RSI7", "RSI14", "RSI21")')
+            conn.executemany(f'INSERT INTO "{table}" VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+
+
+def test_formatter_burst_reads_each_table_once(tmp_path, monkeypatch):
+    from src.engines import sqlite_engine
+    from src.rules import RULES_BY_TABLE
+    from src.storage.cooldown import CooldownStorage
+
+    db = str(tmp_path / "market_data.db")
+    table = "智能RSI扫描器.py"
+    other = next(t for t in RULES_BY_TABLE if t != table)
+    symbols = [f"S{i:02d}USDT" for i in range(50)]
+    _write(db, {
+        table: [(s, "1h", 1e7, "中性区", 50, 50, 50) for s in symbols],
+        other: [(s, "1h", 1e7, None, 1, 2, 3) for s in symbols],
+    })
+
+    calls = []
+
+    def formatter(**kw):
+        calls.append(kw)
+        return "full"
+
+    monkeypatch.setattr(sqlite_engine, "get_cooldown_storage", lambda: CooldownStorage(str(tmp_path / "cd.db")))
+    engine = sqlite_engine.SQLiteSignalEngine(db_path=db, formatter=formatter)
+    engine.allowed_symbols = set()
+    engine.enabled_rules = {"RSI进入超买区"}
+    engine.check_signals()
+    baseline_reads = engine.stats["table_reads"]
+
+    # 50 个币种同时进入超买区：格式化器的跨表查询不再逐信号读全部表
+    _write(db, {
+        table: [(s, "1h", 1e7, "超买区", 80, 75, 70) for s in symbols],
+        other: [(s, "1h", 1e7, None, 1, 2, 3) for s in symbols],
+    })
+    signals = engine.check_signals()
+    assert len(signals) == 50 and all(s.full_message == "full" for s in signals)
+    reads = engine.stats["table_reads"] - baseline_reads
+    # 规则表按其全部周期各读一次，其余表只在格式化器首次跨表查询时按 1h 读一次（原实现为每个信号读全部表）
+    tfs = next(r.timeframes for r in RULES_BY_TABLE[table] if r.name == "RSI进入超买区")
+    assert reads == len(tfs) + len(RULES_BY_TABLE) - 1
+    assert calls[0]["curr_data"][table]["位置"] == "超买区"
+    assert calls[0]["curr_data"][other]["RSI7"] == 1
+    assert calls[0]["prev_data"][table]["位置"] == "中性区"
+
+
+def test_snapshot_is_consistent_and_tolerates_missing_db(tmp_path):
+    from src.engines.snapshot import ReadOnlyPool, open_snapshot
+
+    db = str(tmp_path / "market_data.db")
+    with open_snapshot(ReadOnlyPool(db), ["t"]) as snap:
+        assert snap.rows("t", "1h") == {}
+
+    _write(db, {"t": [("AUSDT", "1h", 1, "a", 1, 1, 1), ("AUSDT", None, 1, "b", 1, 1, 1), ("BUSDT", "4h", 1, "c", 1, 1, 1)]})
+    pool = ReadOnlyPool(db)
+    with open_snapshot(pool, ["t"]) as snap:
+        assert snap.rows("t", "1h")["AUSDT"]["位置"] == "b"  # 周期为空的行对所有周期生效，后者覆盖
+        # 读事务内写入不影响本轮快照
+        with sqlite3.connect(db) as conn:
+            conn.execute('UPDATE "t" SET "位置" = ? WHERE "交易对" = ?', ("z", "BUSDT"))
+        assert snap.rows("t", "4h")["BUSDT"]["位置"] == "c"
+        assert snap.rows("x", "1h") == {}  # 非法表名
+    with open_snapshot(pool, ["t"]) as snap:
+        assert snap.rows("t", "4h")["BUSDT"]["位置"] == "z"
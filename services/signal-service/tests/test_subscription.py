@@ -0,0 +1,109 @@
+"""
+订阅路由索引测试：与逐用户判断一致、本进程修改原地更新、其他连接写入后重建
+"""
+import json
+import random
+import sqlite3
+
+from src.storage import subscription
+from src.storage.routing import SubscriptionIndex
+from src.storage.subscription import _GROUPS_SQL, ALL_TABLES, SubscriptionManager, get_subscription_manager
+
+
+def _brute(db_path: str, table: str) -> list[int]:
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT user_id, enabled, tables FROM signal_subs").fetchall()
+    return sorted(uid for uid, enabled, raw in rows if enabled and table in (json.loads(raw) if raw else ALL_TABLES))
+
+
+def test_index_matches_per_user_check(tmp_path):
+    rnd = random.Random(2)
+    db = str(tmp_path / "subs.db")
+    mgr = SubscriptionManager(db)
+    users = rnd.sample(range(1, 10**9), 300)
+    for uid in users:
+        mgr.get(uid)  # 新用户默认订阅全部
+    for _ in range(1500):
+        uid = rnd.choice(users)
+        op = rnd.random()
+        if op < 0.7:
+            mgr.toggle_table(uid, rnd.choice(ALL_TABLES))
+        elif op < 0.8:
+            mgr.set_enabled(uid, rnd.random() < 0.5)
+        elif op < 0.9:
+            mgr.disable_all(uid)
+        else:
+            mgr.enable_all(uid)
+        if rnd.random() < 0.05:
+            table = rnd.choice(ALL_TABLES)
+            assert sorted(mgr.get_subscribers_for_table(table)) == _brute(db, table)
+    for table in ALL_TABLES:
+        assert sorted(mgr.subscribers(table)) == _brute(db, table)
+        assert sorted(mgr.subscribers(table)) == [u for u in sorted(users) if mgr.is_table_enabled(u, table)]
+
+
+def test_external_write_triggers_rebuild(tmp_path):
+    db = str(tmp_path / "subs.db")
+    mgr = SubscriptionManager(db)
+    table = ALL_TABLES[0]
+    mgr.get(1)
+    assert mgr.subscribers(table) == (1,)
+    assert mgr.refresh_index() is False  # 无外部写入：不重建
+
+    # 其他进程（另一个连接）写入
+    with sqlite3.connect(db) as conn:
+        conn.execute("INSERT INTO signal_subs VALUES (2, 1, ?)", (json.dumps([table]),))
+        conn.execute("INSERT INTO signal_subs VALUES (3, 1, NULL)")  # 订阅全部
+        conn.execute("INSERT INTO signal_subs VALUES (4, 1, 'not json')")  # 无法解析：跳过
+        conn.execute("UPDATE signal_subs SET enabled = 0 WHERE user_id = 1")
+    assert mgr.subscribers(table) == (2, 3)
+    assert mgr.subscribers(ALL_TABLES[1]) == (3,)
+    assert mgr.get(1)["enabled"] is False  # 内存配置随之作废
+
+
+class _WriteBetweenReads:
+    """包装连接：第二条 SELECT 之前由另一连接提交一条新订阅"""
+
+    def __init__(self, conn, db_path, table):
+        self._conn, self._db_path, self._table = conn, db_path, table
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def execute(self, query, *args):
+        if query == _GROUPS_SQL:
+            with sqlite3.connect(self._db_path) as other:
+                other.execute("INSERT INTO signal_subs VALUES (2, 1, ?)", (json.dumps([self._table]),))
+        return self._conn.execute(query, *args)
+
+
+def test_read_members_uses_one_snapshot(tmp_path):
+    db = str(tmp_path / "subs.db")
+    mgr = SubscriptionManager(db)
+    table = ALL_TABLES[0]
+    mgr.get(1)
+    with mgr._conn() as conn:
+        user_ids, members = mgr._read_members(_WriteBetweenReads(conn, db, table))
+    # 两条查询看到同一快照：并发提交的用户 2 两边都不出现
+    assert user_ids.tolist() == [1]
+    assert all(arr.tolist() == [1] for arr in members.values())
+    assert mgr.subscribers(table) == (1, 2)  # 下次刷新时补上
+
+
+def test_index_grows_past_capacity():
+    index = SubscriptionIndex()
+    index.rebuild([8, 7], {"a": [7], "b": [7]})
+    for uid in range(1000, 1300):
+        index.update(uid, True, ["b"] if uid % 3 else ["a"])
+    assert index.subscribers("a") == (7, *range(1002, 1300, 3))
+    assert len(index.subscribers("b")) == 1 + 200
+    index.update(7, False, [])
+    assert index.subscribers("a")[0] == 1002
+
+
+def test_singleton_uses_first_db_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(subscription, "_manager", None)
+    db = str(tmp_path / "telegram_subs.db")
+    mgr = get_subscription_manager(db)
+    assert mgr.db_path == db
+    assert get_subscription_manager() is mgr
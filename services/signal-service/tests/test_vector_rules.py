@@ -0,0 +1,125 @@
+"""
+规则向量化求值差分测试：与逐行 SignalRule.check_condition 的触发结果逐一一致
+"""
+import random
+import sqlite3
+
+from src.rules import ALL_RULES, RULES_BY_TABLE, WINDOW_RULES
+from src.rules.base import ConditionType
+from src.rules.vector import CompiledRuleSet, TableFrame
+
+
+def _vocab() -> dict[str, dict[str, list]]:
+    """每张表每个字段可能取到的值：规则中的阈值/区间边界附近、状态词、包含模式，以及 None/空串/非数值"""
+    out: dict[str, dict[str, list]] = {}
+    for rule in ALL_RULES:
+        cols = out.setdefault(rule.table, {})
+        cfg = rule.condition_config
+        for f in (cfg.get("field"), cfg.get("field_a"), cfg.get("field_b"), *rule.fields.values()):
+            if f:
+                cols.setdefault(f, [None, 0, "", "n/a"])
+        f = cfg.get("field")
+        for k in ("threshold", "min_value", "max_value"):
+            v = cfg.get(k)
+            if f and isinstance(v, (int, float)):
+                cols[f] += [v, v - 0.5, v + 0.5, v * 2]
+        if rule.condition_type == ConditionType.STATE_CHANGE:
+            cols[f] += list(cfg.get("from_values", [])) + list(cfg.get("to_values", []))
+        if rule.condition_type == ConditionType.CONTAINS:
+            pats = list(cfg.get("patterns", []))
+            cols[f] += pats + [" | ".join(pats), f"前缀{pats[0]}后缀" if pats else "x"]
+    return out
+
+
+def _rows(rnd: random.Random, vocab: dict[str, list], n: int) -> list[dict]:
+    rows = []
+    for i in range(n):
+        row = {"交易对": f"S{i:03d}USDT", "成交额": rnd.choice([0, 5e4, 1e5, 2e6, None])}
+        for f, values in vocab.items():
+            if rnd.random() < 0.05:
+                continue  # 缺列
+            v = rnd.choice(values)
+            row[f] = v if rnd.random() < 0.7 else (rnd.uniform(-100, 100) if rnd.random() < 0.8 else v)
+        rows.append(row)
+    return rows
+
+
+def _reference(rules, prev: list, curr: list, timeframe: str) -> list[tuple[int, int]]:
+    """原逐行求值：币种 -> 规则"""
+    hits = []
+    for i, (p, c) in enumerate(zip(prev, curr)):
+        volume = c.get("成交额") or c.get("成交额（USDT）") or 0
+        for j, rule in enumerate(rules):
+            if timeframe not in rule.timeframes or volume < rule.min_volume:
+                continue
+            if rule.check_condition(p, c):
+                hits.append((i, j))
+    return hits
+
+
+def test_vectorized_matches_row_evaluator():
+    rnd = random.Random(11)
+    vocab = _vocab()
+    total = 0
+    for table, rules in RULES_BY_TABLE.items():
+        compiled = CompiledRuleSet(rules)
+        for _ in range(5):
+            curr = _rows(rnd, vocab[table], 300)
+            prev = _rows(rnd, vocab[table], 300)
+            prev = [None if rnd.random() < 0.1 else p for p in prev]  # 新上线币种无基线
+            frame = TableFrame([r["交易对"] for r in curr], curr, prev)
+            for tf in ("5m", "1h", "4h", "1d"):
+                got = compiled.evaluate(frame, tf)
+                assert got == _reference(rules, prev, curr, tf), (table, tf)
+                total += len(got)
+    assert total > 1000
+    assert sum(CompiledRuleSet(r).vectorized for r in RULES_BY_TABLE.values()) >= 70
+
+
+def test_engine_triggers_identical(tmp_path, monkeypatch):
+    """端到端：SQLite 快照两轮（基线 + 变化），引擎信号与逐行求值一致"""
+    from src.engines import sqlite_engine
+    from src.storage.cooldown import CooldownStorage
+
+    rnd = random.Random(3)
+    vocab = _vocab()
+    tables = [t for t in RULES_BY_TABLE if t in ("智能RSI扫描器.py", "MACD柱状扫描器.py", "期货情绪聚合表.py")]
+    db = tmp_path / "market_data.db"
+
+    def write(snapshot: dict) -> None:
+        with sqlite3.connect(db) as conn:
+            for table, rows in snapshot.items():
+                cols = ["交易对", "周期", "成交额", *vocab[table]]
+                conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+                conn.execute(f'CREATE TABLE "{table}" ({", ".join(f"{chr(34)}{c}{chr(34)}" for c in cols)})')
+                conn.executemany(
+                    f'INSERT INTO "{table}" VALUES ({", ".join("?" * len(cols))})',
+                    [[r.get(c) if c != "周期" else "1h" for c in cols] for r in rows],
+                )
+
+    def read() -> dict:
+        with sqlite3.connect(db) as conn:
+            conn.row_factory = sqlite3.Row
+            return {t: [dict(r) for r in conn.execute(f'SELECT * FROM "{t}"')] for t in tables}
+
+    monkeypatch.setattr(sqlite_engine, "get_cooldown_storage", lambda: CooldownStorage(str(tmp_path / "cd.db")))
+    engine = sqlite_engine.SQLiteSignalEngine(db_path=str(db))
+    engine.allowed_symbols = set()
+    engine.enabled_rules -= {r.name for r in WINDOW_RULES}  # 窗口规则见 test_window_rules
+
+    write({t: _rows(rnd, vocab[t], 200) for t in tables})
+    before = read()
+    assert engine.check_signals() == []
+    write({t: _rows(rnd, vocab[t], 200) for t in tables})
+    after = read()
+    got = [(s.table, s.symbol, s.rule_name) for s in engine.check_signals()]
+
+    # 参考：同一快照（SQLite 读回的行）逐行求值，输出顺序也一致
+    expected = []
+    for t in tables:
+        prev = {r["交易对"]: r for r in before[t]}
+        curr = after[t]
+        rules = [r for r in RULES_BY_TABLE[t] if r.name in engine.enabled_rules]
+        for i, j in _reference(rules, [prev.get(r["交易对"]) for r in curr], curr, "1h"):
+            expected.append((t, curr[i]["交易对"], rules[j].name))
+    assert got == expected and got
@@ -0,0 +1,151 @@
+"""
+窗口规则测试：增量状态与全量重算一致、缓冲持久化后重启无需预热、引擎跨轮触发
+"""
+import math
+import random
+import sqlite3
+
+from src.rules.window import All, Bar, Consecutive, WindowTracker, Within, ZScore, window_rule
+
+TABLE = "智能RSI扫描器.py"
+
+
+def _brute(window, series: list[dict], i: int) -> bool:
+    """第 i 根处条件是否成立（只看 series[: i + 1]，逐根重算）"""
+    prev = series[i - 1] if i else None
+    if isinstance(window, Bar):
+        return window.test(prev, series[i])
+    if isinstance(window, Consecutive):
+        return i + 1 >= window.n and all(
+            window.pred.test(series[j - 1] if j else None, series[j]) for j in range(i - window.n + 1, i + 1)
+        )
+    if isinstance(window, Within):
+        return any(
+            window.pred.test(series[j - 1] if j else None, series[j]) for j in range(max(0, i - window.k + 1), i + 1)
+        )
+    if isinstance(window, ZScore):
+        x = series[i].get(window.field)
+        past = [r.get(window.field) for r in series[max(0, i - window.n):i]]
+        if x is None or len(past) < window.n or any(v is None for v in past):
+            return False
+        mean = sum(past) / window.n
+        std = math.sqrt(max(sum(v * v for v in past) / window.n - mean * mean, 0.0))
+        if std == 0:
+            return False
+        z = (x - mean) / std
+        return z >= window.threshold if window.threshold > 0 else z <= window.threshold
+    return all(_brute(c, series, i) for c in window.conds)
+
+
+WINDOWS = [
+    Consecutive(Bar("v", ">", 0.5), 3),
+    Within(Bar("v", "cross_above", other="w"), 4),
+    ZScore("v", 8, 1.5),
+    ZScore("v", 8, -1.5),
+    All((Within(Bar("w", "rising"), 2), Bar("v", "cross_below", 0.3))),
+]
+
+
+def _series(rnd: random.Random, n: int) -> list[dict]:
+    return [
+        {"数据时间": f"t{i:04d}", "v": None if rnd.random() < 0.03 else rnd.random(), "w": rnd.random(), "成交额": 1e7}
+        for i in range(n)
+    ]
+
+
+def _tracker() -> WindowTracker:
+    rules = [
+        window_rule(f"r{k}", TABLE, w, "ALERT", 50, "x", timeframes=["1h"], min_volume=0) for k, w in enumerate(WINDOWS)
+    ]
+    return WindowTracker(rules)
+
+
+def test_incremental_matches_brute_force():
+    rnd = random.Random(5)
+    series = _series(rnd, 400)
+    tracker = _tracker()
+    fired = 0
+    for i, row in enumerate(series):
+        got = {rule.name for _, rule in tracker.observe(TABLE, "1h", {"AUSDT": row})}
+        expected = {
+            f"r{k}" for k, w in enumerate(WINDOWS) if _brute(w, series, i) and not (i and _brute(w, series, i - 1))
+        }
+        assert got == expected, i
+        fired += len(got)
+        # 同一根重复出现不推进
+        assert tracker.observe(TABLE, "1h", {"AUSDT": row}) == []
+    assert fired > 50
+
+
+def test_restart_restores_state_without_warmup(tmp_path):
+    from src.storage.window import WindowStorage
+
+    series = _series(random.Random(9), 120)
+    uninterrupted = _tracker()
+    expected = [[r.name for _, r in uninterrupted.observe(TABLE, "1h", {"AUSDT": row})] for row in series]
+
+    storage = WindowStorage(str(tmp_path / "window.db"))
+    first = _tracker()
+    for row in series[:60]:
+        first.observe(TABLE, "1h", {"AUSDT": row})
+    storage.save_many(first.dump())
+    assert first.dump() == []  # 变化标记已清空
+    storage.close()
+
+    restored = _tracker()
+    restored.load(WindowStorage(str(tmp_path / "window.db")).load_all())
+    assert restored.observe(TABLE, "1h", {"AUSDT": series[59]}) == []  # 已处理过的最后一根
+    got = [[r.name for _, r in restored.observe(TABLE, "1h", {"AUSDT": row})] for row in series[60:]]
+    assert got == expected[60:]
+
+
+def _single(window) -> WindowTracker:
+    return WindowTracker([window_rule("r", TABLE, window, "ALERT", 50, "x", timeframes=["1h"], min_volume=0)])
+
+
+def test_restart_at_every_bar_matches_uninterrupted():
+    """单条规则的表（缓冲不被其他规则撑大）在任意位置 dump -> load 后继续 observe 与不中断一致"""
+    rnd = random.Random(11)
+    series = [
+        {"数据时间": f"t{i:04d}", "v": 0.6 + i * 0.01 if (i // 6) % 2 else rnd.random() * 0.4, "w": rnd.random(),
+         "成交额": 1e7}
+        for i in range(90)
+    ]
+    windows = [Consecutive(Bar("v", "rising"), 3), Consecutive(Bar("v", ">", 0.5), 4), *WINDOWS[1:]]
+    for window in windows:
+        uninterrupted = _single(window)
+        expected = [bool(uninterrupted.observe(TABLE, "1h", {"AUSDT": row})) for row in series]
+        assert any(expected), window
+        for split in range(1, len(series)):
+            first = _single(window)
+            for row in series[:split]:
+                first.observe(TABLE, "1h", {"AUSDT": row})
+            restored = _single(window)
+            restored.load(first.dump())
+            got = [bool(restored.observe(TABLE, "1h", {"AUSDT": row})) for row in series[split:]]
+            assert got == expected[split:], (window, split)
+
+
+def test_engine_fires_window_rule_across_cycles(tmp_path, monkeypatch):
+    from src.engines import sqlite_engine
+    from src.storage.cooldown import CooldownStorage
+
+    db = str(tmp_path / "market_data.db")
+
+    def write(ts: str, rsi: float) -> None:
+        with sqlite3.connect(db) as conn:
+            conn.execute(f'DROP TABLE IF EXISTS "{TABLE}"')
+            conn.execute(f'CREATE TABLE "{TABLE}" ("交易对", "周期", "数据时间", "成交额", "位置", "RSI7", "RSI14", "RSI21")')
+            conn.execute(f'INSERT INTO "{TABLE}" VALUES (?, ?, ?, ?, ?, ?, ?, ?)', ("AUSDT", "1h", ts, 1e7, "超买区", rsi, rsi, rsi))
+
+    monkeypatch.setattr(sqlite_engine, "get_cooldown_storage", lambda: CooldownStorage(str(tmp_path / "cd.db")))
+    engine = sqlite_engine.SQLiteSignalEngine(db_path=db)
+    engine.allowed_symbols = set()
+    engine.enabled_rules = {"RSI连续3根超买"}
+
+    fired = []
+    for hour, rsi in enumerate([75, 76, 77, 78]):
+        write(f"2024-01-01T{hour:02d}:00:00", rsi)
+        fired.append([s.rule_name for s in engine.check_signals()])
+    assert fired == [[], [], ["RSI连续3根超买"], []]
+    assert engine.get_stats()["window_rings"] == 1
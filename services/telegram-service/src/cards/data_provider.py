@@ -51,6 +51,10 @@ def reset_symbols_cache():
     global _ALLOWED_SYMBOLS, _SYMBOLS_LOADED
     _ALLOWED_SYMBOLS = None
     _SYMBOLS_LOADED = False
+    # 快照已按旧的币种集合过滤，一并作废
+    with _snapshot_lock:
+        for cache in _snapshot_caches.values():
+            cache.clear()
     LOGGER.info("币种缓存已重置，下次请求将重新加载")
 
 _latest_data_time: datetime | None = None
@@ -158,6 +162,9 @@ class _SQLitePool:
         self._pool: Queue = Queue(maxsize=pool_size)
         self._lock = threading.Lock()
         self._initialized = False
+        # data_version 探测专用连接（该值按连接计，只能在同一连接上比较）
+        self._probe: Optional[sqlite3.Connection] = None
+        self._probe_gen = 0
     
     def _create_conn(self) -> Optional[sqlite3.Connection]:
         """创建新连接"""
@@ -216,8 +223,37 @@ class _SQLitePool:
             except Exception:
                 pass
     
+    def data_version(self) -> Optional[tuple]:
+        """
+        库级变更版本：探测连接上的 PRAGMA data_version，其他连接（trading-service）提交后值变化。
+        探测连接重建时代数加一，避免新旧连接的值偶然相同；库不可用时返回 None（调用方不缓存）。
+        """
+        with self._lock:
+            try:
+                if self._probe is None:
+                    self._probe = self._create_conn()
+                    if self._probe is None:
+                        return None
+                    self._probe_gen += 1
+                return (self._probe_gen, self._probe.execute("PRAGMA data_version").fetchone()[0])
+            except Exception as exc:
+                LOGGER.warning("data_version 探测失败: %s", exc)
+                try:
+                    self._probe.close()
+                except Exception:
+                    pass
+                self._probe = None
+                return None
+
     def close_all(self) -> None:
         """关闭所有连接"""
+        with self._lock:
+            if self._probe is not None:
+                try:
+                    self._probe.close()
+                except Exception:
+                    pass
+                self._probe = None
         while True:
             try:
                 conn = self._pool.get_nowait()
@@ -257,6 +293,112 @@ import atexit
 atexit.register(_cleanup_pool)
 
 
+# ============================================================
+# 周期快照缓存（按库 data_version 失效）
+# ============================================================
+class _PeriodSnapshot:
+    """单个 (表, 周期) 的解析结果：最新批次（fetch_base 口径）与每币种最新一条（fetch_metric 口径）"""
+
+    __slots__ = ("base_ts", "base", "metric_ts", "metric")
+
+    def __init__(self, rows: List[sqlite3.Row], period: str) -> None:
+        target_period = _normalize_period_value(period)
+        allowed = _get_allowed_symbols()
+
+        # 周期与币种过滤 + 时间戳解析，每个快照只做一次
+        entries = []
+        for row in rows:
+            r = dict(row)
+            if _normalize_period_value(str(r.get("周期", ""))) != target_period:
+                continue
+            sym = str(r.get("交易对", "")).upper()
+            if allowed and sym not in allowed:
+                continue
+            entries.append((sym, _parse_timestamp(str(r.get("数据时间", ""))), r))
+
+        # 最新批次：同一最大时间戳的各币种首条
+        self.base_ts = max((ts for _, ts, _ in entries), default=datetime.min)
+        self.base: Dict[str, Dict] = {}
+        if self.base_ts != datetime.min:
+            for sym, ts, r in entries:
+                if ts == self.base_ts and sym and sym not in self.base:
+                    self.base[sym] = r
+
+        # 每币种最新一条（同一时间戳取后出现的行）
+        latest: Dict[str, Dict] = {}
+        seen: Dict[str, datetime] = {}
+        self.metric_ts = datetime.min
+        for sym, ts, r in entries:
+            if not sym:
+                continue
+            if ts > self.metric_ts:
+                self.metric_ts = ts
+            if ts >= seen.get(sym, datetime.min):
+                latest[sym] = r
+                seen[sym] = ts
+        self.metric: List[Dict] = list(latest.values())
+
+
+class _SnapshotCache:
+    """
+    (表, 周期) -> _PeriodSnapshot，同一库的所有卡片共享；库 data_version 变化后整体作废。
+
+    同一键并发未命中时只有一个线程读库解析，其余等待后复用结果。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._version: Optional[tuple] = None
+        self._items: Dict[tuple, _PeriodSnapshot] = {}
+        self._building: Dict[tuple, threading.Lock] = {}
+        self.stats = {"hits": 0, "builds": 0, "invalidations": 0}
+
+    def get(self, key: tuple, version: Optional[tuple], build) -> _PeriodSnapshot:
+        if version is None:
+            return build()
+        with self._lock:
+            if version != self._version:
+                if self._items:
+                    self.stats["invalidations"] += 1
+                self._items.clear()
+                self._version = version
+            snap = self._items.get(key)
+            if snap is not None:
+                self.stats["hits"] += 1
+                return snap
+            key_lock = self._building.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                snap = self._items.get(key) if self._version == version else None
+            if snap is not None:
+                return snap
+            # 探测在读库之前：写入若发生在两者之间，快照比版本新，下次探测即作废重建
+            snap = build()
+            with self._lock:
+                if self._version == version:
+                    self._items[key] = snap
+                    self.stats["builds"] += 1
+            return snap
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._version = None
+
+
+_snapshot_caches: Dict[Path, _SnapshotCache] = {}
+_snapshot_lock = threading.Lock()
+
+
+def _get_snapshot_cache(db_path: Path) -> _SnapshotCache:
+    """获取或创建库对应的快照缓存"""
+    with _snapshot_lock:
+        cache = _snapshot_caches.get(db_path)
+        if cache is None:
+            cache = _snapshot_caches[db_path] = _SnapshotCache()
+        return cache
+
+
 # ============================================================
 # RankingDataProvider（market_data.db）
 # ============================================================
@@ -275,6 +417,7 @@ class RankingDataProvider:
 
         self.db_path = _resolve_path(db_path)
         self._pool = _get_pool(self.db_path)
+        self._snapshots = _get_snapshot_cache(self.db_path)
 
     def _get_conn(self) -> Optional[sqlite3.Connection]:
         """从连接池获取连接"""
@@ -406,78 +549,29 @@ class RankingDataProvider:
         finally:
             self._return_conn(conn)
 
+    def _snapshot(self, table: str, period: str) -> _PeriodSnapshot:
+        """(表, 周期) 快照：库自上次读取后无写入时直接复用，不再读表和解析时间戳"""
+        key = (self._resolve_table(table), period)  # 原始周期：_load_table_period 的 SQL 候选值随写法不同
+        return self._snapshots.get(
+            key,
+            self._pool.data_version(),
+            lambda: _PeriodSnapshot(self._load_table_period(table, period), period),
+        )
+
     # ---------------- 公共读取 ----------------
+    # 返回的行字典在快照间共享，调用方只读（merge_with_base 等会复制后再改）
     def fetch_base(self, period: str) -> Dict[str, Dict]:
         """按周期取基础数据 - 只取最新批次（同一时间戳），按配置过滤币种"""
-        rows = self._load_table_period("基础数据", period)
-        target_period = _normalize_period_value(period)
-        allowed = _get_allowed_symbols()
-        
-        # 第一遍：找出最新时间戳
-        max_ts = datetime.min
-        for row in rows:
-            r = dict(row)
-            r_period = _normalize_period_value(str(r.get("周期", "")))
-            if r_period != target_period:
-                continue
-            sym = str(r.get("交易对", "")).upper()
-            if allowed and sym not in allowed:
-                continue
-            ts = _parse_timestamp(str(r.get("数据时间", "")))
-            if ts > max_ts:
-                max_ts = ts
-
-        _update_latest(max_ts)
-        
-        if max_ts == datetime.min:
-            return {}
-        
-        # 第二遍：只取最新时间戳的数据
-        latest: Dict[str, Dict] = {}
-        for row in rows:
-            r = dict(row)
-            r_period = _normalize_period_value(str(r.get("周期", "")))
-            if r_period != target_period:
-                continue
-            ts = _parse_timestamp(str(r.get("数据时间", "")))
-            sym = str(r.get("交易对", "")).upper()
-            if allowed and sym not in allowed:
-                continue
-            if ts == max_ts and sym and sym not in latest:
-                latest[sym] = r
-        return latest
+        snap = self._snapshot("基础数据", period)
+        _update_latest(snap.base_ts)
+        return dict(snap.base)
 
     def fetch_metric(self, table: str, period: str) -> List[Dict]:
         """通用指标读取：按周期过滤，每个币种取自身最新一条（不强制同一时间戳），按配置过滤币种"""
-        rows = self._load_table_period(table, period)
-        target_period = _normalize_period_value(period)
-        allowed = _get_allowed_symbols()
-
-        latest_per_symbol: Dict[str, Dict] = {}
-        latest_ts: datetime = datetime.min
-
-        for row in rows:
-            r = dict(row)
-            r_period = _normalize_period_value(str(r.get("周期", "")))
-            if r_period != target_period:
-                continue
-            sym = str(r.get("交易对", "")).upper()
-            if not sym:
-                continue
-            if allowed and sym not in allowed:
-                continue
-            ts = _parse_timestamp(str(r.get("数据时间", "")))
-            if ts > latest_ts:
-                latest_ts = ts
-            prev = latest_per_symbol.get(sym)
-            prev_ts = _parse_timestamp(str(prev.get("数据时间"))) if prev else datetime.min
-            if ts >= prev_ts:
-                latest_per_symbol[sym] = r
-
-        if latest_ts != datetime.min:
-            _update_latest(latest_ts)
-
-        return list(latest_per_symbol.values())
+        snap = self._snapshot(table, period)
+        if snap.metric_ts != datetime.min:
+            _update_latest(snap.metric_ts)
+        return list(snap.metric)
 
     def fetch_base_row(self, period: str, symbol: str) -> Dict:
         return self._fetch_single_row("基础数据", period, symbol)
@@ -3,7 +3,6 @@ Signal Service 适配器
 """
 import sys
 import logging
-import threading
 import asyncio
 from pathlib import Path
 from typing import Callable, Optional
@@ -16,10 +15,11 @@ if str(_SIGNAL_SERVICE_SRC) not in sys.path:
     sys.path.insert(0, str(_SIGNAL_SERVICE_SRC))
 
 # 导入 signal-service
-from engines import get_sqlite_engine, get_pg_engine as _get_pg_engine
+from engines import get_sqlite_engine, get_scheduler, get_pg_engine as _get_pg_engine  # noqa: F401  由 signals 包再导出
 from engines.pg_engine import PGSignal
 from events import SignalPublisher, SignalEvent
 from formatters.base import BaseFormatter, strength_bar, fmt_price
+from storage import get_subscription_manager
 
 _send_func: Optional[Callable] = None
 
@@ -58,7 +58,7 @@ def init_pusher(send_func: Callable):
         if not _send_func:
             return
 
-        from .ui import get_signal_push_kb, _get_subscribers
+        from .ui import SUBS_DB_PATH, get_signal_push_kb
 
         icon = {"BUY": "🟢", "SELL": "🔴", "ALERT": "⚠️"}.get(event.direction, "📊")
         bar = strength_bar(event.strength)
@@ -73,7 +73,9 @@ def init_pusher(send_func: Callable):
 
 💬 {msg}"""
 
-        subscribers = _get_subscribers()
+        # 按信号所属表走路由索引；PG 信号不带表名，推送给全部开启推送的用户
+        subs = get_subscription_manager(SUBS_DB_PATH)
+        subscribers = subs.subscribers(event.table) if event.table else subs.get_enabled_subscribers()
 
         async def push():
             for uid in subscribers:
@@ -97,24 +99,16 @@ def init_pusher(send_func: Callable):
 
 
 def start_signal_loop(interval: int = 60):
-    """启动 SQLite 信号检测"""
-    def run():
-        get_sqlite_engine().run_loop(interval=interval)
-
-    thread = threading.Thread(target=run, daemon=True, name="SQLiteSignalEngine")
-    thread.start()
-    logger.info(f"SQLite 信号引擎已启动，间隔 {interval}s")
+    """启动 SQLite 信号检测（统一调度器中的 sqlite 数据源）"""
+    thread = get_scheduler().enable("sqlite", interval=interval)
+    logger.info(f"SQLite 信号检测已加入调度器，间隔 {interval}s")
     return thread
 
 
 def start_pg_signal_loop(interval: int = 60):
-    """启动 PG 信号检测"""
-    def run():
-        _get_pg_engine().run_loop(interval=interval)
-
-    thread = threading.Thread(target=run, daemon=True, name="PGSignalEngine")
-    thread.start()
-    logger.info(f"PG 信号引擎已启动，间隔 {interval}s")
+    """启动 PG 信号检测（与 SQLite 共用调度线程、线程池与冷却表）"""
+    thread = get_scheduler().enable("pg", interval=interval)
+    logger.info(f"PG 信号检测已加入调度器，间隔 {interval}s")
     return thread
 
 
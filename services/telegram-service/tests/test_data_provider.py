@@ -0,0 +1,158 @@
+"""Ranking data provider tests: snapshot cache matches the old per-request parsing, data_version invalidation, symbol reset."""
+
+import importlib.util
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+# 按文件加载：src.cards 包的 __init__ 会导入 telegram 依赖，数据访问层本身不需要
+_spec = importlib.util.spec_from_file_location(
+    "ranking_data_provider", Path(__file__).parents[1] / "src" / "cards" / "data_provider.py"
+)
+dp = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(dp)
+
+BASE = dp.TABLE_NAME_MAP["基础数据"]
+ATR = dp.TABLE_NAME_MAP["ATR波幅榜单"]
+
+
+def _old_fetch_base(provider, period):
+    """原 fetch_base：两遍扫描，取同一最大时间戳的最新批次"""
+    rows = provider._load_table_period("基础数据", period)
+    target_period = dp._normalize_period_value(period)
+    allowed = dp._get_allowed_symbols()
+    max_ts = datetime.min
+    for row in rows:
+        r = dict(row)
+        if dp._normalize_period_value(str(r.get("周期", ""))) != target_period:
+            continue
+        sym = str(r.get("交易对", "")).upper()
+        if allowed and sym not in allowed:
+            continue
+        ts = dp._parse_timestamp(str(r.get("数据时间", "")))
+        if ts > max_ts:
+            max_ts = ts
+    if max_ts == datetime.min:
+        return {}
+    latest = {}
+    for row in rows:
+        r = dict(row)
+        if dp._normalize_period_value(str(r.get("周期", ""))) != target_period:
+            continue
+        ts = dp._parse_timestamp(str(r.get("数据时间", "")))
+        sym = str(r.get("交易对", "")).upper()
+        if allowed and sym not in allowed:
+            continue
+        if ts == max_ts and sym and sym not in latest:
+            latest[sym] = r
+    return latest
+
+
+def _old_fetch_metric(provider, table, period):
+    """原 fetch_metric：每个币种取自身最新一条（同一时间戳取后出现的行）"""
+    rows = provider._load_table_period(table, period)
+    target_period = dp._normalize_period_value(period)
+    allowed = dp._get_allowed_symbols()
+    latest_per_symbol = {}
+    for row in rows:
+        r = dict(row)
+        if dp._normalize_period_value(str(r.get("周期", ""))) != target_period:
+            continue
+        sym = str(r.get("交易对", "")).upper()
+        if not sym or (allowed and sym not in allowed):
+            continue
+        ts = dp._parse_timestamp(str(r.get("数据时间", "")))
+        prev = latest_per_symbol.get(sym)
+        prev_ts = dp._parse_timestamp(str(prev.get("数据时间"))) if prev else datetime.min
+        if ts >= prev_ts:
+            latest_per_symbol[sym] = r
+    return list(latest_per_symbol.values())
+
+
+# 混合时间戳格式、周期别名、同一时间戳重复行、空交易对、小写交易对
+BASE_ROWS = [
+    ("AUSDT", "1h", "2024-03-01T10:00:00Z", 1.0),
+    ("BUSDT", "1h", "2024-03-01 10:00:00", 2.0),
+    ("AUSDT", "1h", "2024-03-01T11:00:00+00:00", 3.0),
+    ("busdt", "1h", "2024-03-01 11:00:00", 4.0),
+    ("AUSDT", "1h", "2024-03-01 11:00:00", 5.0),
+    ("CUSDT", "1h", "2024-03-01T09:00:00", 6.0),
+    ("", "1h", "2024-03-01 11:00:00", 7.0),
+    ("AUSDT", "1d", "2024-03-01", 8.0),
+    ("BUSDT", "24h", "2024-03-01 00:00:00", 9.0),
+    ("CUSDT", "4h", "2024-03-01 08:00:00", 10.0),
+]
+ATR_ROWS = [
+    ("AUSDT", "1h", "2024-03-01 10:00:00", 0.1),
+    ("AUSDT", "1H", "2024-03-01 11:00:00", 0.2),
+    ("BUSDT", "1h", "2024-03-01T09:00:00Z", 0.3),
+    ("BUSDT", "1h", "2024-03-01 09:00:00", 0.4),
+    ("CUSDT", "1h", "bad", 0.5),
+    ("CUSDT", "24h", "2024-03-01", 0.6),
+    ("DUSDT", "1d", "2024-02-29", 0.7),
+]
+
+
+def _write(db_path, table, rows, value_col):
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS '{table}' (交易对 TEXT, 周期 TEXT, 数据时间 TEXT, {value_col} REAL)")
+    conn.executemany(f"INSERT INTO '{table}' VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def provider(tmp_path, monkeypatch):
+    monkeypatch.setenv("SYMBOLS_GROUPS", "auto")
+    dp.reset_symbols_cache()
+    db_path = tmp_path / "market_data.db"
+    _write(db_path, BASE, BASE_ROWS, "当前价格")
+    _write(db_path, ATR, ATR_ROWS, "ATR百分比")
+    yield dp.RankingDataProvider(db_path)
+    dp.reset_symbols_cache()
+    dp._cleanup_pool()
+
+
+@pytest.mark.parametrize("period", ["1h", "1H", "1d", "24h", "4h", "15m"])
+def test_fetch_matches_old_parsing(provider, period):
+    for _ in range(2):  # 首次构建与缓存命中结果相同
+        assert provider.fetch_base(period) == _old_fetch_base(provider, period)
+        assert provider.fetch_metric("ATR波幅榜单", period) == _old_fetch_metric(provider, "ATR波幅榜单", period)
+    assert provider._snapshots.stats["hits"] >= 2
+
+
+def test_snapshot_rebuilt_after_other_connection_writes(provider):
+    assert set(provider.fetch_base("1h")) == {"AUSDT", "BUSDT"}
+    provider.fetch_base("1h")
+    stats = dict(provider._snapshots.stats)
+    assert stats["builds"] == 1 and stats["hits"] == 1
+
+    # trading-service 另一连接写入新批次：data_version 变化，快照作废重建
+    _write(provider.db_path, BASE, [("CUSDT", "1h", "2024-03-01 12:00:00", 11.0)], "当前价格")
+    assert provider.fetch_base("1h") == _old_fetch_base(provider, "1h")
+    assert list(provider.fetch_base("1h")) == ["CUSDT"]
+    assert provider._snapshots.stats["invalidations"] == stats["invalidations"] + 1
+    assert provider._snapshots.stats["builds"] == 2
+    assert dp.get_latest_data_time() == datetime(2024, 3, 1, 12, 0)
+
+
+def test_unavailable_probe_reads_uncached(provider, monkeypatch):
+    monkeypatch.setattr(provider._pool, "data_version", lambda: None)
+    assert provider.fetch_base("1h") == _old_fetch_base(provider, "1h")
+    provider.fetch_base("1h")
+    assert provider._snapshots.stats["builds"] == 0 and provider._snapshots.stats["hits"] == 0
+
+
+def test_reset_symbols_cache_clears_snapshots(provider, monkeypatch):
+    assert {r["交易对"].upper() for r in provider.fetch_metric("ATR波幅榜单", "1h")} == {"AUSDT", "BUSDT", "CUSDT"}
+
+    # 热更新币种配置：快照按旧币种集合过滤，必须一并作废
+    monkeypatch.setenv("SYMBOLS_GROUPS", "main")
+    monkeypatch.setenv("SYMBOLS_GROUP_MAIN", "AUSDT,CUSDT")
+    dp.reset_symbols_cache()
+    assert provider._snapshots._items == {}
+    got = provider.fetch_metric("ATR波幅榜单", "1h")
+    assert got == _old_fetch_metric(provider, "ATR波幅榜单", "1h")
+    assert {r["交易对"].upper() for r in got} == {"AUSDT", "CUSDT"}
@@ -6,6 +6,8 @@
     python -m indicator_service --full-async             # 完全异步持续运行
     python -m indicator_service --event                  # 事件驱动模式（实验性）
     python -m indicator_service --symbols BTCUSDT,ETHUSDT --intervals 5m,15m
+    SHARD_MEMBERS=a,b SHARD_ID=a python -m indicator_service --event   # 分片实例
+    python -m indicator_service --merge-shards           # 合并所有分片库到逻辑库
 """
 import argparse
 import os
@@ -30,6 +32,8 @@ def main():
     parser.add_argument("--once", action="store_true", help="一次性计算（推荐，可配合crontab）")
     parser.add_argument("--full-async", dest="full_async", action="store_true", help="完全异步持续运行")
     parser.add_argument("--event", action="store_true", help="事件驱动模式（实验性）")
+    parser.add_argument("--merge-shards", dest="merge_shards", action="store_true",
+                        help="合并 SHARD_MEMBERS 的分片库到逻辑库")
     parser.add_argument("--mode", choices=["all", "batch", "incremental"], default="all", help="计算模式")
     parser.add_argument("--symbols", type=str, help="交易对，逗号分隔")
     parser.add_argument("--intervals", type=str, help="周期，逗号分隔")
@@ -71,7 +75,10 @@ def main():
     indicator_list = args.indicators.split(",") if args.indicators else None
 
     try:
-        if args.full_async:
+        if args.merge_shards:
+            from .core.sharding import merge_all
+            merge_all()
+        elif args.full_async:
             from .core.async_full_engine import run_async_full
             run_async_full(
                 symbols=symbols,
@@ -7,6 +7,8 @@
     MAX_WORKERS: 并行计算线程数
     KLINE_INTERVALS: K线指标计算周期
     FUTURES_INTERVALS: 期货情绪计算周期
+    SHARD_ID: 当前实例的分片名（为空=不分片）
+    SHARD_MEMBERS: 全部分片名，逗号分隔（一致性哈希分配币种）
 """
 import os
 from pathlib import Path
@@ -65,6 +67,24 @@ class Config:
         "FUTURES_INTERVALS", "5m,15m,1h,4h,1d,1w"
     ))
 
+    # 分片：每个实例只计算自己的币种，写入分片本地 SQLite，再合并到逻辑库
+    shard_id: str = field(default_factory=lambda: os.getenv("SHARD_ID", "").strip())
+    shard_members: List[str] = field(default_factory=lambda: _parse_intervals("SHARD_MEMBERS", ""))
+
+    def __post_init__(self):
+        # 逻辑库路径（读方始终读这个文件）；分片模式下 sqlite_path 指向分片本地文件
+        self.merged_sqlite_path = self.sqlite_path
+        if self.shard_id and self.shard_members and self.shard_id not in self.shard_members:
+            raise ValueError(f"SHARD_ID={self.shard_id} 不在 SHARD_MEMBERS={self.shard_members} 中")
+        if self.sharded:
+            self.sqlite_path = self.sqlite_path.with_name(
+                f"{self.sqlite_path.stem}.{self.shard_id}{self.sqlite_path.suffix}"
+            )
+
+    @property
+    def sharded(self) -> bool:
+        return bool(self.shard_id) and len(self.shard_members) > 1
+
     # 兼容旧代码
     @property
     def intervals(self) -> List[str]:
@@ -316,7 +316,7 @@ def _compute_indicator(indicator_name: str, klines_data: Dict[str, bytes], inter
     if service_root not in sys.path:
         sys.path.insert(0, service_root)
 
-    from src.indicators.base import get_all_indicators
+    from src.indicators.base import get_all_indicators, rows_to_frame, to_rows
     from src.utils.precision import trim_dataframe
 
     indicators = get_all_indicators()
@@ -333,15 +333,13 @@ def _compute_indicator(indicator_name: str, klines_data: Dict[str, bytes], inter
         if len(df) < ind.meta.lookback // 2:
             continue
         try:
-            result = ind.compute(df, symbol, interval)
-            if result is not None and not result.empty:
-                results.append(result)
+            results.extend(to_rows(ind.compute(df, symbol, interval)))
         except Exception:
             pass
 
     if results:
-        combined = pd.concat(results, ignore_index=True)
-        return (indicator_name, interval, trim_dataframe(combined))
+        # 进程边界：汇总后一次性转换 DataFrame，供 AsyncWriter.write_batch 使用
+        return (indicator_name, interval, trim_dataframe(rows_to_frame(results)))
     return (indicator_name, interval, None)
 
 
@@ -392,6 +390,13 @@ class AsyncWriter(Thread):
                     except Exception as e:
                         LOG.error(f"写入失败: {e}")
 
+                if config.sharded:
+                    from .sharding import merge_shard
+                    try:
+                        merge_shard()
+                    except Exception as e:
+                        LOG.error(f"分片合并失败: {e}")
+
 
 class FullAsyncEngine:
     """完全异步引擎 - 三层隔离"""
@@ -473,6 +478,12 @@ class FullAsyncEngine:
         high_symbols = get_high_priority_symbols_fast(top_n=30)
         LOG.info(f"高优先级: {len(high_symbols)} 币种, {time.time()-t0:.1f}s")
 
+        # 分片模式：只保留本分片的币种
+        if config.sharded:
+            from .sharding import shard_symbols
+            high_symbols = set(shard_symbols(high_symbols))
+            LOG.info(f"分片 {config.shard_id}: {len(high_symbols)} 币种")
+
         # 只缓存高优先级币种
         t0 = time.time()
         self._cache = init_cache(list(high_symbols), self.intervals, max_lookback)
@@ -14,10 +14,11 @@ import pickle
 from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from multiprocessing import cpu_count
 from typing import Dict, List, Tuple
-import pandas as pd
 
 from ..config import config
-from ..indicators.base import get_all_indicators, get_batch_indicators, get_incremental_indicators
+from ..indicators.base import (
+    get_all_indicators, get_batch_indicators, get_incremental_indicators, rows_to_frame, to_rows,
+)
 from ..utils.precision import trim_dataframe
 from ..observability import get_logger, metrics, trace, alert, AlertLevel
 
@@ -32,6 +33,9 @@ _db_write_duration = metrics.histogram("db_write_duration_seconds", "数据库
 _active_symbols = metrics.gauge("active_symbols", "活跃交易对数量")
 _last_compute_ts = metrics.gauge("last_compute_timestamp", "最后计算时间戳")
 
+# 数据不足/计算失败时的占位行
+_PLACEHOLDER_COLUMNS = ("交易对", "周期", "数据时间", "指标")
+
 # 全局进程池（复用）
 _executor: ProcessPoolExecutor = None
 
@@ -44,8 +48,8 @@ def _get_executor(max_workers: int) -> ProcessPoolExecutor:
     return _executor
 
 
-def _compute_batch(args: Tuple) -> Dict[str, List[dict]]:
-    """计算一批 (symbol, interval, df_bytes) 的所有指标"""
+def _compute_batch(args: Tuple) -> Dict[str, list]:
+    """计算一批 (symbol, interval, df_bytes) 的所有指标，返回 {指标名: [ResultRow, ...]}"""
     import pickle
     import sys
     import os
@@ -55,17 +59,19 @@ def _compute_batch(args: Tuple) -> Dict[str, List[dict]]:
     if service_root not in sys.path:
         sys.path.insert(0, service_root)
 
-    from src.indicators.base import get_all_indicators
+    from src.indicators.base import get_all_indicators, ResultRow, to_rows
 
     batch, indicator_names, futures_cache = args
 
-    # 设置期货缓存
+    # 设置期货缓存（仅子进程注入；线程模式与主进程共用同一缓存）
     if futures_cache:
-        try:
-            from src.indicators.incremental.futures_sentiment import set_metrics_cache
-            set_metrics_cache(futures_cache)
-        except ImportError:
-            pass
+        import multiprocessing
+        if multiprocessing.parent_process() is not None:
+            try:
+                from src.indicators.incremental.futures_sentiment import set_metrics_cache
+                set_metrics_cache(futures_cache)
+            except ImportError:
+                pass
 
     indicators = get_all_indicators()
     if indicator_names:
@@ -80,16 +86,16 @@ def _compute_batch(args: Tuple) -> Dict[str, List[dict]]:
 
         for name, cls in indicators.items():
             ind = cls()
-            placeholder = [{"交易对": symbol, "周期": interval, "数据时间": last_ts, "指标": None}]
+            placeholder = ResultRow(_PLACEHOLDER_COLUMNS, (symbol, interval, last_ts, None))
 
             if len(df) < ind.meta.lookback // 2:
                 if last_ts:
                     results[name].append(placeholder)
                 continue
             try:
-                result = ind.compute(df, symbol, interval)
-                if result is not None and not result.empty:
-                    results[name].append(result.to_dict('records'))
+                rows = to_rows(ind.compute(df, symbol, interval))
+                if rows:
+                    results[name].extend(rows)
                 elif last_ts:
                     results[name].append(placeholder)
             except Exception:
@@ -139,6 +145,14 @@ class Engine:
                 symbols = list(high_symbols)
                 LOG.info(f"高优先级币种: {len(symbols)} 个, 耗时 {time.time()-t_priority:.1f}s")
 
+            # 分片模式：只缓存/计算本分片的币种
+            if config.sharded:
+                from .sharding import shard_symbols
+                symbols = shard_symbols(symbols)
+                LOG.info(f"分片 {config.shard_id}: {len(symbols)} 币种")
+                if not symbols:
+                    return
+
             _active_symbols.set(len(symbols))
             span.set_tag("symbols_count", len(symbols))
 
@@ -202,10 +216,11 @@ class Engine:
                 for (sym, iv), df in all_klines.items()
             ]
 
-            # 预加载期货缓存
+            # 预加载期货缓存（所有期货周期一次导出，按本次币种裁剪）
             try:
                 from src.indicators.incremental.futures_sentiment import get_metrics_cache
-                futures_cache = get_metrics_cache()
+                futures_intervals = [iv for iv in self.intervals if iv in config.futures_intervals]
+                futures_cache = get_metrics_cache(futures_intervals, symbols) if futures_intervals else None
             except ImportError:
                 futures_cache = None
 
@@ -238,7 +253,7 @@ class Engine:
                 _db_write_duration.observe(t_write)
                 write_span.set_tag("duration_s", round(t_write, 2))
 
-            total_rows = sum(len(recs) for recs_list in all_results.values() for recs in recs_list)
+            total_rows = sum(len(rows) for rows in all_results.values())
             total_time = time.time() - start
 
             # 更新指标
@@ -255,23 +270,12 @@ class Engine:
                 alert(AlertLevel.WARNING, "计算耗时过长", f"总耗时 {total_time:.1f}s 超过阈值", symbols=len(symbols), rows=total_rows)
 
     def _write_simple_db(self, all_results: Dict[str, list]):
-        """写入 market_data.db - 每个指标一张表，全量覆盖"""
+        """写入 market_data.db - 每个指标一张表，ResultRow 直接写入（不经 DataFrame）"""
         from ..db.reader import writer as sqlite_writer
 
-        for indicator_name, records_list in all_results.items():
-            if not records_list:
-                continue
-            # 合并所有记录
-            all_records = []
-            for records in records_list:
-                if isinstance(records, list):
-                    all_records.extend(records)
-                elif isinstance(records, dict):
-                    all_records.append(records)
-
-            if all_records:
-                df = pd.DataFrame(all_records)
-                sqlite_writer.write(indicator_name, df)
+        for indicator_name, rows in all_results.items():
+            if rows:
+                sqlite_writer.write_rows(indicator_name, rows)
 
         # 全局计算：市场占比
         self._update_market_share()
@@ -279,6 +283,14 @@ class Engine:
         # 清理期货表的1m数据（期货无1m粒度）
         self._cleanup_futures_1m()
 
+        # 分片模式：合并到读方使用的逻辑库
+        if config.sharded:
+            from .sharding import merge_shard
+            try:
+                merge_shard()
+            except Exception as e:
+                LOG.error(f"分片合并失败: {e}")
+
     def _update_market_share(self):
         """更新期货情绪聚合表的市场占比字段（基于全市场持仓总额）"""
         import sqlite3
@@ -363,7 +375,12 @@ class Engine:
         batches = []
         for i in range(0, len(task_list), batch_size):
             batch = task_list[i:i + batch_size]
-            batches.append((batch, indicator_names, futures_cache))
+            batch_cache = futures_cache
+            if futures_cache and backend == "process":
+                # 进程模式：每批只携带本批币种的期货切片，减少序列化体积
+                batch_symbols = {sym for sym, _, _ in batch}
+                batch_cache = {iv: snap.subset(batch_symbols) for iv, snap in futures_cache.items()}
+            batches.append((batch, indicator_names, batch_cache))
 
         all_results = {name: [] for name in indicators}
 
@@ -413,7 +430,6 @@ class Engine:
         if symbol not in klines:
             return
 
-        result = indicator.compute(klines[symbol], symbol, interval)
-        if result is not None and not result.empty:
-            result = trim_dataframe(result)
-            writer.write(indicator.meta.name, result, interval)
+        rows = to_rows(indicator.compute(klines[symbol], symbol, interval))
+        if rows:
+            writer.write(indicator.meta.name, trim_dataframe(rows_to_frame(rows)), interval)
@@ -6,7 +6,14 @@
 架构:
   启动 → 全量计算（用 Engine）
   candles_1m (NOTIFY) → 触发对应周期增量计算
+
+调度:
+  每个触发携带截止时间（下一根 K 线闭合），按 (层级, 币种分组, 截止时间) 出队:
+    fast(快指标) → slow(慢指标) → __full__(全量)，同一层级内高优先级币种先于其余币种
+  同一 (周期, 层级, 分组) 未出队的旧触发被新触发合并；已过期或预计超时的慢任务直接丢弃
 """
+import heapq
+import itertools
 import json
 import logging
 import signal
@@ -15,16 +22,34 @@ import time
 from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from queue import Queue
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import psycopg
 import select
 
 from ..config import config
+from ..observability import metrics
 
 LOG = logging.getLogger("indicator_service.event")
 
+# 调度指标
+_deadline_missed = metrics.counter("event_deadline_missed_total", "错过截止时间的触发数")
+_coalesced = metrics.counter("event_coalesced_total", "被新触发合并的触发数")
+_queue_depth = metrics.gauge("event_queue_depth", "待调度触发数")
+_lateness = metrics.histogram("event_lateness_seconds", "完成时间相对截止时间的余量(负=超时)",
+                              (-60, -10, -1, 0, 1, 10, 60, 300, 3600, float("inf")))
+
+# 调度层级（数值越小越先执行）
+TIER_FAST = "fast"
+TIER_SLOW = "slow"
+TIER_FULL = "full"
+TIER_PRIORITY = {TIER_FAST: 0, TIER_SLOW: 1, TIER_FULL: 2}
+
+# 币种分组（同一层级内数值越小越先执行）：高优先级币种 / 其余指定币种
+GROUP_HIGH = "high"
+GROUP_REST = "rest"
+GROUP_PRIORITY = {GROUP_HIGH: 0, GROUP_REST: 1}
+
 # 周期配置: (周期名, 分钟数, CA刷新延迟秒)
 INTERVALS = [
     ("1m", 1, 2),
@@ -43,6 +68,69 @@ class TriggerEvent:
     interval: str
     trigger_time: datetime
     symbols: Optional[List[str]] = None
+    deadline: Optional[datetime] = None   # 下一根 K 线闭合时间，None=不限
+    tier: str = TIER_FAST
+    group: str = GROUP_HIGH
+
+    @property
+    def key(self) -> Tuple[str, str, str]:
+        """合并 / 互斥 / 耗时统计的键"""
+        return self.interval, self.tier, self.group
+
+
+class DeadlineQueue:
+    """
+    截止时间优先队列
+
+    - 按 (层级优先级, 币种分组优先级, 截止时间, 入队顺序) 出队
+    - 同一 (周期, 层级, 分组) 只保留最新触发，旧触发标记失效（惰性删除）
+    - 出队时已过截止时间的触发直接丢弃并计数
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[int, int, float, int, TriggerEvent]] = []
+        self._pending: Dict[Tuple[str, str, str], TriggerEvent] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def put(self, event: TriggerEvent):
+        key = event.key
+        deadline_ts = event.deadline.timestamp() if event.deadline else float("inf")
+        with self._cond:
+            if key in self._pending:
+                _coalesced.inc(1, interval=event.interval, tier=event.tier, group=event.group)
+            self._pending[key] = event
+            heapq.heappush(self._heap, (TIER_PRIORITY.get(event.tier, 0), GROUP_PRIORITY.get(event.group, 0),
+                                        deadline_ts, next(self._seq), event))
+            _queue_depth.set(len(self._pending))
+            self._cond.notify()
+
+    def get(self, timeout: float = None) -> Optional[TriggerEvent]:
+        """取出下一个有效触发，超时返回 None"""
+        end = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while True:
+                while self._heap:
+                    _, _, deadline_ts, _, event = heapq.heappop(self._heap)
+                    key = event.key
+                    if self._pending.get(key) is not event:
+                        continue  # 已被合并
+                    del self._pending[key]
+                    _queue_depth.set(len(self._pending))
+                    if time.time() >= deadline_ts:
+                        _deadline_missed.inc(1, interval=event.interval, tier=event.tier, group=event.group,
+                                             reason="expired")
+                        LOG.warning(f"[{event.interval}/{event.tier}/{event.group}] 已过截止时间，丢弃")
+                        continue
+                    return event
+                remaining = end - time.monotonic() if end is not None else None
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def qsize(self) -> int:
+        with self._cond:
+            return len(self._pending)
 
 
 class EventEngine:
@@ -57,12 +145,16 @@ class EventEngine:
         self.workers = workers
 
         self._running = False
-        self._trigger_queue: Queue = Queue()
+        self._trigger_queue = DeadlineQueue()
         self._last_triggered: Dict[str, datetime] = {}
         self._initialized = False  # 计算线程已就绪
         self._ready_for_events = False  # 已识别高优先级币种，可以接受 NOTIFY
         self._high_symbols = []
-        self._interval_locks: Dict[str, threading.Lock] = {}
+        self._rest_symbols = []  # 指定币种中非高优先级的部分，排在高优先级之后
+        self._interval_locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+        # 各 (周期, 层级, 分组) 计算耗时的指数滑动平均，用于预判超时
+        self._duration_ewma: Dict[Tuple[str, str, str], float] = {}
+        self._fast_indicators, self._slow_indicators = self._split_indicators()
 
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
@@ -101,19 +193,40 @@ class EventEngine:
         # 识别高优先级币种
         LOG.info("识别高优先级币种...")
         t0 = time.time()
-        self._high_symbols = list(get_high_priority_symbols_fast(top_n=30))
-        LOG.info(f"高优先级: {len(self._high_symbols)} 币种, {time.time()-t0:.1f}s")
+        self._high_symbols, self._rest_symbols = self._group_symbols(get_high_priority_symbols_fast(top_n=30))
+        LOG.info(f"高优先级: {len(self._high_symbols)} 币种, 其余: {len(self._rest_symbols)} 币种, {time.time()-t0:.1f}s")
         self._ready_for_events = True
 
         # 启动时全量计算一次（不阻塞通知消费）
         LOG.info("=" * 40)
         LOG.info("调度启动全量计算（后台）...")
-        self._trigger_queue.put(TriggerEvent(interval="__full__", trigger_time=datetime.now(timezone.utc)))
+        self._put_groups(interval="__full__", trigger_time=datetime.now(timezone.utc), tier=TIER_FULL)
         LOG.info("=" * 40)
 
         self._initialized = True
         LOG.info("计算线程就绪，开始监听事件驱动增量更新...")
 
+    def _group_symbols(self, high_priority) -> Tuple[List[str], List[str]]:
+        """
+        划分币种分组：未指定币种时只算高优先级币种；
+        指定币种时其中的高优先级币种先算，其余排在同层级之后（而非被忽略）
+        """
+        if self.symbols:
+            high = [s for s in self.symbols if s in high_priority]
+            rest = [s for s in self.symbols if s not in high_priority]
+        else:
+            high, rest = list(high_priority), []
+        if config.sharded:
+            from .sharding import shard_symbols
+            high, rest = shard_symbols(high), shard_symbols(rest)
+        return high, rest
+
+    def _put_groups(self, **fields):
+        """按币种分组入队（空分组不入队）"""
+        for group, symbols in ((GROUP_HIGH, self._high_symbols), (GROUP_REST, self._rest_symbols)):
+            if symbols:
+                self._trigger_queue.put(TriggerEvent(symbols=symbols, group=group, **fields))
+
     def _listen_loop(self):
         """监听 PostgreSQL NOTIFY"""
         conn = psycopg.connect(config.db_url, autocommit=True)
@@ -162,6 +275,8 @@ class EventEngine:
                 bucket_ts = datetime.fromisoformat(bucket_ts_str.replace("Z", "+00:00"))
             else:
                 bucket_ts = bucket_ts_str
+            if bucket_ts.tzinfo is None:
+                bucket_ts = bucket_ts.replace(tzinfo=timezone.utc)
 
             minute = bucket_ts.hour * 60 + bucket_ts.minute
 
@@ -178,11 +293,13 @@ class EventEngine:
 
                     self._last_triggered[interval] = bucket_ts
 
-                    # 延迟触发（等待 CA 刷新）
+                    # 延迟触发（等待 CA 刷新），截止时间为下一根 K 线闭合
+                    # bucket_ts 是 1m 开盘时间：本根在 +1m 闭合（NOTIFY 到达时已过去），下一根再过一个周期
                     trigger_time = datetime.now(timezone.utc) + timedelta(seconds=delay)
-                    event = TriggerEvent(interval=interval, trigger_time=trigger_time)
-                    self._trigger_queue.put(event)
-                    LOG.info(f"[{interval}] 调度计算 @ {bucket_ts}, 延迟 {delay}s")
+                    deadline = bucket_ts + timedelta(minutes=1 + minutes)
+                    for tier in (TIER_FAST, TIER_SLOW):
+                        self._put_groups(interval=interval, trigger_time=trigger_time, deadline=deadline, tier=tier)
+                    LOG.info(f"[{interval}] 调度计算 @ {bucket_ts}, 延迟 {delay}s, 截止 {deadline:%H:%M}")
 
         except Exception as e:
             LOG.error(f"调度失败: {e}")
@@ -192,50 +309,96 @@ class EventEngine:
         # 期货指标单独处理，这里简化为同样的逻辑
         pass
 
-    def _do_compute(self, interval: str):
-        """执行单个周期的计算 - 直接用 Engine"""
+    @staticmethod
+    def _split_indicators() -> Tuple[List[str], List[str]]:
+        """分离快慢指标（慢指标定义与 async_full_engine 一致）"""
+        from ..indicators.base import get_all_indicators
+        from .async_full_engine import SLOW_INDICATORS
+
+        names = list(get_all_indicators().keys())
+        return [n for n in names if n not in SLOW_INDICATORS], [n for n in names if n in SLOW_INDICATORS]
+
+    def _do_compute(self, interval: str, tier: str = TIER_FULL, symbols: Optional[List[str]] = None):
+        """执行单个周期单个层级的计算 - 直接用 Engine"""
         from .engine import Engine
-        LOG.info(f"[{interval}] 计算 {len(self._high_symbols)} 币种...")
+        symbols = symbols or self._high_symbols
+        LOG.info(f"[{interval}/{tier}] 计算 {len(symbols)} 币种...")
         t0 = time.time()
 
         if interval == "__full__":
             Engine(
-                symbols=self._high_symbols,
+                symbols=symbols,
                 intervals=self.intervals,
                 max_workers=self.workers,
             ).run(mode="all")
         else:
-            Engine(
-                symbols=self._high_symbols,
-                intervals=[interval],
-                max_workers=self.workers,
-            ).run(mode="all")
+            indicators = self._fast_indicators if tier == TIER_FAST else self._slow_indicators
+            if indicators:
+                Engine(
+                    symbols=symbols,
+                    intervals=[interval],
+                    indicators=indicators,
+                    max_workers=self.workers,
+                ).run(mode="all")
 
-        LOG.info(f"[{interval}] 完成: {time.time()-t0:.1f}s")
+        LOG.info(f"[{interval}/{tier}] 完成: {time.time()-t0:.1f}s")
 
     def _calculation_loop(self):
-        """计算循环 - 处理触发队列"""
+        """计算循环 - 只在有空闲 worker 时出队，保证优先级在执行层面生效"""
+        slots = threading.Semaphore(self.workers)
         with ThreadPoolExecutor(max_workers=self.workers) as executor:
             while self._running:
-                try:
-                    event = self._trigger_queue.get(timeout=1.0)
-                except Exception:
+                if not slots.acquire(timeout=1.0):
                     continue
+                event = self._trigger_queue.get(timeout=1.0)
+                if event is None:
+                    slots.release()
+                    continue
+
+                future = executor.submit(self._run_single_event, event)
+                future.add_done_callback(lambda _: slots.release())
 
-                executor.submit(self._run_single_event, event)
+    def _would_overrun(self, event: TriggerEvent) -> bool:
+        """慢层级按历史耗时预判是否超过截止时间（快层级始终执行）"""
+        if event.deadline is None or event.tier != TIER_SLOW:
+            return False
+        estimate = self._duration_ewma.get(event.key)
+        if estimate is None:
+            return False
+        start = max(event.trigger_time, datetime.now(timezone.utc))
+        return start + timedelta(seconds=estimate) > event.deadline
 
     def _run_single_event(self, event: TriggerEvent):
-        """带互斥的单事件执行，避免同周期重入"""
-        lock = self._interval_locks.setdefault(event.interval, threading.Lock())
+        """带互斥的单事件执行，避免同周期同层级同分组重入"""
+        key = event.key
+        labels = {"interval": event.interval, "tier": event.tier, "group": event.group}
+        lock = self._interval_locks.setdefault(key, threading.Lock())
         if not lock.acquire(blocking=False):
-            LOG.info(f"[{event.interval}] 正在计算，跳过重复触发")
+            LOG.info(f"[{event.interval}/{event.tier}/{event.group}] 正在计算，跳过重复触发")
+            _coalesced.inc(1, **labels)
             return
         try:
+            if self._would_overrun(event):
+                _deadline_missed.inc(1, reason="predicted", **labels)
+                LOG.warning(f"[{event.interval}/{event.tier}/{event.group}] 预计超过截止时间，丢弃")
+                return
             now = datetime.now(timezone.utc)
             wait_seconds = (event.trigger_time - now).total_seconds()
             if wait_seconds > 0:
                 time.sleep(wait_seconds)
-            self._do_compute(event.interval)
+
+            t0 = time.time()
+            self._do_compute(event.interval, event.tier, event.symbols)
+            elapsed = time.time() - t0
+            prev = self._duration_ewma.get(key)
+            self._duration_ewma[key] = elapsed if prev is None else 0.7 * prev + 0.3 * elapsed
+
+            if event.deadline is not None:
+                slack = (event.deadline - datetime.now(timezone.utc)).total_seconds()
+                _lateness.observe(slack, **labels)
+                if slack < 0:
+                    _deadline_missed.inc(1, reason="overrun", **labels)
+                    LOG.warning(f"[{event.interval}/{event.tier}/{event.group}] 超过截止时间 {-slack:.1f}s")
         except Exception as e:
             LOG.error(f"计算错误: {e}")
         finally:
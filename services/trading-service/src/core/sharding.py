@@ -0,0 +1,160 @@
+"""
+水平分片
+
+多个引擎实例通过一致性哈希划分币种全集，每个实例只缓存/计算自己的分片，
+结果写入分片本地 SQLite（config.sqlite_path），再合并到读方使用的逻辑库
+（config.merged_sqlite_path）。分片间币种不相交，合并按币种整体替换，互不覆盖。
+
+配置:
+    SHARD_MEMBERS=engine-0,engine-1,engine-2
+    SHARD_ID=engine-1
+"""
+import bisect
+import hashlib
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from ..config import config
+
+LOG = logging.getLogger("indicator_service.shard")
+
+# 每个成员的虚拟节点数（越大分布越均匀）
+VIRTUAL_NODES = 128
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """一致性哈希环：成员增减时只迁移约 1/N 的币种"""
+
+    def __init__(self, members: Sequence[str], vnodes: int = VIRTUAL_NODES):
+        if not members:
+            raise ValueError("分片成员不能为空")
+        self.members = list(dict.fromkeys(members))
+        points = sorted((_hash(f"{m}#{i}"), m) for m in self.members for i in range(vnodes))
+        self._keys = [p for p, _ in points]
+        self._owners = [m for _, m in points]
+
+    def owner(self, symbol: str) -> str:
+        idx = bisect.bisect(self._keys, _hash(symbol)) % len(self._keys)
+        return self._owners[idx]
+
+    def assign(self, symbols: Iterable[str]) -> Dict[str, List[str]]:
+        """按成员分组"""
+        result: Dict[str, List[str]] = {m: [] for m in self.members}
+        for s in symbols:
+            result[self.owner(s)].append(s)
+        return result
+
+
+_ring: Optional[HashRing] = None
+
+
+def get_ring() -> Optional[HashRing]:
+    """当前配置的哈希环，未启用分片返回 None"""
+    global _ring
+    if not config.sharded:
+        return None
+    if _ring is None:
+        _ring = HashRing(config.shard_members)
+    return _ring
+
+
+def shard_symbols(symbols: Iterable[str], shard_id: str = None) -> List[str]:
+    """过滤出属于当前分片的币种（未启用分片时原样返回）"""
+    ring = get_ring()
+    if ring is None:
+        return list(symbols)
+    shard_id = shard_id or config.shard_id
+    return [s for s in symbols if ring.owner(s) == shard_id]
+
+
+def shard_sqlite_path(shard_id: str, base: Path = None) -> Path:
+    """分片本地库路径: market_data.db -> market_data.<shard_id>.db（与 Config 约定一致）"""
+    base = Path(base or config.merged_sqlite_path)
+    return base.with_name(f"{base.stem}.{shard_id}{base.suffix}")
+
+
+def merge_shard(shard_path: Path = None, target_path: Path = None, timeout: float = 30.0,
+                shard_id: str = None, ring: HashRing = None) -> int:
+    """
+    将分片库合并到逻辑库
+
+    对分片库中每张表：只取哈希环上归属本分片的币种（成员变更后分片库残留的旧币种不会覆盖新归属），
+    删除目标库中这些币种的所有行，再整体插入。无币种列的表无法按分片拆分，只由首个成员合并，
+    避免各分片轮流整表覆盖。单个事务完成，读方要么看到旧快照要么看到新快照。返回合并行数。
+    """
+    shard_path = Path(shard_path or config.sqlite_path)
+    target_path = Path(target_path or config.merged_sqlite_path)
+    if not shard_path.exists() or shard_path == target_path:
+        return 0
+    ring = ring or get_ring()
+    shard_id = shard_id or config.shard_id
+
+    t0 = time.time()
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(target_path), timeout=timeout)
+    merged = 0
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        if ring is not None:
+            conn.create_function("shard_owned", 1, lambda s: ring.owner(s) == shard_id, deterministic=True)
+        conn.execute("ATTACH DATABASE ? AS shard", (str(shard_path),))
+        conn.execute("BEGIN IMMEDIATE")
+        tables = [r[0] for r in conn.execute("SELECT name FROM shard.sqlite_master WHERE type='table'")]
+        for table in tables:
+            shard_cols = [c[1] for c in conn.execute(f"PRAGMA shard.table_info([{table}])")]
+            if ring is not None and "交易对" not in shard_cols and shard_id != ring.members[0]:
+                continue
+            target_cols = [c[1] for c in conn.execute(f"PRAGMA main.table_info([{table}])")]
+            if not target_cols:
+                create_sql = conn.execute(
+                    "SELECT sql FROM shard.sqlite_master WHERE type='table' AND name=?", (table,)
+                ).fetchone()[0]
+                conn.execute(create_sql)
+                target_cols = shard_cols
+
+            cols = [c for c in target_cols if c in shard_cols]
+            if not cols:
+                continue
+            cols_escaped = ",".join(f"[{c}]" for c in cols)
+            where = ""
+            if "交易对" in cols:
+                if ring is not None:
+                    where = " WHERE shard_owned([交易对])"
+                conn.execute(f"DELETE FROM main.[{table}] WHERE [交易对] IN "
+                             f"(SELECT DISTINCT [交易对] FROM shard.[{table}]{where})")
+            else:
+                # 无币种列的表由分片库整体覆盖（分片模式下只有首个成员执行到这里）
+                conn.execute(f"DELETE FROM main.[{table}]")
+            cur = conn.execute(f"INSERT INTO main.[{table}] ({cols_escaped}) SELECT {cols_escaped} FROM shard.[{table}]{where}")
+            merged += max(cur.rowcount, 0)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        try:
+            conn.execute("DETACH DATABASE shard")
+        except sqlite3.Error:
+            pass
+        conn.close()
+
+    LOG.info(f"分片合并: {shard_path.name} -> {target_path.name}, {merged} 行, {time.time()-t0:.2f}s")
+    return merged
+
+
+def merge_all(shard_ids: Sequence[str] = None, target_path: Path = None) -> int:
+    """合并所有成员的分片库（协调进程 / 手动执行）"""
+    target_path = Path(target_path or config.merged_sqlite_path)
+    shard_ids = shard_ids or config.shard_members
+    ring = HashRing(shard_ids)
+    total = 0
+    for sid in shard_ids:
+        total += merge_shard(shard_sqlite_path(sid, target_path), target_path, shard_id=sid, ring=ring)
+    return total
@@ -17,6 +17,7 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 
 from ..config import config
+from .reader import candle_table
 
 LOG = logging.getLogger("indicator_service.cache")
 
@@ -46,6 +47,9 @@ class DataCache:
         # 初始化标记
         self._initialized: Dict[str, bool] = {}
 
+    def _connect(self):
+        return psycopg.connect(self.db_url, row_factory=dict_row)
+
     def init_interval(self, symbols: List[str], interval: str):
         """初始化单个周期 - 单SQL批量查询"""
         LOG.info(f"[{interval}] 初始化缓存 ({len(symbols)} 币种)...")
@@ -55,7 +59,7 @@ class DataCache:
             self._klines[interval] = {}
             self._last_ts[interval] = {}
 
-        table = f"candles_{interval}"
+        table = candle_table(interval, self._connect)
         symbols_set = set(symbols)
         count = 0
 
@@ -106,7 +110,7 @@ class DataCache:
             self.init_interval(symbols, interval)
             return len(symbols)
 
-        table = f"candles_{interval}"
+        table = candle_table(interval, self._connect)
         updated = 0
 
         try:
@@ -0,0 +1,242 @@
+"""
+期货指标缓存（列式）
+
+FuturesSentiment（最新值）与 FuturesAggregate（历史窗口）共用：
+1. 每个周期一份列式快照：按 (symbol, 时间) 排序的连续数组 + 每个 symbol 的切片
+2. 按数据源节奏刷新：所有周期都由 5m 原始数据（及每 5 分钟刷新的连续聚合）派生，
+   只有新的 5m bucket 到期后才重新加载，而非固定 60 秒 TTL
+3. 引擎一次性导出所有周期（按币种裁剪）的快照交给计算进程，子进程不再各自查库
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from ..config import config
+
+LOG = logging.getLogger("indicator_service.metrics_cache")
+
+# 期货数据周期秒数（无 1m）
+PERIOD_SECONDS = {"5m": 300, "15m": 900, "1h": 3600, "4h": 14400, "1d": 86400, "1w": 604800}
+
+# 数据源（binance_futures_metrics_5m 及各周期连续聚合）的更新周期
+SOURCE_PERIOD = 300
+# 新 bucket 入库延迟：到点后等待采集/连续聚合刷新
+SOURCE_LAG = 30
+# 5m 快照不完整（新 bucket 尚未入库）时的重试间隔
+RETRY_SECONDS = 30
+
+# 每个币种保留的历史根数（FuturesAggregate 窗口）
+HISTORY_LIMIT = 240
+# 最大回看天数（与原逐币种查询的 30 天上限一致）
+MAX_LOOKBACK_DAYS = 30
+
+VALUE_COLUMNS = ("oi", "oiv", "ctlsr", "tlsr", "lsr", "tlsvr")
+
+
+def _source_idx(now: float) -> int:
+    """当前已到期的数据源 bucket 序号"""
+    return int((now - SOURCE_LAG) // SOURCE_PERIOD)
+
+
+def _value(v) -> Optional[float]:
+    """NaN 还原为 None（与原 dict 缓存中数据库 NULL 的语义一致）"""
+    return None if v != v else float(v)
+
+
+class MetricsSnapshot:
+    """单个周期的列式快照"""
+
+    __slots__ = ("interval", "source_idx", "loaded_at", "ts", "closed", "columns", "slices")
+
+    def __init__(self, interval: str, ts: np.ndarray, closed: np.ndarray, columns: Dict[str, np.ndarray],
+                 slices: Dict[str, tuple], source_idx: int = 0, loaded_at: float = 0.0):
+        self.interval = interval
+        self.ts = ts
+        self.closed = closed
+        self.columns = columns
+        self.slices = slices
+        self.source_idx = source_idx
+        self.loaded_at = loaded_at
+
+    @classmethod
+    def from_rows(cls, interval: str, rows: list, source_idx: int = 0) -> "MetricsSnapshot":
+        """rows: (symbol, ts, oi, oiv, ctlsr, tlsr, lsr, tlsvr, closed)，按 symbol, ts 升序"""
+        n = len(rows)
+        ts = np.empty(n, dtype=np.float64)
+        closed = np.zeros(n, dtype=bool)
+        columns = {c: np.empty(n, dtype=np.float64) for c in VALUE_COLUMNS}
+        slices: Dict[str, tuple] = {}
+
+        start, current = 0, None
+        for i, row in enumerate(rows):
+            symbol = row[0]
+            if symbol != current:
+                if current is not None:
+                    slices[current] = (start, i)
+                current, start = symbol, i
+            t = row[1]
+            if t is not None and t.tzinfo is None:
+                t = t.replace(tzinfo=timezone.utc)
+            ts[i] = t.timestamp() if t is not None else np.nan
+            for j, c in enumerate(VALUE_COLUMNS):
+                v = row[2 + j]
+                columns[c][i] = float(v) if v is not None else np.nan
+            closed[i] = bool(row[8])
+        if current is not None:
+            slices[current] = (start, n)
+
+        return cls(interval, ts, closed, columns, slices, source_idx, time.time())
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    @property
+    def max_ts(self) -> float:
+        return float(np.nanmax(self.ts)) if len(self.ts) else 0.0
+
+    def _row(self, i: int) -> dict:
+        t = self.ts[i]
+        dt = datetime.fromtimestamp(t, tz=timezone.utc) if t == t else None
+        row = {"datetime": dt, "ts": int(t) if dt else 0}
+        for c in VALUE_COLUMNS:
+            row[c] = _value(self.columns[c][i])
+        row["x"] = bool(self.closed[i])
+        return row
+
+    def latest(self, symbol: str) -> Optional[dict]:
+        span = self.slices.get(symbol)
+        if not span:
+            return None
+        return self._row(span[1] - 1)
+
+    def history(self, symbol: str, limit: int = HISTORY_LIMIT) -> List[dict]:
+        """时间升序的最近 limit 根"""
+        span = self.slices.get(symbol)
+        if not span:
+            return []
+        start, end = span
+        return [self._row(i) for i in range(max(start, end - limit), end)]
+
+    def subset(self, symbols: Iterable[str]) -> "MetricsSnapshot":
+        """按币种裁剪（跨进程传递时只带需要的切片）"""
+        spans = [(s, self.slices[s]) for s in symbols if s in self.slices]
+        if not spans:
+            idx = np.empty(0, dtype=np.int64)
+        else:
+            idx = np.concatenate([np.arange(a, b) for _, (a, b) in spans])
+        slices, offset = {}, 0
+        for s, (a, b) in spans:
+            slices[s] = (offset, offset + b - a)
+            offset += b - a
+        return MetricsSnapshot(
+            self.interval, self.ts[idx], self.closed[idx],
+            {c: arr[idx] for c, arr in self.columns.items()},
+            slices, self.source_idx, self.loaded_at,
+        )
+
+
+class FuturesMetricsCache:
+    """期货指标缓存：按周期懒加载，数据源新 bucket 到期才刷新"""
+
+    def __init__(self, db_url: str = None, history_limit: int = HISTORY_LIMIT):
+        self.db_url = db_url or config.db_url
+        self.history_limit = history_limit
+        self._snapshots: Dict[str, MetricsSnapshot] = {}
+        self._lock = threading.RLock()
+        # 由 install() 注入的快照（计算进程），不再查库
+        self._installed = False
+
+    def _is_due(self, snap: Optional[MetricsSnapshot], now: float) -> bool:
+        if self._installed:
+            return False
+        if snap is None:
+            return True
+        if _source_idx(now) > snap.source_idx:
+            return True
+        # 5m 原始表：新 bucket 还没入库则短间隔重试
+        if snap.interval == "5m" and snap.max_ts < snap.source_idx * SOURCE_PERIOD:
+            return now - snap.loaded_at >= RETRY_SECONDS
+        return False
+
+    def get(self, interval: str) -> Optional[MetricsSnapshot]:
+        if interval not in PERIOD_SECONDS:
+            return None
+        now = time.time()
+        snap = self._snapshots.get(interval)
+        if not self._is_due(snap, now):
+            return snap
+        with self._lock:
+            snap = self._snapshots.get(interval)
+            if self._is_due(snap, now):
+                loaded = self._load(interval, _source_idx(now))
+                if loaded is not None:
+                    self._snapshots[interval] = snap = loaded
+        return snap
+
+    def _load(self, interval: str, source_idx: int) -> Optional[MetricsSnapshot]:
+        """单 SQL 加载所有币种最近 history_limit 根（时间窗口按周期收窄，不再固定扫 30 天）"""
+        import psycopg
+
+        if interval == "5m":
+            table, time_col, closed_col = "binance_futures_metrics_5m", "create_time", "is_closed"
+        else:
+            table, time_col, closed_col = f"binance_futures_metrics_{interval}_last", "bucket", "complete"
+
+        # 2 倍余量容忍缺口，上限 30 天
+        lookback = min(PERIOD_SECONDS[interval] * self.history_limit * 2, MAX_LOOKBACK_DAYS * 86400)
+        sql = f"""
+            SELECT symbol, t, oi, oiv, ctlsr, tlsr, lsr, tlsvr, closed FROM (
+                SELECT symbol, {time_col} AS t, sum_open_interest AS oi, sum_open_interest_value AS oiv,
+                       count_toptrader_long_short_ratio AS ctlsr, sum_toptrader_long_short_ratio AS tlsr,
+                       count_long_short_ratio AS lsr, sum_taker_long_short_vol_ratio AS tlsvr,
+                       {closed_col} AS closed,
+                       ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY {time_col} DESC) AS rn
+                FROM market_data.{table}
+                WHERE {time_col} > NOW() - make_interval(secs => %s)
+            ) r
+            WHERE rn <= %s
+            ORDER BY symbol, t
+        """
+        t0 = time.time()
+        try:
+            with psycopg.connect(self.db_url) as conn:
+                rows = conn.execute(sql, (lookback, self.history_limit)).fetchall()
+        except Exception as e:
+            LOG.warning(f"[{interval}] 期货指标加载失败: {e}")
+            return None
+
+        snap = MetricsSnapshot.from_rows(interval, rows, source_idx)
+        LOG.info(f"[{interval}] 期货指标缓存: {len(snap.slices)} 币种, {len(snap)} 行, {time.time()-t0:.2f}s")
+        return snap
+
+    def latest(self, symbol: str, interval: str = "5m") -> Optional[dict]:
+        snap = self.get(interval)
+        return snap.latest(symbol) if snap else None
+
+    def history(self, symbol: str, interval: str = "5m", limit: int = HISTORY_LIMIT) -> List[dict]:
+        snap = self.get(interval)
+        return snap.history(symbol, limit) if snap else []
+
+    def export(self, intervals: Iterable[str], symbols: Iterable[str] = None) -> Dict[str, MetricsSnapshot]:
+        """导出多个周期的快照（可按币种裁剪），供计算进程 install()"""
+        symbols = list(symbols) if symbols is not None else None
+        result = {}
+        for interval in intervals:
+            snap = self.get(interval)
+            if snap is not None:
+                result[interval] = snap.subset(symbols) if symbols is not None else snap
+        return result
+
+    def install(self, snapshots: Dict[str, MetricsSnapshot]):
+        """注入导出的快照（子进程），之后不再查库"""
+        with self._lock:
+            self._snapshots.update(snapshots)
+            self._installed = True
+
+
+# 全局单例
+metrics_cache = FuturesMetricsCache()
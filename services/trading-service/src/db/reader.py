@@ -12,10 +12,11 @@ import sqlite3
 import threading
 import logging
 from pathlib import Path
-from typing import Dict, List, Sequence
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 from contextlib import contextmanager
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+import numpy as np
 import pandas as pd
 from psycopg.rows import dict_row
 from psycopg_pool import ConnectionPool
@@ -25,6 +26,27 @@ from ..config import config
 _sqlite_lock = threading.Lock()
 LOG = logging.getLogger("indicator_service.db")
 
+# 库中已有的 candles_{周期}_live 视图（schema 009：采集端聚合优先、连续聚合兜底），首次读取时探测
+_live_views: Optional[frozenset] = None
+
+
+def candle_table(interval: str, connect) -> str:
+    """K 线读取表名：有 candles_{周期}_live 视图时读视图，否则读连续聚合 candles_{周期}；connect 仅首次探测时调用"""
+    global _live_views
+    if _live_views is None:
+        try:
+            with connect() as conn:
+                rows = conn.execute(
+                    "SELECT table_name FROM information_schema.views "
+                    "WHERE table_schema = 'market_data' AND table_name LIKE 'candles%_live'"
+                ).fetchall()
+            _live_views = frozenset(r["table_name"] for r in rows)
+        except Exception as e:
+            LOG.warning(f"探测 K 线聚合视图失败，读取连续聚合: {e}")
+            return f"candles_{interval}"
+    live = f"candles_{interval}_live"
+    return live if live in _live_views else f"candles_{interval}"
+
 
 class DataReader:
     """从 TimescaleDB 读取 K 线数据（高性能版）"""
@@ -62,7 +84,7 @@ class DataReader:
         if not symbols:
             return {}
 
-        table = f"candles_{interval}"
+        table = candle_table(interval, self._conn)
         symbols_list = list(symbols)
 
         # 根据周期计算时间范围，避免扫描全部分区
@@ -109,7 +131,7 @@ class DataReader:
         from concurrent.futures import ThreadPoolExecutor, as_completed
 
         result = {}
-        table = f"candles_{interval}"
+        table = candle_table(interval, self._conn)
 
         # 根据周期计算时间范围，避免扫描全部分区
         interval_minutes = {"1m": 1, "5m": 5, "15m": 15, "1h": 60, "4h": 240, "1d": 1440, "1w": 10080}
@@ -171,7 +193,7 @@ class DataReader:
     def _get_klines_fallback(self, symbols: Sequence[str], interval: str, limit: int, exchange: str) -> Dict[str, pd.DataFrame]:
         """回退方案：逐个查询"""
         result = {}
-        table = f"candles_{interval}"
+        table = candle_table(interval, self._conn)
 
         with self._conn() as conn:
             for symbol in symbols:
@@ -216,7 +238,7 @@ class DataReader:
         exchange = exchange or config.exchange
         try:
             with self._conn() as conn:
-                sql = f"SELECT MAX(bucket_ts) FROM market_data.candles_{interval} WHERE exchange = %s"
+                sql = f"SELECT MAX(bucket_ts) FROM market_data.{candle_table(interval, self._conn)} WHERE exchange = %s"
                 row = conn.execute(sql, (exchange,)).fetchone()
                 if row and row["max"]:
                     return row["max"]
@@ -295,8 +317,53 @@ class DataWriter:
             self._cleanup_old_data(conn, table, df)
             conn.commit()
 
+    def write_rows(self, table: str, rows: Sequence):
+        """写入单个表 - 直接写入 ResultRow（columns/values），不经 DataFrame 中转"""
+        if not rows:
+            return
+
+        columns = _merge_columns(rows)
+
+        with self._lock:
+            conn = self._get_conn()
+
+            try:
+                existing_cols = [c[1] for c in conn.execute(f'PRAGMA table_info([{table}])').fetchall()]
+            except Exception:
+                existing_cols = []
+
+            if existing_cols:
+                # 对齐列：缺失的补 None，多余的丢弃
+                columns = existing_cols
+            else:
+                # 表不存在：建表是一次性操作，沿用 to_sql 的列类型推断，与 write() 建出的表一致
+                pd.DataFrame([r.as_dict() for r in rows]).head(0).to_sql(table, conn, if_exists="replace", index=False)
+            data = _align_rows(rows, columns)
+
+            key_idx = _key_indices(columns)
+            if key_idx:
+                i_sym, i_iv, i_ts = key_idx
+                keys = {(r[i_sym], r[i_iv], r[i_ts]) for r in data}
+                conn.executemany(f"DELETE FROM [{table}] WHERE [交易对]=? AND [周期]=? AND [数据时间]=?", keys)
+
+            placeholders = ",".join(["?"] * len(columns))
+            cols_escaped = ",".join(f"[{c}]" for c in columns)
+            conn.executemany(f"INSERT INTO [{table}] ({cols_escaped}) VALUES ({placeholders})", data)
+
+            if key_idx:
+                self._cleanup_pairs(conn, table, {(r[key_idx[0]], r[key_idx[1]]) for r in data})
+            conn.commit()
+
     def _cleanup_old_data(self, conn, table: str, df: pd.DataFrame):
         """清理旧数据，保留每个币种每个周期最新N条"""
+        if "周期" not in df.columns or "交易对" not in df.columns or "数据时间" not in df.columns:
+            return
+
+        pairs = df[["交易对", "周期"]].drop_duplicates().itertuples(index=False, name=None)
+        self._cleanup_pairs(conn, table, pairs)
+
+    def _cleanup_pairs(self, conn, table: str, pairs: Iterable[Tuple[str, str]]):
+        """按 (交易对, 周期) 清理超出保留数量的旧数据"""
         # 保留条数配置（约4GB总量）
         RETENTION = {
             '1m': 120,   # 2小时
@@ -308,12 +375,7 @@ class DataWriter:
             '1w': 104,   # 2年
         }
 
-        if "周期" not in df.columns or "交易对" not in df.columns or "数据时间" not in df.columns:
-            return
-
-        for _, row in df[["交易对", "周期"]].drop_duplicates().iterrows():
-            symbol = row["交易对"]
-            interval = row["周期"]
+        for symbol, interval in pairs:
             limit = RETENTION.get(interval, 60)
 
             try:
@@ -386,6 +448,45 @@ class DataWriter:
                 self._conn = None
 
 
+def _merge_columns(rows: Sequence) -> List[str]:
+    """列并集（保持首次出现顺序，相同 schema 只处理一次）"""
+    columns: Dict[str, None] = {}
+    seen = set()
+    for row in rows:
+        if row.columns in seen:
+            continue
+        seen.add(row.columns)
+        columns.update(dict.fromkeys(row.columns))
+    return list(columns)
+
+
+def _sql_value(v):
+    """numpy 标量转 Python 原生类型（sqlite3 无法绑定 np.int64 等）"""
+    return v.item() if isinstance(v, np.generic) else v
+
+
+def _align_rows(rows: Sequence, columns: List[str]) -> List[tuple]:
+    """按目标列顺序对齐行值，同一 schema 的行共用一次索引映射"""
+    mappings: Dict[tuple, List[int]] = {}
+    data = []
+    for row in rows:
+        picks = mappings.get(row.columns)
+        if picks is None:
+            idx = {c: i for i, c in enumerate(row.columns)}
+            picks = mappings[row.columns] = [idx.get(c, -1) for c in columns]
+        values = row.values
+        data.append(tuple(None if i < 0 else _sql_value(values[i]) for i in picks))
+    return data
+
+
+def _key_indices(columns: List[str]):
+    """(交易对, 周期, 数据时间) 在列中的位置，缺失任一返回 None"""
+    try:
+        return columns.index("交易对"), columns.index("周期"), columns.index("数据时间")
+    except ValueError:
+        return None
+
+
 # 全局单例
 reader = DataReader()
 writer = DataWriter()
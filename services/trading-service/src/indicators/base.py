@@ -7,16 +7,85 @@
     - 必须包含: 交易对, 周期, 数据时间
     - 数据时间: ISO8601 格式
     - 结果写入 SQLite，表名 = meta.name
+    - 单行结果使用 ResultRow（列元组 + 值元组），仅在 API 边界转换为 DataFrame
 """
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple, Union
 import pandas as pd
 
 
 # 默认最小数据量
 DEFAULT_MIN_DATA = 5
 
+# 列元组驻留表：同一指标的所有结果行共享一个 columns 对象（pickle 时只序列化一次）
+_schemas: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+class ResultRow:
+    """
+    单行指标结果（轻量）
+
+    替代一行的 pd.DataFrame，直接交给 SQLite 写入器；
+    保留 empty / to_dict('records') 以兼容按 DataFrame 处理结果的旧调用方。
+    """
+
+    __slots__ = ("columns", "values")
+
+    def __init__(self, columns: Tuple[str, ...], values: Tuple[Any, ...]):
+        self.columns = _schemas.setdefault(columns, columns)
+        self.values = values
+
+    @property
+    def empty(self) -> bool:
+        return False
+
+    def __len__(self) -> int:
+        return 1
+
+    def __getitem__(self, key: str) -> Any:
+        return self.values[self.columns.index(key)]
+
+    def __getstate__(self):
+        return self.columns, self.values
+
+    def __setstate__(self, state):
+        columns, values = state
+        self.columns = _schemas.setdefault(columns, columns)
+        self.values = values
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(zip(self.columns, self.values))
+
+    def to_dict(self, orient: str = "records") -> List[Dict[str, Any]]:
+        """兼容 DataFrame.to_dict('records')"""
+        return [self.as_dict()]
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame([self.values], columns=list(self.columns))
+
+    def __repr__(self) -> str:
+        return f"ResultRow({self.as_dict()!r})"
+
+
+def to_rows(result: Union[ResultRow, pd.DataFrame, None]) -> List[ResultRow]:
+    """将 compute() 的返回值统一为 ResultRow 列表"""
+    if result is None:
+        return []
+    if isinstance(result, ResultRow):
+        return [result]
+    if result.empty:
+        return []
+    columns = tuple(result.columns)
+    return [ResultRow(columns, values) for values in result.itertuples(index=False, name=None)]
+
+
+def rows_to_frame(rows: List[ResultRow]) -> pd.DataFrame:
+    """ResultRow 列表 -> DataFrame（仅用于 API 边界）"""
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame([row.as_dict() for row in rows])
+
 
 @dataclass
 class IndicatorMeta:
@@ -33,7 +102,7 @@ class Indicator(ABC):
     meta: IndicatorMeta
 
     @abstractmethod
-    def compute(self, df: pd.DataFrame, symbol: str, interval: str) -> pd.DataFrame:
+    def compute(self, df: pd.DataFrame, symbol: str, interval: str) -> Union[ResultRow, pd.DataFrame]:
         """
         计算指标
         
@@ -43,7 +112,7 @@ class Indicator(ABC):
             interval: 周期
             
         Returns:
-            DataFrame，必须包含: 交易对, 周期, 数据时间, ...指标字段
+            ResultRow（_make_result 构建）或 DataFrame，必须包含: 交易对, 周期, 数据时间, ...指标字段
         """
         pass
 
@@ -53,7 +122,7 @@ class Indicator(ABC):
         return len(df) >= min_req
 
     def _make_insufficient_result(self, df: pd.DataFrame, symbol: str, interval: str,
-                                   fields: Dict[str, Any]) -> pd.DataFrame:
+                                   fields: Dict[str, Any]) -> ResultRow:
         """生成数据不足时的结果（所有值为None，状态标记为数据不足）"""
         data = {k: None for k in fields}
         if "信号" in fields or "信号概述" in fields:
@@ -61,18 +130,15 @@ class Indicator(ABC):
             data[key] = "数据不足"
         return self._make_result(df, symbol, interval, data)
 
-    def _make_result(self, df: pd.DataFrame, symbol: str, interval: str, data: dict, timestamp=None) -> pd.DataFrame:
+    def _make_result(self, df: pd.DataFrame, symbol: str, interval: str, data: dict, timestamp=None) -> ResultRow:
         """构建标准输出格式，前3列固定为: 交易对, 周期, 数据时间"""
         if timestamp is None:
             timestamp = df.index[-1] if not df.empty else None
         ts_str = timestamp.isoformat() if hasattr(timestamp, "isoformat") else str(timestamp)
 
-        # 固定前3列顺序
+        # 固定前3列顺序（dict 插入顺序保证前3列在前）
         row = {"交易对": symbol, "周期": interval, "数据时间": ts_str, **data}
-        result = pd.DataFrame([row])
-        # 确保列顺序
-        cols = ["交易对", "周期", "数据时间"] + [c for c in result.columns if c not in ("交易对", "周期", "数据时间")]
-        return result[cols]
+        return ResultRow(tuple(row), tuple(row.values()))
 
 
 # 指标注册表
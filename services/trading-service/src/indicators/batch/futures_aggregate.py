@@ -4,6 +4,7 @@ import pandas as pd
 from datetime import datetime, timezone
 from typing import Optional, List
 from ..base import Indicator, IndicatorMeta, register
+from ...db.metrics_cache import metrics_cache
 
 
 def _f(v) -> Optional[float]:
@@ -82,46 +83,8 @@ def _尾部连续根数(sign_list: List[int]) -> Optional[int]:
 
 
 def get_metrics_history(symbol: str, limit: int = 100, interval: str = "5m") -> List[dict]:
-    """从 PostgreSQL 读取期货情绪历史数据"""
-    import psycopg
-    from ...config import config
-
-    # 根据周期选择表和列名（期货只有 5m/15m/1h/4h/1d/1w）
-    if interval == "5m":
-        table = "binance_futures_metrics_5m"
-        time_col = "create_time"
-        closed_col = "is_closed"
-    else:
-        table = f"binance_futures_metrics_{interval}_last"
-        time_col = "bucket"
-        closed_col = "complete"
-
-    try:
-        with psycopg.connect(config.db_url) as conn:
-            with conn.cursor() as cur:
-                cur.execute(f"""
-                    SELECT {time_col}, sum_open_interest, sum_open_interest_value,
-                           count_toptrader_long_short_ratio, sum_toptrader_long_short_ratio,
-                           count_long_short_ratio, sum_taker_long_short_vol_ratio, {closed_col}
-                    FROM market_data.{table}
-                    WHERE symbol = %s AND {time_col} > NOW() - INTERVAL '30 days'
-                    ORDER BY {time_col} DESC
-                    LIMIT %s
-                """, (symbol, limit))
-                rows = cur.fetchall()
-                if not rows:
-                    return []
-                result = []
-                for row in reversed(rows):
-                    result.append({
-                        "datetime": row[0].replace(tzinfo=timezone.utc) if row[0] else None,
-                        "ts": int(row[0].timestamp()) if row[0] else 0,
-                        "oi": row[1], "oiv": row[2], "ctlsr": row[3],
-                        "tlsr": row[4], "lsr": row[5], "tlsvr": row[6], "x": row[7],
-                    })
-                return result
-    except Exception:
-        return []
+    """期货情绪历史数据（共享列式缓存，与 FuturesSentiment 同源）"""
+    return metrics_cache.history(symbol, interval, limit)
 
 
 @register
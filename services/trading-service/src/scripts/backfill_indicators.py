@@ -7,9 +7,8 @@ import time
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-import pandas as pd
 from src.db.reader import writer, reader
-from src.indicators.base import get_batch_indicators
+from src.indicators.base import get_batch_indicators, rows_to_frame, to_rows
 from src.core.async_full_engine import get_high_priority_symbols_fast
 
 # 保留条数配置（与 reader.py 一致）
@@ -53,14 +52,12 @@ def backfill_symbol_interval(symbol: str, interval: str, indicators: dict, reten
                 continue
 
             try:
-                result = indicator.compute(window_df, symbol, interval)
-                if result is not None and not result.empty:
-                    results.append(result)
+                results.extend(to_rows(indicator.compute(window_df, symbol, interval)))
             except Exception:
                 continue
 
         if results:
-            all_results = pd.concat(results, ignore_index=True)
+            all_results = rows_to_frame(results)
             all_results = all_results.drop_duplicates(
                 subset=['交易对', '周期', '数据时间'],
                 keep='last'
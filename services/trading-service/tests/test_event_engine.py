@@ -0,0 +1,138 @@
+"""Event engine scheduling tests: deadline queue ordering/expiry, symbol groups, trigger coalescing, overrun prediction, lateness."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.core import event_engine
+from src.core.event_engine import (
+    GROUP_HIGH,
+    GROUP_REST,
+    TIER_FAST,
+    TIER_FULL,
+    TIER_SLOW,
+    DeadlineQueue,
+    EventEngine,
+    TriggerEvent,
+)
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _event(interval, tier=TIER_FAST, deadline_in=60.0, trigger_in=0.0, group=GROUP_HIGH):
+    now = _now()
+    return TriggerEvent(interval=interval, trigger_time=now + timedelta(seconds=trigger_in),
+                        deadline=now + timedelta(seconds=deadline_in), tier=tier, group=group)
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    # 不注册进程信号、不加载指标模块
+    monkeypatch.setattr(event_engine.signal, "signal", lambda *a: None)
+    monkeypatch.setattr(EventEngine, "_split_indicators", staticmethod(lambda: (["fast"], ["slow"])))
+    e = EventEngine(intervals=["1m", "5m"], workers=1)
+    e._ready_for_events = True
+    return e
+
+
+def test_queue_orders_by_tier_then_deadline():
+    q = DeadlineQueue()
+    q.put(_event("1h", TIER_SLOW, deadline_in=10))
+    q.put(_event("5m", TIER_FAST, deadline_in=300))
+    q.put(_event("1m", TIER_FAST, deadline_in=60))
+    q.put(TriggerEvent(interval="__full__", trigger_time=_now(), tier=TIER_FULL))
+    order = [(e.interval, e.tier) for e in iter(lambda: q.get(timeout=0), None)]
+    assert order == [("1m", TIER_FAST), ("5m", TIER_FAST), ("1h", TIER_SLOW), ("__full__", TIER_FULL)]
+
+
+def test_queue_drops_expired_triggers():
+    q = DeadlineQueue()
+    q.put(_event("1m", TIER_FAST, deadline_in=-1))
+    q.put(_event("5m", TIER_FAST, deadline_in=60))
+    assert q.get(timeout=0).interval == "5m"
+    assert q.get(timeout=0.01) is None and q.qsize() == 0
+
+
+def test_queue_coalesces_same_interval_and_tier():
+    q = DeadlineQueue()
+    old, new = _event("1m", TIER_FAST, deadline_in=30), _event("1m", TIER_FAST, deadline_in=90)
+    slow = _event("1m", TIER_SLOW, deadline_in=30)
+    for e in (old, slow, new):
+        q.put(e)
+    assert q.qsize() == 2
+    assert q.get(timeout=0) is new  # 旧触发被合并，不再出队
+    assert q.get(timeout=0) is slow
+    assert q.get(timeout=0.01) is None
+
+
+def test_overrun_prediction_only_for_slow_tier(engine):
+    slow = _event("5m", TIER_SLOW, deadline_in=30)
+    assert engine._would_overrun(slow) is False  # 无历史耗时
+    engine._duration_ewma[("5m", TIER_SLOW, GROUP_HIGH)] = 60.0
+    assert engine._would_overrun(slow) is True
+    assert engine._would_overrun(_event("5m", TIER_SLOW, deadline_in=120)) is False
+    # 推迟触发的时间也计入
+    assert engine._would_overrun(_event("5m", TIER_SLOW, deadline_in=120, trigger_in=90)) is True
+    engine._duration_ewma[("5m", TIER_FAST, GROUP_HIGH)] = 600.0
+    assert engine._would_overrun(_event("5m", TIER_FAST, deadline_in=30)) is False
+
+
+def test_closed_1m_bar_triggers_are_not_expired(engine):
+    # NOTIFY 在 1m 闭合后到达：bucket_ts 为刚闭合那根的开盘时间，截止时间为下一根闭合
+    engine.intervals = ["1m"]
+    engine._high_symbols = ["BTCUSDT"]
+    bucket = _now().replace(second=0, microsecond=0) - timedelta(minutes=1)
+    engine._schedule_candle_triggers(bucket.isoformat())
+
+    got = {(e.interval, e.tier): e for e in iter(lambda: engine._trigger_queue.get(timeout=0), None)}
+    assert set(got) == {("1m", TIER_FAST), ("1m", TIER_SLOW)}  # 无其余币种：只有高优先级分组
+    assert all(e.deadline == bucket + timedelta(minutes=2) for e in got.values())
+
+
+def test_queue_runs_high_priority_symbols_first_within_tier():
+    q = DeadlineQueue()
+    q.put(_event("1m", TIER_SLOW, deadline_in=10, group=GROUP_HIGH))
+    q.put(_event("1m", TIER_FAST, deadline_in=10, group=GROUP_REST))
+    q.put(_event("5m", TIER_FAST, deadline_in=300, group=GROUP_HIGH))
+    q.put(_event("1m", TIER_FAST, deadline_in=60, group=GROUP_HIGH))
+    q.put(_event("1m", TIER_FAST, deadline_in=60, group=GROUP_HIGH))  # 同分组合并
+    order = [(e.interval, e.tier, e.group) for e in iter(lambda: q.get(timeout=0), None)]
+    assert order == [("1m", TIER_FAST, GROUP_HIGH), ("5m", TIER_FAST, GROUP_HIGH),
+                     ("1m", TIER_FAST, GROUP_REST), ("1m", TIER_SLOW, GROUP_HIGH)]
+
+
+def test_group_symbols_keeps_configured_rest(engine, monkeypatch):
+    monkeypatch.setattr(event_engine.config, "shard_id", "")  # 不分片
+    top = {"BTCUSDT", "ETHUSDT", "SOLUSDT"}
+    assert sorted(engine._group_symbols(top)[0]) == sorted(top) and engine._group_symbols(top)[1] == []
+    # 指定币种：其中的高优先级币种先算，其余不再被忽略
+    engine.symbols = ["DOGEUSDT", "ETHUSDT", "XRPUSDT", "BTCUSDT"]
+    assert engine._group_symbols(top) == (["ETHUSDT", "BTCUSDT"], ["DOGEUSDT", "XRPUSDT"])
+
+
+def test_candle_triggers_enqueue_symbol_groups(engine):
+    engine.intervals = ["1m"]
+    engine._high_symbols, engine._rest_symbols = ["BTCUSDT"], ["DOGEUSDT"]
+    bucket = _now().replace(second=0, microsecond=0) - timedelta(minutes=1)
+    engine._schedule_candle_triggers(bucket.isoformat())
+    got = [(e.tier, e.group, e.symbols) for e in iter(lambda: engine._trigger_queue.get(timeout=0), None)]
+    assert got == [(TIER_FAST, GROUP_HIGH, ["BTCUSDT"]), (TIER_FAST, GROUP_REST, ["DOGEUSDT"]),
+                   (TIER_SLOW, GROUP_HIGH, ["BTCUSDT"]), (TIER_SLOW, GROUP_REST, ["DOGEUSDT"])]
+
+
+def test_lateness_histogram_counts_large_slack(engine, monkeypatch):
+    computed = []
+    monkeypatch.setattr(engine, "_do_compute", lambda interval, tier, symbols: computed.append(symbols))
+    labels = {"interval": "1w", "tier": TIER_FAST, "group": GROUP_REST}
+    key = tuple(sorted(labels.items()))
+    event = _event("1w", TIER_FAST, deadline_in=7 * 86400, group=GROUP_REST)
+    event.symbols = ["DOGEUSDT"]
+    engine._run_single_event(event)
+    assert computed == [["DOGEUSDT"]]
+    # 余量超过最大有限桶（1 小时）时仍计入 +Inf 桶，与 count 一致
+    counts = event_engine._lateness._counts[key]
+    assert counts[float("inf")] == event_engine._lateness._totals[key] >= 1
+    assert counts[3600] == 0
+    assert ("1w", TIER_FAST, GROUP_REST) in engine._duration_ewma
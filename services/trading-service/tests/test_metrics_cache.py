@@ -0,0 +1,136 @@
+"""Futures metrics cache tests: columnar snapshot vs the old per-symbol queries, subset, staleness, install."""
+
+import pickle
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.db import metrics_cache as mc
+from src.db.metrics_cache import FuturesMetricsCache, MetricsSnapshot
+
+T0 = datetime(2024, 3, 1, 0, 0)  # 与库中一致：5m 原始表 create_time 为 UTC naive
+
+
+def _rows(symbols=("AUSDT", "BUSDT", "CUSDT"), n=30, seed=7):
+    """模拟 _load 的返回：(symbol, t, oi, oiv, ctlsr, tlsr, lsr, tlsvr, closed)，按 symbol, t 升序"""
+    rnd = random.Random(seed)
+    rows = []
+    for s in symbols:
+        for i in range(n):
+            values = [None if rnd.random() < 0.05 else round(rnd.random() * 1e3, 5) for _ in range(6)]
+            rows.append((s, T0 + timedelta(minutes=5 * i), *values, i < n - 1))
+    return rows
+
+
+def _old_history(rows, symbol, limit):
+    """原 get_metrics_history：按时间倒序取 limit 根，再反转为升序"""
+    desc = sorted((r for r in rows if r[0] == symbol), key=lambda r: r[1], reverse=True)[:limit]
+    return [{
+        "datetime": r[1].replace(tzinfo=timezone.utc), "ts": int(r[1].replace(tzinfo=timezone.utc).timestamp()),
+        "oi": r[2], "oiv": r[3], "ctlsr": r[4], "tlsr": r[5], "lsr": r[6], "tlsvr": r[7], "x": r[8],
+    } for r in reversed(desc)]
+
+
+def _old_latest(rows, symbol):
+    """原 _load_all_metrics：DISTINCT ON (symbol) 取最新一行"""
+    r = max((r for r in rows if r[0] == symbol), key=lambda r: r[1], default=None)
+    if r is None:
+        return None
+    return {"datetime": r[1].replace(tzinfo=timezone.utc),
+            "oi": r[2], "oiv": r[3], "ctlsr": r[4], "tlsr": r[5], "lsr": r[6], "tlsvr": r[7]}
+
+
+@pytest.mark.parametrize("limit", [1, 10, 30, 240])
+def test_history_matches_old_query(limit):
+    rows = _rows()
+    snap = MetricsSnapshot.from_rows("5m", rows)
+    for symbol in ("AUSDT", "BUSDT", "CUSDT"):
+        assert snap.history(symbol, limit) == _old_history(rows, symbol, limit)
+    assert snap.history("ZUSDT", limit) == []
+
+
+def test_latest_matches_old_query():
+    rows = _rows()
+    snap = MetricsSnapshot.from_rows("5m", rows)
+    for symbol in ("AUSDT", "BUSDT", "CUSDT"):
+        got = snap.latest(symbol)
+        assert {k: got[k] for k in _old_latest(rows, symbol)} == _old_latest(rows, symbol)
+    assert snap.latest("ZUSDT") is None
+    assert len(snap) == 90 and snap.max_ts == (T0 + timedelta(minutes=5 * 29)).replace(tzinfo=timezone.utc).timestamp()
+
+
+def test_subset_keeps_only_requested_symbols():
+    rows = _rows()
+    snap = MetricsSnapshot.from_rows("1h", rows, source_idx=42)
+    sub = snap.subset(["CUSDT", "AUSDT", "ZUSDT"])
+    assert set(sub.slices) == {"AUSDT", "CUSDT"} and len(sub) == 60
+    assert (sub.interval, sub.source_idx, sub.loaded_at) == ("1h", 42, snap.loaded_at)
+    for symbol in ("AUSDT", "CUSDT"):
+        assert sub.history(symbol, 240) == snap.history(symbol, 240)
+    assert sub.latest("BUSDT") is None
+    assert len(snap.subset([])) == 0
+    # 跨进程传递：pickle 往返后内容不变
+    assert pickle.loads(pickle.dumps(sub)).history("AUSDT", 5) == sub.history("AUSDT", 5)
+
+
+def _snap(interval, source_idx, last_bucket_idx, loaded_at):
+    """最新一根位于第 last_bucket_idx 个数据源 bucket 的单行快照"""
+    t = datetime.fromtimestamp(last_bucket_idx * mc.SOURCE_PERIOD, tz=timezone.utc)
+    snap = MetricsSnapshot.from_rows(interval, [("AUSDT", t, 1, 1, 1, 1, 1, 1, True)], source_idx)
+    snap.loaded_at = loaded_at
+    return snap
+
+
+def test_is_due_follows_source_buckets():
+    cache = FuturesMetricsCache(db_url="postgresql://unused")
+    idx = 1_000_000
+    now = idx * mc.SOURCE_PERIOD + mc.SOURCE_LAG + 1  # 第 idx 个 bucket 刚到期
+    assert cache._is_due(None, now) is True
+
+    # 已加载到当前 bucket 且数据齐全：直到下一个 bucket 到期才刷新
+    fresh = _snap("5m", idx, idx, now)
+    assert cache._is_due(fresh, now + 200) is False
+    assert cache._is_due(fresh, now + mc.SOURCE_PERIOD) is True
+
+    # 5m 新 bucket 尚未入库：RETRY_SECONDS 后短间隔重试；聚合周期不重试
+    lagging = _snap("5m", idx, idx - 1, now)
+    assert cache._is_due(lagging, now + mc.RETRY_SECONDS - 1) is False
+    assert cache._is_due(lagging, now + mc.RETRY_SECONDS) is True
+    lagging.interval = "1h"
+    assert cache._is_due(lagging, now + mc.RETRY_SECONDS) is False
+
+
+def test_get_loads_once_per_bucket(monkeypatch):
+    cache = FuturesMetricsCache(db_url="postgresql://unused")
+    loads = []
+
+    def load(interval, source_idx):
+        loads.append((interval, source_idx))
+        return MetricsSnapshot.from_rows(interval, _rows(n=3), source_idx)
+
+    monkeypatch.setattr(cache, "_load", load)
+    clock = [1_000_000 * mc.SOURCE_PERIOD + mc.SOURCE_LAG + 1.0]
+    monkeypatch.setattr(mc.time, "time", lambda: clock[0])
+    assert cache.latest("AUSDT", "1h")["x"] is False
+    clock[0] += 100
+    assert len(cache.history("AUSDT", "1h")) == 3
+    assert loads == [("1h", 1_000_000)]
+    clock[0] += mc.SOURCE_PERIOD
+    cache.get("1h")
+    assert loads[-1] == ("1h", 1_000_001)
+    assert cache.get("1m") is None  # 期货数据无 1m
+
+
+def test_install_stops_database_loads(monkeypatch):
+    source = FuturesMetricsCache(db_url="postgresql://unused")
+    monkeypatch.setattr(source, "_load", lambda interval, idx: MetricsSnapshot.from_rows(interval, _rows(), idx))
+    exported = source.export(["5m", "1h"], ["AUSDT"])
+    assert set(exported) == {"5m", "1h"} and all(set(s.slices) == {"AUSDT"} for s in exported.values())
+
+    worker = FuturesMetricsCache(db_url="postgresql://unused")
+    monkeypatch.setattr(worker, "_load", lambda *a: pytest.fail("install 后不应再查库"))
+    worker.install(pickle.loads(pickle.dumps(exported)))
+    assert worker.history("AUSDT", "1h") == source.history("AUSDT", "1h")
+    assert worker.latest("BUSDT", "5m") is None
+    assert worker.get("4h") is None  # 未导出的周期也不查库
@@ -0,0 +1,58 @@
+"""DB reader tests: K-line table selection (rollup live views vs continuous aggregates)."""
+
+import importlib
+from contextlib import contextmanager
+
+import pytest
+
+# src.db 包把 reader 实例导出为同名属性，按模块路径取模块本身
+reader = importlib.import_module("src.db.reader")
+
+
+class _Conn:
+    def __init__(self, views, calls):
+        self.views, self.calls = views, calls
+
+    def execute(self, sql, params=None):
+        self.calls.append(sql)
+        return self
+
+    def fetchall(self):
+        return [{"table_name": v} for v in self.views]
+
+
+@pytest.fixture
+def connect(monkeypatch):
+    monkeypatch.setattr(reader, "_live_views", None)
+    calls = []
+
+    def factory(views):
+        @contextmanager
+        def connect():
+            yield _Conn(views, calls)
+        return connect
+
+    return factory, calls
+
+
+def test_candle_table_prefers_live_view(connect):
+    factory, calls = connect
+    conn = factory(["candles_5m_live", "candles_1h_live"])
+    assert reader.candle_table("5m", conn) == "candles_5m_live"
+    assert reader.candle_table("1h", conn) == "candles_1h_live"
+    assert reader.candle_table("1m", conn) == "candles_1m"
+    assert len(calls) == 1  # 只探测一次
+
+
+def test_candle_table_without_views_or_on_error(connect):
+    factory, calls = connect
+
+    @contextmanager
+    def broken():
+        raise OSError("db down")
+        yield
+
+    assert reader.candle_table("5m", broken) == "candles_5m"
+    assert reader._live_views is None  # 探测失败不缓存，下次重试
+    assert reader.candle_table("5m", factory([])) == "candles_5m"
+    assert reader._live_views == frozenset()
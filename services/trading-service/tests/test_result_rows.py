@@ -0,0 +1,127 @@
+"""ResultRow write path tests: column alignment, numpy scalars, delete-then-insert and retention, vs the DataFrame writer."""
+
+import importlib
+import pickle
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.indicators.base import ResultRow, rows_to_frame, to_rows
+
+# src.db 包把 reader 实例导出为同名属性，按模块路径取模块本身
+reader = importlib.import_module("src.db.reader")
+
+COLS = ("交易对", "周期", "数据时间", "值")
+
+
+def _row(symbol, interval, ts, value, **extra):
+    return ResultRow(COLS + tuple(extra), (symbol, interval, ts, value) + tuple(extra.values()))
+
+
+def _table(path, table="指标"):
+    conn = sqlite3.connect(path)
+    try:
+        cols = [c[1] for c in conn.execute(f"PRAGMA table_info([{table}])")]
+        rows = conn.execute(f"SELECT * FROM [{table}] ORDER BY 交易对, 周期, 数据时间").fetchall()
+        return cols, rows
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def writers(tmp_path):
+    """同一批结果分别走 write_rows 与原 write(DataFrame)"""
+    made = [reader.DataWriter(tmp_path / "rows.db"), reader.DataWriter(tmp_path / "frame.db")]
+    yield made
+    for w in made:
+        if w._conn is not None:
+            w._conn.close()
+
+
+def test_result_row_compat_and_pickle():
+    row = _row("BTCUSDT", "1m", "2024-03-01T00:00:00", 1.5)
+    assert not row.empty and len(row) == 1 and row["值"] == 1.5
+    assert row.to_dict("records") == [dict(zip(COLS, ("BTCUSDT", "1m", "2024-03-01T00:00:00", 1.5)))]
+    # 同一 schema 的列元组驻留共享，pickle 往返后仍指向同一对象
+    other = pickle.loads(pickle.dumps(_row("ETHUSDT", "1m", "2024-03-01T00:00:00", 2.0)))
+    assert other.columns is row.columns and other.values[0] == "ETHUSDT"
+
+    df = pd.DataFrame([row.as_dict(), other.as_dict()])
+    assert [r.values for r in to_rows(df)] == [row.values, other.values]
+    assert to_rows(None) == [] and to_rows(pd.DataFrame()) == [] and to_rows(row) == [row]
+    pd.testing.assert_frame_equal(rows_to_frame([row, other]), df)
+
+
+def test_write_rows_aligns_columns_across_schemas(writers):
+    by_rows, by_frame = writers
+    rows = [
+        _row("AUSDT", "1m", "2024-03-01T00:00:00", 1.0, 信号="买"),
+        _row("BUSDT", "1m", "2024-03-01T00:00:00", 2.0),                 # 缺少 信号
+        ResultRow(("数据时间", "交易对", "周期", "额外", "值"),            # 列顺序不同 + 新列
+                  ("2024-03-01T00:00:00", "CUSDT", "1m", 9, 3.0)),
+    ]
+    by_rows.write_rows("指标", rows)
+    by_frame.write("指标", rows_to_frame(rows))
+    cols, got = _table(by_rows.sqlite_path)
+    assert cols == ["交易对", "周期", "数据时间", "值", "信号", "额外"]
+    assert got == [("AUSDT", "1m", "2024-03-01T00:00:00", 1.0, "买", None),
+                   ("BUSDT", "1m", "2024-03-01T00:00:00", 2.0, None, None),
+                   ("CUSDT", "1m", "2024-03-01T00:00:00", 3.0, None, 9)]
+    assert _table(by_frame.sqlite_path) == (cols, got)
+
+    # 表已存在：按已有列对齐，多余列丢弃、缺失列补 NULL
+    later = [ResultRow(("交易对", "周期", "数据时间", "值", "未知"), ("DUSDT", "1m", "2024-03-01T00:01:00", 4.0, "x"))]
+    by_rows.write_rows("指标", later)
+    by_frame.write("指标", rows_to_frame(later))
+    assert _table(by_rows.sqlite_path)[1][-1] == ("DUSDT", "1m", "2024-03-01T00:01:00", 4.0, None, None)
+    assert _table(by_rows.sqlite_path) == _table(by_frame.sqlite_path)
+
+
+def test_write_rows_converts_numpy_scalars(writers):
+    by_rows, _ = writers
+    by_rows.write_rows("指标", [
+        _row("AUSDT", "1m", "2024-03-01T00:00:00", np.float64(1.25), 次数=np.int64(7), 标记=np.bool_(True)),
+    ])
+    _, got = _table(by_rows.sqlite_path)
+    assert got == [("AUSDT", "1m", "2024-03-01T00:00:00", 1.25, 7, 1)]
+    assert all(not isinstance(v, bytes) for v in got[0])  # 未以 blob 形式写入
+
+
+def test_write_rows_replaces_same_key(writers):
+    by_rows, by_frame = writers
+    first = [_row("AUSDT", "1m", "2024-03-01T00:00:00", 1.0), _row("AUSDT", "1m", "2024-03-01T00:01:00", 2.0),
+             _row("BUSDT", "1m", "2024-03-01T00:00:00", 3.0)]
+    again = [_row("AUSDT", "1m", "2024-03-01T00:01:00", 20.0), _row("AUSDT", "5m", "2024-03-01T00:01:00", 5.0)]
+    for batch in (first, again):
+        by_rows.write_rows("指标", batch)
+        by_frame.write("指标", rows_to_frame(batch))
+    _, got = _table(by_rows.sqlite_path)
+    # 同一 (交易对, 周期, 数据时间) 先删后插，不产生重复；其他周期不受影响
+    assert [r[:4] for r in got] == [("AUSDT", "1m", "2024-03-01T00:00:00", 1.0),
+                                   ("AUSDT", "1m", "2024-03-01T00:01:00", 20.0),
+                                   ("AUSDT", "5m", "2024-03-01T00:01:00", 5.0),
+                                   ("BUSDT", "1m", "2024-03-01T00:00:00", 3.0)]
+    assert _table(by_rows.sqlite_path) == _table(by_frame.sqlite_path)
+
+
+def test_write_rows_keeps_retention_per_pair(writers):
+    by_rows, by_frame = writers
+    # 1m 保留 120 条：写入 130 条后只留最新 120 条，另一币种不受影响
+    stamps = [f"2024-03-01T{m // 60:02d}:{m % 60:02d}:00" for m in range(130)]
+    batches = [[_row("AUSDT", "1m", ts, float(i))] for i, ts in enumerate(stamps)]
+    batches.append([_row("BUSDT", "1m", stamps[0], 0.0)])
+    for batch in batches:
+        by_rows.write_rows("指标", batch)
+        by_frame.write("指标", rows_to_frame(batch))
+    _, got = _table(by_rows.sqlite_path)
+    kept = [r[2] for r in got if r[0] == "AUSDT"]
+    assert kept == stamps[10:] and [r[0] for r in got].count("BUSDT") == 1
+    assert _table(by_rows.sqlite_path) == _table(by_frame.sqlite_path)
+
+    # 无 (交易对, 周期, 数据时间) 键的表：只追加，不删除不清理
+    plain = [ResultRow(("名称", "值"), ("a", 1)), ResultRow(("名称", "值"), ("a", 1))]
+    by_rows.write_rows("无键表", plain)
+    by_rows.write_rows("无键表", plain)
+    assert by_rows._get_conn().execute("SELECT COUNT(*) FROM [无键表]").fetchone()[0] == 4
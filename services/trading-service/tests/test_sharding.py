@@ -0,0 +1,106 @@
+"""Sharding tests: consistent hashing and multi-process shard merge."""
+
+import os
+import sqlite3
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+from src.core.sharding import HashRing, merge_shard, shard_sqlite_path
+
+SERVICE_ROOT = Path(__file__).parent.parent
+MEMBERS = ["engine-0", "engine-1", "engine-2"]
+SYMBOLS = [f"SYM{i}USDT" for i in range(60)]
+
+# 子进程：按 SHARD_ID 过滤币种，写入分片本地库并合并到逻辑库
+WORKER = textwrap.dedent("""
+    from src.config import config
+    from src.core.sharding import shard_symbols, merge_shard
+    from src.db.reader import DataWriter
+    from src.indicators.base import ResultRow
+
+    symbols = shard_symbols({symbols!r})
+    rows = [ResultRow(("交易对", "周期", "数据时间", "值"), (s, "1h", "2026-01-01T00:00:00+00:00", {version}))
+            for s in symbols]
+    DataWriter(config.sqlite_path).write_rows("测试指标.py", rows)
+    merge_shard()
+    print(len(symbols))
+""")
+
+
+def _run_shard(tmp_path: Path, shard_id: str, version: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "SHARD_MEMBERS": ",".join(MEMBERS),
+        "SHARD_ID": shard_id,
+        "INDICATOR_SQLITE_PATH": str(tmp_path / "market_data.db"),
+    }
+    code = WORKER.format(symbols=SYMBOLS, version=version)
+    return subprocess.Popen([sys.executable, "-c", code], cwd=SERVICE_ROOT, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+
+def test_ring_assignment_is_disjoint_and_complete():
+    assignment = HashRing(MEMBERS).assign(SYMBOLS)
+    assigned = [s for group in assignment.values() for s in group]
+    assert sorted(assigned) == sorted(SYMBOLS)
+    assert all(group for group in assignment.values())
+
+
+def test_ring_membership_change_moves_few_symbols():
+    before = HashRing(MEMBERS)
+    after = HashRing(MEMBERS + ["engine-3"])
+    moved = [s for s in SYMBOLS if before.owner(s) != after.owner(s)]
+    # 新成员只接管约 1/4 的币种，其余保持不动
+    assert all(after.owner(s) == "engine-3" for s in moved)
+    assert len(moved) < len(SYMBOLS) / 2
+
+
+def test_multi_process_shards_merge_into_one_db(tmp_path):
+    for version in (1, 2):
+        procs = [_run_shard(tmp_path, sid, version) for sid in MEMBERS]
+        counts = []
+        for proc in procs:
+            out, err = proc.communicate(timeout=60)
+            assert proc.returncode == 0, err
+            counts.append(int(out.strip().splitlines()[-1]))
+        assert sum(counts) == len(SYMBOLS)
+
+        conn = sqlite3.connect(tmp_path / "market_data.db")
+        rows = conn.execute("SELECT 交易对, 值 FROM [测试指标.py]").fetchall()
+        conn.close()
+        assert sorted(r[0] for r in rows) == sorted(SYMBOLS)
+        assert {r[1] for r in rows} == {version}
+
+    for sid in MEMBERS:
+        assert (tmp_path / f"market_data.{sid}.db").exists()
+
+
+def _shard_db(path: Path, symbols, value, global_value):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE [测试指标.py] (交易对 TEXT, 值 INTEGER)")
+    conn.executemany("INSERT INTO [测试指标.py] VALUES (?, ?)", [(s, value) for s in symbols])
+    conn.execute("CREATE TABLE [全局.py] (值 INTEGER)")
+    conn.execute("INSERT INTO [全局.py] VALUES (?)", (global_value,))
+    conn.commit()
+    conn.close()
+
+
+def test_merge_skips_unowned_symbols_and_global_tables(tmp_path):
+    ring = HashRing(MEMBERS)
+    target = tmp_path / "market_data.db"
+    # 每个分片库都残留全部币种（如成员变更前的旧数据），只有归属本分片的行应被合并
+    for i, sid in enumerate(MEMBERS):
+        _shard_db(shard_sqlite_path(sid, target), SYMBOLS, i, i)
+    for sid in reversed(MEMBERS):
+        merge_shard(shard_sqlite_path(sid, target), target, shard_id=sid, ring=ring)
+
+    conn = sqlite3.connect(target)
+    rows = dict(conn.execute("SELECT 交易对, 值 FROM [测试指标.py]").fetchall())
+    global_rows = conn.execute("SELECT 值 FROM [全局.py]").fetchall()
+    conn.close()
+    assert sorted(rows) == sorted(SYMBOLS)
+    assert all(MEMBERS[v] == ring.owner(s) for s, v in rows.items())
+    # 无币种列的表只取首个成员，与合并顺序无关
+    assert global_rows == [(0,)]